@@ -87,7 +87,7 @@ Provided by Gismo 0.0.3
 
 ghenv.Component.Name = "Gismo_Air Pollution"
 ghenv.Component.NickName = "AirPollution"
-ghenv.Component.Message = "VER 0.0.3\nMAY_10_2025"
+ghenv.Component.Message = "VER 0.0.3\nOCT_17_2026"
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Gismo"
 ghenv.Component.SubCategory = "1 | OpenStreetMap"
@@ -225,14 +225,7 @@ def main(_analysisType, _location, _APIkey, _radiusInMeter, _numOfCell, _current
     
     
     # b)3) get latitude,longitude for each divPt
-    latitude_L = []
-    longitude_L = []
-    
-    for divPt in divPt_L:
-        latitude, longitude = gismo_gis.XYtoLocation(divPt, _location, _origin)
-        
-        latitude_L.append(latitude)
-        longitude_L.append(longitude)
+    latitude_L, longitude_L = gismo_gis.XYtoLocations(divPt_L, _location, _origin)
     
     
     
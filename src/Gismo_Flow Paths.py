@@ -21,6 +21,10 @@ Component based on:
 
 "Finding the downhill direction vector when given a plane defined by a normal and a point", stackoverflow.com topic by Zach Helms, 2016
 http://stackoverflow.com/q/14369233/3137724
+
+"Priority-flood: An optimal depression-filling and watershed-labeling algorithm for digital elevation models", Barnes, Lehman, Mulla, Computers & Geosciences, 2014
+
+"A new method for the determination of flow directions and upslope areas in grid digital elevation models", Tarboton, Water Resources Research, 1997
 -
 Provided by Gismo 0.0.3
     
@@ -48,6 +52,16 @@ Provided by Gismo 0.0.3
                         1 - Curves
                         -
                         If nothing supplied, flowPathsType_ input will be set to 0 (Polylines).
+        flowMethod_: Choose one of the three flow path methods:
+                     -
+                     0 - Mesh (each flow path is traced separately, step by step, down the _geometry mesh)
+                     1 - D8 (the _geometry is sampled to a regular elevation grid with stepSize_ distance between grid points, its depressions are filled and the flow of each grid point goes to its steepest downslope neighbor)
+                     2 - D-infinity (same as 1, but the flow of each grid point is split between two neighbors around the steepest downslope direction)
+                     -
+                     Flow directions of the whole grid are calculated only once for 1 and 2, so they are much faster than 0 for large number of initial points. They also create the "accumulation" and "catchments" outputs.
+                     Grid with more than 1 000 000 points will be made sparser: the distance between its points is increased from stepSize_ to the smallest distance for which the grid has at most 1 000 000 points (around the square root of the _geometry's bounding box area divided by 1 000 000).
+                     -
+                     If nothing supplied, flowMethod_ input will be set to 0 (Mesh).
         bakeIt_: Set to "True" to bake the flowpaths geometry into the Rhino scene.
                  -
                  If not supplied default value "False" will be used.
@@ -60,15 +74,20 @@ Provided by Gismo 0.0.3
         titleOrigin: Title base point, which can be used to move the "title" geometry with grasshopper's "Move" component.
                      -
                      Connect this output to a Grasshopper's "Point" parameter in order to preview the point in the Rhino scene.
+        accumulation: Flow accumulation mesh, for flowMethod_ = 1 or 2.
+                      Each mesh vertex is colored by its upslope area - the area from which the water flows through that vertex, in logarithmic scale.
+                      Higher values indicate the places where water collects: streams and rivers.
+        catchments: Catchments (drainage basins) mesh, for flowMethod_ = 1 or 2.
+                    Mesh vertices which drain to the same outlet (a point on the _geometry edge, or its lowest point) have the same color.
 """
 
 ghenv.Component.Name = "Gismo_Flow Paths"
 ghenv.Component.NickName = "FlowPaths"
-ghenv.Component.Message = "VER 0.0.3\nJAN_29_2019"
+ghenv.Component.Message = "VER 0.0.3\nOCT_17_2026"
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Gismo"
 ghenv.Component.SubCategory = "2 | Terrain"
-#compatibleGismoVersion = VER 0.0.3\nJAN_29_2019
+#compatibleGismoVersion = VER 0.0.3\nOCT_17_2026
 try: ghenv.Component.AdditionalHelpFromDocStrings = "2"
 except: pass
 
@@ -78,21 +97,22 @@ import scriptcontext as sc
 import Grasshopper
 import System
 import Rhino
+import random
 import time
 import math
 import gc
 
 
-def checkInputData(geometryIds, numOfInitialPts, initialPtsSpread, stepSize, flowPathsType):
+def checkInputData(geometryIds, numOfInitialPts, initialPtsSpread, stepSize, flowPathsType, flowMethod):
     
     # check inputs
     if len(geometryIds) == 0:
-        geometryMesh = numOfInitialPts = initialPtsSpread = initialPtsSpreadLabel = stepSize = flowPathsType = flowPathsTypeLabel = None
+        geometryMesh = numOfInitialPts = initialPtsSpread = initialPtsSpreadLabel = stepSize = flowPathsType = flowPathsTypeLabel = flowMethod = flowMethodLabel = None
         validInputData = False
         printMsg = "\"_geometry\" input is empty.\n" + \
                    "Please supply a surface and/or polysurface and/or mesh for which you would like to conduct the flow path analysis (that can be a building, terrain, landscape or any other sort of geometry)."
         
-        return geometryMesh, numOfInitialPts, initialPtsSpread, initialPtsSpreadLabel, stepSize, flowPathsType, flowPathsTypeLabel, validInputData, printMsg
+        return geometryMesh, numOfInitialPts, initialPtsSpread, initialPtsSpreadLabel, stepSize, flowPathsType, flowPathsTypeLabel, flowMethod, flowMethodLabel, validInputData, printMsg
     
     
     if (numOfInitialPts == None):
@@ -139,6 +159,15 @@ def checkInputData(geometryIds, numOfInitialPts, initialPtsSpread, stepSize, flo
         flowPathsTypeLabel = "Polylines"
     
     
+    if (flowMethod == None):
+        flowMethod = 0  # default (mesh)
+    if (flowMethod not in [0,1,2]):
+        print "\"flowMethod_\" input only accepts values: 0 (Mesh), 1 (D8) and 2 (D-infinity).\n" + \
+              "\"flowMethod_\" input set to 0 (Mesh)."
+        flowMethod = 0
+    flowMethodLabel = ["Mesh", "D8", "D-infinity"][flowMethod]
+    
+    
     
     # create a geometryMesh from _geometry inputs
     geometryMesh = Rhino.Geometry.Mesh()  # joined mesh of all geometry supplied into the "_geometry" input
@@ -160,17 +189,17 @@ def checkInputData(geometryIds, numOfInitialPts, initialPtsSpread, stepSize, flo
         pass
     else:
         # neither mesh nor brep object(s) have been supplied into the "_geometry" input
-        geometryMesh = numOfInitialPts = initialPtsSpread = initialPtsSpreadLabel = stepSize = flowPathsType = flowPathsTypeLabel = None
+        geometryMesh = numOfInitialPts = initialPtsSpread = initialPtsSpreadLabel = stepSize = flowPathsType = flowPathsTypeLabel = flowMethod = flowMethodLabel = None
         validInputData = False
         printMsg = "The data you supplied to the \"_geometry\" input is neither a surface and/or polysurface and/or mesh.\n" + \
                    "Please input some (or all) of these types of data to the \"_geometry\" input."
         
-        return geometryMesh, numOfInitialPts, initialPtsSpread, initialPtsSpreadLabel, stepSize, flowPathsType, flowPathsTypeLabel, validInputData, printMsg
+        return geometryMesh, numOfInitialPts, initialPtsSpread, initialPtsSpreadLabel, stepSize, flowPathsType, flowPathsTypeLabel, flowMethod, flowMethodLabel, validInputData, printMsg
     
     validInputData = True
     printMsg = "ok"
     
-    return geometryMesh, numOfInitialPts, initialPtsSpread, initialPtsSpreadLabel, stepSize, flowPathsType, flowPathsTypeLabel, validInputData, printMsg
+    return geometryMesh, numOfInitialPts, initialPtsSpread, initialPtsSpreadLabel, stepSize, flowPathsType, flowPathsTypeLabel, flowMethod, flowMethodLabel, validInputData, printMsg
 
 
 def calculateFlowPaths(geometryMesh, initialPt, flowPathsType):
@@ -214,14 +243,122 @@ def calculateFlowPaths(geometryMesh, initialPt, flowPathsType):
         return None
 
 
-def main(geometryMesh, numOfInitialPts, initialPtsSpread, flowPathsType):
+def createElevationGrid(geometryMesh, stepSize):
+    
+    # regular elevation grid of the geometryMesh top (where the rain hits it). It is sampled by vertical rays shot at the geometryMesh, from the points of its bounding box top
+    # grid points outside of the geometryMesh get None elevation
+    bb = geometryMesh.GetBoundingBox(False)
+    cellsize = stepSize
+    maxNumOfGridPts = 1000000
+    width = bb.Max.X-bb.Min.X
+    depth = bb.Max.Y-bb.Min.Y
+    if (width/cellsize + 1) * (depth/cellsize + 1) > maxNumOfGridPts:
+        # the smallest cellsize for which (width/cellsize + 1) * (depth/cellsize + 1) = maxNumOfGridPts. Around math.sqrt(width*depth/maxNumOfGridPts) for larger grids
+        cellsizeForMaxNumOfGridPts = ((width+depth) + math.sqrt((width+depth)**2 + 4*(maxNumOfGridPts-1)*width*depth)) / (2*(maxNumOfGridPts-1))
+        cellsize = max(stepSize, cellsizeForMaxNumOfGridPts)
+        print "The elevation grid with stepSize_ of %s would have more than %s points.\n" % (stepSize, maxNumOfGridPts) + \
+              "Distance between grid points is increased to %0.2f rhino document units, so that the grid has at most %s points." % (cellsize, maxNumOfGridPts)
+    numberOfColumns = int(width/cellsize) + 1
+    numberOfRows = int(depth/cellsize) + 1
+    
+    startX = bb.Min.X
+    startY = bb.Max.Y
+    gridRayOriginZ = bb.Max.Z + 1
+    gridRayOrigins = [Rhino.Geometry.Point3d(startX + i*cellsize, startY - k*cellsize, gridRayOriginZ)  for k in xrange(numberOfRows)  for i in xrange(numberOfColumns)]
+    gridRayHits = gismo_rayCasting.meshRays(geometryMesh, gridRayOrigins, [Rhino.Geometry.Vector3d(0,0,-1)]*len(gridRayOrigins))
+    elevationLL = []
+    for k in xrange(numberOfRows):
+        elevationLL.append([(gridRayOriginZ - rayIntersectParam) if (rayIntersectParam >= 0) else None  for rayIntersectParam, faceIndex in gridRayHits[k*numberOfColumns:(k+1)*numberOfColumns]])
+    
+    return elevationLL, startX, startY, cellsize
+
+
+def createGridMesh(elevationLL, startX, startY, cellsize, colorLL):
+    
+    # mesh from the grid points which are on the geometryMesh
+    gridMesh = Rhino.Geometry.Mesh()
+    vertexIndexLL = []
+    for k,row in enumerate(elevationLL):
+        vertexIndexRow = []
+        for i,elevation in enumerate(row):
+            if (elevation == None):
+                vertexIndexRow.append(None)
+            else:
+                vertexIndexRow.append(gridMesh.Vertices.Count)
+                gridMesh.Vertices.Add(startX + i*cellsize, startY - k*cellsize, elevation)
+                gridMesh.VertexColors.Add(colorLL[k][i])
+        vertexIndexLL.append(vertexIndexRow)
+    
+    for k in xrange(1, len(elevationLL)):
+        for i in xrange(1, len(elevationLL[0])):
+            faceVertexIndices = [vertexIndexLL[k][i-1], vertexIndexLL[k][i], vertexIndexLL[k-1][i], vertexIndexLL[k-1][i-1]]
+            if (None not in faceVertexIndices):
+                gridMesh.Faces.AddFace(*faceVertexIndices)
+    
+    return gridMesh
+
+
+def calculateGridFlowPaths(geometryMesh, bbUpperFacePts, stepSize, flowPathsType, flowMethod):
+    
+    elevationLL, startX, startY, cellsize = createElevationGrid(geometryMesh, stepSize)
+    if all((elevation == None)  for row in elevationLL  for elevation in row):
+        flowPaths = accumulationMesh = catchmentsMesh = None
+        validGrid = False
+        printMsg = "None of the elevation grid points hit the _geometry from above, so no flow paths could be calculated.\n" + \
+                   "Try decreasing the stepSize_ input, or use flowMethod_ = 0 (Mesh)."
+        return flowPaths, accumulationMesh, catchmentsMesh, validGrid, printMsg
+    
+    # flow directions of all grid points are calculated only once
+    epsilon = cellsize * 0.000001  # filled depressions and flats are given a tiny slope towards their outlet
+    filledLL = gismo_terrain.fillDepressions(elevationLL, epsilon)
+    receiversLL = gismo_terrain.flowReceivers(filledLL, cellsize, cellsize, flowMethod-1)
+    
+    # each flow path is a walk from the grid point closest to the initial point, down to its outlet
+    flowPaths = []
+    for bbUpperFacePt in bbUpperFacePts:
+        k = int(round((startY - bbUpperFacePt.Y) / cellsize))
+        i = int(round((bbUpperFacePt.X - startX) / cellsize))
+        if (k < 0) or (i < 0) or (k >= len(elevationLL)) or (i >= len(elevationLL[0])) or (elevationLL[k][i] == None):
+            # initial point is not above the geometryMesh
+            continue
+        pathGridPts = gismo_terrain.flowPath(receiversLL, k, i)
+        if len(pathGridPts) > 1:  # fix for raising the "Object reference not set to an instance of an object" error for len(polylinePts) == 1
+            flowPathPts = [Rhino.Geometry.Point3d(startX + i*cellsize, startY - k*cellsize, elevationLL[k][i])  for k,i in pathGridPts]
+            if flowPathsType == 0:
+                flowPath = Rhino.Geometry.Polyline(flowPathPts)
+            elif flowPathsType == 1:
+                flowPath = Rhino.Geometry.Curve.CreateInterpolatedCurve(flowPathPts, 3)
+            flowPaths.append(flowPath)
+    
+    # accumulation and catchments meshes
+    accumulationLL = gismo_terrain.flowAccumulation(filledLL, receiversLL)
+    upslopeAreasLog = [math.log10(accumulation * cellsize**2)  for row in accumulationLL  for accumulation in row  if (accumulation != None)]
+    upslopeAreasColors = iter(gismo_preparation.numberToColor(upslopeAreasLog, []))
+    accumulationColorLL = [[(upslopeAreasColors.next() if (accumulation != None) else None)  for accumulation in row]  for row in accumulationLL]
+    accumulationMesh = createGridMesh(elevationLL, startX, startY, cellsize, accumulationColorLL)
+    
+    catchmentLL, numOfCatchments = gismo_terrain.catchments(filledLL, receiversLL)
+    randomColor = random.Random(0)
+    catchmentColors = [System.Drawing.Color.FromArgb(randomColor.randint(0,255), randomColor.randint(0,255), randomColor.randint(0,255))  for catchmentIndex in xrange(numOfCatchments)]
+    catchmentColorLL = [[(catchmentColors[catchmentIndex] if (catchmentIndex != None) else None)  for catchmentIndex in row]  for row in catchmentLL]
+    catchmentsMesh = createGridMesh(elevationLL, startX, startY, cellsize, catchmentColorLL)
+    
+    del elevationLL; del filledLL; del receiversLL; del accumulationLL; del catchmentLL
+    
+    validGrid = True
+    printMsg = "ok"
+    
+    return flowPaths, accumulationMesh, catchmentsMesh, validGrid, printMsg
+
+
+def main(geometryMesh, numOfInitialPts, initialPtsSpread, stepSize, flowPathsType, flowMethod):
     
     # create "initialPts"
     bb = geometryMesh.GetBoundingBox(False)
     upperBBsurface = bb.ToBrep().Faces[5].DuplicateSurface()
     
     initialPts = []
-    bbUpperFacePts = []  # remains empty for initialPtsSpread == 0
+    bbUpperFacePts = []
     if initialPtsSpread == 0:
         # calculate Udivisions, Vdivisions according to approximatelly numOfInitialPts
         upperBBsurface_edge1 = bb.GetEdges()[4]
@@ -249,42 +386,47 @@ def main(geometryMesh, numOfInitialPts, initialPtsSpread, flowPathsType):
             for k in xrange(Vdivisions):
                 v = k * vStep
                 bbUpperFacePt = upperBBsurface.PointAt(u,v)
-                ray = Rhino.Geometry.Ray3d(bbUpperFacePt, Rhino.Geometry.Vector3d(0,0,-1))
-                rayIntersectParam = Rhino.Geometry.Intersect.Intersection.MeshRay(geometryMesh, ray)
-                if rayIntersectParam > 0:
-                    initialPt = ray.PointAt(rayIntersectParam)
-                    initialPts.append(initialPt)
-        # end of create "initialPts"
+                bbUpperFacePts.append(bbUpperFacePt)
     
     elif initialPtsSpread == 1:
         seed = 0
         bbUpperFacePts = ghc.PopulateGeometry(upperBBsurface, numOfInitialPts, seed)
+    
+    
+    if (flowMethod == 0):
+        # mesh
         for bbUpperFacePt in bbUpperFacePts:
             ray = Rhino.Geometry.Ray3d(bbUpperFacePt, Rhino.Geometry.Vector3d(0,0,-1))
             rayIntersectParam = Rhino.Geometry.Intersect.Intersection.MeshRay(geometryMesh, ray)
             if rayIntersectParam > 0:
                 initialPt = ray.PointAt(rayIntersectParam)
                 initialPts.append(initialPt)
-    
-    
-    # calculate the flow lines
-    flowPaths = []
-    for initialPt in initialPts:
-        flowPath = calculateFlowPaths(geometryMesh, initialPt, flowPathsType)
-        if flowPath != None:
-            flowPaths.append(flowPath)
+        # end of create "initialPts"
+        
+        # calculate the flow lines
+        flowPaths = []
+        for initialPt in initialPts:
+            flowPath = calculateFlowPaths(geometryMesh, initialPt, flowPathsType)
+            if flowPath != None:
+                flowPaths.append(flowPath)
+        accumulationMesh = catchmentsMesh = None
+        validGrid = True
+        printMsg = "ok"
+    else:
+        # D8, D-infinity
+        flowPaths, accumulationMesh, catchmentsMesh, validGrid, printMsg = calculateGridFlowPaths(geometryMesh, bbUpperFacePts, stepSize, flowPathsType, flowMethod)
     
     del initialPts
     del bbUpperFacePts
     gc.collect()
     
-    return flowPaths
+    return flowPaths, accumulationMesh, catchmentsMesh, validGrid, printMsg
 
 
-def createTitle(geometryMesh, numOfInitialPts, initialPtsSpreadLabel, stepSize, flowPathsTypeLabel):
+def createTitle(geometryMesh, numOfInitialPts, initialPtsSpreadLabel, stepSize, flowPathsTypeLabel, flowMethodLabel):
     
     titleLabelText = "Flow paths analysis\n" + \
-                     "numOfInitialPts: %s, initialPtsSpread: %s\nstepSize: %s, flowPathsType: %s" % (numOfInitialPts, initialPtsSpreadLabel, stepSize, flowPathsTypeLabel)
+                     "numOfInitialPts: %s, initialPtsSpread: %s\nstepSize: %s, flowPathsType: %s, flowMethod: %s" % (numOfInitialPts, initialPtsSpreadLabel, stepSize, flowPathsTypeLabel, flowMethodLabel)
     titleLabelMesh, titleLabelOrigin, titleTextSize = gismo_preparation.createTitle("mesh", [geometryMesh], [titleLabelText])
     
     
@@ -330,7 +472,7 @@ def bakingGrouping(numOfInitialPts, initialPtsSpreadLabel, stepSize, flowPathsTy
     Rhino.RhinoDoc.ActiveDoc.Groups.AddToGroup(groupIndex, flowPathsIds)
 
 
-def printOutput(numOfInitialPts, initialPtsSpread, initialPtsSpreadLabel, stepSize, flowPathsType, flowPathsTypeLabel):
+def printOutput(numOfInitialPts, initialPtsSpread, initialPtsSpreadLabel, stepSize, flowPathsType, flowPathsTypeLabel, flowMethod, flowMethodLabel):
     if bakeIt_ == True:
         bakedOrNot = "and baked "
     elif bakeIt_ == False:
@@ -344,7 +486,8 @@ Number of initial points: %s
 Initial points spread: %s (%s)
 Step size: %s
 Flow paths type: %s (%s)
-    """ % (numOfInitialPts, initialPtsSpread, initialPtsSpreadLabel, stepSize, flowPathsType, flowPathsTypeLabel)
+Flow method: %s (%s)
+    """ % (numOfInitialPts, initialPtsSpread, initialPtsSpreadLabel, stepSize, flowPathsType, flowPathsTypeLabel, flowMethod, flowMethodLabel)
     print resultsCompletedMsg
     print printOutputMsg
 
@@ -354,15 +497,21 @@ if sc.sticky.has_key("gismoGismo_released"):
     validVersionDate, printMsg = sc.sticky["gismo_check"].versionDate(ghenv.Component)
     if validVersionDate:
         gismo_preparation = sc.sticky["gismo_Preparation"]()
+        gismo_rayCasting = sc.sticky["gismo_RayCasting"]()
+        gismo_terrain = sc.sticky["gismo_Terrain"]()
         
-        geometryMesh, numOfInitialPts, initialPtsSpread, initialPtsSpreadLabel, stepSize, flowPathsType, flowPathsTypeLabel, validInputData, printMsg = checkInputData(_geometry, numOfInitialPts_, initialPtsSpread_, stepSize_, flowPathsType_)
+        geometryMesh, numOfInitialPts, initialPtsSpread, initialPtsSpreadLabel, stepSize, flowPathsType, flowPathsTypeLabel, flowMethod, flowMethodLabel, validInputData, printMsg = checkInputData(_geometry, numOfInitialPts_, initialPtsSpread_, stepSize_, flowPathsType_, flowMethod_)
         if validInputData:
             if _runIt:
-                flowPaths = main(geometryMesh, numOfInitialPts, initialPtsSpread, flowPathsType)
-                titleLabelMesh, titleLabelOrigin = createTitle(geometryMesh, numOfInitialPts, initialPtsSpreadLabel, stepSize, flowPathsTypeLabel)
-                if bakeIt_: bakingGrouping(numOfInitialPts, initialPtsSpreadLabel, stepSize, flowPathsTypeLabel, flowPaths, titleLabelMesh)
-                printOutput(numOfInitialPts, initialPtsSpread, initialPtsSpreadLabel, stepSize, flowPathsType, flowPathsTypeLabel)
-                title = titleLabelMesh; titleOrigin = titleLabelOrigin
+                flowPaths, accumulation, catchments, validGrid, printMsg = main(geometryMesh, numOfInitialPts, initialPtsSpread, stepSize, flowPathsType, flowMethod)
+                if validGrid:
+                    titleLabelMesh, titleLabelOrigin = createTitle(geometryMesh, numOfInitialPts, initialPtsSpreadLabel, stepSize, flowPathsTypeLabel, flowMethodLabel)
+                    if bakeIt_: bakingGrouping(numOfInitialPts, initialPtsSpreadLabel, stepSize, flowPathsTypeLabel, flowPaths, titleLabelMesh)
+                    printOutput(numOfInitialPts, initialPtsSpread, initialPtsSpreadLabel, stepSize, flowPathsType, flowPathsTypeLabel, flowMethod, flowMethodLabel)
+                    title = titleLabelMesh; titleOrigin = titleLabelOrigin
+                else:
+                    print printMsg
+                    ghenv.Component.AddRuntimeMessage(level, printMsg)
             else:
                 print "All inputs are ok. Please set \"_runIt\" to True, in order to run the Flow paths component"
         else:
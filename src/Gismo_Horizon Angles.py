@@ -66,6 +66,14 @@ Provided by Gismo 0.0.3
                           This type is also mandatory for both Meteonorm 6 and Meteonorm 7.
                           -
                           If not supplied 0 (Meteonorm 6 and Meteonorm 7) will be used by default.
+        horizonMethod_: The method used to find the highest ray which hits the _context, for each azimuth:
+                        -
+                        0 - occlusion search: the lowest ray is shot first. If it hits the _context, the transition between hitting and missing rays is found by bisection, followed by a short sweep of rays above it. Around 20 rays are shot per azimuth instead of 1200.
+                        1 - all rays: all 1200 rays of each azimuth are shot. Very slow for larger _context meshes.
+                        -
+                        Both methods result in the same horizon angles, with a precision of 0.075 degrees. Method 1 can be used in case your _context has multiple gaps through which rays can pass (for example: a bridge).
+                        -
+                        If not supplied, 0 will be used as a default (occlusion search).
         exportHorizon_: Set to "True" to bake export(create) a .hor file.
                         -
                         If not supplied default value "False" will be used.
@@ -103,11 +111,11 @@ Provided by Gismo 0.0.3
 
 ghenv.Component.Name = "Gismo_Horizon Angles"
 ghenv.Component.NickName = "HorizonAngles"
-ghenv.Component.Message = "VER 0.0.3\nJAN_29_2019"
+ghenv.Component.Message = "VER 0.0.3\nOCT_17_2026"
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Gismo"
 ghenv.Component.SubCategory = "2 | Terrain"
-#compatibleGismoVersion = VER 0.0.3\nJAN_29_2019
+#compatibleGismoVersion = VER 0.0.3\nOCT_17_2026
 try: ghenv.Component.AdditionalHelpFromDocStrings = "2"
 except: pass
 
@@ -122,7 +130,7 @@ import math
 import os
 
 
-def checkInputData(analysisGeometry, contextMeshes, north, scale, outputGeometryIndex, workingFolderPath, horizonFileType):
+def checkInputData(analysisGeometry, contextMeshes, north, scale, outputGeometryIndex, workingFolderPath, horizonFileType, horizonMethod):
     
     pathsAnalysisGeometry = analysisGeometry.Paths
     analysisGeometryBranchesLists = analysisGeometry.Branches
@@ -176,21 +184,21 @@ def checkInputData(analysisGeometry, contextMeshes, north, scale, outputGeometry
         if item == None:
             NoneItemsIn_srfCentroidL += 1
     if len(srfCentroidL) == NoneItemsIn_srfCentroidL:
-        srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = unitConversionFactor = None
+        srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = horizonMethod = unitConversionFactor = None
         validInputData = False
         printMsg = "The value(s) you supplied to the \"_analysisGeometry\" input are neither points nor surfaces.\n" + \
                    "Please input one of these."
-        return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
+        return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, horizonMethod, unitConversionFactor, validInputData, printMsg
     
     
     # check if something inputted into "context_" input
     if len(contextMeshes) == 0:
-        srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = unitConversionFactor = None
+        srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = horizonMethod = unitConversionFactor = None
         validInputData = False
         printMsg = "Input the \"terrainShadingMask\" output from \"Terrain shading mask\" component.\n" + \
                    "You can additionally input other opaque obstacles surrounding your location: houses, buildings etc.\n" + \
                    "Do not input trees, as they are not opaque obstacles and should not be taken into account when analysing the horizon angles."
-        return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
+        return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, horizonMethod, unitConversionFactor, validInputData, printMsg
     else:
         # remove "None" from context_
         contextMeshesFiltered = []
@@ -210,10 +218,10 @@ def checkInputData(analysisGeometry, contextMeshes, north, scale, outputGeometry
         try:  # check if it's a number
             north = float(north)
             if north < 0 or north > 360:
-                srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = unitConversionFactor = None
+                srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = horizonMethod = unitConversionFactor = None
                 validInputData = False
                 printMsg = "Please input north angle value from 0 to 360."
-                return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
+                return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, horizonMethod, unitConversionFactor, validInputData, printMsg
         except Exception, e:  # check if it's a vector
             north.Unitize()
         
@@ -234,12 +242,12 @@ def checkInputData(analysisGeometry, contextMeshes, north, scale, outputGeometry
         workingSubFolderPath = os.path.join(workingFolderPath, "horizon_files")
     folderCreated = gismo_preparation.createFolder(workingSubFolderPath)
     if folderCreated == False:
-        srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = unitConversionFactor = None
+        srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = horizonMethod = unitConversionFactor = None
         validInputData = False
         printMsg = "workingFolder_ input is invalid.\n" + \
                    "Input the string in the following format (example): C:\someFolder.\n" + \
                    "Or do not input anything, in which case a default Gismo folder will be used instead."
-        return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
+        return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, horizonMethod, unitConversionFactor, validInputData, printMsg
     
     
     if (horizonFileType == None) or (horizonFileType == 0):  # .hor file with no heading (Meteonorm 6 and Meteonorm 7)
@@ -266,21 +274,29 @@ def checkInputData(analysisGeometry, contextMeshes, north, scale, outputGeometry
               "horizonFileType_ input set to 0 (Meteonorm) by default."
     
     
+    if (horizonMethod == None):
+        horizonMethod = 0  # default, occlusion search
+    elif (horizonMethod < 0) or (horizonMethod > 1):
+        horizonMethod = 0
+        print "horizonMethod_ input only supports values 0 (occlusion search) or 1 (all rays).\n" + \
+              "horizonMethod_ input set to 0 (occlusion search)."
+    
+    
     if (outputGeometryIndex == None) or (outputGeometryIndex < 0):
         outputGeometryIndex = 0  # default
     else:
         if (outputGeometryIndex + 1) > len(pathsAnalysisGeometry):
-            srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = unitConversionFactor = None
+            srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = horizonMethod = unitConversionFactor = None
             validInputData = False
             printMsg = "The index number inputted into \"outputGeometryIndex_\" is higher than number of inputted objects into \"_analysisGeometry\". Please choose an input for \"outputGeometryIndex_\" from 0 to %s." % str(len(analysisGeometryBranchesLists)-1)
-            return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
+            return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, horizonMethod, unitConversionFactor, validInputData, printMsg
         elif srfCentroidL[outputGeometryIndex] == None:
-            srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = unitConversionFactor = None
+            srfCornerPtsLL = srfCentroidL = srfCentroid = contextMeshJoined = northRad = northVec = scale = outputGeometryIndex = workingSubFolderPath = horizonFileType = horizonFileTypeLabel = horizonMethod = unitConversionFactor = None
             validInputData = False
             printMsg = "The %s supplied to the \"outputGeometryIndex_\" input, points to the %s. item in the \"_analysisGeometry\" input. This item is neither a surface, nor a point, therefor it's invalid.\n" % (outputGeometryIndex, outputGeometryIndex) + \
                        "Remove that item from your \"_analysisGeometry\" input, or change the value supplied to the \"outputGeometryIndex_\" so that it points to some other valid \"_analysisGeometry\" item."
             outputGeometryIndex  = None  # set bellow the "printMsg" variable, so that it does not confront with it
-            return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
+            return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, horizonMethod, unitConversionFactor, validInputData, printMsg
     
     
     srfCentroid = srfCentroidL[outputGeometryIndex]
@@ -290,10 +306,10 @@ def checkInputData(analysisGeometry, contextMeshes, north, scale, outputGeometry
     validInputData = True
     printMsg = "ok"
     
-    return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
+    return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, horizonMethod, unitConversionFactor, validInputData, printMsg
 
 
-def calculateHorizonAngles(contextMeshJoined, origin, northRad, unitConversionFactor):
+def calculateHorizonAngles(contextMeshJoined, origin, northRad, horizonMethod, unitConversionFactor):
     
     originLifted = Rhino.Geometry.Point3d(origin.X, origin.Y, origin.Z + 0.01)  # fix for rays intersection, if user inputted a ground surface to "_contex" input
     
@@ -337,54 +353,58 @@ def calculateHorizonAngles(contextMeshJoined, origin, northRad, unitConversionFa
     
     
     # check for intersection between the contextMeshJoined and rays
+    def rayHits(k):
+        # "u" is the azimuth of the current column
+        skyDomePt = halvedSkyDomeSrf.PointAt(u, skyDomeDomainVmin + stepV*k)
+        ray = Rhino.Geometry.Ray3d(originLifted, skyDomePt-originLifted)
+        rayIntersectParam = Rhino.Geometry.Intersect.Intersection.MeshRay(contextMeshJoined,ray)
+        return (rayIntersectParam >= 0)
+    
     horizonAnglesRoseMeshPts = []
     lastRowPoints = []
     
-    hitted = False  # initial switch
-    for i in xrange(0,precisionU):
+    for i in xrange(0,precisionU,10):  # only azimuths 0,10,20,30... 3580,3590 are used for horizon angles
         u = skyDomeDomainUmin + stepU*i
-        if (i % 10 == 0):
-            horizonAnglesRoseMeshPts.append(originLifted)
-            firstRowPt = halvedSkyDomeSrf.PointAt(u,0)
-            horizonAnglesRoseMeshPts.append(firstRowPt)
-        for k in xrange(0,precisionV):
-            v = skyDomeDomainVmin + stepV*k
-            skyDomePt = halvedSkyDomeSrf.PointAt(u,v)
-            rayVector = skyDomePt-originLifted
-            ray = Rhino.Geometry.Ray3d(originLifted, rayVector)
-            rayIntersectParam = Rhino.Geometry.Intersect.Intersection.MeshRay(contextMeshJoined,ray)
-            if rayIntersectParam >= 0:
-                # ray hitted something in that column
-                hitted = True
-                lastRowPt = skyDomePt
-                continue
-            else:
-                # ray did not hit anything in that column
-                pass
-        if hitted == False:
+        horizonAnglesRoseMeshPts.append(originLifted)
+        firstRowPt = halvedSkyDomeSrf.PointAt(u,0)
+        horizonAnglesRoseMeshPts.append(firstRowPt)
+        
+        if (horizonMethod == 0):
+            # occlusion search
+            lastHittingRayIndex = gismo_environmentalAnalysis.highestHittingRayIndex(rayHits, precisionV)
+        elif (horizonMethod == 1):
+            # all rays
+            lastHittingRayIndex = -1
+            for k in xrange(0,precisionV):
+                if rayHits(k):
+                    # ray hitted something in that column
+                    lastHittingRayIndex = k
+        
+        if (lastHittingRayIndex >= 0):
+            lastRowPt = halvedSkyDomeSrf.PointAt(u, skyDomeDomainVmin + stepV*lastHittingRayIndex)
+        else:
+            # no ray hitted anything in that column
             lastRowPt = halvedSkyDomeSrf.PointAt(u,0)
         lastRowPoints.append(lastRowPt)
-        hitted = False  # reset the hitted switch
     
     
     # calculate the horizonAngles from lastRowPoints:
     azimuthsD = []  # depends on precisionU and precisionV
     horizonAnglesD = []
     horizonAnglesD_for_colors = []  # made of horizonAnglesD duplicates to account for the origin point of the horizonAnglesRoseMeshPts
-    for azimuth,lastRowPt in enumerate(lastRowPoints):
-        if (azimuth % 10 == 0):  # only take azimuths 0,10,20,30... 3580,3590
-            projectedLastRowPt = Rhino.Geometry.Point3d(lastRowPt.X, lastRowPt.Y, originLifted.Z)
-            tangent_horizonAngleR = (lastRowPt.Z - originLifted.Z)/originLifted.DistanceTo(projectedLastRowPt)
-            if tangent_horizonAngleR < 0.001:  # fix if horizonAngle = 0
-                tangent_horizonAngleR = 0
-            horizonAngleR = math.atan(tangent_horizonAngleR)
-            horizonAngleD = math.degrees(horizonAngleR)  # .hor files have integer values for horizon angles
-            
-            horizonAnglesD.append(int(horizonAngleD))
-            azimuthsD.append(int(azimuth/10))  # convert the azimuths from 0,10,20,30... 3580,3590 to 0,1,2,3... 358,359
-            
-            horizonAnglesD_for_colors.append(horizonAngleD)
-            horizonAnglesD_for_colors.append(horizonAngleD)
+    for azimuthD,lastRowPt in enumerate(lastRowPoints):  # azimuths 0,1,2,3... 358,359
+        projectedLastRowPt = Rhino.Geometry.Point3d(lastRowPt.X, lastRowPt.Y, originLifted.Z)
+        tangent_horizonAngleR = (lastRowPt.Z - originLifted.Z)/originLifted.DistanceTo(projectedLastRowPt)
+        if tangent_horizonAngleR < 0.001:  # fix if horizonAngle = 0
+            tangent_horizonAngleR = 0
+        horizonAngleR = math.atan(tangent_horizonAngleR)
+        horizonAngleD = math.degrees(horizonAngleR)  # .hor files have integer values for horizon angles
+        
+        horizonAnglesD.append(int(horizonAngleD))
+        azimuthsD.append(azimuthD)
+        
+        horizonAnglesD_for_colors.append(horizonAngleD)
+        horizonAnglesD_for_colors.append(horizonAngleD)
     
     
     # possible future creation of contextShadingMask (more precisely contextShadingMaskUnscaledUnrotated), the same as from "Terrain shading mask" component by its code starting from "    if maskStyle == 0:  # spherical terrain shading mask" (line ?)
@@ -393,7 +413,7 @@ def calculateHorizonAngles(contextMeshJoined, origin, northRad, unitConversionFa
     return azimuthsD, horizonAnglesD, originLifted, horizonAnglesRoseMeshPts, horizonAnglesD_for_colors, contextShadingMaskUnscaledUnrotated
 
 
-def main(contextMeshJoined, srfCentroidL, northRad, outputGeometryIndex, unitConversionFactor):
+def main(contextMeshJoined, srfCentroidL, northRad, outputGeometryIndex, horizonMethod, unitConversionFactor):
     
     azimuthsD_dataTree = Grasshopper.DataTree[object]()
     horizonAnglesD_dataTree = Grasshopper.DataTree[object]()
@@ -403,7 +423,7 @@ def main(contextMeshJoined, srfCentroidL, northRad, outputGeometryIndex, unitCon
     paths = _analysisGeometry.Paths
     for index,srfCentroid in enumerate(srfCentroidL):
         if srfCentroid != None:  # the inputted _analysisGeometry is not a point nor a single faced brep
-            azimuthsD, horizonAnglesD, originLifted, horizonAnglesRoseMeshPts_notPicked, horizonAnglesD_for_colors_notPicked, contextShadingMaskUnscaledUnrotated_notPicked = calculateHorizonAngles(contextMeshJoined, srfCentroid, northRad, unitConversionFactor)
+            azimuthsD, horizonAnglesD, originLifted, horizonAnglesRoseMeshPts_notPicked, horizonAnglesD_for_colors_notPicked, contextShadingMaskUnscaledUnrotated_notPicked = calculateHorizonAngles(contextMeshJoined, srfCentroid, northRad, horizonMethod, unitConversionFactor)
             
            # maximualHorizonAngle, maximalAzimuth
             maximalHorizonAngle_maximalAzimuth = []
@@ -611,13 +631,14 @@ if sc.sticky.has_key("gismoGismo_released"):
         gismo_mainComponent = sc.sticky["gismo_mainComponent"]()
         gismo_preparation = sc.sticky["gismo_Preparation"]()
         gismo_geometry = sc.sticky["gismo_CreateGeometry"]()
+        gismo_environmentalAnalysis = sc.sticky["gismo_EnvironmentalAnalysis"]()
         
         locationName, locationLatitudeD, locationLongitudeD, timeZone, elevation, validLocationData, printMsg = gismo_preparation.checkLocationData(_location)
         if validLocationData:
-            srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg = checkInputData(_analysisGeometry, _context, north_, scale_, outputGeometryIndex_, workingFolder_, horizonFileType_)
+            srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, horizonMethod, unitConversionFactor, validInputData, printMsg = checkInputData(_analysisGeometry, _context, north_, scale_, outputGeometryIndex_, workingFolder_, horizonFileType_, horizonMethod_)
             if validInputData:
                 if _runIt:
-                    azimuthsD, horizonAnglesD, azimuthsD_for_horizonFile, horizonAnglesD_for_horizonFile, maximalAzimuthD, maximalHorizonAngleD, maximalAzimuthD_for_title, maximalHorizonAngleD_for_title, horizonAnglesRoseMeshPts, horizonAnglesD_for_colors, contextShadingMaskUnscaledUnrotated = main(contextMeshJoined, srfCentroidL, northRad, outputGeometryIndex, unitConversionFactor)
+                    azimuthsD, horizonAnglesD, azimuthsD_for_horizonFile, horizonAnglesD_for_horizonFile, maximalAzimuthD, maximalHorizonAngleD, maximalAzimuthD_for_title, maximalHorizonAngleD_for_title, horizonAnglesRoseMeshPts, horizonAnglesD_for_colors, contextShadingMaskUnscaledUnrotated = main(contextMeshJoined, srfCentroidL, northRad, outputGeometryIndex, horizonMethod, unitConversionFactor)
                     horizonAnglesRoseMeshUnscaledUnrotated, compassCrvsUnscaledUnrotated, titleDescriptionLabelMeshesUnscaledUnrotated, legendUnscaledUnrotated, legendBasePtUnscaledUnrotated = compassCrvs_legend(srfCentroid, horizonAnglesRoseMeshPts, horizonAnglesD_for_colors, maximalAzimuthD_for_title, maximalHorizonAngleD_for_title, unitConversionFactor, legendBakePar_)
                     contextShadingMask, horizonAnglesRoseMesh, compassCrvs, legend, legendPlane, titleDescriptionLabelMeshes = scalingRotating(northRad, scale, srfCentroid, contextShadingMaskUnscaledUnrotated, horizonAnglesRoseMeshUnscaledUnrotated, compassCrvsUnscaledUnrotated, legendUnscaledUnrotated, legendBasePtUnscaledUnrotated, titleDescriptionLabelMeshesUnscaledUnrotated)
                     if exportHorizon_: createHorFile(locationLatitudeD, locationLongitudeD, locationName, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, azimuthsD_for_horizonFile, horizonAnglesD_for_horizonFile)
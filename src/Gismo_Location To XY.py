@@ -36,7 +36,7 @@ Provided by Gismo 0.0.3
 
 ghenv.Component.Name = "Gismo_Location To XY"
 ghenv.Component.NickName = "LocationToXY"
-ghenv.Component.Message = "VER 0.0.3\nJAN_29_2019"
+ghenv.Component.Message = "VER 0.0.3\nOCT_17_2026"
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Gismo"
 ghenv.Component.SubCategory = "1 | Gismo"
@@ -74,22 +74,13 @@ def main(requiredLocation, anchorLocation, anchorOrigin):
     anchorOrigin_meters = Rhino.Geometry.Point3d(anchorOrigin.X*unitConversionFactor, anchorOrigin.Y*unitConversionFactor, anchorOrigin.Z*unitConversionFactor)  # in meters
     
     
-    # inputCRS
-    EPSGcode = 4326
-    inputCRS = gismo_gis.CRS_from_EPSGcode(EPSGcode)
-    # outputCRS
-    outputCRS = gismo_gis.UTM_CRS_from_latitude(required_locationLatitudeD, required_locationLongitudeD)
-    
-    required_originPtProjected_meters = gismo_gis.convertBetweenTwoCRS(inputCRS, outputCRS, required_locationLongitudeD, required_locationLatitudeD)  # in meters
+    # UTM zone of the required location
+    required_originPtProjected_meters = gismo_gis.projectedLocationCoordinates(required_locationLatitudeD, required_locationLongitudeD)  # in meters
     required_originPtProjected = Rhino.Geometry.Point3d(required_originPtProjected_meters.X/unitConversionFactor, required_originPtProjected_meters.Y/unitConversionFactor, required_originPtProjected_meters.Z/unitConversionFactor)  # in Rhino document units
     
     
-    # inputCRS2 = inputCRS
-    
-    # outputCRS2
-    outputCRS2 = gismo_gis.UTM_CRS_from_latitude(anchor_locationLatitudeD, anchor_locationLongitudeD)
-    
-    anchor_originPtProjected_meters = gismo_gis.convertBetweenTwoCRS(inputCRS, outputCRS2, anchor_locationLongitudeD, anchor_locationLatitudeD)  # in meters
+    # UTM zone of the anchor location
+    anchor_originPtProjected_meters = gismo_gis.projectedLocationCoordinates(anchor_locationLatitudeD, anchor_locationLongitudeD)  # in meters
     anchor_originPtProjected = Rhino.Geometry.Point3d(anchor_originPtProjected_meters.X/unitConversionFactor, anchor_originPtProjected_meters.Y/unitConversionFactor, anchor_originPtProjected_meters.Z/unitConversionFactor)  # in Rhino document units
     
     
@@ -87,7 +87,7 @@ Provided by Gismo 0.0.3
 
 ghenv.Component.Name = "Gismo_OSM 3D"
 ghenv.Component.NickName = "OSM3D"
-ghenv.Component.Message = "VER 0.0.3\nJAN_29_2019"
+ghenv.Component.Message = "VER 0.0.3\nOCT_17_2026"
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Gismo"
 ghenv.Component.SubCategory = "1 | OpenStreetMap"
@@ -377,6 +377,7 @@ def createThreeDeeShapes(shapesDataTree, keys, valuesDataTree, heightPerLevel, r
     projectionDirection = Rhino.Geometry.Vector3d(0,0,1)  # it can be direction = Rhino.Geometry.Vector3d(0,0,-1) as well, does not matter
     tol = Rhino.RhinoDoc.ActiveDoc.ModelAbsoluteTolerance
     atleastOneThreeDeeShapeCanBeCreated = False  # initial value
+    keyIndices = gismo_gis.keyIndices(keys)
     for branchIndex,shapesL in enumerate(shapes_shiftedPaths_LL):
         if len(shapesL) == 0:
             # some shape may have been removed with the "OSM ids" component
@@ -384,7 +385,7 @@ def createThreeDeeShapes(shapesDataTree, keys, valuesDataTree, heightPerLevel, r
             threeDeeShapeL = []
             threeDeeValueL = []
         else:
-            subValuesL_filtered, shapesL_filtered = gismo_gis.filterShapes(keys, values_shiftedPaths_LL[branchIndex], "shapesL dummy string", osm_id_Only, osm_way_id_Only, osm_id_Remove, osm_way_id_Remove)
+            subValuesL_filtered, shapesL_filtered = gismo_gis.filterShapes(keys, values_shiftedPaths_LL[branchIndex], "shapesL dummy string", osm_id_Only, osm_way_id_Only, osm_id_Remove, osm_way_id_Remove, keyIndices)
             if (len(subValuesL_filtered) == 0) and (len(shapesL_filtered) == 0):
                 # the id supplied to the "osm_id_Only, osm_way_id_Only, osm_id_Remove, osm_way_id_Remove" is found
                 height = 0
@@ -392,34 +393,17 @@ def createThreeDeeShapes(shapesDataTree, keys, valuesDataTree, heightPerLevel, r
                 threeDeeValueL = []
             elif (len(subValuesL_filtered) != 0) and (len(shapesL_filtered) != 0):
                 # the id supplied to the "osm_id_Only, osm_way_id_Only, osm_id_Remove, osm_way_id_Remove" is NOT found
-                valueBuilding = ""  # dummy value in case "building" key does not exist
-                valueHeight = ""  # dummy value in case "height" key does not exist
-                valueMinHeight = ""  # dummy value in case "height" key does not exist
-                valueLevel = ""  # dummy value in case "building_l" key does not exist
-                valueLeafType = ""  # dummy value in case "leaf_type" key does not exist
-                valueCycleType = ""  # dummy value in case "leaf_cycle" key does not exist
-                valueNatural = ""  # dummy value in case "natural" key does not exist
-                valueDiameterCrown = ""  # dummy value in case "diameter_c" key does not exist
+                # "" is a dummy value in case the key does not exist
+                valuesL = values_shiftedPaths_LL[branchIndex]
+                valueBuilding = valuesL[keyIndices["building"]] if ("building" in keyIndices) else ""
+                valueHeight = valuesL[keyIndices["height"]] if ("height" in keyIndices) else ""
+                valueMinHeight = valuesL[keyIndices["min_height"]] if ("min_height" in keyIndices) else ""
+                valueLevel = valuesL[keyIndices["building:levels"]] if ("building:levels" in keyIndices) else ""  # the short name is: building_l
+                valueLeafType = valuesL[keyIndices["leaf_type"]] if ("leaf_type" in keyIndices) else ""
+                valueCycleType = valuesL[keyIndices["leaf_cycle"]] if ("leaf_cycle" in keyIndices) else ""
+                valueNatural = valuesL[keyIndices["natural"]] if ("natural" in keyIndices) else ""
+                valueDiameterCrown = valuesL[keyIndices["diameter_crown"]] if ("diameter_crown" in keyIndices) else ""  # the short name is: diameter_c
                 deciduousOrConiferous = ""  # dummy value in case "leaf_type", "leaf_cycle", "natural" keys do not exist
-                for keyIndex,key in enumerate(keys):
-                    if (key == "building"):
-                        valueBuilding = values_shiftedPaths_LL[branchIndex][keyIndex]
-                    elif (key == "height"):
-                        valueHeight = values_shiftedPaths_LL[branchIndex][keyIndex]
-                    elif (key == "building:levels"):  # the short name is: building_l
-                        valueLevel = values_shiftedPaths_LL[branchIndex][keyIndex]
-                    
-                    elif (key == "leaf_type"):
-                        valueLeafType = values_shiftedPaths_LL[branchIndex][keyIndex]
-                    elif (key == "leaf_cycle"):
-                        valueCycleType = values_shiftedPaths_LL[branchIndex][keyIndex]
-                    elif (key == "natural"):
-                        valueNatural = values_shiftedPaths_LL[branchIndex][keyIndex]
-                    elif (key == "diameter_crown"):  # the short name is: diameter_c
-                        valueDiameterCrown = values_shiftedPaths_LL[branchIndex][keyIndex]
-                    
-                    if (key == "min_height"):
-                        valueMinHeight = values_shiftedPaths_LL[branchIndex][keyIndex]
                 
                 # find the "height" for both extruding buildings and trees
                 if isNumber(valueHeight):
@@ -87,7 +87,7 @@ Provided by Gismo 0.0.3
 
 ghenv.Component.Name = "Gismo_OSM Search"
 ghenv.Component.NickName = "OSMsearch"
-ghenv.Component.Message = "VER 0.0.3\nJAN_29_2019"
+ghenv.Component.Message = "VER 0.0.3\nOCT_17_2026"
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Gismo"
 ghenv.Component.SubCategory = "1 | OpenStreetMap"
@@ -411,6 +411,7 @@ def searchShapes(requiredKeyL, requiredValuesLL, shapesDataTree, keys, valuesDat
     foundShapeOrNotDataTree = Grasshopper.DataTree[object]()
     foundOSMobjectNamesDataTree = Grasshopper.DataTree[object]()
     paths = shapes_shiftedPaths_DataTree.Paths
+    keyIndices = gismo_gis.keyIndices(keys)
     
     for branchIndex,shapesL in enumerate(shapes_shiftedPaths_LL):
         if len(shapesL) == 0:
@@ -420,7 +421,7 @@ def searchShapes(requiredKeyL, requiredValuesLL, shapesDataTree, keys, valuesDat
             foundShapeOrNotL = [False]
             OSMobjectNameBranchL = []
         else:
-            foundShapesSwitch, value, OSMobjectNameBranchL = gismo_gis.tagEqual_to_requiredTag(branchIndex, keys, values_shiftedPaths_LL, requiredKeyL, requiredValuesLL, OSMobjectNameL)
+            foundShapesSwitch, value, OSMobjectNameBranchL = gismo_gis.tagEqual_to_requiredTag(branchIndex, keys, values_shiftedPaths_LL, requiredKeyL, requiredValuesLL, OSMobjectNameL, keyIndices)
             
             if foundShapesSwitch == True:
                 if (len(shapesL) == 0):
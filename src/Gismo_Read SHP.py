@@ -30,6 +30,14 @@ Provided by Gismo 0.0.3
         north_: Input a vector to be used as a true North direction, or a number between 0 and 360 that represents the clockwise degrees off from the Y-axis.
                 -
                 If not supplied, default North direction will be set to the Y-axis (0 degrees).
+        radius_: Horizontal distance around the _location. Only the shapes which are inside of it (or intersect it) will be read.
+                 This makes reading of large shapefiles (for example: whole country or region) much faster.
+                 -
+                 The first time the shapefile is read with this input, a spatial index file (.gsi) will be created next to the .shp file. It will be recreated each time the .shp file changes.
+                 -
+                 If not supplied, all shapes from the shapefile will be read.
+                 -
+                 In meters.
         bakeIt_: Set to "True" to bake the shapes geometry into the Rhino scene.
                  -
                  If not supplied default value "False" will be used.
@@ -48,7 +56,7 @@ Provided by Gismo 0.0.3
 
 ghenv.Component.Name = "Gismo_Read SHP"
 ghenv.Component.NickName = "ReadShapefile"
-ghenv.Component.Message = "VER 0.0.3\nOCT_22_2023"
+ghenv.Component.Message = "VER 0.0.3\nOCT_17_2026"
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Gismo"
 ghenv.Component.SubCategory = "1 | Gismo"
@@ -66,7 +74,7 @@ import os
 
 
 
-def main(shpFile, anchorLocation, north, originPt):
+def main(shpFile, anchorLocation, north, originPt, radiusM):
     
     # check inputs
     
@@ -100,6 +108,14 @@ def main(shpFile, anchorLocation, north, originPt):
     northRad, northVec = gismo_prep.angle2northClockwise(north)
     northDeg = math.degrees(northRad)
     
+    # radius_
+    if (radiusM != None) and (radiusM <= 0):
+        locationName = latitude = longitude = northDeg = originPt = shortenedName_keys = values = shapes = shapefileShapeType = proj4_str = moveVector = None
+        validShapes = False
+        printMsg = "radius_ input only supports values larger than 0.\n" + \
+                   "If you want to read all shapes from the shapefile, do not supply anything to radius_ input."
+        return locationName, latitude, longitude, northDeg, originPt,  shortenedName_keys, values, shapes, shapefileShapeType, proj4_str, moveVector, validShapes, printMsg
+    
     # _runIt
     if (_runIt == False):
         locationName = latitude = longitude = northDeg = originPt = shortenedName_keys = values = shapes = shapefileShapeType = proj4_str = moveVector = None
@@ -114,7 +130,7 @@ def main(shpFile, anchorLocation, north, originPt):
     unitConversionFactor, unitSystemLabel = gismo_prep.checkUnits()
     
     # read SHP
-    shortenedName_keys, values, shapes, shapefileShapeType, proj4_str, moveVector, validShapes, printMsg = gismo_gis.readSHPfile(shpFile, float(latitude), float(longitude), northRad, originPt, unitConversionFactor, osm_id_Only=[], osm_way_id_Only=[], osm_id_Remove=[], osm_way_id_Remove=[])  # from 'unitConversionFactor' input onwards, inputs are default - do not change them
+    shortenedName_keys, values, shapes, shapefileShapeType, proj4_str, moveVector, validShapes, printMsg = gismo_gis.readSHPfile(shpFile, float(latitude), float(longitude), northRad, originPt, unitConversionFactor, osm_id_Only=[], osm_way_id_Only=[], osm_id_Remove=[], osm_way_id_Remove=[], radiusM=radiusM)  # from 'unitConversionFactor' input onwards, inputs are default - do not change them
     
     if not validShapes:
         locationName = latitude = longitude = northDeg = originPt = shortenedName_keys = values = shapes = shapefileShapeType = proj4_str = moveVector = None
@@ -147,7 +163,7 @@ def main(shpFile, anchorLocation, north, originPt):
     
     
     validShapes = True
-    printMsg = "ok"
+    # printMsg from 'readSHPfile': "ok", or a warning which does not invalidate the shapes
     
     return locationName, latitude, longitude, northDeg, originPt,  shortenedName_keys, values, shapes, shapefileShapeType, proj4_str, moveVector, validShapes, printMsg
 
@@ -182,12 +198,15 @@ if sc.sticky.has_key("gismoGismo_released"):
         gismo_prep = sc.sticky["gismo_Preparation"]()
         gismo_gis = sc.sticky["gismo_GIS"]()
         
-        locationName, latitude, longitude, northDeg, originPt, keys, values, shapes, shapefileShapeType, proj4_str, moveVec, validShapes, printMsg = main(_shpFile, _location, north_, origin_)
+        locationName, latitude, longitude, northDeg, originPt, keys, values, shapes, shapefileShapeType, proj4_str, moveVec, validShapes, printMsg = main(_shpFile, _location, north_, origin_, radius_)
         if not validShapes:
             print printMsg
             if not printMsg.startswith("All inputs"):  # if '_runIt=False'
                 ghenv.Component.AddRuntimeMessage(level, printMsg)
         else:
+            if (printMsg != "ok"):
+                print printMsg
+                ghenv.Component.AddRuntimeMessage(level, printMsg)
             #printOutput(locationName, latitude, longitude, northDeg, originPt, shapefileShapeType, proj4_str)
             pass
             #print "Read SHP component successfully ran."
@@ -28,6 +28,7 @@ Use this component to perform the following terrain analysis types:
 - SRF (Surface Roughness Factor by Hobson)
 - TPI (Topographic Position Index)
 - Mean curvature
+- Multi-scale TPI (Topographic Position Index)
 ------
 Component mainly based on:
 
@@ -58,6 +59,13 @@ Provided by Gismo 0.0.3
                        8 - SRF (Surface Roughness Factor by Hobson)
                        9 - TPI (Topographic Position Index)
                        10 - Mean curvature
+                       11 - Multi-scale TPI (Topographic Position Index)
+                       -
+                       Visibility (4) is calculated with the XDraw viewshed algorithm, on a regular elevation grid sampled from the "_terrain". Compared to a line of sight test against the "_terrain" mesh:
+                       - each observer is moved to the closest grid point. Its height stays the same.
+                       - grid points outside of the "_terrain" (for example: circular terrain) get the lowest terrain elevation, so they never block the view.
+                       - the horizon in front of each grid point is interpolated between two grid points. That is why a few terrain vertices right at the edge of visible areas may be classified differently (around 1% of them, when compared with a line of sight test in tests/test_viewshed.py).
+                       Obstruction by the "context_" is still tested exactly, along the line of sight from an observer to each terrain vertex.
         _terrain: A terrain surface or polysurface.
                   Add it by supplying the "terrain" output from the Ladybug "Terrain Generator" or Gismo "Terrain Generator" components.
                   -
@@ -75,6 +83,10 @@ Provided by Gismo 0.0.3
                     Add it by supplying the "elevation" output from the Gismo "Terrain Generator" component.
                     -
                     In Rhino document units.
+        observers_: Additional observer points for _analysisType = 4 (Visibility). Each of them is projected onto the "_terrain" and lifted for 1.6 meters (5.25 feet), the same as "_origin".
+                    A terrain vertex is visible if it can be seen from "_origin" or from any of the observers_. Its value is the distance to the closest of those from which it can be seen.
+                    -
+                    If not supplied, only the "_origin" will be used as an observer.
         context_: These are obstacles surrounding your location: houses, buildings, trees etc.
                   For example, you can use 3d buildings and 3d trees generated by Gismo's "OSM 3D" component.
                   -
@@ -101,6 +113,23 @@ Provided by Gismo 0.0.3
                  Still if your PC configuration is strong enough, you can always set this input to "True". Except for the _analysisType = 7 (TRI categories). In that case the refine_ input will not make any effect on the final "analysedTerrain" mesh.
                  -
                  If not supplied, the refine_ input will be set to False by default.
+        windowRadius_: Radius of the cells (vertex) window, around each terrain vertex, for _analysisType = 6, 7, 8, 9, 11 (TRI, TRI categories, SRF, TPI, Multi-scale TPI).
+                       1 means 3x3 cells window, 2 means 5x5 cells window, 3 means 7x7 cells window etc.
+                       Windows of terrain vertices at the terrain edge are cut by it.
+                       -
+                       For _analysisType = 11 (Multi-scale TPI), it is the largest window radius. Window radii 1, 2, 4, 8... up to windowRadius_ will be used.
+                       -
+                       If not supplied, 1 (3x3 cells window) will be used for _analysisType = 6, 7, 8, 9. And 16 will be used for _analysisType = 11.
+        kernel_: Method used to calculate slope, grade, aspect, hillshade and mean curvature (_analysisType = 0, 1, 2, 5, 10):
+                 -
+                 0 - terrain surface normals and curvature at each terrain mesh vertex
+                 1 - Horn finite differences: the terrain is sampled to a regular elevation grid, and slope and aspect are calculated from all 8 neighboring grid points
+                 2 - Zevenbergen-Thorne finite differences: same as 1, but slope and aspect are calculated from 4 closest neighboring grid points
+                 -
+                 In case of 1 and 2, the curvature is calculated with Zevenbergen-Thorne method, and the results are interpolated at terrain mesh vertices.
+                 These are much faster than 0 for large terrains. Their grid resolution is the same as the one used for _analysisType = 6, 7, 8, 9 (it depends on the refine_ input).
+                 -
+                 If not supplied, 0 will be used.
         legendBakePar_: Optional legend parameters from the Gismo "Legend Bake Parameters" component.
         bakeIt_: Set to "True" to bake the terrain analysis geometry into the Rhino scene.
                  -
@@ -123,11 +152,11 @@ Provided by Gismo 0.0.3
 
 ghenv.Component.Name = "Gismo_Terrain Analysis"
 ghenv.Component.NickName = "TerrainAnalysis"
-ghenv.Component.Message = "VER 0.0.3\nJAN_29_2019"
+ghenv.Component.Message = "VER 0.0.3\nOCT_17_2026"
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Gismo"
 ghenv.Component.SubCategory = "2 | Terrain"
-#compatibleGismoVersion = VER 0.0.3\nJAN_29_2019
+#compatibleGismoVersion = VER 0.0.3\nOCT_17_2026
 try: ghenv.Component.AdditionalHelpFromDocStrings = "2"
 except: pass
 
@@ -142,14 +171,14 @@ import math
 import gc
 
 
-def checkInputData(analysisType, terrainId, originPt, originPtElevation, north, sunVector, hypsometricStrength, refine):
+def checkInputData(analysisType, terrainId, originPt, originPtElevation, north, sunVector, hypsometricStrength, refine, windowRadius, kernel):
     
     # check inputs
-    if (analysisType == None) or ((analysisType  < 0) or (analysisType  > 10)):
-        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVector = hypsometricStrength = refine = exportValues = unitSystem = unitConversionFactor = legendUnit = None
+    if (analysisType == None) or ((analysisType  < 0) or (analysisType  > 11)):
+        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVector = hypsometricStrength = refine = windowRadius = kernel = exportValues = unitSystem = unitConversionFactor = legendUnit = None
         validInputData = False
-        printMsg = "Please supply a number from 0 to 10 to the \"_analysisGeometry\" input based on the analysis you would like to perform."
-        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+        printMsg = "Please supply a number from 0 to 11 to the \"_analysisGeometry\" input based on the analysis you would like to perform."
+        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, windowRadius, kernel, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
     if (analysisType == 0):
         analysisTypeLabel = "Slope"
     elif (analysisType == 1):
@@ -172,16 +201,18 @@ def checkInputData(analysisType, terrainId, originPt, originPtElevation, north,
         analysisTypeLabel = "Topographic Position Index"
     elif (analysisType == 10):
         analysisTypeLabel = "Mean curvature"
+    elif (analysisType == 11):
+        analysisTypeLabel = "Multi-scale Topographic Position Index"
     
     
     if (terrainId == None):
-        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVector = hypsometricStrength = refine = exportValues = unitSystem = unitConversionFactor = legendUnit = None
+        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVector = hypsometricStrength = refine = windowRadius = kernel = exportValues = unitSystem = unitConversionFactor = legendUnit = None
         validInputData = False
         printMsg = "Please supply the \"terrain\" output data from the Gismo \"Terrain Generator\" component, to this component's \"_terrain\" input.\n" + \
                    "It needs to be a surface/polysurface: set the:\n" + \
                    "\"type_\" input of the Ladybug \"Terrain Generator\" component to \"1\", or\n" + \
                    "\"type_\" input of the Gismo \"Terrain Generator\" component to \"2\" or \"3\"."
-        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, windowRadius, kernel, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
     else:
         terrainObj = rs.coercegeometry(terrainId)
         if isinstance(terrainObj, Rhino.Geometry.Brep):
@@ -189,28 +220,28 @@ def checkInputData(analysisType, terrainId, originPt, originPtElevation, north,
             pass
         else:
             #isinstance(terrainObj, Rhino.Geometry.Mesh) or any other geometry type
-            analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVector = hypsometricStrength = refine = exportValues = unitSystem = unitConversionFactor = legendUnit = None
+            analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVector = hypsometricStrength = refine = windowRadius = kernel = exportValues = unitSystem = unitConversionFactor = legendUnit = None
             validInputData = False
             printMsg = "The data you supplied to the \"_terrain\" input is not a surface nor a polysurface.\n" + \
                        "Please supply the \"terrain\" output data from the Ladybug \"Terrain Generator\" or Gismo \"Terrain Generator\" component, to this component's \"_terrain\" input.\n" + \
                        "It needs to be a surface/polysurface: set the:\n" + \
                        "\"type_\" input of the Ladybug \"Terrain Generator\" component to \"1\", or\n" + \
                        "\"type_\" input of the Gismo \"Terrain Generator\" component to \"2\" or \"3\"."
-            return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+            return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, windowRadius, kernel, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
     
     
     if (originPt == None):
-        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVector = hypsometricStrength = refine = exportValues = unitSystem = unitConversionFactor = legendUnit = None
+        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVector = hypsometricStrength = refine = windowRadius = kernel = exportValues = unitSystem = unitConversionFactor = legendUnit = None
         validInputData = False
         printMsg = "Please supply the \"origin\" output data from Ladybug \"Terrain Generator\" or Gismo \"Terrain Generator\" component, to this component's \"_origin\" input.."
-        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, windowRadius, kernel, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
     
     
     if (originPtElevation == None):
-        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVector = hypsometricStrength = refine = exportValues = unitSystem = unitConversionFactor = legendUnit = None
+        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVector = hypsometricStrength = refine = windowRadius = kernel = exportValues = unitSystem = unitConversionFactor = legendUnit = None
         validInputData = False
         printMsg = "Please supply the \"elevation\" output data from Ladybug \"Terrain Generator\" or Gismo \"Terrain Generator\" component, to this component's \"_elevation\" input.."
-        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, windowRadius, kernel, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
     
     
     if (north == None):
@@ -220,10 +251,10 @@ def checkInputData(analysisType, terrainId, originPt, originPtElevation, north,
         try:  # check if it's a number
             north = float(north)
             if north < 0 or north > 360:
-                analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVector = hypsometricStrength = refine = exportValues = unitSystem = unitConversionFactor = legendUnit = None
+                analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVector = hypsometricStrength = refine = windowRadius = kernel = exportValues = unitSystem = unitConversionFactor = legendUnit = None
                 validInputData = False
                 printMsg = "Please input north_ angle value from 0 to 360."
-                return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+                return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, windowRadius, kernel, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
         except Exception, e:  # check if it's a vector
             north.Unitize()
         
@@ -247,6 +278,28 @@ def checkInputData(analysisType, terrainId, originPt, originPtElevation, north,
     if (refine == None):
         refine = False  # default
     
+    if (windowRadius == None):
+        if (analysisType == 11):
+            windowRadius = 16  # default, window radii: 1, 2, 4, 8, 16
+        else:
+            windowRadius = 1  # default, 3x3 cells window
+    elif (windowRadius < 1):
+        windowRadius = 1
+        print "windowRadius_ input only supports values of 1 and higher.\n" + \
+              "windowRadius_ input set to 1 (3x3 cells window)."
+    windowRadius = int(windowRadius)
+    
+    if (kernel == None):
+        kernel = 0  # default, terrain surface normals and curvature
+    elif (kernel not in [0,1,2]):
+        analysisType = analysisTypeLabel = originPt = originPtElevation = northRad = northD = sunVector = hypsometricStrength = refine = windowRadius = kernel = exportValues = unitSystem = unitConversionFactor = legendUnit = None
+        validInputData = False
+        printMsg = "kernel_ input only supports the following values:\n" + \
+                   "0 - terrain surface normals and curvature\n" + \
+                   "1 - Horn\n" + \
+                   "2 - Zevenbergen-Thorne"
+        return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, windowRadius, kernel, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+    
     exportValues = True  # possible future input (exportValues_)
     if (exportValues == None):
         exportValues = False  # default
@@ -274,11 +327,13 @@ def checkInputData(analysisType, terrainId, originPt, originPtElevation, north,
         legendUnit = "unitless‎"
     elif (analysisType == 10):
         legendUnit = "1/%s" % unitSystem
+    elif (analysisType == 11):
+        legendUnit = "DEVmax"
     
     validInputData = True
     printMsg = "ok"
     
-    return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
+    return analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, windowRadius, kernel, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg
 
 
 def createOutputDescriptions(analysisType, unitSystem):
@@ -332,7 +387,7 @@ def createOutputDescriptions(analysisType, unitSystem):
         ["Terrain Visibility analysis mesh.",  #analysedTerrain
         
         "Terrain Visibility values.\n" + \
-        "Each value represents the distance between the lifted _origin and each terrain mesh vertex.\n" + \
+        "Each value represents the distance between the lifted _origin (or the closest of the lifted observers_ which can see the vertex) and each terrain mesh vertex.\n" + \
         "_origin is always lifted for 1.6 meters (5.25 feet) to depict the average height of the human eyesight.\n" + \
         "If mesh vertex is not visible from the _origin (these are gray colored areas), then the distance will be: 0.\n" + \
         "-\n" + \
@@ -393,7 +448,7 @@ def createOutputDescriptions(analysisType, unitSystem):
         "TPI is another index used to depict terrain ruggedness.",  #analysedTerrain
         
         "Topographic Position Index (TPI) values.\n" + \
-        "Each value represents the difference between vertex elevation and mean elevation of its surrounding 8 vertices in 3x3 cells (vertex) window.\n" + \
+        "Each value represents the Elevation-Relief Ratio of the cells (vertex) window around each vertex: the difference between the mean and minimal elevation of the window, divided by the difference between its maximal and minimal elevation.\n" + \
         "-\n" + \
         "In %s." % unitSystem]  #values
         
@@ -407,6 +462,17 @@ def createOutputDescriptions(analysisType, unitSystem):
         "Each value represents mean curvature value at each terrain mesh vertex.\n" + \
         "-\n" + \
         "In 1/%s." % unitSystem]  #values
+        
+        ,
+        
+        ["Multi-scale Topographic Position Index (TPI) analysis mesh.\n" + \
+        "Unlike TPI, it depicts terrain features of different sizes at the same time.",  #analysedTerrain
+        
+        "Multi-scale Topographic Position Index (DEVmax) values.\n" + \
+        "For each window radius, deviation from mean elevation (DEV) is calculated as the difference between the vertex elevation and the mean elevation of its window, divided by the standard deviation of the window elevations.\n" + \
+        "Each value represents the DEV with the largest absolute value, of all window radii.\n" + \
+        "-\n" + \
+        "Unitless."]  #values
         ]
         
         chosenOutputDescription = outputDescriptions[analysisType]
@@ -430,7 +496,26 @@ def correctSrfAzimuthDforNorth(northRad, srfAzimuthD):
     return correctedSrfAzimuthD
 
 
-def createAnalysedTerrainMesh(analysisType, terrainId, originPt, originPtElevation, contextIdL, northRad, sunVector, hypsometricStrength, refine, exportValues, unitConversionFactor):
+def terrainElevationGrid(terrainMesh, bb, numberOfRows, numberOfColumns, unitConversionFactor):
+    
+    # regular elevation grid of the terrainMesh. It is sampled by vertical rays shot at the terrainMesh, from the points of the terrain bounding box top
+    # grid points outside of the terrainMesh (for example: circular terrain) get None elevation
+    safeHeightDummy = 10000/unitConversionFactor  # in meters
+    startX = bb.Min.X
+    startY = bb.Max.Y
+    cellsizeX = (bb.Max.X - bb.Min.X)/(numberOfColumns-1)
+    cellsizeY = (bb.Max.Y - bb.Min.Y)/(numberOfRows-1)
+    gridRayOriginZ = bb.Max.Z + safeHeightDummy
+    gridRayOrigins = [Rhino.Geometry.Point3d(startX + i*cellsizeX, startY - k*cellsizeY, gridRayOriginZ)  for k in xrange(numberOfRows)  for i in xrange(numberOfColumns)]
+    gridRayHits = gismo_rayCasting.meshRays(terrainMesh, gridRayOrigins, [Rhino.Geometry.Vector3d(0,0,-1)]*len(gridRayOrigins))
+    elevationLL = []
+    for k in xrange(numberOfRows):
+        elevationLL.append([(gridRayOriginZ - rayIntersectParam) if (rayIntersectParam >= 0) else None  for rayIntersectParam, faceIndex in gridRayHits[k*numberOfColumns:(k+1)*numberOfColumns]])
+    
+    return elevationLL, startX, startY, cellsizeX, cellsizeY
+
+
+def createAnalysedTerrainMesh(analysisType, terrainId, originPt, originPtElevation, observerPtL, contextIdL, northRad, sunVector, hypsometricStrength, refine, windowRadius, kernel, exportValues, unitConversionFactor):
     
     terrainBrep = rs.coercegeometry(terrainId)
     # shrink the upper terrain brepface in case it is not shrinked (for example: the terrain surface inputted to _terrain input is not created by Gismo "Terrain Generator" component)
@@ -445,7 +530,7 @@ def createAnalysedTerrainMesh(analysisType, terrainId, originPt, originPtElevati
     terrainSrfControlPts = terrainSrf.Points
     terrainSrfControlPtsCoordinates = [pt.Location for pt in terrainSrfControlPts]
     distanceBetweenFirstSecondControlPt = terrainSrfControlPtsCoordinates[int((len(terrainSrfControlPtsCoordinates)/2)-4)].DistanceTo(terrainSrfControlPtsCoordinates[int(len(terrainSrfControlPtsCoordinates)/2-5)])
-    # for analysisType 6, 7 only:
+    # for analysisType 4, 6, 7 only:
     bb = terrainBrep.GetBoundingBox(False)
     bb_bottom_Xdirection_edge = bb.GetEdges()[0]
     bb_bottom_Ydirection_edge = bb.GetEdges()[1]
@@ -460,6 +545,8 @@ def createAnalysedTerrainMesh(analysisType, terrainId, originPt, originPtElevati
         numberOfColumns = 2 * numberOfColumns  # for "refine_" input set to True, double the numberOfColumns
     
     terrainMesh = Rhino.Geometry.Mesh.CreateFromBrep(terrainBrep, meshParam)[0]
+    terrainMeshWithoutContext = terrainMesh.DuplicateMesh()  # for analysisType 4 only
+    contextMesh = Rhino.Geometry.Mesh()  # for analysisType 4 only
     
     
     # add "context_" to "terrainMesh" unless in casses of TRI, TRI categories, SRF, TPI because they use the surface terrain instead of mesh terrain to analyse the terrain
@@ -470,8 +557,10 @@ def createAnalysedTerrainMesh(analysisType, terrainId, originPt, originPtElevati
                 contextObj_meshes = Rhino.Geometry.Mesh.CreateFromBrep(contextObj, meshParam)
                 for mesh in contextObj_meshes:
                     terrainMesh.Append(mesh)
+                    contextMesh.Append(mesh)
             elif (type(contextObj) == Rhino.Geometry.Mesh):
                 terrainMesh.Append(contextObj)
+                contextMesh.Append(contextObj)
             else:
                 print "One of the items you added to the \"context_\" input is not a brep nor a mesh which is what this input requires."
     
@@ -488,67 +577,93 @@ def createAnalysedTerrainMesh(analysisType, terrainId, originPt, originPtElevati
         vertexElevation = (vertexZ-originPtZ)+originPtElevation
         return vertexElevation
     
+    # for _analysisStyle == 0,1,2,5,10 with "kernel_" input set to 1 or 2
+    if (kernel != 0) and (analysisType in [0,1,2,5,10]):
+        # finite differences on the regular elevation grid of the terrain (without context_), interpolated at each mesh vertex
+        elevationLL, startX, startY, cellsizeX, cellsizeY = terrainElevationGrid(terrainMeshWithoutContext, bb, numberOfRows, numberOfColumns, unitConversionFactor)
+        elevationLL = gismo_terrain.fillGridGaps(elevationLL)
+        derivativesLLL = gismo_terrain.surfaceDerivatives(elevationLL, cellsizeX, cellsizeY, kernel-1)
+        vertexSurfaceParameters = []  # slopeR, aspectR, planCurvature, profileCurvature, meanCurvature of each vertex
+        for vertex in terrainMesh_vertices:
+            derivatives = [gismo_terrain.elevationAt(derivativeLL, startX, startY, cellsizeX, cellsizeY, vertex.X, vertex.Y)  for derivativeLL in derivativesLLL]
+            if (derivatives[0] == None):
+                # vertex on the edge of the grid, moved outside of it by the floating point error
+                vertexX = min(max(vertex.X, startX), startX + cellsizeX*(numberOfColumns-1))
+                vertexY = max(min(vertex.Y, startY), startY - cellsizeY*(numberOfRows-1))
+                derivatives = [gismo_terrain.elevationAt(derivativeLL, startX, startY, cellsizeX, cellsizeY, vertexX, vertexY)  for derivativeLL in derivativesLLL]
+            vertexSurfaceParameters.append(gismo_terrain.surfaceParameters(*derivatives))
+        del elevationLL; del derivativesLLL
+    
     if (analysisType == 0):
         # slope
-        slopeAngles = []
-        for vertex in terrainMesh_vertices:
-            success, u, v = terrainSrf.ClosestPoint(vertex)
-            surfaceNormal = terrainSrf.NormalAt(u,v)
-            # check if slopeAngleD = 0
-            vectorsParallel = Rhino.Geometry.Vector3d.IsParallelTo(surfaceNormal, Rhino.Geometry.Vector3d(0,0,1), 0.01)
-            if vectorsParallel == 1:  # surfaceNormal and Rhino.Geometry.Vector3d(0,0,1) are parallel
-                slopeAngleD = 0
-            else:
-                projectedSurfaceNormal = Rhino.Geometry.Vector3d(surfaceNormal.X, surfaceNormal.Y, 0)
-                surfaceNormal_projectedSurfaceNormal_AngleR = Rhino.Geometry.Vector3d.VectorAngle(surfaceNormal, projectedSurfaceNormal)
-                if surfaceNormal_projectedSurfaceNormal_AngleR < 0.001: surfaceNormal_projectedSurfaceNormal_AngleR = 0
-                slopeAngleR = math.radians(90) - surfaceNormal_projectedSurfaceNormal_AngleR
-                slopeAngleD = math.degrees(slopeAngleR)  # in degrees
-            slopeAngles.append(slopeAngleD)
+        if (kernel != 0):
+            slopeAngles = [math.degrees(slopeR)  for slopeR, aspectR, planCurvature, profileCurvature, meanCurvature in vertexSurfaceParameters]  # in degrees
+        else:
+            slopeAngles = []
+            for vertex in terrainMesh_vertices:
+                success, u, v = terrainSrf.ClosestPoint(vertex)
+                surfaceNormal = terrainSrf.NormalAt(u,v)
+                # check if slopeAngleD = 0
+                vectorsParallel = Rhino.Geometry.Vector3d.IsParallelTo(surfaceNormal, Rhino.Geometry.Vector3d(0,0,1), 0.01)
+                if vectorsParallel == 1:  # surfaceNormal and Rhino.Geometry.Vector3d(0,0,1) are parallel
+                    slopeAngleD = 0
+                else:
+                    projectedSurfaceNormal = Rhino.Geometry.Vector3d(surfaceNormal.X, surfaceNormal.Y, 0)
+                    surfaceNormal_projectedSurfaceNormal_AngleR = Rhino.Geometry.Vector3d.VectorAngle(surfaceNormal, projectedSurfaceNormal)
+                    if surfaceNormal_projectedSurfaceNormal_AngleR < 0.001: surfaceNormal_projectedSurfaceNormal_AngleR = 0
+                    slopeAngleR = math.radians(90) - surfaceNormal_projectedSurfaceNormal_AngleR
+                    slopeAngleD = math.degrees(slopeAngleR)  # in degrees
+                slopeAngles.append(slopeAngleD)
         colors = gismo_preparation.numberToColor(slopeAngles, customColors, minValue, maxValue)
     
     
     elif (analysisType == 1):
         # grade
-        gradePercents = []
-        for vertex in terrainMesh_vertices:
-            success, u, v = terrainSrf.ClosestPoint(vertex)
-            surfaceNormal = terrainSrf.NormalAt(u,v)
-            # check if slopeAngleD = 0
-            vectorsParallel = Rhino.Geometry.Vector3d.IsParallelTo(surfaceNormal, Rhino.Geometry.Vector3d(0,0,1), 0.01)
-            if vectorsParallel == 1:  # surfaceNormal and Rhino.Geometry.Vector3d(0,0,1) are parallel
-                gradePercent = 0
-            else:
-                projectedSurfaceNormal = Rhino.Geometry.Vector3d(surfaceNormal.X, surfaceNormal.Y, 0)
-                surfaceNormal_projectedSurfaceNormal_AngleR = Rhino.Geometry.Vector3d.VectorAngle(surfaceNormal, projectedSurfaceNormal)
-                if surfaceNormal_projectedSurfaceNormal_AngleR < 0.001: surfaceNormal_projectedSurfaceNormal_AngleR = 0
-                slopeAngleR = math.radians(90) - surfaceNormal_projectedSurfaceNormal_AngleR
-                gradePercent = math.tan(slopeAngleR)*100  # in percent
-            gradePercents.append(gradePercent)
+        if (kernel != 0):
+            gradePercents = [math.tan(slopeR)*100  for slopeR, aspectR, planCurvature, profileCurvature, meanCurvature in vertexSurfaceParameters]  # in percent
+        else:
+            gradePercents = []
+            for vertex in terrainMesh_vertices:
+                success, u, v = terrainSrf.ClosestPoint(vertex)
+                surfaceNormal = terrainSrf.NormalAt(u,v)
+                # check if slopeAngleD = 0
+                vectorsParallel = Rhino.Geometry.Vector3d.IsParallelTo(surfaceNormal, Rhino.Geometry.Vector3d(0,0,1), 0.01)
+                if vectorsParallel == 1:  # surfaceNormal and Rhino.Geometry.Vector3d(0,0,1) are parallel
+                    gradePercent = 0
+                else:
+                    projectedSurfaceNormal = Rhino.Geometry.Vector3d(surfaceNormal.X, surfaceNormal.Y, 0)
+                    surfaceNormal_projectedSurfaceNormal_AngleR = Rhino.Geometry.Vector3d.VectorAngle(surfaceNormal, projectedSurfaceNormal)
+                    if surfaceNormal_projectedSurfaceNormal_AngleR < 0.001: surfaceNormal_projectedSurfaceNormal_AngleR = 0
+                    slopeAngleR = math.radians(90) - surfaceNormal_projectedSurfaceNormal_AngleR
+                    gradePercent = math.tan(slopeAngleR)*100  # in percent
+                gradePercents.append(gradePercent)
         colors = gismo_preparation.numberToColor(gradePercents, customColors, minValue, maxValue)
     
     
     elif (analysisType == 2):
         # aspect (slope direction)
-        Yaxis = Rhino.Geometry.Vector3d(0,1,0)
-        slopeDirections = []
-        for vertex in terrainMesh_vertices:
-            success, u, v = terrainSrf.ClosestPoint(vertex)
-            surfaceNormal = terrainSrf.NormalAt(u,v)
-            # check if surfaceNormal == +Z axis
-            vectorsParallel = Rhino.Geometry.Vector3d.IsParallelTo(surfaceNormal, Rhino.Geometry.Vector3d(0,0,1), 0.01)
-            if vectorsParallel == 1:  # surfaceNormal and Rhino.Geometry.Vector3d(0,0,1) are parallel
-                slopeDirectionD = 0
-            else:
-                projectedSurfaceNormal = Rhino.Geometry.Vector3d(surfaceNormal.X, surfaceNormal.Y, 0)
-                # clockwise
-                slopeDirectionR = Rhino.Geometry.Vector3d.VectorAngle(projectedSurfaceNormal, Yaxis, Rhino.Geometry.Plane(Rhino.Geometry.Point3d(0,0,0), Rhino.Geometry.Vector3d(0,0,1)))
-                # counter clockwise
-                #slopeDirectionR = Rhino.Geometry.Vector3d.VectorAngle(projectedSurfaceNormal, Yaxis, Rhino.Geometry.Plane(Rhino.Geometry.Point3d(0,0,0), Rhino.Geometry.Vector3d(0,0,-1)))
-                if slopeDirectionR < 0.001: slopeDirectionR = 0
-                slopeDirectionD = math.degrees(slopeDirectionR)  # in degrees
-            correctedSlopeDirectionD_forNorth = correctSrfAzimuthDforNorth(northRad, slopeDirectionD)
-            slopeDirections.append(correctedSlopeDirectionD_forNorth)
+        if (kernel != 0):
+            slopeDirections = [correctSrfAzimuthDforNorth(northRad, math.degrees(aspectR))  for slopeR, aspectR, planCurvature, profileCurvature, meanCurvature in vertexSurfaceParameters]  # in degrees
+        else:
+            Yaxis = Rhino.Geometry.Vector3d(0,1,0)
+            slopeDirections = []
+            for vertex in terrainMesh_vertices:
+                success, u, v = terrainSrf.ClosestPoint(vertex)
+                surfaceNormal = terrainSrf.NormalAt(u,v)
+                # check if surfaceNormal == +Z axis
+                vectorsParallel = Rhino.Geometry.Vector3d.IsParallelTo(surfaceNormal, Rhino.Geometry.Vector3d(0,0,1), 0.01)
+                if vectorsParallel == 1:  # surfaceNormal and Rhino.Geometry.Vector3d(0,0,1) are parallel
+                    slopeDirectionD = 0
+                else:
+                    projectedSurfaceNormal = Rhino.Geometry.Vector3d(surfaceNormal.X, surfaceNormal.Y, 0)
+                    # clockwise
+                    slopeDirectionR = Rhino.Geometry.Vector3d.VectorAngle(projectedSurfaceNormal, Yaxis, Rhino.Geometry.Plane(Rhino.Geometry.Point3d(0,0,0), Rhino.Geometry.Vector3d(0,0,1)))
+                    # counter clockwise
+                    #slopeDirectionR = Rhino.Geometry.Vector3d.VectorAngle(projectedSurfaceNormal, Yaxis, Rhino.Geometry.Plane(Rhino.Geometry.Point3d(0,0,0), Rhino.Geometry.Vector3d(0,0,-1)))
+                    if slopeDirectionR < 0.001: slopeDirectionR = 0
+                    slopeDirectionD = math.degrees(slopeDirectionR)  # in degrees
+                correctedSlopeDirectionD_forNorth = correctSrfAzimuthDforNorth(northRad, slopeDirectionD)
+                slopeDirections.append(correctedSlopeDirectionD_forNorth)
         colors = gismo_preparation.numberToColor(slopeDirections, customColors, minValue, maxValue)
     
     
@@ -563,6 +678,7 @@ def createAnalysedTerrainMesh(analysisType, terrainId, originPt, originPtElevati
     
     elif (analysisType == 4):
         # visibility
+        # based on XDraw viewshed algorithm: "Line-of-sight algorithms for grid digital elevation models", W. Randolph Franklin, Clark K. Ray, 1994
         hittedPts = []
         hittedLines = []
         
@@ -571,30 +687,59 @@ def createAnalysedTerrainMesh(analysisType, terrainId, originPt, originPtElevati
         eachMeshVertexIndex_notHitted = []
         colors = [None]*len(terrainMesh_vertices)
         
-        # project _origin to terrainMesh. This is done due to inconsistency between "origin" output for "type = 0 or 1", and "origin" output for "type = 2 or 3" for Gismo "Terrain Generator" component
+        # regular elevation grid of the terrain (without context_)
         safeHeightDummy = 10000/unitConversionFactor  # in meters
-        highLiftedOrigin = Rhino.Geometry.Point3d(originPt.X, originPt.Y, (originPt.Z+safeHeightDummy))
-        ray = Rhino.Geometry.Ray3d(highLiftedOrigin, Rhino.Geometry.Vector3d(0,0,-1))
-        rayIntersectParam = Rhino.Geometry.Intersect.Intersection.MeshRay(terrainMesh, ray)
-        locationPt = ray.PointAt(rayIntersectParam)
-        # lift the locationPt for average eye height
-        eyeHeightRhinoUnits = 1.6 / unitConversionFactor  # (1.6 meters, 5.25 feet)
-        liftedOriginPt = Rhino.Geometry.Point3d(locationPt.X, locationPt.Y, locationPt.Z + eyeHeightRhinoUnits)
+        elevationLL, startX, startY, cellsizeX, cellsizeY = terrainElevationGrid(terrainMeshWithoutContext, bb, numberOfRows, numberOfColumns, unitConversionFactor)
+        lowestGridElevation = min([elevation  for row in elevationLL  for elevation in row  if (elevation != None)])
+        # grid points outside of the terrain (for example: circular terrain) get the lowest terrain elevation, so they do not obstruct the view
+        elevationLL = [[elevation if (elevation != None) else lowestGridElevation  for elevation in row]  for row in elevationLL]
+        
+        liftedVertices = [Rhino.Geometry.Point3d(vertex.X, vertex.Y, vertex.Z + 0.01) for vertex in terrainMesh_vertices]  # lift each mesh vertex due to line of sight intersection
+        
+        # the smallest distance to the observer which sees the vertex. None if vertex can not be seen by any observer
+        visibleDistances = [None]*len(terrainMesh_vertices)
+        for observerPt in [originPt] + observerPtL:
+            # project observerPt to terrainMesh. This is done due to inconsistency between "origin" output for "type = 0 or 1", and "origin" output for "type = 2 or 3" for Gismo "Terrain Generator" component
+            highLiftedOrigin = Rhino.Geometry.Point3d(observerPt.X, observerPt.Y, (observerPt.Z+safeHeightDummy))
+            ray = Rhino.Geometry.Ray3d(highLiftedOrigin, Rhino.Geometry.Vector3d(0,0,-1))
+            rayIntersectParam = Rhino.Geometry.Intersect.Intersection.MeshRay(terrainMesh, ray)
+            if (rayIntersectParam < 0):
+                print "One of the points supplied to the \"observers_\" input is not above or below the \"_terrain\". It will not be used."
+                continue
+            locationPt = ray.PointAt(rayIntersectParam)
+            # lift the locationPt for average eye height
+            eyeHeightRhinoUnits = 1.6 / unitConversionFactor  # (1.6 meters, 5.25 feet)
+            liftedOriginPt = Rhino.Geometry.Point3d(locationPt.X, locationPt.Y, locationPt.Z + eyeHeightRhinoUnits)
+            
+            # obstruction by the terrain
+            minVisibleElevationLL = gismo_terrain.viewshed(elevationLL, startX, startY, cellsizeX, cellsizeY, (liftedOriginPt.X, liftedOriginPt.Y, liftedOriginPt.Z))
+            # obstruction by the context_: lines from liftedOriginPt to each lifted mesh vertex
+            if (contextMesh.Faces.Count > 0):
+                lineVectors = [liftedVertex - liftedOriginPt for liftedVertex in liftedVertices]
+                contextLineHits = gismo_rayCasting.meshRays(contextMesh, [liftedOriginPt], lineVectors, maxParameter=1)
+            
+            for index,vertex in enumerate(terrainMesh_vertices):
+                minVisibleElevation = gismo_terrain.elevationAt(minVisibleElevationLL, startX, startY, cellsizeX, cellsizeY, vertex.X, vertex.Y)
+                if (minVisibleElevation != None) and (liftedVertices[index].Z < minVisibleElevation):
+                    # terrain hitted
+                    continue
+                if (contextMesh.Faces.Count > 0) and (contextLineHits[index][0] >= 0):
+                    # context_ hitted
+                    continue
+                distanceRhinoUnits = liftedOriginPt.DistanceTo(vertex)
+                if (visibleDistances[index] == None) or (distanceRhinoUnits < visibleDistances[index]):
+                    visibleDistances[index] = distanceRhinoUnits
         
         for index,vertex in enumerate(terrainMesh_vertices):
-            liftedVertex = Rhino.Geometry.Point3d(vertex.X, vertex.Y, vertex.Z + 0.01)  # lift each mesh vertex due to Intersection.MeshLine
-            line = Rhino.Geometry.Line(liftedOriginPt, liftedVertex)
-            intersectionPts, intersectionFaceIndex = Rhino.Geometry.Intersect.Intersection.MeshLine(terrainMesh,line)
-            if len(intersectionPts) != 0:
+            if (visibleDistances[index] == None):
                 # terrainMesh hitted
-                #hittedPts.append(liftedVertex)
-                #hittedLines.append(line)
+                #hittedPts.append(liftedVertices[index])
                 colors[index] = System.Drawing.Color.FromArgb(70,70,70)  # set it to gray color
                 distanceToEachMeshVertex_all.append(0)  # if vertex can not be seen from liftedOriginPt, then set the distance between a vertex and liftedOriginPt to 0
             else:
                 # nothing hitted
                 eachMeshVertexIndex_notHitted.append(index)
-                distanceRhinoUnits = liftedOriginPt.DistanceTo(vertex)
+                distanceRhinoUnits = visibleDistances[index]
                 distanceToEachMeshVertex_notHitted.append(distanceRhinoUnits)  # will be used to create a legend
                 distanceToEachMeshVertex_all.append(distanceRhinoUnits)  # will be used for "values" output
         if len(distanceToEachMeshVertex_notHitted) == 0:  # fix when all vertices can not be seen
@@ -629,28 +774,32 @@ def createAnalysedTerrainMesh(analysisType, terrainId, originPt, originPtElevati
         vertexZmax = max(vertexZ)
         
         hypsometricallyShadedHillshadeL = []
-        for vertex in terrainMesh_vertices:
-            success, u, v = terrainSrf.ClosestPoint(vertex)
-            surfaceNormal = terrainSrf.NormalAt(u,v)
-            # check if slopeAngleD = 0 and slopeDirectionD = 0
-            vectorsParallel = Rhino.Geometry.Vector3d.IsParallelTo(surfaceNormal, Rhino.Geometry.Vector3d(0,0,1), 0.01)
-            if vectorsParallel == 1:  # surfaceNormal and Rhino.Geometry.Vector3d(0,0,1) are parallel
-                slopeAngleR = 0
-                slopeAngleD = 0
-                slopeDirectionD = 0
+        for vertexIndex, vertex in enumerate(terrainMesh_vertices):
+            if (kernel != 0):
+                slopeAngleR, slopeDirectionR = vertexSurfaceParameters[vertexIndex][:2]
+                slopeDirectionD = math.degrees(slopeDirectionR)  # in degrees
             else:
-                projectedSurfaceNormal = Rhino.Geometry.Vector3d(surfaceNormal.X, surfaceNormal.Y, 0)
-                surfaceNormal_projectedSurfaceNormal_AngleR = Rhino.Geometry.Vector3d.VectorAngle(surfaceNormal, projectedSurfaceNormal)
-                if surfaceNormal_projectedSurfaceNormal_AngleR < 0.001: surfaceNormal_projectedSurfaceNormal_AngleR = 0
-                slopeAngleR = math.radians(90) - surfaceNormal_projectedSurfaceNormal_AngleR
-                slopeAngleD = math.degrees(slopeAngleR)  # in degrees
+                success, u, v = terrainSrf.ClosestPoint(vertex)
+                surfaceNormal = terrainSrf.NormalAt(u,v)
+                # check if slopeAngleD = 0 and slopeDirectionD = 0
+                vectorsParallel = Rhino.Geometry.Vector3d.IsParallelTo(surfaceNormal, Rhino.Geometry.Vector3d(0,0,1), 0.01)
+                if vectorsParallel == 1:  # surfaceNormal and Rhino.Geometry.Vector3d(0,0,1) are parallel
+                    slopeAngleR = 0
+                    slopeAngleD = 0
+                    slopeDirectionD = 0
+                else:
+                    projectedSurfaceNormal = Rhino.Geometry.Vector3d(surfaceNormal.X, surfaceNormal.Y, 0)
+                    surfaceNormal_projectedSurfaceNormal_AngleR = Rhino.Geometry.Vector3d.VectorAngle(surfaceNormal, projectedSurfaceNormal)
+                    if surfaceNormal_projectedSurfaceNormal_AngleR < 0.001: surfaceNormal_projectedSurfaceNormal_AngleR = 0
+                    slopeAngleR = math.radians(90) - surfaceNormal_projectedSurfaceNormal_AngleR
+                    slopeAngleD = math.degrees(slopeAngleR)  # in degrees
                 
-                # clockwise
-                slopeDirectionR = Rhino.Geometry.Vector3d.VectorAngle(projectedSurfaceNormal, Yaxis, Rhino.Geometry.Plane(Rhino.Geometry.Point3d(0,0,0), Rhino.Geometry.Vector3d(0,0,1)))
-                # counter clockwise
-                #slopeDirectionR = Rhino.Geometry.Vector3d.VectorAngle(projectedSurfaceNormal, Yaxis, Rhino.Geometry.Plane(Rhino.Geometry.Point3d(0,0,0), Rhino.Geometry.Vector3d(0,0,-1)))
-                if slopeDirectionR < 0.001: slopeDirectionR = 0
-                slopeDirectionD = math.degrees(slopeDirectionR)  # in degrees
+                    # clockwise
+                    slopeDirectionR = Rhino.Geometry.Vector3d.VectorAngle(projectedSurfaceNormal, Yaxis, Rhino.Geometry.Plane(Rhino.Geometry.Point3d(0,0,0), Rhino.Geometry.Vector3d(0,0,1)))
+                    # counter clockwise
+                    #slopeDirectionR = Rhino.Geometry.Vector3d.VectorAngle(projectedSurfaceNormal, Yaxis, Rhino.Geometry.Plane(Rhino.Geometry.Point3d(0,0,0), Rhino.Geometry.Vector3d(0,0,-1)))
+                    if slopeDirectionR < 0.001: slopeDirectionR = 0
+                    slopeDirectionD = math.degrees(slopeDirectionR)  # in degrees
             
             correctedSlopeDirectionD_forNorth = correctSrfAzimuthDforNorth(northRad, slopeDirectionD)
             correctedSlopeDirectionR_forNorth = math.radians(correctedSlopeDirectionD_forNorth)
@@ -665,8 +814,8 @@ def createAnalysedTerrainMesh(analysisType, terrainId, originPt, originPtElevati
         colors = gismo_preparation.numberToColor(hypsometricallyShadedHillshadeL, customColors, minValue, maxValue)
     
     
-    elif (analysisType == 6) or (analysisType == 7) or (analysisType == 8) or (analysisType == 9):
-        # TRI, TRI categories, SRF, TPI
+    elif (analysisType == 6) or (analysisType == 7) or (analysisType == 8) or (analysisType == 9) or (analysisType == 11):
+        # TRI, TRI categories, SRF, TPI, Multi-scale TPI
         # based on: http://download.osgeo.org/qgis/doc/reference-docs/Terrain_Ruggedness_Index.pdf
         # http://gis.stackexchange.com/a/6059/65002
         # https://github.com/wschwanghart/topotoolbox/blob/master/@GRIDobj/roughness.m
@@ -734,61 +883,25 @@ def createAnalysedTerrainMesh(analysisType, terrainId, originPt, originPtElevati
         # end of generation of points on terrainSrf (ptsOnTerrainSrf) and its elevation values (vertexElevations)
         
         
-        # calculation of surrounding set of neighboring indices in a matrix. equations by: http://math.stackexchange.com/users/71915/dolma
-        def rowOfIndexFunc(index):
-            rowOfIndex = int(math.floor(index/numberOfColumns)+1)
-            return rowOfIndex
+        # elevation and normal grids (lists of rows)
+        elevationLL = [vertexElevations[i*numberOfColumns:(i+1)*numberOfColumns]  for i in xrange(numberOfRows)]
+        normalsLL = [[(normal.X, normal.Y, normal.Z)  for normal in vertexNormals[i*numberOfColumns:(i+1)*numberOfColumns]]  for i in xrange(numberOfRows)]
         
-        TRI_List = []
-        SRF_List = []
-        TPI_List = []
-        TRI_category_List = []
-        TPI_category_List = []
-        for wantedIndex in xrange(len(vertexElevations)):
-            rowOfWantedIndex = rowOfIndexFunc(wantedIndex)
-            
-            indicesInRowBeforeWantedIndex = [wantedIndex-numberOfColumns-1, wantedIndex-numberOfColumns, wantedIndex-numberOfColumns+1]
-            indicesInRowOfWantedIndex = [wantedIndex-1, wantedIndex+1]
-            indicesInRowAfterWantedIndex = [wantedIndex+numberOfColumns-1, wantedIndex+numberOfColumns, wantedIndex+numberOfColumns+1]
-            
-            kept_indicesInRowBeforeWantedIndex = [index  for index in indicesInRowBeforeWantedIndex  if rowOfIndexFunc(index) ==  rowOfWantedIndex-1]
-            kept_indicesInRowOfWantedIndex = [index2  for index2 in indicesInRowOfWantedIndex  if rowOfIndexFunc(index2) ==  rowOfWantedIndex]
-            kept_indicesInRowAfterWantedIndex = [index3  for index3 in indicesInRowAfterWantedIndex  if rowOfIndexFunc(index3) ==  rowOfWantedIndex+1]
-            mergedThreeLists_kept_indices = kept_indicesInRowBeforeWantedIndex + kept_indicesInRowOfWantedIndex + kept_indicesInRowAfterWantedIndex
-            
-            indicesRange = range(0, numberOfRows*numberOfColumns)
-            neighborIndices = [index4  for index4 in mergedThreeLists_kept_indices  if index4 in indicesRange]
-            neighboringVertexElevations = [vertexElevations[index] for index in neighborIndices]
-            neighboringVertexNormals = [vertexNormals[index] for index in neighborIndices]
-            centralVertexElevation = vertexElevations[wantedIndex]
-            centralVertexNormal = vertexNormals[wantedIndex]
-            neighboringVertexElevations_plus_centralVertexElevation = neighboringVertexElevations + [centralVertexElevation]
-            neighboringVertexNormals_plus_centralVertexNormal = neighboringVertexNormals + [centralVertexNormal]
-            
-            TRI_rhinoUnits = math.sqrt( sum([(centralVertexElevation-ptsZ)**2  for ptsZ in neighboringVertexElevations]) )  # in rhino document units
-            TRI_List.append(TRI_rhinoUnits)
-            
-            TRI_category = calculate_TRI_category(TRI_rhinoUnits)  # unitless
-            TRI_category_List.append(TRI_category)
-            
-            SRF_unitless = math.sqrt( (sum([normal.X  for normal in neighboringVertexNormals_plus_centralVertexNormal]))**2 + (sum([normal.Y  for normal in neighboringVertexNormals_plus_centralVertexNormal]))**2 + (sum([normal.Z  for normal in neighboringVertexNormals_plus_centralVertexNormal]))**2 ) / len(neighboringVertexElevations_plus_centralVertexElevation)  # unitless
-            SRF_List.append(SRF_unitless)
-            
-            TPI_rhinoUnits = centralVertexElevation - sum(neighboringVertexElevations)/len(neighboringVertexElevations)  # in rhino document units
-            averageVertexElevations = sum(neighboringVertexElevations_plus_centralVertexElevation) / len(neighboringVertexElevations_plus_centralVertexElevation)
-            TPI2 = (averageVertexElevations - min(neighboringVertexElevations_plus_centralVertexElevation)) / (max(neighboringVertexElevations_plus_centralVertexElevation) - min(neighboringVertexElevations_plus_centralVertexElevation))  # unitless, also called ERR (Elevation–Relief Ratio (Pike and Wilson, 1971)), source: Olaya, V. 2009: Basic land-surface parameters. In: Geomorphometry, Hengl, T. & Reuter, H. I.
-            #TPI_List.append(TPI_rhinoUnits)
-            TPI_List.append(TPI2)
-            """
-            # TPI cagories
-            averageElevationOfCellsWindow = sum(neighboringVertexElevations_plus_centralVertexElevation) / len(neighboringVertexElevations_plus_centralVertexElevation)
-            SD = math.sqrt(  sum( [(elevation - averageElevationOfCellsWindow)**2  for elevation in neighboringVertexElevations_plus_centralVertexElevation] ) / (len(neighboringVertexElevations_plus_centralVertexElevation) - 1)  )  # standard deviation of the elevation, in rhino document units
-            projectedCentralVertexNormal = Rhino.Geometry.Vector3d(centralVertexNormal.X, centralVertexNormal.Y, 0)
-            slopeAngleR = math.radians(90) - Rhino.Geometry.Vector3d.VectorAngle(centralVertexNormal, projectedCentralVertexNormal)
-            slopeAngleD = math.degrees(slopeAngleR)
-            TPI_category = calculate_TPI_category(TPI_rhinoUnits, SD, slopeAngleD)  # unitless
-            TPI_category_List.append(TPI_category)
-            """
+        if (analysisType == 11):
+            radii = []
+            radius = 1
+            while (radius <= windowRadius):
+                radii.append(radius)
+                radius = 2 * radius
+            DEVmaxLL, radiusLL = gismo_terrain.multiScaleTPI(elevationLL, radii)
+            DEVmax_List = gismo_preparation.flattenLL(DEVmaxLL)
+        else:
+            TRI_LL, SRF_LL, TPI_LL, ERR_LL = gismo_terrain.ruggednessIndices(elevationLL, normalsLL, windowRadius)
+            TRI_List = gismo_preparation.flattenLL(TRI_LL)  # in rhino document units
+            TRI_category_List = [calculate_TRI_category(TRI_rhinoUnits)  for TRI_rhinoUnits in TRI_List]  # unitless
+            SRF_List = gismo_preparation.flattenLL(SRF_LL)  # unitless
+            #TPI_List = gismo_preparation.flattenLL(TPI_LL)  # in rhino document units
+            TPI_List = gismo_preparation.flattenLL(ERR_LL)  # unitless, also called ERR (Elevation-Relief Ratio (Pike and Wilson, 1971)), source: Olaya, V. 2009: Basic land-surface parameters. In: Geomorphometry, Hengl, T. & Reuter, H. I.
         
         if (analysisType == 6):
             colors = gismo_preparation.numberToColor(TRI_List, customColors, minValue, maxValue)
@@ -814,16 +927,25 @@ def createAnalysedTerrainMesh(analysisType, terrainId, originPt, originPtElevati
             del terrainMesh_vertices; del ptsOnTerrainSrf; del colors; del TRI_List; del TRI_category_List; del SRF_List
             
             return terrainMesh_colored, TPI_List, TPI_List
+        elif (analysisType == 11):
+            colors = gismo_preparation.numberToColor(DEVmax_List, customColors, minValue, maxValue)
+            terrainMesh_colored = gismo_geometry.meshFromPoints(numberOfRows, numberOfColumns, ptsOnTerrainSrf, colors)
+            del terrainMesh_vertices; del ptsOnTerrainSrf; del colors; del radiusLL
+            
+            return terrainMesh_colored, DEVmax_List, DEVmax_List
     
     
     elif (analysisType == 10):
         # mean curvature
-        MeanCurvatures = []
-        for vertex in terrainMesh_vertices:
-            success, u, v = terrainSrf.ClosestPoint(vertex)
-            surfaceCurvatureParameters = terrainSrf.CurvatureAt(u,v)
-            meanCurvature = surfaceCurvatureParameters.Mean
-            MeanCurvatures.append(meanCurvature)
+        if (kernel != 0):
+            MeanCurvatures = [meanCurvature  for slopeR, aspectR, planCurvature, profileCurvature, meanCurvature in vertexSurfaceParameters]
+        else:
+            MeanCurvatures = []
+            for vertex in terrainMesh_vertices:
+                success, u, v = terrainSrf.ClosestPoint(vertex)
+                surfaceCurvatureParameters = terrainSrf.CurvatureAt(u,v)
+                meanCurvature = surfaceCurvatureParameters.Mean
+                MeanCurvatures.append(meanCurvature)
         colors = gismo_preparation.numberToColor(MeanCurvatures, customColors, minValue, maxValue)
     
     
@@ -910,7 +1032,7 @@ def joinTerrainStand_withTerrainMesh(terrainId, terrainMesh):
         return terrainMesh
 
 
-def createTitleLegend(analysisType, terrainMesh_withWithoutStand, legendValues, analysisTypeLabel, northD, sunVector, hypsometricStrength, refine, unitSystem, legendUnit):
+def createTitleLegend(analysisType, terrainMesh_withWithoutStand, legendValues, analysisTypeLabel, northD, sunVector, hypsometricStrength, refine, windowRadius, kernel, unitSystem, legendUnit):
     
     # extract data from legendBakePar_
     legendStyle, legendPlane, maxValue, minValue, customColors, numLegendCells, fontName, fontSize, numDecimals, customLegendUnit, customTitle, scale, layerName, layerColor, layerCategoryName = gismo_preparation.read_legendBakePar(legendBakePar_)
@@ -919,9 +1041,13 @@ def createTitleLegend(analysisType, terrainMesh_withWithoutStand, legendValues,
     if (analysisType == 5):
         titleLabelText = "Terrain %s analysis\nsunVector: (%0.2f,%0.2f,%0.2f), hypsoStrength: %s\nnorth: %s, refine: %s" % (analysisTypeLabel, sunVector.X, sunVector.Y, sunVector.Z, str(hypsometricStrength), str(northD), refine)
     elif (analysisType == 6) or (analysisType == 7) or (analysisType == 8) or (analysisType == 9):
-        titleLabelText = "%s analysis\nnorth: %s, refine: %s, for fixed 3x3 cells window" % (analysisTypeLabel, northD, refine)
+        titleLabelText = "%s analysis\nnorth: %s, refine: %s, for %sx%s cells window" % (analysisTypeLabel, northD, refine, 2*windowRadius+1, 2*windowRadius+1)
+    elif (analysisType == 11):
+        titleLabelText = "%s analysis\nnorth: %s, refine: %s, for up to %sx%s cells window" % (analysisTypeLabel, northD, refine, 2*windowRadius+1, 2*windowRadius+1)
     else:
         titleLabelText = "Terrain %s analysis\nnorth: %s, refine: %s" % (analysisTypeLabel, northD, refine)
+    if (kernel != 0) and (analysisType in [0,1,2,5,10]):
+        titleLabelText += ", kernel: %s" % ["Horn", "Zevenbergen-Thorne"][kernel-1]
     
     titleLabelMesh, titleStartPt, titleTextSize = gismo_preparation.createTitle("mesh", [terrainMesh_withWithoutStand], [titleLabelText], customTitle, textStartPt=None, textSize=None, fontName=fontName)
     
@@ -994,14 +1120,16 @@ if sc.sticky.has_key("gismoGismo_released"):
         gismo_mainComponent = sc.sticky["gismo_mainComponent"]()
         gismo_preparation = sc.sticky["gismo_Preparation"]()
         gismo_geometry = sc.sticky["gismo_CreateGeometry"]()
+        gismo_rayCasting = sc.sticky["gismo_RayCasting"]()
+        gismo_terrain = sc.sticky["gismo_Terrain"]()
         
-        analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg = checkInputData(_analysisType, _terrain, _origin, _elevation, north_, sunVector_, hypsoStrength_, refine_)
+        analysisType, analysisTypeLabel, originPt, originPtElevation, northRad, northD, sunVector, hypsometricStrength, refine, windowRadius, kernel, exportValues, unitSystem, unitConversionFactor, legendUnit, validInputData, printMsg = checkInputData(_analysisType, _terrain, _origin, _elevation, north_, sunVector_, hypsoStrength_, refine_, windowRadius_, kernel_)
         if validInputData:
             createOutputDescriptions(analysisType, unitSystem)
             if _runIt:
-                terrainMesh, values, legendValues = createAnalysedTerrainMesh(analysisType, _terrain, originPt, originPtElevation, context_, northRad, sunVector, hypsometricStrength, refine, exportValues, unitConversionFactor)
+                terrainMesh, values, legendValues = createAnalysedTerrainMesh(analysisType, _terrain, originPt, originPtElevation, [pt for pt in (observers_ or []) if (pt != None)], context_, northRad, sunVector, hypsometricStrength, refine, windowRadius, kernel, exportValues, unitConversionFactor)
                 terrainMesh_withWithoutStand = joinTerrainStand_withTerrainMesh(_terrain, terrainMesh)
-                titleLabelMesh, legendMesh, legendPlane = createTitleLegend(analysisType, terrainMesh_withWithoutStand, legendValues, analysisTypeLabel, northD, sunVector, hypsometricStrength, refine, unitSystem, legendUnit)
+                titleLabelMesh, legendMesh, legendPlane = createTitleLegend(analysisType, terrainMesh_withWithoutStand, legendValues, analysisTypeLabel, northD, sunVector, hypsometricStrength, refine, windowRadius, kernel, unitSystem, legendUnit)
                 if bakeIt_: bakingGrouping(analysisType, analysisTypeLabel, terrainMesh_withWithoutStand, titleLabelMesh, legendMesh, legendPlane, originPt)
                 printOutput(analysisType, analysisTypeLabel, originPt, originPtElevation, northD, sunVector, hypsometricStrength, refine, unitSystem)
                 analysedTerrain = terrainMesh_withWithoutStand; origin = originPt; title = titleLabelMesh; legend = legendMesh; del legendValues;
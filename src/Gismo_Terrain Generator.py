@@ -93,6 +93,28 @@ Provided by Gismo 0.0.3
                         If you would not like the elevationContours output to be calculated, set the numOfContours_ input to 0.
                         -
                         If not supplied, default value of 10 elevation contours will be used.
+        tolerance_: Maximal vertical distance between the terrain mesh and the downloaded terrain data, used to simplify the terrain mesh.
+                    Flat and distant parts of the terrain will then be created with larger mesh faces, which makes the terrain mesh much lighter (usually 10 to 50 times), and speeds up the components which use it (for example: "OSM Shapes", "OSM 3D", "Terrain Analysis").
+                    -
+                    Set it to 0 to create the terrain mesh with one vertex per terrain data cell.
+                    -
+                    The elevationContours output will be simplified with the same tolerance_ (as the maximal horizontal distance from the exact elevation contour).
+                    -
+                    If not supplied, default value of 0 (no simplification) will be used.
+                    -
+                    In meters.
+        coreRadius_: Horizontal distance from the origin_ inside of which the terrain mesh will keep the full precision, even if tolerance_ input is higher than 0.
+                     Beyond it, the tolerance_ increases with the distance from the origin_: at two coreRadius_ distances it is two times larger, at three coreRadius_ distances three times larger etc.
+                     -
+                     If not supplied, default value of 0 (the same tolerance_ for the whole terrain) will be used.
+                     -
+                     In meters.
+        surfaceGridStep_: Use every n-th terrain data point (in both directions) to create the terrain surface, when type_ input is set to 2 or 3.
+                          Larger values create lighter and smoother terrain surfaces, much quicker.
+                          -
+                          The terrain surface is created only for type_ 2 and 3, and it is remembered for the same terrain. So changing other inputs and rerunning the component will not create it again.
+                          -
+                          If not supplied, default value of 1 (all terrain data points) will be used.
         legendBakePar_: In case your type_ input is set to 0 or 1, you can use the legendBakePar_ input to control the colors with which the final "terrain" mesh will be colored with based on elevation.
                         Use Gismo "Legend Bake Parameters" component's "customColors_" input to control these colors.
                         Also use its fontName_ and fontSize_ inputs to change the font, size of the "title" output.
@@ -122,11 +144,11 @@ Provided by Gismo 0.0.3
 
 ghenv.Component.Name = "Gismo_Terrain Generator"
 ghenv.Component.NickName = "TerrainGenerator"
-ghenv.Component.Message = "VER 0.0.3\nMAY_07_2025"
+ghenv.Component.Message = "VER 0.0.3\nOCT_17_2026"
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Gismo"
 ghenv.Component.SubCategory = "2 | Terrain"
-#compatibleGismoVersion = VER 0.0.3\nJAN_29_2019
+#compatibleGismoVersion = VER 0.0.3\nOCT_17_2026
 try: ghenv.Component.AdditionalHelpFromDocStrings = "1"
 except: pass
 
@@ -145,7 +167,7 @@ import os
 import gc
 
 
-def checkInputData(locationLatitudeD, locationLongitudeD, opentopo_APIkey, maxVisibilityRadiusM, gridSize, source, _type, origin, north, standThickness, numOfContours, downloadTSVLink):
+def checkInputData(locationLatitudeD, locationLongitudeD, opentopo_APIkey, maxVisibilityRadiusM, gridSize, source, _type, origin, north, standThickness, numOfContours, simplifyToleranceM, coreRadiusM, surfaceGridStep, downloadTSVLink):
     
     # check if MapWinGIS is properly installed
     gismoGismoComponentNotRan = False  # initial value
@@ -153,8 +175,8 @@ def checkInputData(locationLatitudeD, locationLongitudeD, opentopo_APIkey, maxVi
         mapFolder_ = sc.sticky["gismo_mapwingisFolder"]
         iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, validInputData, printMsg = gismo_mainComponent.mapWinGIS(mapFolder_)
         if not validInputData:
-            maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
-            return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+            maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = simplifyToleranceM = coreRadiusM = surfaceGridStep = None
+            return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, simplifyToleranceM, coreRadiusM, surfaceGridStep, validInputData, printMsg
         if sc.sticky.has_key("MapWinGIS"):
             global MapWinGIS
             import MapWinGIS
@@ -164,22 +186,22 @@ def checkInputData(locationLatitudeD, locationLongitudeD, opentopo_APIkey, maxVi
         gismoGismoComponentNotRan = True
     
     if (gismoGismoComponentNotRan == True):
-        maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
+        maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = simplifyToleranceM = coreRadiusM = surfaceGridStep = None
         validInputData = False
         printMsg = "The \"Gismo Gismo\" component has not been run. Run it before running this component."
-        return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+        return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, simplifyToleranceM, coreRadiusM, surfaceGridStep, validInputData, printMsg
     
     
     # check inputs
     if (opentopo_APIkey == None):
-        maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
+        maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = simplifyToleranceM = coreRadiusM = surfaceGridStep = None
         validInputData = False
         printMsg = "\"_APIkey\" input has not been added. To obtain it for free:\n" + \
                     "1) go to the following link:  https://portal.opentopography.org/myopentopo\n" + \
                     "2) go to the following link:  https://github.com/stgeorges/gismo/blob/master/resources/tutorials/Get_OpenTopo_APIkey.mp4\n" + \
                     "3) click on 'Download' and watch the video tutorial\n" + \
                     "4) repeat the steps in the tutorial"
-        return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+        return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, simplifyToleranceM, coreRadiusM, surfaceGridStep, validInputData, printMsg
     
     
     if (source == None):
@@ -249,22 +271,47 @@ def checkInputData(locationLatitudeD, locationLongitudeD, opentopo_APIkey, maxVi
               "numOfContours_ input set to 0 (no elevation contours will be created)."
     
     
+    if (simplifyToleranceM == None):
+        simplifyToleranceM = 0  # default, no simplification of the terrain mesh
+    elif (simplifyToleranceM < 0):
+        simplifyToleranceM = 0
+        print "tolerance_ input can not be lower than 0. It can only be either 0 (no simplification of the terrain mesh) or higher.\n" + \
+              "tolerance_ input set to 0 (no simplification of the terrain mesh)."
+    
+    
+    if (coreRadiusM == None):
+        coreRadiusM = 0  # default, the same tolerance for the whole terrain mesh
+    elif (coreRadiusM < 0):
+        coreRadiusM = 0
+        print "coreRadius_ input can not be lower than 0. It can only be either 0 (the same tolerance_ for the whole terrain mesh) or higher.\n" + \
+              "coreRadius_ input set to 0 (the same tolerance_ for the whole terrain mesh)."
+    
+    
+    if (surfaceGridStep == None):
+        surfaceGridStep = 1  # default, all terrain data points
+    elif (surfaceGridStep < 1):
+        surfaceGridStep = 1
+        print "surfaceGridStep_ input can not be lower than 1.\n" + \
+              "surfaceGridStep_ input set to 1 (all terrain data points)."
+    surfaceGridStep = int(surfaceGridStep)
+    
+    
     if (maxVisibilityRadiusM == None):
         maxVisibilityRadiusM = 200  # default in meters
     elif (maxVisibilityRadiusM >= 20) and (maxVisibilityRadiusM < 200):
         maxVisibilityRadiusM = 200  # values less than 150m can download invalid .tif file from opentopography.org. So the .tif file will always be downloaded with the minimal radius of 200 meters
     elif (maxVisibilityRadiusM < 20):
-        maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
+        maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = simplifyToleranceM = coreRadiusM = surfaceGridStep = None
         validInputData = False
         printMsg = "radius_ input only supports values equal or larger than 20 meters."
-        return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+        return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, simplifyToleranceM, coreRadiusM, surfaceGridStep, validInputData, printMsg
     elif (maxVisibilityRadiusM > 100000):
-        maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
+        maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = simplifyToleranceM = coreRadiusM = surfaceGridStep = None
         validInputData = False
         printMsg = "Radii longer than 100 000 meters (100 kilometers) are not supported, due to possibility of crashing the Rhino.\n" + \
                    " \n" + \
                    "ATTENTION!!! Have in mind that even radii of a couple of thousands of meters may require stronger PC configurations and 64 bit version of Rhino 5. Otherwise Rhino 5 may crash."
-        return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+        return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, simplifyToleranceM, coreRadiusM, surfaceGridStep, validInputData, printMsg
     
     #arcAngleD = math.degrees( math.atan( maxVisibilityRadiusM / (6371000+elevation) ) )  # assumption of Earth being a sphere
     #arcLength = (arcAngleD*math.pi*R)/180
@@ -275,50 +322,50 @@ def checkInputData(locationLatitudeD, locationLongitudeD, opentopo_APIkey, maxVi
         # USGS1m limits:
         # lon western than Hawaii islands; lon eastern than US Virgin islands; lat northern than Minessota; lat southern than US Virgin islands
         # based on: https://portal.opentopography.org/raster?opentopoID=OTNED.012021.4269.3
-        maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
+        maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = simplifyToleranceM = coreRadiusM = surfaceGridStep = None
         validInputData = False
         printMsg = "The \"source_ = 0\" input (USGS1m) has range limits: Only supports USA, Island of Hawai`i, Puerto Rico, US Virgin islands.\n" + \
                    "Defined \"_location\" exceeds these limits.\n" + \
                    "Try using \"source_ = 1/2/3/4\" input instead, which have higher range limits."
-        return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+        return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, simplifyToleranceM, coreRadiusM, surfaceGridStep, validInputData, printMsg
     
     if (source == 1)  and  ((locationLongitudeD > -63.772819560330355)   or   (locationLatitudeD < -14.478117392394656)):
         # USGS10m limits:
         # lon eastern than US Virgin islands; lat southern than American Samoa
         # based on: https://portal.opentopography.org/datasetMetadata?otCollectionID=OT.012021.4269.1
-        maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
+        maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = simplifyToleranceM = coreRadiusM = surfaceGridStep = None
         validInputData = False
         printMsg = "The \"source_ = 1\" input (USGS1m) has range limits: Only supports USA, all Hawaii islands, Puerto Rico, US and British Virgin islands, American Samoa, Alaska.\n" + \
                    "Defined \"_location\" exceeds these limits.\n" + \
                    "Try using \"source_ = 2/3/4\" input instead, which have higher range limits."
-        return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+        return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, simplifyToleranceM, coreRadiusM, surfaceGridStep, validInputData, printMsg
     
     if (source == 2)  and  ((locationLatitudeD < -56) or (locationLatitudeD > 60)):
         # NASADEM is limited to -56 to 60 latitude
-        maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
+        maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = simplifyToleranceM = coreRadiusM = surfaceGridStep = None
         validInputData = False
         printMsg = "The \"source_ = 2\" input (NASADEM) has range limits: from -56 South to 60North latitude.\n" + \
                    "Defined \"_location\" exceeds these limits.\n" + \
                    "Try using either \"source_ = 3\" input or \"source_ = 4\" inputs, which have higher range limits (both from -82 South to 82 North latitude)."
-        return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+        return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, simplifyToleranceM, coreRadiusM, surfaceGridStep, validInputData, printMsg
     
     if (source == 3)  and  ((locationLatitudeD < -82) or (locationLatitudeD > 82)):
         # AW3D30 is limited to -82 to 82 latitude
-        maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
+        maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = simplifyToleranceM = coreRadiusM = surfaceGridStep = None
         validInputData = False
         printMsg = "The \"source_ = 3\" input (AW3D30) has range limits: from -82 South to 82 North latitude.\n" + \
                    "Defined \"_location\" exceeds these limits.\n" + \
                    "For now, no other Gismo \"source_\" supports latitude beyond this."
-        return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+        return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, simplifyToleranceM, coreRadiusM, surfaceGridStep, validInputData, printMsg
     
     if (source == 5)  and  ((locationLatitudeD < -82) or (locationLatitudeD > 82)):
         # GMRT is limited to -82 to 82 latitude
-        maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
+        maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = simplifyToleranceM = coreRadiusM = surfaceGridStep = None
         validInputData = False
         printMsg = "The \"source_ = 5\" input (GMRT) has range limits: from -82 South to 82 North latitude.\n" + \
                    "Defined \"_location\" exceeds these limits.\n" + \
                    "For now, no other Gismo \"source_\" supports latitude beyond this."
-        return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+        return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, simplifyToleranceM, coreRadiusM, surfaceGridStep, validInputData, printMsg
     
     
     if (north == None):
@@ -328,10 +375,10 @@ def checkInputData(locationLatitudeD, locationLongitudeD, opentopo_APIkey, maxVi
         try:  # check if it's a number
             north = float(north)
             if north < 0 or north > 360:
-                maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
+                maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = simplifyToleranceM = coreRadiusM = surfaceGridStep = None
                 validInputData = False
                 printMsg = "Please input north angle value from 0 to 360."
-                return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+                return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, simplifyToleranceM, coreRadiusM, surfaceGridStep, validInputData, printMsg
         except Exception, e:  # check if it's a vector
             north.Unitize()
         
@@ -346,12 +393,12 @@ def checkInputData(locationLatitudeD, locationLongitudeD, opentopo_APIkey, maxVi
     workingSubFolderPath = os.path.join(gismoFolderPath, "terrain_files")
     folderCreatedSuccess = gismo_preparation.createFolder(workingSubFolderPath)
     if folderCreatedSuccess == False:
-        maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = None
+        maxVisibilityRadiusM = gridSize = source = sourceLabel = opentopo_APIkey = _type = typeLabel = origin = northRad = northDeg = standThickness = numOfContours = workingSubFolderPath = downloadTSVLink = unitConversionFactor = unitConversionFactor2 = simplifyToleranceM = coreRadiusM = surfaceGridStep = None
         validInputData = False
         printMsg = "The file path you added to \"gismoFolder_\" input of Gismo Gismo component is invalid.\n" + \
                    "Input the string in the following format (example): c:\someFolder\gismo.\n" + \
                    "Or do not input anything, in which case a default Gismo folder will be used instead: C:\gismo."
-        return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+        return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, simplifyToleranceM, coreRadiusM, surfaceGridStep, validInputData, printMsg
     
     if downloadTSVLink == None:
         downloadTSVLink = "https://raw.githubusercontent.com/stgeorges/terrainShadingMask/master/objFiles/0_terrain_shading_masks_download_links.tsv"
@@ -365,7 +412,7 @@ def checkInputData(locationLatitudeD, locationLongitudeD, opentopo_APIkey, maxVi
     validInputData = True
     printMsg = "ok"
     
-    return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg
+    return maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, simplifyToleranceM, coreRadiusM, surfaceGridStep, validInputData, printMsg
 
 
 def distanceBetweenTwoPoints(latitude1D, longitude1D, maxVisibilityRadiusM):
@@ -543,6 +590,34 @@ def import_export_origin_0_0_0_and_terrainShadingMask_from_objFile(importExportO
         return terrainShadingMask, origin_0_0_0
 
 
+def rasterDownloadLink(source, latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD, opentopo_APIkey):
+    
+    # generate download link for raster region
+    if (source == 0):
+        # based on: https://portal.opentopography.org/apidocs/#/Public/getUsgsDem
+        downloadRasterLink = "https://portal.opentopography.org/API/usgsdem?datasetName=USGS1m&south={}&north={}&west={}&east={}&outputFormat=GTiff&API_Key={}".format( latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD, opentopo_APIkey )  # USGS1m
+    elif (source == 1):
+        # based on: https://portal.opentopography.org/apidocs/#/Public/getUsgsDem
+        downloadRasterLink = "https://portal.opentopography.org/API/usgsdem?datasetName=USGS10m&south={}&north={}&west={}&east={}&outputFormat=GTiff&API_Key={}".format( latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD, opentopo_APIkey )  # USGS10m
+    elif (source == 2):
+        # based on: https://portal.opentopography.org/apidocs/#/Public/getGlobalDem
+        #downloadRasterLink = "https://portal.opentopography.org/API/globaldem?demtype=SRTMGL1&south={}&north={}&west={}&east={}&outputFormat=GTiff&API_Key={}".format( latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD, opentopo_APIkey )  # SRTMGL1 1 arc second
+        downloadRasterLink = "https://portal.opentopography.org/API/globaldem?demtype=NASADEM&south={}&north={}&west={}&east={}&outputFormat=GTiff&API_Key={}".format( latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD, opentopo_APIkey )  # NASADEM 1 arc second
+    elif (source == 3):
+        # based on: https://portal.opentopography.org/apidocs/#/Public/getGlobalDem
+        downloadRasterLink = "https://portal.opentopography.org/API/globaldem?demtype=AW3D30&south={}&north={}&west={}&east={}&outputFormat=GTiff&API_Key={}".format( latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD, opentopo_APIkey )  # ALOS 1 arc second (AW3D30)
+    elif (source == 4):
+        # based on: https://portal.opentopography.org/apidocs/#/Public/getGlobalDem
+        downloadRasterLink = "https://portal.opentopography.org/API/globaldem?demtype=COP30&south={}&north={}&west={}&east={}&outputFormat=GTiff&API_Key={}".format( latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD, opentopo_APIkey )  # COP30 1 arc second
+    elif (source == 5):
+        # based on: https://www.gmrt.org/services/gridserverinfo.php#!/services/getGMRTGridAttribution
+        # 'opentopo_APIkey' is not needed for 'source == 5'
+        #downloadRasterLink = "http://www.gmrt.org/services/GridServer?north={}&west={}&east={}&south={}&layer=topo&format=geotiff&resolution=high".format( latitudeTopD,longitudeLeftD,longitudeRightD,latitudeBottomD )  # GMRT
+        downloadRasterLink = "https://portal.opentopography.org/API/globaldem?demtype=SRTM15Plus&south={}&north={}&west={}&east={}&outputFormat=GTiff&API_Key={}".format( latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD, opentopo_APIkey )  # GMRT
+    
+    return downloadRasterLink
+
+
 def checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyleLabel, source, sourceLabel, opentopo_APIkey):
     
     # convert the float to integer if minVisibilityRadiusM == 0 (to avoid "0.0" in the .obj fileName)
@@ -693,39 +768,39 @@ def checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink
                 if validVisibilityRadiusM == True:
                     # (correctedMaskRadiusM >= maxVisibilityRadiusM)
                     latitudeTopD, dummyLongitudeTopD, latitudeBottomD, dummyLongitudeBottomD, dummyLatitudeLeftD, longitudeLeftD, dummyLatitudeRightD, longitudeRightD = gismo_gis.destinationLatLon(locationLatitudeD, locationLongitudeD, correctedMaskRadiusM)
-                    # generate download link for raster region
-                    
-                    
-                    if (source == 0):
-                        # based on: https://portal.opentopography.org/apidocs/#/Public/getUsgsDem
-                        downloadRasterLink_withCorrectedMaskRadiusKM = "https://portal.opentopography.org/API/usgsdem?datasetName=USGS1m&south={}&north={}&west={}&east={}&outputFormat=GTiff&API_Key={}".format( latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD, opentopo_APIkey )  # USGS1m
-                    elif (source == 1):
-                        # based on: https://portal.opentopography.org/apidocs/#/Public/getUsgsDem
-                        downloadRasterLink_withCorrectedMaskRadiusKM = "https://portal.opentopography.org/API/usgsdem?datasetName=USGS10m&south={}&north={}&west={}&east={}&outputFormat=GTiff&API_Key={}".format( latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD, opentopo_APIkey )  # USGS10m
-                    elif (source == 2):
-                        # based on: https://portal.opentopography.org/apidocs/#/Public/getGlobalDem
-                        #downloadRasterLink_withCorrectedMaskRadiusKM = "https://portal.opentopography.org/API/globaldem?demtype=SRTMGL1&south={}&north={}&west={}&east={}&outputFormat=GTiff&API_Key={}".format( latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD, opentopo_APIkey )  # SRTMGL1 1 arc second
-                        downloadRasterLink_withCorrectedMaskRadiusKM = "https://portal.opentopography.org/API/globaldem?demtype=NASADEM&south={}&north={}&west={}&east={}&outputFormat=GTiff&API_Key={}".format( latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD, opentopo_APIkey )  # NASADEM 1 arc second
-                    elif (source == 3):
-                        # based on: https://portal.opentopography.org/apidocs/#/Public/getGlobalDem
-                        downloadRasterLink_withCorrectedMaskRadiusKM = "https://portal.opentopography.org/API/globaldem?demtype=AW3D30&south={}&north={}&west={}&east={}&outputFormat=GTiff&API_Key={}".format( latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD, opentopo_APIkey )  # ALOS 1 arc second (AW3D30)
-                    elif (source == 4):
-                        # based on: https://portal.opentopography.org/apidocs/#/Public/getGlobalDem
-                        downloadRasterLink_withCorrectedMaskRadiusKM = "https://portal.opentopography.org/API/globaldem?demtype=COP30&south={}&north={}&west={}&east={}&outputFormat=GTiff&API_Key={}".format( latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD, opentopo_APIkey )  # COP30 1 arc second
-                    elif (source == 5):
-                        # based on: https://www.gmrt.org/services/gridserverinfo.php#!/services/getGMRTGridAttribution
-                        # 'opentopo_APIkey' is not needed for 'source == 5'
-                        #downloadRasterLink_withCorrectedMaskRadiusKM = "http://www.gmrt.org/services/GridServer?north={}&west={}&east={}&south={}&layer=topo&format=geotiff&resolution=high".format( latitudeTopD,longitudeLeftD,longitudeRightD,latitudeBottomD )  # GMRT
-                        downloadRasterLink_withCorrectedMaskRadiusKM = "https://portal.opentopography.org/API/globaldem?demtype=SRTM15Plus&south={}&north={}&west={}&east={}&outputFormat=GTiff&API_Key={}".format( latitudeTopD, longitudeLeftD, longitudeRightD, latitudeBottomD, opentopo_APIkey )  # GMRT
-                    
-                    
-                    
                     ####print 'downloadRasterLink_withCorrectedMaskRadiusKM: ', downloadRasterLink_withCorrectedMaskRadiusKM  # uncomment for actual download link
                     # new rasterFileNamePlusExtension and rasterFilePath corrected according to new correctedMaskRadiusM
                     rasterFileNamePlusExtension_withCorrectedMaskRadiusKM = fileNameIncomplete + "_visibility=" + str(round(maxVisibilityRadiusM/1000, 2)) + "KM" + "_source=" + sourceLabel + ".tif"  # IMPORTANT: rasterFileNamePlusExtension_withCorrectedMaskRadiusKM will always be used instead of rasterFilePath from line 647 !!!
                     rasterFilePath_withCorrectedMaskRadiusKM = os.path.join(workingSubFolderPath, rasterFileNamePlusExtension_withCorrectedMaskRadiusKM)
                     
-                    tifFileDownloaded = gismo_preparation.downloadFile(downloadRasterLink_withCorrectedMaskRadiusKM, rasterFilePath_withCorrectedMaskRadiusKM)
+                    # sources 1 to 5 are downloaded as tiles of a regular latitude-longitude grid, and kept in a cache. The raster is then created by mosaicking and cropping the tiles.
+                    # so that terrains of the same or neighbouring locations, or with a different radius_, reuse the already downloaded tiles
+                    # USGS1m is downloaded in the UTM zone of the requested region, so its tiles can not be mosaicked: it is always downloaded directly
+                    maxNumOfMissingTiles = 16  # larger regions are downloaded directly, to limit the number of requests sent to opentopography.org
+                    gdalErrorMsg = None  # GDAL's error message if the downloaded tiles could not be mosaicked and cropped
+                    if (source != 0):
+                        demTilesFolderPath = os.path.join(workingSubFolderPath, "dem_tiles")
+                        gismo_preparation.createFolder(demTilesFolderPath)
+                        demTileCache = sc.sticky["gismo_DEMTileCache"](demTilesFolderPath)
+                        tiles = demTileCache.tilesCovering(sourceLabel, latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD)
+                        missingTiles = demTileCache.missingTiles(tiles)
+                    
+                    if (source != 0) and (len(missingTiles) <= maxNumOfMissingTiles):
+                        downloadedTiles = []
+                        for tileKey, tileFilePath, (tileLatitudeBottomD, tileLatitudeTopD, tileLongitudeLeftD, tileLongitudeRightD) in missingTiles:
+                            tileFileDownloaded = gismo_preparation.downloadFile(rasterDownloadLink(source, tileLatitudeBottomD, tileLatitudeTopD, tileLongitudeLeftD, tileLongitudeRightD, opentopo_APIkey), tileFilePath)
+                            if not tileFileDownloaded:
+                                break
+                            downloadedTiles.append((tileKey, tileFilePath, (tileLatitudeBottomD, tileLatitudeTopD, tileLongitudeLeftD, tileLongitudeRightD)))
+                        downloadedTiles = demTileCache.addTiles(downloadedTiles)  # without the files which are not valid rasters
+                        
+                        tifFileDownloaded = (len(downloadedTiles) == len(missingTiles))
+                        if tifFileDownloaded:
+                            demTileCache.useTiles(tiles)
+                            tifFileDownloaded, gdalErrorMsg = gismo_gis.mosaicCropRasters([tileFilePath for tileKey, tileFilePath, tileBoundsD in tiles], rasterFilePath_withCorrectedMaskRadiusKM, latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD)
+                    else:
+                        downloadRasterLink_withCorrectedMaskRadiusKM = rasterDownloadLink(source, latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD, opentopo_APIkey)
+                        tifFileDownloaded = gismo_preparation.downloadFile(downloadRasterLink_withCorrectedMaskRadiusKM, rasterFilePath_withCorrectedMaskRadiusKM)
                     if tifFileDownloaded:
                         terrainShadingMask = origin_0_0_0 = None
                         valid_Obj_or_Raster_file = True
@@ -735,7 +810,13 @@ def checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink
                         terrainShadingMask = origin_0_0_0 = elevationM = None
                         valid_Obj_or_Raster_file = False
                         
-                        if (source == 0):
+                        if (gdalErrorMsg != None):
+                            printMsg = "The downloaded terrain tiles could not be mosaicked and cropped by the GDAL library (MapWinGIS):\n" + \
+                                       "%s\n" % gdalErrorMsg + \
+                                       " \n" + \
+                                       "Try deleting the downloaded tiles from the \"%s\" folder, and then rerun the component.\n" % demTilesFolderPath + \
+                                       "If this does not help, open a new topic about this issue on: www.grasshopper3d.com/group/gismo/forum."
+                        elif (source == 0):
                             printMsg = 'Free access to "source_"="USGS1m" is restricted only to accademics. If you obtained the "_APIkey" from opentopography.org - then it seems your "_APIkey", is not an academic one.\n' +\
                                        '\n' +\
                                        '1) If you are an US or international academic, check here how to abtain a free API key for academics:\n' +\
@@ -772,7 +853,7 @@ def checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink
     return terrainShadingMask, origin_0_0_0, fileName, objFilePath, rasterFilePath, rasterReprojectedFilePath, rasterReprojectedFileNamePlusExtension, vrtFilePath, elevationM, valid_Obj_or_Raster_file, printMsg
 
 
-def createTerrainMeshBrep(source, rasterFilePath, rasterReprojectedFilePath, locationLatitudeD, locationLongitudeD, maxVisibilityRadiusM, unitConversionFactor2):
+def createTerrainMeshBrep(source, rasterFilePath, locationLatitudeD, locationLongitudeD, maxVisibilityRadiusM, simplifyToleranceM, coreRadiusM, surfaceGridStep, unitConversionFactor2):
     
     # create "terrainMesh" and "terrrainBrep" from Opentopography data
     
@@ -797,18 +878,22 @@ def createTerrainMeshBrep(source, rasterFilePath, rasterReprojectedFilePath, loc
         # output crs data: outputCRS_UTMzone, northOrsouth
         CRS_EPSG_code, outputCRS_UTMzone, northOrsouth = gismo_gis.calculate_CRS_UTMzone(locationLatitudeD, locationLongitudeD)
         
-        # reproject raster
-        utils = MapWinGIS.UtilsClass()
+        # reproject raster. Reprojected rasters are cached, so the same downloaded raster is only reprojected once
+        rasterCacheFolderPath = os.path.join(os.path.dirname(rasterFilePath), "reprojected_rasters")
+        gismo_preparation.createFolder(rasterCacheFolderPath)
+        rasterCache = sc.sticky["gismo_RasterCache"](rasterCacheFolderPath)
         resamplingMethod = "-r bilinear"
         bstrOptions = '-s_srs EPSG:4326 -t_srs "+proj=utm +zone=%s +%s +datum=WGS84 +ellps=WGS84" %s' % (outputCRS_UTMzone, northOrsouth, resamplingMethod)
-        reprojectGridResult = MapWinGIS.UtilsClass.GDALWarp(utils, rasterFilePath, rasterReprojectedFilePath, bstrOptions, None)
-        if (reprojectGridResult != True):
-            convertErrorNo = MapWinGIS.GlobalSettingsClass().GdalLastErrorNo
-            convertErrorMsg = MapWinGIS.GlobalSettingsClass().GdalLastErrorMsg
-            convertErrorType = MapWinGIS.GlobalSettingsClass().GdalLastErrorType
-            print "convertErrorNo: ", convertErrorNo
-            print "convertErrorMsg: ", convertErrorMsg
-            print "convertErrorType: ", convertErrorType
+        rasterReprojectedFilePath, gdalErrorMsg = rasterCache.cachedRaster("GDALWarp", rasterFilePath, bstrOptions)
+        if (rasterReprojectedFilePath == None):
+            terrainMesh = terrainBrepHandle = locationPt = elevationM = None
+            validRasterFile = False
+            printMsg = "The downloaded terrain could not be reprojected by the GDAL library (MapWinGIS):\n" + \
+                       "%s\n" % gdalErrorMsg + \
+                       " \n" + \
+                       "Try deleting the downloaded terrain from the \"%s\" folder, and then rerun the component.\n" % os.path.dirname(rasterFilePath) + \
+                       "If this does not help, open a new topic about this issue on: www.grasshopper3d.com/group/gismo/forum."
+            return terrainMesh, terrainBrepHandle, locationPt, elevationM, validRasterFile, printMsg
         
         # open the reprojected raster
         grid = MapWinGIS.GridClass()
@@ -852,27 +937,29 @@ def createTerrainMeshBrep(source, rasterFilePath, rasterReprojectedFilePath, loc
     terrainMeshStartPtX = ( terrainMeshLeftBottomPtX )*scaleFactor
     terrainMeshStartPtY = ( terrainMeshLeftBottomPtY + ((abs(cellsizeX)/unitConversionFactor2)*numOfRows) )*scaleFactor
     
-    pts = []
-    # create terrainMesh from 1 arc-second format
-    for k in xrange(numOfCellsInY):
-        for i in xrange(numOfCellsInX):
-            ptZ = grid.Value(i,k)
-            if math.isnan(ptZ):  # ptZ is float("nan")
-                ptZ = 0
-            pt = Rhino.Geometry.Point3d(terrainMeshStartPtX+(i*abs(cellsizeX/unitConversionFactor2)*scaleFactor), terrainMeshStartPtY-(k*abs(cellsizeY/unitConversionFactor2)*scaleFactor), ptZ/unitConversionFactor2*scaleFactor)
-            pts.append(pt)
-    
+    # read all cell values at once (NaN values replaced with 0), then create the vertex coordinates per column and per row
+    cellValues = gismo_gis.readGridValues(grid, rasterFilePath if (source == 0) else rasterReprojectedFilePath, 0)
     closeGridSuccess = grid.Close()
     
+    xCoordinates = [terrainMeshStartPtX+(i*abs(cellsizeX/unitConversionFactor2)*scaleFactor)  for i in xrange(numOfCellsInX)]
+    yCoordinates = [terrainMeshStartPtY-(k*abs(cellsizeY/unitConversionFactor2)*scaleFactor)  for k in xrange(numOfCellsInY)]
+    zScale = scaleFactor/unitConversionFactor2
+    zCoordinates = [ptZ*zScale  for ptZ in cellValues]
+    del cellValues
+    
     # always create a terrain mesh regardless of type_ input so that "elevationM" can be calculated on a mesh
-    terrainMesh = gismo_geometry.meshFromPoints(numOfRows, numOfColumns, pts)
+    if (simplifyToleranceM > 0):
+        # adaptive level of detail: larger mesh faces where the terrain is flat, or far from the origin_ (terrainMesh is always centered to 0,0,0 point)
+        elevationLL = [zCoordinates[k*numOfCellsInX:(k+1)*numOfCellsInX]  for k in xrange(numOfCellsInY)]
+        vertexGridPts, faces = gismo_terrain.simplifyGrid(elevationLL, xCoordinates, yCoordinates, simplifyToleranceM/unitConversionFactor2*scaleFactor, coreRadiusM/unitConversionFactor2*scaleFactor, 0, 0)
+        terrainMesh = gismo_geometry.simplifiedMeshFromGrid(xCoordinates, yCoordinates, zCoordinates, vertexGridPts, faces)
+        del elevationLL; del vertexGridPts; del faces
+    else:
+        terrainMesh = gismo_geometry.meshFromGrid(xCoordinates, yCoordinates, zCoordinates)
     
-    # always create a terrain brep
-    uDegree = min(3, numOfCellsInY - 1)
-    vDegree = min(3, numOfCellsInX - 1)
-    uClosed = False; vClosed = False
-    terrainSurface = Rhino.Geometry.NurbsSurface.CreateThroughPoints(pts, numOfCellsInY, numOfCellsInX, uDegree, vDegree, uClosed, vClosed)
-    terrainBrep = terrainSurface.ToBrep()
+    # terrain brep is only fitted when it is needed (type_ = 2 and 3), through the terrain grid points (not the simplified terrainMesh vertices)
+    terrainKey = "%s_%s_%s" % (rasterFilePath, os.path.getmtime(rasterFilePath), unitConversionFactor2)
+    terrainBrepHandle = gismo_terrainBrep(terrainKey, xCoordinates, yCoordinates, zCoordinates, surfaceGridStep)
     
     
     # project origin_0_0_0 (locationPt) to terrainMesh
@@ -887,14 +974,12 @@ def createTerrainMeshBrep(source, rasterFilePath, rasterReprojectedFilePath, loc
     elevationM = round(elevationM,2)
     
     
-    # deleting
-    if (source != 0):
-        os.remove(rasterReprojectedFilePath)  # reprojected .tif file
-    
-    del pts
     gc.collect()
     
-    return terrainMesh, terrainBrep, locationPt, elevationM
+    validRasterFile = True
+    printMsg = "ok"
+    
+    return terrainMesh, terrainBrepHandle, locationPt, elevationM, validRasterFile, printMsg
 
 
 def colorMesh(terrainMesh):
@@ -915,10 +1000,9 @@ def colorMesh(terrainMesh):
     return terrainMesh  # colored mesh
 
 
-def split_createStand_colorTerrain(terrainMesh, terrainBrep, locationPt, origin, standThickness, unitConversionFactor2):
+def cuttingRadius(unitConversionFactor2):
     
     scaleFactor = 0.01  # scale terrainMesh 100 times (should never be changed), meaning 1 meter in real life is 0.01 meters in Rhino document
-    tol = Rhino.RhinoDoc.ActiveDoc.ModelAbsoluteTolerance
     
     #if (radius_ < (200/unitConversionFactor2)):
     if (radius_ < 200):
@@ -927,6 +1011,16 @@ def split_createStand_colorTerrain(terrainMesh, terrainBrep, locationPt, origin,
     else:
         cuttingRadiusScaled = (radius_*0.9) / unitConversionFactor2 * scaleFactor  # 0.9 to avoid the cutting sphere getting out of the terrainMesh/terrainBrep edges
     
+    return cuttingRadiusScaled
+
+
+def split_createStand_colorTerrain(terrainMesh, terrainBrepHandle, locationPt, origin, standThickness, unitConversionFactor2):
+    
+    scaleFactor = 0.01  # scale terrainMesh 100 times (should never be changed), meaning 1 meter in real life is 0.01 meters in Rhino document
+    tol = Rhino.RhinoDoc.ActiveDoc.ModelAbsoluteTolerance
+    
+    cuttingRadiusScaled = cuttingRadius(unitConversionFactor2)
+    
     # always perform the cutting of either a mesh or surface regardless if type_ is 0,1,2,3
     if (_type == 0) or (_type == 1):
         # splitting of mesh
@@ -949,6 +1043,7 @@ def split_createStand_colorTerrain(terrainMesh, terrainBrep, locationPt, origin,
     
     elif (_type == 2) or (_type == 3):
         # splitting of surface
+        terrainBrep = terrainBrepHandle.brep()
         if (_type == 2):
             # split with a cuboid
             boxInterval = Rhino.Geometry.Interval(-cuttingRadiusScaled, cuttingRadiusScaled)
@@ -992,7 +1087,7 @@ def split_createStand_colorTerrain(terrainMesh, terrainBrep, locationPt, origin,
         if (_type == 0) or (_type == 1):
             # just color the mesh
             terrain_Mesh_colored = colorMesh(terrain_MeshOrBrep_Splitted)
-            del terrainBrep
+            del terrainBrepHandle
             
             return terrain_Mesh_colored
         elif (_type == 2) or (_type == 3):
@@ -1053,60 +1148,56 @@ def split_createStand_colorTerrain(terrainMesh, terrainBrep, locationPt, origin,
             terrain_withStand.Append(terrain_MeshOrBrep_Splitted)
             
             terrain_withStand_colored = colorMesh(terrain_withStand)
-            del terrainBrep
+            del terrainBrepHandle
             
             return terrain_withStand_colored
 
 
-def remapNum(n, domainStart, domainEnd):
-    """remap a number from 0 to 1 according to domain"""
-    divisor = (domainEnd - domainStart)
-    if (divisor == 0): return 0  # prevention to divide with zero
-    else:
-        n_norm = (n - domainStart) / divisor
-    return n_norm
-
-
-def createElevationContours(terrainUnoriginUnscaledUnrotated, numOfContours, _type):
+def createElevationContours(terrainBrepHandle, locationPt, numOfContours, _type, simplifyToleranceM, unitConversionFactor2):
     
+    # elevation contours are created directly from the terrain grid points (marching squares), for all contour levels at once
     scaleFactor = 0.01
-    tol = Rhino.RhinoDoc.ActiveDoc.ModelAbsoluteTolerance
-    
-    # create intersection planes
-    accurate = True
-    terrainBB_edges = terrainUnoriginUnscaledUnrotated.GetBoundingBox(accurate).GetEdges()
-    terrainBB_verticalEdge = terrainBB_edges[8]  # "Rhino.Geometry.Line" type
-    
-    includeEnds = True
-    terrainBB_edges_t_param_L_ = terrainBB_verticalEdge.ToNurbsCurve().DivideByCount(numOfContours, includeEnds)
-    
-    if (Rhino.RhinoApp.Version.Major <= 6):
-        terrainBB_edges_t_param_L = terrainBB_edges_t_param_L_[1:-1]  # '[1:-1]' to remove the start and end values
-    else:
-        # on rhino 7, for some unknown reason the upper 'DivideByCount' method has been changed, and it does not return normalized t parameters (from 0 to 1), but larger than 1. We will correct this:
-        terrainBB_edges_t_param_L = [remapNum(n,  min(terrainBB_edges_t_param_L_),  max(terrainBB_edges_t_param_L_))    for n in terrainBB_edges_t_param_L_]   [1:-1]  # '[1:-1]' to remove the start and end values
-    
-    elevationContours_planeOrigins = [Rhino.Geometry.Line.PointAt(terrainBB_verticalEdge, t)  for t in terrainBB_edges_t_param_L]
-    elevationContours_planes = [Rhino.Geometry.Plane(origin, Rhino.Geometry.Vector3d(0,0,1))  for origin in elevationContours_planeOrigins]
-    
-    if (_type == 0) or (_type == 1):
-        elevationContours_Polylines = list(Rhino.Geometry.Intersect.Intersection.MeshPlane(terrainUnoriginUnscaledUnrotated, elevationContours_planes))
-        elevationContours = [crv.ToNurbsCurve()     for crv in elevationContours_Polylines]  # crvs
-    
-    elif (_type == 2) or (_type == 3):
-        elevationContours = []
-        for plane in elevationContours_planes:
-            succ, elevationContoursSubList, elevationContourPointsSubList = Rhino.Geometry.Intersect.Intersection.BrepPlane(terrainUnoriginUnscaledUnrotated, plane, tol/(1/scaleFactor))  # divide the "tol" with "1/scaleFactor" to account for the 100 times scalling in "title_scalingRotating" function
-            
-            if (elevationContoursSubList != None):  # rhino 7 may return 'None' instead of an empty array sometimes, when there is no intersection between the mesh/brep and a pln
-                elevationContoursSubList_closedCrvs = [crv     for crv in elevationContoursSubList]
-                if (len(elevationContoursSubList_closedCrvs) > 0):  # or succ == True
-                    elevationContours.extend(elevationContoursSubList_closedCrvs)
+    cuttingRadiusScaled = cuttingRadius(unitConversionFactor2)
+    xCoordinates = terrainBrepHandle.xCoordinates
+    yCoordinates = terrainBrepHandle.yCoordinates
+    zCoordinates = terrainBrepHandle.zCoordinates
+    numOfColumns = len(xCoordinates)
+    
+    # only the grid points inside of the cutting box (type_ = 0 and 2) or sphere (type_ = 1 and 3). The rest are None
+    columnIndices = [i  for i,x in enumerate(xCoordinates)  if abs(x - locationPt.X) <= cuttingRadiusScaled]
+    rowIndices = [k  for k,y in enumerate(yCoordinates)  if abs(y - locationPt.Y) <= cuttingRadiusScaled]
+    elevationLL = []
+    for k in rowIndices:
+        rowStart = k*numOfColumns
+        if (_type == 0) or (_type == 2):
+            elevationLL.append( [zCoordinates[rowStart+i]  for i in columnIndices] )
+        elif (_type == 1) or (_type == 3):
+            dy2 = (yCoordinates[k] - locationPt.Y)**2
+            elevationLL.append( [zCoordinates[rowStart+i] if ((xCoordinates[i] - locationPt.X)**2 + dy2 + (zCoordinates[rowStart+i] - locationPt.Z)**2 <= cuttingRadiusScaled**2) else None  for i in columnIndices] )
+    
+    elevations = [z  for elevationRowL in elevationLL  for z in elevationRowL  if z != None]
+    if (len(columnIndices) < 2) or (len(rowIndices) < 2) or (len(elevations) == 0):
+        return []
+    
+    # contour levels divide the terrain elevation range into numOfContours equal parts (the lowest and the highest terrain point are excluded)
+    minElevation = min(elevations); maxElevation = max(elevations)
+    del elevations
+    levels = [minElevation + (maxElevation - minElevation) * j / numOfContours  for j in xrange(1, numOfContours)]
+    
+    contourTolerance = simplifyToleranceM / unitConversionFactor2 * scaleFactor
+    polylinesLL = gismo_terrain.contourLines(elevationLL, [xCoordinates[i]  for i in columnIndices], [yCoordinates[k]  for k in rowIndices], levels, contourTolerance)
+    del elevationLL
+    
+    elevationContours = []
+    for polylines in polylinesLL:
+        for polyline in polylines:
+            if (len(polyline) > 1):
+                elevationContours.append( Rhino.Geometry.Polyline([Rhino.Geometry.Point3d(x, y, z)  for x, y, z in polyline]).ToNurbsCurve() )  # crvs
     
     return elevationContours
 
 
-def title_scalingRotating(terrainUnoriginUnscaledUnrotated, locationName, locationLatitudeD, locationLongitudeD, locationPt, maxVisibilityRadiusM, _type, sourceLabel, origin, northDeg, northRad, numOfContours, unitConversionFactor):
+def title_scalingRotating(terrainUnoriginUnscaledUnrotated, terrainBrepHandle, locationName, locationLatitudeD, locationLongitudeD, locationPt, maxVisibilityRadiusM, _type, sourceLabel, origin, northDeg, northRad, numOfContours, simplifyToleranceM, unitConversionFactor, unitConversionFactor2):
     
     # scaling, rotating
     originTransformMatrix = Rhino.Geometry.Transform.PlaneToPlane(  Rhino.Geometry.Plane(locationPt, Rhino.Geometry.Vector3d(0,0,1)), Rhino.Geometry.Plane(origin, Rhino.Geometry.Vector3d(0,0,1)) )  # move the terrain from "locationPt" to "origin"
@@ -1117,7 +1208,7 @@ def title_scalingRotating(terrainUnoriginUnscaledUnrotated, locationName, locati
     
     if numOfContours_ > 0:
         # create elevationContours
-        elevationContours_UnoriginUnscaledUnrotated = createElevationContours(terrainUnoriginUnscaledUnrotated, numOfContours, _type)
+        elevationContours_UnoriginUnscaledUnrotated = createElevationContours(terrainBrepHandle, locationPt, numOfContours, _type, simplifyToleranceM, unitConversionFactor2)
     else:
         # no elevationContours will be created
         elevationContours_UnoriginUnscaledUnrotated = []
@@ -1168,7 +1259,7 @@ def bakingGrouping(locationName, locationLatitudeD, locationLongitudeD, maxVisib
     groupIndex2 = gismo_preparation.groupGeometry(layerName + "_terrainGenerator", geometryIds2)
 
 
-def printOutput(northDeg, latitude, longitude, locationName, maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, workingSubFolderPath, standThickness, numOfContours):
+def printOutput(northDeg, latitude, longitude, locationName, maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, workingSubFolderPath, standThickness, numOfContours, simplifyToleranceM, coreRadiusM):
     if bakeIt_ == True:
         bakedOrNot = "and baked "
     elif bakeIt_ == False:
@@ -1189,9 +1280,11 @@ Type: %s (%s)
 Origin: %s
 Stand thickness (rhino doc. units): %s
 Number of elevation contours: %s
+Tolerance (m): %s
+Core radius (m): %s
 
 Working folder: %s
-    """ % (locationName, latitude, longitude, northDeg, maxVisibilityRadiusM, source, sourceLabel, _type, typeLabel, origin, standThickness, numOfContours, workingSubFolderPath)
+    """ % (locationName, latitude, longitude, northDeg, maxVisibilityRadiusM, source, sourceLabel, _type, typeLabel, origin, standThickness, numOfContours, simplifyToleranceM, coreRadiusM, workingSubFolderPath)
     print resultsCompletedMsg
     print printOutputMsg
 
@@ -1204,23 +1297,31 @@ if sc.sticky.has_key("gismoGismo_released"):
         gismo_preparation = sc.sticky["gismo_Preparation"]()
         gismo_geometry = sc.sticky["gismo_CreateGeometry"]()
         gismo_gis = sc.sticky["gismo_GIS"]()
+        gismo_terrain = sc.sticky["gismo_Terrain"]()
+        gismo_terrainBrep = sc.sticky["gismo_TerrainBrep"]
         
         locationName, locationLatitudeD, locationLongitudeD, timeZone, elevation, validLocationData, printMsg = gismo_preparation.checkLocationData(_location)
         if validLocationData:
             fileNameIncomplete = locationName + "_" + str(locationLatitudeD) + "_" + str(locationLongitudeD) + "_TERRAIN"  # incomplete due to missing "_visibility=2KM_source=AW3D30" part (for example)
             heightM = 0; minVisibilityRadiusM = 0; maskStyle = 0; maskStyleLabel = "sph"; downloadUrl_ = None; downloadTSVLink = None;   gridSize_ = 10  # dummy value
-            maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, validInputData, printMsg = checkInputData(locationLatitudeD, locationLongitudeD, _APIkey, radius_, gridSize_, source_, type_, origin_, north_, standThickness_, numOfContours_, downloadTSVLink)
+            maxVisibilityRadiusM, gridSize, source, sourceLabel, opentopo_APIkey, _type, typeLabel, origin, northRad, northDeg, standThickness, numOfContours, workingSubFolderPath, downloadTSVLink, unitConversionFactor, unitConversionFactor2, simplifyToleranceM, coreRadiusM, surfaceGridStep, validInputData, printMsg = checkInputData(locationLatitudeD, locationLongitudeD, _APIkey, radius_, gridSize_, source_, type_, origin_, north_, standThickness_, numOfContours_, tolerance_, coreRadius_, surfaceGridStep_, downloadTSVLink)
             if validInputData:
                 if _runIt:
                     terrainShadingMaskUnscaledUnrotated, origin_0_0_0, fileName, objFilePath, rasterFilePath, rasterReprojectedFilePath, rasterReprojectedFileNamePlusExtension, vrtFilePath, elevationM, valid_Obj_or_Raster_file, printMsg = checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyleLabel, source, sourceLabel, opentopo_APIkey)
                     if valid_Obj_or_Raster_file:
+                        validRasterFile = True
                         if (rasterFilePath != "needless") and (rasterFilePath != "download failed"):  # terrain shading mask NEEDS to be created
-                            terrainMesh, terrainBrep, locationPt, elevationM = createTerrainMeshBrep(source, rasterFilePath, rasterReprojectedFilePath, locationLatitudeD, locationLongitudeD, maxVisibilityRadiusM, unitConversionFactor2)
-                            terrainUnoriginUnscaledUnrotated = split_createStand_colorTerrain(terrainMesh, terrainBrep, locationPt, origin, standThickness, unitConversionFactor2)
-                        terrain, title, elevationContours = title_scalingRotating(terrainUnoriginUnscaledUnrotated, locationName, locationLatitudeD, locationLongitudeD, locationPt, maxVisibilityRadiusM, _type, sourceLabel, origin, northDeg, northRad, numOfContours, unitConversionFactor)
-                        if bakeIt_: bakingGrouping(locationName, locationLatitudeD, locationLongitudeD, maxVisibilityRadiusM, sourceLabel, typeLabel, standThickness, terrain, title, elevationContours, origin)
-                        printOutput(northDeg, locationLatitudeD, locationLongitudeD, locationName, maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, workingSubFolderPath, standThickness, numOfContours)
-                        elevation = elevationM
+                            terrainMesh, terrainBrepHandle, locationPt, elevationM, validRasterFile, printMsg = createTerrainMeshBrep(source, rasterFilePath, locationLatitudeD, locationLongitudeD, maxVisibilityRadiusM, simplifyToleranceM, coreRadiusM, surfaceGridStep, unitConversionFactor2)
+                            if validRasterFile:
+                                terrainUnoriginUnscaledUnrotated = split_createStand_colorTerrain(terrainMesh, terrainBrepHandle, locationPt, origin, standThickness, unitConversionFactor2)
+                        if validRasterFile:
+                            terrain, title, elevationContours = title_scalingRotating(terrainUnoriginUnscaledUnrotated, terrainBrepHandle, locationName, locationLatitudeD, locationLongitudeD, locationPt, maxVisibilityRadiusM, _type, sourceLabel, origin, northDeg, northRad, numOfContours, simplifyToleranceM, unitConversionFactor, unitConversionFactor2)
+                            if bakeIt_: bakingGrouping(locationName, locationLatitudeD, locationLongitudeD, maxVisibilityRadiusM, sourceLabel, typeLabel, standThickness, terrain, title, elevationContours, origin)
+                            printOutput(northDeg, locationLatitudeD, locationLongitudeD, locationName, maxVisibilityRadiusM, gridSize, source, sourceLabel, _type, typeLabel, origin, workingSubFolderPath, standThickness, numOfContours, simplifyToleranceM, coreRadiusM)
+                            elevation = elevationM
+                        else:
+                            print printMsg
+                            ghenv.Component.AddRuntimeMessage(level, printMsg)
                     else:
                         print printMsg
                         ghenv.Component.AddRuntimeMessage(level, printMsg)
@@ -97,6 +97,9 @@ Provided by Gismo 0.0.3
                         This component may download topography files up to 600 MB in size from the Internet, and then create the Terrain shading masks from them.
                         Make sure that the "workingFolder_" you choose is a hard disk partition with enough space on it.
                         -
+                        -
+                        Created terrain shading masks are saved to this folder as binary terrain cache files (.gtc), so that they are loaded almost instantly the next time the component runs for the same _location and inputs. Previously created or downloaded .obj terrain shading masks are converted to .gtc files the first time they are used.
+                        -
                         If not supplied, the default Gismo folder path will be used: "c:\gismo\terrain_shading_masks".
         downloadUrl_: Address of a web page which contains download links of already created Terrain shading masks.
                       -
@@ -110,6 +113,24 @@ Provided by Gismo 0.0.3
                       -
                       If not supplied, the following default downloadUrl_ input will be used
                       raw.githubusercontent.com/stgeorges/terrainShadingMask/master/objFiles/0_terrain_shading_masks_download_links.tsv
+        horizonMethod_: The method used to find the silhouette of the surrounding terrain:
+                        -
+                        0 - horizon scan: each of 3600 azimuths is walked outward across the terrain elevation grid once, and the maximal elevation angle is kept. Takes a fraction of the time needed for the ray casting.
+                        1 - ray casting: 3600 x 1200 rays are shot from the viewpoint to the terrain mesh. Very slow for larger maxVisibilityRadius_ inputs.
+                        -
+                        Both methods result in the same Terrain shading mask.
+                        -
+                        If not supplied, 0 will be used as a default (horizon scan).
+        nearFieldRadius_: Horizontal distance from the _location, inside of which a finer terrain (COP30, 1 arc-second: around 30 meters) will be downloaded and used by the horizon scan.
+                          Beyond it, the 3 arc-second terrain is used. Its coarser copies, with the cell size doubled each time the distance from the _location doubles (a resolution pyramid), are used to skip the distant terrain which can not rise above the horizon. Nearby hills and buildings-sized terrain features are then taken into account precisely, while the time needed for the horizon scan of distant terrain grows slowly with maxVisibilityRadius_.
+                          -
+                          It is only used when horizonMethod_ input is set to 0 (horizon scan). With horizonMethod_ = 1 (ray casting) it is set to 0, and the component shows a warning.
+                          -
+                          It can not be longer than 20 kilometers.
+                          -
+                          If not supplied, 0 will be used as a default (3 arc-second terrain for the whole maxVisibilityRadius_).
+                          -
+                          In kilometers.
         bakeIt_: Set to "True" to bake the Terrain shading mask results into the Rhino scene.
                  -
                  If not supplied default value "False" will be used.
@@ -153,11 +174,11 @@ Provided by Gismo 0.0.3
 
 ghenv.Component.Name = "Gismo_Terrain Shading Mask"
 ghenv.Component.NickName = "TerrainShadingMask"
-ghenv.Component.Message = "VER 0.0.3\nAPR_02_2022"
+ghenv.Component.Message = "VER 0.0.3\nOCT_17_2026"
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Gismo"
 ghenv.Component.SubCategory = "2 | Terrain"
-#compatibleGismoVersion = VER 0.0.3\nJAN_29_2019
+#compatibleGismoVersion = VER 0.0.3\nOCT_17_2026
 try: ghenv.Component.AdditionalHelpFromDocStrings = "2"
 except: pass
 
@@ -175,7 +196,7 @@ import os
 import gc
 
 
-def checkInputData(opentopo_APIkey, minVisibilityRadiusKM, maxVisibilityRadiusKM, north, maskStyle, workingFolderPath, downloadTSVLink):
+def checkInputData(opentopo_APIkey, minVisibilityRadiusKM, maxVisibilityRadiusKM, north, maskStyle, workingFolderPath, downloadTSVLink, horizonMethod, nearFieldRadiusKM):
     
     # check if MapWinGIS is properly installed
     gismoGismoComponentNotRan = False  # initial value
@@ -183,8 +204,8 @@ def checkInputData(opentopo_APIkey, minVisibilityRadiusKM, maxVisibilityRadiusKM
         mapFolder_ = sc.sticky["gismo_mapwingisFolder"]
         iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, validInputData, printMsg = gismo_mainComponent.mapWinGIS(mapFolder_)
         if not validInputData:
-            heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = iteropMapWinGIS_dll_folderPath = gdalDataPath_folderPath = workingSubFolderPath = downloadTSVLink = unitConversionFactor = None
-            return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, validInputData, printMsg
+            heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = iteropMapWinGIS_dll_folderPath = gdalDataPath_folderPath = workingSubFolderPath = downloadTSVLink = horizonMethod = nearFieldRadiusM = unitConversionFactor = None
+            return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, horizonMethod, nearFieldRadiusM, unitConversionFactor, validInputData, printMsg
         if sc.sticky.has_key("MapWinGIS"):
             global MapWinGIS
             import MapWinGIS
@@ -194,23 +215,23 @@ def checkInputData(opentopo_APIkey, minVisibilityRadiusKM, maxVisibilityRadiusKM
         gismoGismoComponentNotRan = True
     
     if (gismoGismoComponentNotRan == True):
-        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = iteropMapWinGIS_dll_folderPath = gdalDataPath_folderPath = workingSubFolderPath = downloadTSVLink = unitConversionFactor = None
+        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = iteropMapWinGIS_dll_folderPath = gdalDataPath_folderPath = workingSubFolderPath = downloadTSVLink = horizonMethod = nearFieldRadiusM = unitConversionFactor = None
         validInputData = False
         printMsg = "The \"Gismo Gismo\" component has not been run. Run it before running this component."
-        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, validInputData, printMsg
+        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, horizonMethod, nearFieldRadiusM, unitConversionFactor, validInputData, printMsg
     
     
     
     # check inputs
     if (opentopo_APIkey == None):
-        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = workingSubFolderPath = downloadTSVLink = unitConversionFactor = None
+        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = workingSubFolderPath = downloadTSVLink = horizonMethod = nearFieldRadiusM = unitConversionFactor = None
         validInputData = False
         printMsg = "\"_APIkey\" input has not been added. To obtain it for free:\n" + \
                     "1) go to the following link:  https://portal.opentopography.org/lidarAuthorizationInfo\n" + \
                     "2) go to the following link:  https://github.com/stgeorges/gismo/blob/master/resources/tutorials/Get_OpenTopo_APIkey.mp4\n" + \
                     "3) click on 'Download' and watch the video tutorial\n" + \
                     "4) repeat the steps in the tutorial"
-        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, validInputData, printMsg
+        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, horizonMethod, nearFieldRadiusM, unitConversionFactor, validInputData, printMsg
     
     
     
@@ -230,17 +251,17 @@ def checkInputData(opentopo_APIkey, minVisibilityRadiusKM, maxVisibilityRadiusKM
         print "minVisibilityRadius_ input only supports values equal or larger than 0 kilometer.\n" + \
               "minVisibilityRadius_ input set to 0 kilometer."
     elif (minVisibilityRadiusKM > 10):
-        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = iteropMapWinGIS_dll_folderPath = gdalDataPath_folderPath = workingSubFolderPath = downloadTSVLink = unitConversionFactor = None
+        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = iteropMapWinGIS_dll_folderPath = gdalDataPath_folderPath = workingSubFolderPath = downloadTSVLink = horizonMethod = nearFieldRadiusM = unitConversionFactor = None
         validInputData = False
         printMsg = "minVisibilityRadius_ values longer than 10 are not supported.\n" + \
                    "Please set the minVisibilityRadius_ to some value from 0 to 10 (0 being recommended unless you are doing an analysis of big parts of a city)."
-        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, validInputData, printMsg
+        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, horizonMethod, nearFieldRadiusM, unitConversionFactor, validInputData, printMsg
     if (3 * minVisibilityRadiusKM > maxVisibilityRadiusKM):
-        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = iteropMapWinGIS_dll_folderPath = gdalDataPath_folderPath = workingSubFolderPath = downloadTSVLink = unitConversionFactor = None
+        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = iteropMapWinGIS_dll_folderPath = gdalDataPath_folderPath = workingSubFolderPath = downloadTSVLink = horizonMethod = nearFieldRadiusM = unitConversionFactor = None
         validInputData = False
         printMsg = "minVisibilityRadius_ value can not be longer than one third of maxVisibilityRadius_.\n" + \
                    "Please set the minVisibilityRadius_ to some value from 0 to 10 so that the minVisibilityRadius_ is equal or less than 0.3*maxVisibilityRadius_."
-        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, validInputData, printMsg
+        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, horizonMethod, nearFieldRadiusM, unitConversionFactor, validInputData, printMsg
     minVisibilityRadiusKM_rounded = round(minVisibilityRadiusKM,1)  # round the "minVisibilityRadius_" input to 0.1 value
     minVisibilityRadiusM = minVisibilityRadiusKM_rounded * 1000  # convert to meters
     
@@ -254,7 +275,7 @@ def checkInputData(opentopo_APIkey, minVisibilityRadiusKM, maxVisibilityRadiusKM
         print "maxVisibilityRadius_ input only supports values equal or larger than 1 kilometer.\n" + \
               "maxVisibilityRadius_ input set to 1 kilometer."
     elif (maxVisibilityRadiusKM > 400):
-        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = iteropMapWinGIS_dll_folderPath = gdalDataPath_folderPath = workingSubFolderPath = downloadTSVLink = unitConversionFactor = None
+        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = iteropMapWinGIS_dll_folderPath = gdalDataPath_folderPath = workingSubFolderPath = downloadTSVLink = horizonMethod = nearFieldRadiusM = unitConversionFactor = None
         validInputData = False
         printMsg = "Radii longer than 400 are not supported, due to the following reason:\n" + \
                    "The longest recorded horizontal visibility distance (which is the maxVisibilityRadius_ in our case) during daylight is 388 km.\n" + \
@@ -266,7 +287,7 @@ def checkInputData(opentopo_APIkey, minVisibilityRadiusKM, maxVisibilityRadiusKM
                    "ATTENTION!!! Have in mind that even radii above 100 km may require stronger PC configurations and 64 bit version of Rhino 5. Otherwise Rhino 5 may crash.\n" + \
                    "If this happens (Rhino 5 crashes) get back to the \"maxVisibilityRadius_\" input of 100."
         
-        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, validInputData, printMsg
+        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, horizonMethod, nearFieldRadiusM, unitConversionFactor, validInputData, printMsg
     maxVisibilityRadiusM = maxVisibilityRadiusKM * 1000  # convert to meters
     #arcAngleD = math.degrees( math.atan( maxVisibilityRadiusM / (6371000+elevation) ) )  # assumption of Earth being a sphere
     #arcLength = (arcAngleD*math.pi*R)/180
@@ -280,10 +301,10 @@ def checkInputData(opentopo_APIkey, minVisibilityRadiusKM, maxVisibilityRadiusKM
         try:  # check if it's a number
             north = float(north)
             if north < 0 or north > 360:
-                heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = workingSubFolderPath = downloadTSVLink = unitConversionFactor = None
+                heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = workingSubFolderPath = downloadTSVLink = horizonMethod = nearFieldRadiusM = unitConversionFactor = None
                 validInputData = False
                 printMsg = "Please input north angle value from 0 to 360."
-                return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, GDAL_librariesFolderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, validInputData, printMsg
+                return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, GDAL_librariesFolderPath, workingSubFolderPath, downloadTSVLink, horizonMethod, nearFieldRadiusM, unitConversionFactor, validInputData, printMsg
         except Exception, e:  # check if it's a vector
             north.Unitize()
         
@@ -312,16 +333,43 @@ def checkInputData(opentopo_APIkey, minVisibilityRadiusKM, maxVisibilityRadiusKM
         workingSubFolderPath = os.path.join(workingFolderPath, "terrain_shading_masks")
     folderCreated = gismo_preparation.createFolder(workingSubFolderPath)
     if folderCreated == False:
-        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = workingSubFolderPath = downloadTSVLink = unitConversionFactor = None
+        heightM = minVisibilityRadiusM = maxVisibilityRadiusM = northRad = northVec = maskStyle = maskStyleLabel = workingSubFolderPath = downloadTSVLink = horizonMethod = nearFieldRadiusM = unitConversionFactor = None
         validInputData = False
         printMsg = "workingFolder_ input is invalid.\n" + \
                    "Input the string in the following format (example): c:\someFolder.\n" + \
                    "Or do not input anything, in which case a default Gismo folder will be used instead: \"c:\gismo\\terrain_shading_masks\"."
-        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, validInputData, printMsg
+        return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, horizonMethod, nearFieldRadiusM, unitConversionFactor, validInputData, printMsg
     
     if downloadTSVLink == None:
         downloadTSVLink = "https://raw.githubusercontent.com/stgeorges/terrainShadingMask/master/objFiles/0_terrain_shading_masks_download_links.tsv"
     
+    if (horizonMethod == None):
+        horizonMethod = 0  # default, horizon scan
+    elif (horizonMethod < 0) or (horizonMethod > 1):
+        horizonMethod = 0
+        print "horizonMethod_ input only supports values 0 (horizon scan) or 1 (ray casting).\n" + \
+              "horizonMethod_ input set to 0 (horizon scan)."
+    
+    if (nearFieldRadiusKM == None):
+        nearFieldRadiusKM = 0  # default, no finer near field terrain
+    elif (nearFieldRadiusKM < 0):
+        nearFieldRadiusKM = 0
+        print "nearFieldRadius_ input only supports values equal or larger than 0 kilometers.\n" + \
+              "nearFieldRadius_ input set to 0 (no finer near field terrain)."
+    elif (nearFieldRadiusKM > 20):
+        nearFieldRadiusKM = 20
+        print "nearFieldRadius_ input only supports values up to 20 kilometers.\n" + \
+              "nearFieldRadius_ input set to 20 kilometers."
+    if (horizonMethod == 1) and (nearFieldRadiusKM > 0):
+        # the finer near field terrain is only used by the horizon scan
+        nearFieldRadiusKM = 0
+        level = Grasshopper.Kernel.GH_RuntimeMessageLevel.Warning
+        printMsg = "nearFieldRadius_ input is only used when horizonMethod_ input is set to 0 (horizon scan).\n" + \
+                   "The ray casting (horizonMethod_ = 1) uses the 3 arc-second terrain for the whole maxVisibilityRadius_. nearFieldRadius_ input set to 0."
+        ghenv.Component.AddRuntimeMessage(level, printMsg)
+        print printMsg
+    nearFieldRadiusM = round(nearFieldRadiusKM,1) * 1000  # round the "nearFieldRadius_" input to 0.1 value, and convert to meters
+    
     #unitConversionFactor, unitSystemLabel = gismo_preparation.checkUnits()  # factor to convert Rhino document units to meters.
     unitConversionFactor = 1  # unitConversionFactor is always fixed to "1" to avoid problems when .obj files are exported from Rhino document (session) in one Units, and then imported in some other Rhino document (session) with different Units
     
@@ -329,7 +377,7 @@ def checkInputData(opentopo_APIkey, minVisibilityRadiusKM, maxVisibilityRadiusKM
     validInputData = True
     printMsg = "ok"
     
-    return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, validInputData, printMsg
+    return heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, horizonMethod, nearFieldRadiusM, unitConversionFactor, validInputData, printMsg
 
 
 def distanceBetweenTwoPoints(latitude1D, longitude1D, maxVisibilityRadiusM):
@@ -439,6 +487,84 @@ def distanceBetweenTwoPoints(latitude1D, longitude1D, maxVisibilityRadiusM):
     return correctedMaskRadiusM, validVisibilityRadiusM, printMsg
 
 
+def meshTerrainShadingMask(terrainShadingMaskBrep):
+    
+    # terrain shading masks are saved to the binary terrain cache as meshes. The mesh is only used for the cache, not as the "terrainShadingMask" output
+    meshParam = Rhino.Geometry.MeshingParameters.Smooth
+    meshParam.MinimumEdgeLength = 0.0001
+    meshParam.SimplePlanes = True
+    terrainShadingMaskMeshes = Rhino.Geometry.Mesh.CreateFromBrep(terrainShadingMaskBrep, meshParam)  # it can contain more than one mesh
+    terrainShadingMaskMesh = Rhino.Geometry.Mesh()
+    for meshMaskPart in terrainShadingMaskMeshes:
+        terrainShadingMaskMesh.Append(meshMaskPart)
+    
+    return terrainShadingMaskMesh
+
+
+def export_read_terrainShadingMask_cacheFile(exportReadCache, cacheFilePath, locationName, locationLatitudeD, locationLongitudeD, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyleLabel, terrainShadingMaskMesh=None, origin_0_0_0=None, elevationM=None):
+    
+    if exportReadCache == "exportCache":
+        # header: georeference, origin and elevation of the terrain shading mask
+        CRS_EPSG_code, outputCRS_UTMzone, northOrsouth = gismo_gis.calculate_CRS_UTMzone(locationLatitudeD, locationLongitudeD)
+        nowUTC = datetime.datetime.utcnow()  # UTC date and time
+        header = {
+            "description": "Terrain shading mask generated by Grasshopper Gismo plugin. True North direction is set to the Y axis",
+            "location": locationName,
+            "latitude": locationLatitudeD,
+            "longitude": locationLongitudeD,
+            "CRS_EPSG_code": CRS_EPSG_code,
+            "origin": [origin_0_0_0.X, origin_0_0_0.Y, origin_0_0_0.Z],
+            "elevationM": elevationM,
+            "heightM": heightM,
+            "minVisibilityRadiusM": minVisibilityRadiusM,
+            "maxVisibilityRadiusM": maxVisibilityRadiusM,
+            "maskStyle": maskStyleLabel,
+            "maskRadius": 200,  # in document units
+            "createdUTC": nowUTC.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        gismo_io.exportTerrainCache(cacheFilePath, header, terrainShadingMaskMesh)
+        
+        terrainShadingMaskMesh = origin_0_0_0 = elevationM = None  # not needed for "exportCache"
+    
+    elif exportReadCache == "readCache":
+        header, terrainShadingMaskMesh = gismo_io.readTerrainCache(cacheFilePath)
+        if (header != None):
+            # "terrainShadingMask" output is a brep, no matter if it has been created or loaded from the binary terrain cache
+            terrainShadingMask = Rhino.Geometry.Brep.CreateFromMesh(terrainShadingMaskMesh, True)
+            origin_0_0_0 = Rhino.Geometry.Point3d(*header["origin"])
+            elevationM = header["elevationM"]
+        else:
+            # the file is corrupted, or it has been created by a newer Gismo version
+            terrainShadingMask = origin_0_0_0 = elevationM = None
+        
+        return terrainShadingMask, origin_0_0_0, elevationM
+    
+    return terrainShadingMaskMesh, origin_0_0_0, elevationM
+
+
+def convertObjFileToCache(objFilePath, cacheFilePath, terrainShadingMask, origin_0_0_0, locationName, locationLatitudeD, locationLongitudeD, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyleLabel):
+    
+    # extract "elevationM" data from the .obj file
+    myFile = open(objFilePath,"r")
+    for line in myFile.xreadlines():
+        if "Elevation" in line:
+            splittedLine = line.split(" ")
+            try:
+                elevationM = float(splittedLine[2])  # "elevation" output is always in meters
+            except (IndexError, ValueError):
+                elevationM = None  # somebody opened the .obj file and edited the heading
+            break
+    else:
+        elevationM = None  # is somebody opened the .obj file and deleted the heading for some reason
+    myFile.close()
+    
+    # save the imported .obj terrain shading mask to the binary terrain cache, so that the .obj file does not have to be imported again
+    terrainShadingMaskMesh = meshTerrainShadingMask(terrainShadingMask)
+    export_read_terrainShadingMask_cacheFile("exportCache", cacheFilePath, locationName, locationLatitudeD, locationLongitudeD, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyleLabel, terrainShadingMaskMesh, origin_0_0_0, elevationM)
+    
+    return elevationM
+
+
 def import_export_origin_0_0_0_and_terrainShadingMask_from_objFile(importExportObj, objFilePath, fileNameIncomplete, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, elevationM=None, shadingMaskSrf=None, origin=None):
         
         objFilePath2 = chr(34) + objFilePath + chr(34)
@@ -513,7 +639,7 @@ def import_export_origin_0_0_0_and_terrainShadingMask_from_objFile(importExportO
         return terrainShadingMask, origin_0_0_0
 
 
-def checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyleLabel):
+def checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink, locationName, locationLatitudeD, locationLongitudeD, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyleLabel, nearFieldRadiusM):
     
     # convert the float to integer if minVisibilityRadiusM == 0 (to avoid "0.0" in the .obj fileName)
     if minVisibilityRadiusM == 0:
@@ -522,39 +648,38 @@ def checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink
         minVisibilityRadiusKM = minVisibilityRadiusM/1000
     
     fileName = fileNameIncomplete + "_visibility=" + str(minVisibilityRadiusKM) + "-" + str(int(maxVisibilityRadiusM/1000)) + "KM"
+    if (nearFieldRadiusM > 0):
+        # terrain shading masks with a finer near field terrain are never premade
+        fileName += "_near=%gKM" % (nearFieldRadiusM/1000)
     fileName2 = fileNameIncomplete + "_visibility=" + str(int(maxVisibilityRadiusM/1000)) + "KM"
     objFileNamePlusExtension = fileName + "_" + maskStyleLabel + ".obj"
     rasterFileNamePlusExtension = fileName2 + ".tif"
-    rasterReprojectedFileNamePlusExtension = fileName2 + "_reprojected" + ".tif"
-    rasterTranslatedFileNamePlusExtension = fileName2 + "_translated" + ".tif"
     tsvFileNamePlusExtension = "0_terrain_shading_masks_download_links" + ".tsv"
     
     objFilePath = os.path.join(workingSubFolderPath, objFileNamePlusExtension)
+    cacheFilePath = os.path.splitext(objFilePath)[0] + ".gtc"  # binary terrain cache
     rasterFilePath = os.path.join(workingSubFolderPath, rasterFileNamePlusExtension)
-    rasterReprojectedFilePath = os.path.join(workingSubFolderPath, rasterReprojectedFileNamePlusExtension)
-    rasterTranslatedFilePath = os.path.join(workingSubFolderPath, rasterTranslatedFileNamePlusExtension)
     tsvFilePath = os.path.join(workingSubFolderPath, tsvFileNamePlusExtension)
     
     
     # chronology labels:  I, II, 1, 2, A, B, a, b
     
+    ##### 0) check if binary terrain cache (.gtc) file exist. Load it
+    if os.path.exists(cacheFilePath):
+        terrainShadingMask, origin_0_0_0, elevationM = export_read_terrainShadingMask_cacheFile("readCache", cacheFilePath, locationName, locationLatitudeD, locationLongitudeD, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyleLabel)
+        if (terrainShadingMask != None):
+            rasterFilePath = "needless"
+            valid_Obj_or_Raster_file = True
+            printMsg = "ok"
+            return terrainShadingMask, origin_0_0_0, fileName, cacheFilePath, rasterFilePath, elevationM, valid_Obj_or_Raster_file, printMsg
+    
     ##### I) check if .obj file exist:
     objFileAlreadyExists = os.path.exists(objFilePath)
     if objFileAlreadyExists == True:
-        # .obj file already created. Import it
+        # .obj file already created. Import it, and convert it to binary terrain cache
         terrainShadingMask, origin_0_0_0 = import_export_origin_0_0_0_and_terrainShadingMask_from_objFile("importObj", objFilePath, fileNameIncomplete, heightM, minVisibilityRadiusM, maxVisibilityRadiusM)
         if (terrainShadingMask != None) and (origin_0_0_0 != None):
-            # extract "elevationM" data from the .obj file
-            myFile = open(objFilePath,"r")
-            for line in myFile.xreadlines():
-                if "Elevation" in line:
-                    splittedLine = line.split(" ")
-                    elevationM = splittedLine[2]
-                    #elevationM = float(splittedLine[2])/0.305  # ovo mi ne treba. "elevation" output ce uvek da bude u meters
-                    break
-            else:
-                elevationM = None  # is somebody opened the .obj file and deleted the heading for some reason
-            myFile.close()
+            elevationM = convertObjFileToCache(objFilePath, cacheFilePath, terrainShadingMask, origin_0_0_0, locationName, locationLatitudeD, locationLongitudeD, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyleLabel)
             
             rasterFilePath = "needless"
             valid_Obj_or_Raster_file = True
@@ -622,6 +747,8 @@ def checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink
                     ### II.1.A .obj file IS listed in "0_terrain_shading_masks_download_links.tsv", so download it
                     objFileDownloadedDummy = gismo_preparation.downloadFile(downloadObjLink, objFilePath)
                     terrainShadingMask, origin_0_0_0 = import_export_origin_0_0_0_and_terrainShadingMask_from_objFile("importObj", objFilePath, fileNameIncomplete, heightM, minVisibilityRadiusM, maxVisibilityRadiusM)
+                    if (terrainShadingMask != None) and (origin_0_0_0 != None):
+                        elevationM = convertObjFileToCache(objFilePath, cacheFilePath, terrainShadingMask, origin_0_0_0, locationName, locationLatitudeD, locationLongitudeD, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyleLabel)
                     rasterFilePath = "needless"
                     valid_Obj_or_Raster_file = True
                     printMsg = "ok"
@@ -703,7 +830,7 @@ def checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink
                     #printMsg - from distanceBetweenTwoPoints function
     
     
-    return terrainShadingMask, origin_0_0_0, fileName, objFilePath, rasterFilePath, rasterReprojectedFilePath, rasterTranslatedFilePath, elevationM, valid_Obj_or_Raster_file, printMsg
+    return terrainShadingMask, origin_0_0_0, fileName, cacheFilePath, rasterFilePath, elevationM, valid_Obj_or_Raster_file, printMsg
 
 
 def ptZcorrectedHeight(locationPt, meshPt, scaleFactor):
@@ -718,43 +845,38 @@ def ptZcorrectedHeight(locationPt, meshPt, scaleFactor):
     return ptZCorrection
 
 
-def createTerrainShadingMask(objFilePath, rasterFilePath, rasterReprojectedFilePath, rasterTranslatedFilePath, locationLatitudeD, locationLongitudeD, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyle, context, unitConversionFactor):
+def rasterCache(rasterFilePath):
+    
+    # reprojected and resampled rasters are cached, so the same downloaded raster is only reprojected and resampled once
+    rasterCacheFolderPath = os.path.join(os.path.dirname(rasterFilePath), "reprojected_rasters")
+    gismo_preparation.createFolder(rasterCacheFolderPath)
+    
+    return sc.sticky["gismo_RasterCache"](rasterCacheFolderPath)
+
+
+def reprojectRasterToUTM(rasterFilePath, locationLatitudeD, locationLongitudeD):
     
     # output crs data: outputCRS_UTMzone, northOrsouth
     CRS_EPSG_code, outputCRS_UTMzone, northOrsouth = gismo_gis.calculate_CRS_UTMzone(locationLatitudeD, locationLongitudeD)
     
-    # reproject raster
-    utils = MapWinGIS.UtilsClass()
+    # reproject raster (None and GDAL's error message if it fails)
     resamplingMethod = "-r bilinear"
     bstrOptions = '-s_srs EPSG:4326 -t_srs "+proj=utm +zone=%s +%s +datum=WGS84 +ellps=WGS84" %s' % (outputCRS_UTMzone, northOrsouth, resamplingMethod)
-    reprojectGridResult = MapWinGIS.UtilsClass.GDALWarp(utils, rasterFilePath, rasterReprojectedFilePath, bstrOptions, None)
-    if (reprojectGridResult != True):
-        convertErrorNo = MapWinGIS.GlobalSettingsClass().GdalLastErrorNo
-        convertErrorMsg = MapWinGIS.GlobalSettingsClass().GdalLastErrorMsg
-        convertErrorType = MapWinGIS.GlobalSettingsClass().GdalLastErrorType
-        print "convertErrorNo: ", convertErrorNo
-        print "convertErrorMsg: ", convertErrorMsg
-        print "convertErrorType: ", convertErrorType
+    rasterReprojectedFilePath, gdalErrorMsg = rasterCache(rasterFilePath).cachedRaster("GDALWarp", rasterFilePath, bstrOptions)
     
-    # resample the raster to 50 size%
-    utils2 = MapWinGIS.UtilsClass()
-    bstrOptions2 = "-outsize 50% 50%"
-    translateGridResult = MapWinGIS.UtilsClass.TranslateRaster(utils2, rasterReprojectedFilePath, rasterTranslatedFilePath, bstrOptions2, None)
-    if (translateGridResult != True):
-        convertErrorNo = MapWinGIS.GlobalSettingsClass().GdalLastErrorNo
-        convertErrorMsg = MapWinGIS.GlobalSettingsClass().GdalLastErrorMsg
-        convertErrorType = MapWinGIS.GlobalSettingsClass().GdalLastErrorType
-        print "convertErrorNo: ", convertErrorNo
-        print "convertErrorMsg: ", convertErrorMsg
-        print "convertErrorType: ", convertErrorType
-    
-    # open the reprojected raster
+    return rasterReprojectedFilePath, gdalErrorMsg
+
+
+def elevationGridFromRaster(rasterFilePath, locationLatitudeD, locationLongitudeD, scaleFactor):
+    
+    # create the elevation grid (corrected for Earth's curvature and refraction, and scaled) from a raster in UTM projection. The grid is centered to the _location
+    
+    # open the raster
     grid = MapWinGIS.GridClass()
     dataType = MapWinGIS.GridDataType.DoubleDataType
     fileTypeExtension = MapWinGIS.GridFileType.UseExtension
     inRam = True
-    #openGridSuccess = MapWinGIS.GridClass.Open(grid, rasterReprojectedFilePath, dataType, inRam, fileTypeExtension, None)
-    openGridSuccess = MapWinGIS.GridClass.Open(grid, rasterTranslatedFilePath, dataType, inRam, fileTypeExtension, None)
+    openGridSuccess = MapWinGIS.GridClass.Open(grid, rasterFilePath, dataType, inRam, fileTypeExtension, None)
     if (openGridSuccess != True):
         gridErrorMsg = grid.ErrorMsg
         print "gridErrorMsg: ", gridErrorMsg
@@ -769,8 +891,6 @@ def createTerrainShadingMask(objFilePath, rasterFilePath, rasterReprojectedFileP
     cellsizeY = header.dY
     
     # calculate the starting point (upper left corner) of terrain mesh
-    scaleFactor = 0.01  # scale terrainMesh 100 times (should never be changed), meaning 1 meter in real life is 0.01 meters in Rhino document
-    origin_0_0_0 = Rhino.Geometry.Point3d(0,0,0)  # always center the terrainMesh to 0,0,0 point
     lowerLeftCornerCellCentroidXcoord = header.XllCenter
     lowerLeftCornerCellCentroidYcoord = header.YllCenter
     lowerLeftCornerXcoord = lowerLeftCornerCellCentroidXcoord - (cellsizeX/2)
@@ -787,26 +907,80 @@ def createTerrainShadingMask(objFilePath, rasterFilePath, rasterReprojectedFileP
     #terrainMeshStartPtY = ( terrainMeshLeftBottomPtY + ((abs(cellsizeX)/unitConversionFactor2)*numOfRows) )*scaleFactor
     terrainMeshStartPtY = ( terrainMeshLeftBottomPtY + (abs(cellsizeX)*numOfRows) )*scaleFactor
     
-    pts = []
-    # create terrainMesh from 1 arc-second format
+    # read all cell values at once (NaN values replaced with 0), then create the vertex coordinates per column and per row
+    cellValues = gismo_gis.readGridValues(grid, rasterFilePath, 0)
+    closeGridSuccess = grid.Close()
+    del grid
+    
+    xCoordinates = [terrainMeshStartPtX+(i*abs(cellsizeX)*scaleFactor)  for i in xrange(numOfCellsInX)]
+    yCoordinates = [terrainMeshStartPtY-(k*abs(cellsizeY)*scaleFactor)  for k in xrange(numOfCellsInY)]
+    
+    # Earth's curvature and refraction correction (the same as "ptZcorrectedHeight" function), split into its per column and per row parts
+    xCorrectionsKM2 = [(x/scaleFactor/1000)**2  for x in xCoordinates]
+    yCorrectionsKM2 = [(y/scaleFactor/1000)**2  for y in yCoordinates]
+    elevationLL = []  # corrected Z coordinates of terrainMesh vertices, per row. Used by the horizon scan
     for k in xrange(numOfCellsInY):
-        for i in xrange(numOfCellsInX):
-            ptZ = grid.Value(i,k)
-            pt_ZcoordZero = Rhino.Geometry.Point3d(terrainMeshStartPtX+(i*abs(cellsizeX)*scaleFactor), terrainMeshStartPtY-(k*abs(cellsizeY)*scaleFactor), 0)
-            ptZCorrection = ptZcorrectedHeight(origin_0_0_0, pt_ZcoordZero, scaleFactor)  # in meters, unscaled
-            ptCorrected = Rhino.Geometry.Point3d(pt_ZcoordZero.X, pt_ZcoordZero.Y, (ptZ-ptZCorrection)*scaleFactor)
-            pts.append(ptCorrected)
+        rowStart = k*numOfCellsInX
+        yCorrectionKM2 = yCorrectionsKM2[k]
+        elevationLL.append( [(ptZ - 0.0675*(xCorrectionKM2+yCorrectionKM2))*scaleFactor  for ptZ, xCorrectionKM2 in zip(cellValues[rowStart:rowStart+numOfCellsInX], xCorrectionsKM2)] )
+    del cellValues
     
-    closeGridSuccess = grid.Close()
+    return elevationLL, xCoordinates, yCoordinates, abs(cellsizeX)*scaleFactor, abs(cellsizeY)*scaleFactor
+
+
+def nearFieldElevationGrid(rasterFilePath, locationLatitudeD, locationLongitudeD, nearFieldRadiusM, scaleFactor, opentopo_APIkey):
     
-    terrainMesh = gismo_geometry.meshFromPoints(numOfCellsInY, numOfCellsInX, pts)
+    # download a finer terrain (COP30, 1 arc-second) for the area nearFieldRadiusM around the _location, and create its elevation grid
+    nearFieldRasterFilePath = os.path.splitext(rasterFilePath)[0] + "_near=%gKM_COP30.tif" % (nearFieldRadiusM/1000)
     
-    # deleting
-    #os.remove(rasterFilePath)  # downloaded .tif file
-    os.remove(rasterReprojectedFilePath)
-    os.remove(rasterTranslatedFilePath)
-    del grid
-    del pts
+    if not os.path.exists(nearFieldRasterFilePath):
+        # 10% larger area, so that the reprojected raster still covers the whole nearFieldRadiusM
+        latitudeTopD, dummyLongitudeTopD, latitudeBottomD, dummyLongitudeBottomD, dummyLatitudeLeftD, longitudeLeftD, dummyLatitudeRightD, longitudeRightD = gismo_gis.destinationLatLon(locationLatitudeD, locationLongitudeD, nearFieldRadiusM*1.1)
+        downloadRasterLink = "https://portal.opentopography.org/API/globaldem?demtype=COP30&south={}&north={}&west={}&east={}&outputFormat=GTiff&API_Key={}".format(latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD, opentopo_APIkey)
+        tifFileDownloaded = gismo_preparation.downloadFile(downloadRasterLink, nearFieldRasterFilePath)
+        if not tifFileDownloaded:
+            return None
+    
+    nearFieldRasterReprojectedFilePath, gdalErrorMsg = reprojectRasterToUTM(nearFieldRasterFilePath, locationLatitudeD, locationLongitudeD)
+    if (nearFieldRasterReprojectedFilePath == None):
+        return None
+    
+    nearFieldGrid = elevationGridFromRaster(nearFieldRasterReprojectedFilePath, locationLatitudeD, locationLongitudeD, scaleFactor)
+    
+    return nearFieldGrid
+
+
+def createTerrainShadingMask(cacheFilePath, rasterFilePath, locationName, locationLatitudeD, locationLongitudeD, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyle, maskStyleLabel, horizonMethod, nearFieldRadiusM, opentopo_APIkey, context, unitConversionFactor):
+    
+    # reproject raster
+    rasterReprojectedFilePath, gdalErrorMsg = reprojectRasterToUTM(rasterFilePath, locationLatitudeD, locationLongitudeD)
+    if (rasterReprojectedFilePath == None):
+        validRasterFile = False
+        printMsg = "The downloaded terrain could not be reprojected by the GDAL library (MapWinGIS):\n" + \
+                   "%s\n" % gdalErrorMsg + \
+                   " \n" + \
+                   "Try deleting the downloaded terrain from the \"%s\" folder, and then rerun the component.\n" % os.path.dirname(rasterFilePath) + \
+                   "If this does not help, open a new topic about this issue on: www.grasshopper3d.com/group/gismo/forum."
+        return None, None, None, validRasterFile, printMsg
+    
+    # resample the raster to 50 size%
+    bstrOptions2 = "-outsize 50% 50%"
+    rasterTranslatedFilePath, gdalErrorMsg = rasterCache(rasterFilePath).cachedRaster("TranslateRaster", rasterReprojectedFilePath, bstrOptions2)
+    if (rasterTranslatedFilePath == None):
+        validRasterFile = False
+        printMsg = "The downloaded terrain could not be resampled by the GDAL library (MapWinGIS):\n" + \
+                   "%s\n" % gdalErrorMsg + \
+                   " \n" + \
+                   "Try deleting the downloaded terrain from the \"%s\" folder, and then rerun the component.\n" % os.path.dirname(rasterFilePath) + \
+                   "If this does not help, open a new topic about this issue on: www.grasshopper3d.com/group/gismo/forum."
+        return None, None, None, validRasterFile, printMsg
+    
+    scaleFactor = 0.01  # scale terrainMesh 100 times (should never be changed), meaning 1 meter in real life is 0.01 meters in Rhino document
+    origin_0_0_0 = Rhino.Geometry.Point3d(0,0,0)  # always center the terrainMesh to 0,0,0 point
+    
+    # create terrainMesh from 3 arc-second format
+    elevationLL, xCoordinates, yCoordinates, cellsizeXScaled, cellsizeYScaled = elevationGridFromRaster(rasterTranslatedFilePath, locationLatitudeD, locationLongitudeD, scaleFactor)
+    terrainMesh = gismo_geometry.meshFromGrid(xCoordinates, yCoordinates, [ptZ  for elevationRowL in elevationLL  for ptZ in elevationRowL])
     
     
     # project origin_0_0_0 (locationPt) to terrainMesh
@@ -816,6 +990,21 @@ def createTerrainShadingMask(objFilePath, rasterFilePath, rasterReprojectedFileP
     rayIntersectParam = Rhino.Geometry.Intersect.Intersection.MeshRay(terrainMesh, ray)
     locationPt = ray.PointAt(rayIntersectParam)
     
+    nearFieldGrid = None
+    if (horizonMethod == 0) and (nearFieldRadiusM > 0):
+        nearFieldGrid = nearFieldElevationGrid(rasterFilePath, locationLatitudeD, locationLongitudeD, nearFieldRadiusM, scaleFactor, opentopo_APIkey)
+        if (nearFieldGrid != None):
+            # the viewpoint stands on the finer near field terrain
+            nearFieldElevationLL, nearFieldXCoordinates, nearFieldYCoordinates, nearFieldCellsizeXScaled, nearFieldCellsizeYScaled = nearFieldGrid
+            nearFieldElevation = gismo_terrain.elevationAt(nearFieldElevationLL, nearFieldXCoordinates[0], nearFieldYCoordinates[0], nearFieldCellsizeXScaled, nearFieldCellsizeYScaled, locationPt.X, locationPt.Y)
+            if (nearFieldElevation != None):
+                locationPt.Z = nearFieldElevation
+        else:
+            level = Grasshopper.Kernel.GH_RuntimeMessageLevel.Warning
+            printMsg = "The finer near field terrain could not be downloaded. The 3 arc-second terrain is used for the whole maxVisibilityRadius_ instead."
+            ghenv.Component.AddRuntimeMessage(level, printMsg)
+            print printMsg
+    
     heightScaled = heightM * scaleFactor
     locationPt.Z = locationPt.Z + heightScaled  # lifting up the locationPt for "height_" input (minimum 2 meters)
     elevationM = locationPt.Z/scaleFactor  # in meters
@@ -823,12 +1012,12 @@ def createTerrainShadingMask(objFilePath, rasterFilePath, rasterReprojectedFileP
     
     
     minVisibilityRadiusScaled = minVisibilityRadiusM * scaleFactor
-    if minVisibilityRadiusM > 0:
+    if (minVisibilityRadiusM > 0) and (horizonMethod == 1):
         # split the terrainMesh with a sphere to exclude the terrainMesh area minVisibilityRadiusKM around the locationPt
         meshSphere = Rhino.Geometry.Mesh.CreateFromSphere(Rhino.Geometry.Sphere(locationPt, minVisibilityRadiusScaled), 12, 10)
         terrainMeshSplitted = terrainMesh.Split(meshSphere)[0]
     else:
-        # minVisibilityRadius_ input == 0. No splitting of the terrainMesh
+        # minVisibilityRadius_ input == 0, or horizon scan (it ignores the terrain closer than minVisibilityRadius_ by itself). No splitting of the terrainMesh
         terrainMeshSplitted = terrainMesh
     
     
@@ -848,36 +1037,78 @@ def createTerrainShadingMask(objFilePath, rasterFilePath, rasterReprojectedFileP
     stepU = (skyDomeDomainUmax - skyDomeDomainUmin)/precisionU
     stepV = (skyDomeDomainVmax - skyDomeDomainVmin)/precisionV
     
-    # check for intersection between the terrainMesh and rays
     lines = []
     lastRowPoints = []
     
-    hitted = False  # initial switch
-    for i in xrange(0,precisionU):
-        for k in xrange(0,precisionV):
+    if (horizonMethod == 0):
+        # horizon scan: walk each sky dome column's azimuth across the elevation grid, and find the highest row whose ray would hit the terrain
+        azimuthsR = []
+        for i in xrange(0,precisionU):
             u = skyDomeDomainUmin + stepU*i
-            v = skyDomeDomainVmin + stepV*k
-            skyDomePt = halvedSkyDomeSrf.PointAt(u,v)
-            rayVector = skyDomePt-locationPt
-            ray = Rhino.Geometry.Ray3d(locationPt, rayVector)
-            rayIntersectParam = Rhino.Geometry.Intersect.Intersection.MeshRay(terrainMeshSplitted,ray)
-            if rayIntersectParam >= 0:
+            horizonPt = halvedSkyDomeSrf.PointAt(u,0)
+            azimuthsR.append( math.atan2(horizonPt.Y-locationPt.Y, horizonPt.X-locationPt.X) )
+        
+        if (nearFieldGrid != None):
+            # finer near field terrain up to the nearFieldRadius_, then the 3 arc-second terrain. Beyond two nearFieldRadius_, the azimuths which can not rise above the horizon are skipped with a resolution pyramid of the 3 arc-second terrain: its cell size doubles each time the distance doubles
+            nearFieldRadiusScaled = nearFieldRadiusM * scaleFactor
+            numOfLevels = max(int(math.ceil(math.log(maxVisibilityRadiusM/nearFieldRadiusM, 2))), 1)
+            pyramidLevels = gismo_terrain.resolutionPyramid(elevationLL, xCoordinates[0], yCoordinates[0], cellsizeXScaled, cellsizeYScaled, numOfLevels)
+            levels = [(nearFieldElevationLL, nearFieldXCoordinates[0], nearFieldYCoordinates[0], nearFieldCellsizeXScaled, nearFieldCellsizeYScaled, nearFieldRadiusScaled, None)]
+            for levelIndex, pyramidLevel in enumerate(pyramidLevels):
+                levelMaxRadius = None if (levelIndex == len(pyramidLevels)-1) else nearFieldRadiusScaled * 2**(levelIndex+1)  # the coarsest level is used up to the end of the terrain
+                finerGrid = None if (levelIndex == 0) else pyramidLevels[0]  # horizon angles are always taken from the 3 arc-second terrain
+                levels.append(pyramidLevel + (levelMaxRadius, finerGrid))
+            horizonAnglesR = gismo_terrain.multiResolutionHorizonScan(levels, (locationPt.X, locationPt.Y, locationPt.Z), azimuthsR, minVisibilityRadiusScaled)
+            del levels; del pyramidLevels; del nearFieldGrid; del nearFieldElevationLL
+        else:
+            horizonAnglesR = gismo_terrain.horizonScan(elevationLL, xCoordinates[0], yCoordinates[0], cellsizeXScaled, cellsizeYScaled, (locationPt.X, locationPt.Y, locationPt.Z), azimuthsR, minVisibilityRadiusScaled)
+        
+        for i in xrange(0,precisionU):
+            u = skyDomeDomainUmin + stepU*i
+            # rays with "v" smaller than the horizon angle hit the terrain. The last one of them is the lastRowPt
+            numOfHittingRays = int(math.ceil((horizonAnglesR[i] - skyDomeDomainVmin)/stepV))
+            if numOfHittingRays > 0:
                 # ray hitted something in that column
-                hitted = True
-                lastRowPt = skyDomePt
-                continue
+                k = min(numOfHittingRays, precisionV) - 1
+                lastRowPt = halvedSkyDomeSrf.PointAt(u, skyDomeDomainVmin + stepV*k)
             else:
-                # ray did not hit anything in that column
-                pass
-        if hitted == False:
-            lastRowPt = halvedSkyDomeSrf.PointAt(u,0)
-        line = Rhino.Geometry.Line(locationPt, lastRowPt)
-        lines.append(line.ToNurbsCurve())
-        lastRowPoints.append(lastRowPt)
-        hitted = False  # reset the hitted switch
+                # no ray hitted anything in that column
+                lastRowPt = halvedSkyDomeSrf.PointAt(u,0)
+            line = Rhino.Geometry.Line(locationPt, lastRowPt)
+            lines.append(line.ToNurbsCurve())
+            lastRowPoints.append(lastRowPt)
+        
+        del horizonAnglesR
+    
+    elif (horizonMethod == 1):
+        # ray casting: check for intersection between the terrainMesh and rays
+        hitted = False  # initial switch
+        for i in xrange(0,precisionU):
+            for k in xrange(0,precisionV):
+                u = skyDomeDomainUmin + stepU*i
+                v = skyDomeDomainVmin + stepV*k
+                skyDomePt = halvedSkyDomeSrf.PointAt(u,v)
+                rayVector = skyDomePt-locationPt
+                ray = Rhino.Geometry.Ray3d(locationPt, rayVector)
+                rayIntersectParam = Rhino.Geometry.Intersect.Intersection.MeshRay(terrainMeshSplitted,ray)
+                if rayIntersectParam >= 0:
+                    # ray hitted something in that column
+                    hitted = True
+                    lastRowPt = skyDomePt
+                    continue
+                else:
+                    # ray did not hit anything in that column
+                    pass
+            if hitted == False:
+                lastRowPt = halvedSkyDomeSrf.PointAt(u,0)
+            line = Rhino.Geometry.Line(locationPt, lastRowPt)
+            lines.append(line.ToNurbsCurve())
+            lastRowPoints.append(lastRowPt)
+            hitted = False  # reset the hitted switch
     
     del terrainMesh
     del terrainMeshSplitted
+    del elevationLL
     
     tol = Rhino.RhinoDoc.ActiveDoc.ModelAbsoluteTolerance
     if maskStyle == 0:  # spherical terrain shading mask
@@ -912,8 +1143,9 @@ def createTerrainShadingMask(objFilePath, rasterFilePath, rasterReprojectedFileP
         transformMatrix = Rhino.Geometry.Transform.Translation(translationVec)
         transformSuccess = terrainShadingMaskUnscaledUnrotated.Transform(transformMatrix)
         
-        # export the created Terrain shading mask to .obj
-        terrainShadingMaskDummy, origin_0_0_0Dummy = import_export_origin_0_0_0_and_terrainShadingMask_from_objFile("exportObj", objFilePath, fileNameIncomplete, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, elevationM, terrainShadingMaskUnscaledUnrotated, origin_0_0_0)
+        # export the created Terrain shading mask to binary terrain cache (.gtc)
+        terrainShadingMaskMesh = meshTerrainShadingMask(terrainShadingMaskUnscaledUnrotated)
+        terrainShadingMaskDummy, origin_0_0_0Dummy, elevationMDummy = export_read_terrainShadingMask_cacheFile("exportCache", cacheFilePath, locationName, locationLatitudeD, locationLongitudeD, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyleLabel, terrainShadingMaskMesh, origin_0_0_0, elevationM)
     
     
     # final deleting
@@ -921,7 +1153,10 @@ def createTerrainShadingMask(objFilePath, rasterFilePath, rasterReprojectedFileP
     del lastRowPoints
     gc.collect()
     
-    return terrainShadingMaskUnscaledUnrotated, origin_0_0_0, elevationM
+    validRasterFile = True
+    printMsg = "ok"
+    
+    return terrainShadingMaskUnscaledUnrotated, origin_0_0_0, elevationM, validRasterFile, printMsg
 
 
 def scaleTerrainShadingMask(context, terrainShadingMaskUnscaledUnrotated, origin_0_0_0, latitude):
@@ -1003,9 +1238,8 @@ def scaleTerrainShadingMask(context, terrainShadingMaskUnscaledUnrotated, origin
             scaledTerrainShadingMaskMeshL.append(scaledTerrainShadingMaskMesh)
             
             conditionSum = 0
-            for i,cornerPt in enumerate(contextBBoxBottom4points):
-                skyExposureFactor = gismo_environmentalAnalysis.calculateSkyExposureFactor(cornerPt, [scaledTerrainShadingMaskMesh], latitude, skyDomeRadius, precision)
-                
+            skyExposureFactors = gismo_environmentalAnalysis.calculateSkyExposureFactors(contextBBoxBottom4points, [scaledTerrainShadingMaskMesh], latitude, skyDomeRadius, precision)
+            for i,skyExposureFactor in enumerate(skyExposureFactors):
                 if i == 0:
                     skyExposureFactor0 = skyExposureFactor  # for the first step, both skyExposureFactor0 and skyExposureFactor1 equal to skyExposureFactor
                 skyExposureFactor1 = skyExposureFactor
@@ -1173,25 +1407,32 @@ if sc.sticky.has_key("gismoGismo_released"):
         gismo_geometry = sc.sticky["gismo_CreateGeometry"]()
         gismo_environmentalAnalysis = sc.sticky["gismo_EnvironmentalAnalysis"]()
         gismo_gis = sc.sticky["gismo_GIS"]()
+        gismo_terrain = sc.sticky["gismo_Terrain"]()
+        gismo_io = sc.sticky["gismo_IO"]()
         
         locationName, locationLatitudeD, locationLongitudeD, timeZone, elevation, validLocationData, printMsg = gismo_preparation.checkLocationData(_location)
         if validLocationData:
             fileNameIncomplete = locationName + "_" + str(locationLatitudeD) + "_" + str(locationLongitudeD) + "_TERRAIN_MASK"  # incomplete due to missing "_visibility=100KM_sph" part (for example)
-            heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, unitConversionFactor, validInputData, printMsg = checkInputData(_APIkey, minVisibilityRadius_, maxVisibilityRadius_, north_, maskStyle_, workingFolder_, downloadUrl_)
+            heightM, minVisibilityRadiusM, maxVisibilityRadiusM, northRad, northVec, maskStyle, maskStyleLabel, iteropMapWinGIS_dll_folderPath, gdalDataPath_folderPath, workingSubFolderPath, downloadTSVLink, horizonMethod, nearFieldRadiusM, unitConversionFactor, validInputData, printMsg = checkInputData(_APIkey, minVisibilityRadius_, maxVisibilityRadius_, north_, maskStyle_, workingFolder_, downloadUrl_, horizonMethod_, nearFieldRadius_)
             if validInputData:
                 if _runIt:
                     if validInputData:
-                        terrainShadingMaskUnscaledUnrotated, origin_0_0_0, fileName, objFilePath, rasterFilePath, rasterReprojectedFilePath, rasterTranslatedFilePath, elevationM, valid_Obj_or_Raster_file, printMsg = checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyleLabel)
+                        terrainShadingMaskUnscaledUnrotated, origin_0_0_0, fileName, cacheFilePath, rasterFilePath, elevationM, valid_Obj_or_Raster_file, printMsg = checkObjRasterFile(fileNameIncomplete, workingSubFolderPath, downloadTSVLink, locationName, locationLatitudeD, locationLongitudeD, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyleLabel, nearFieldRadiusM)
                         if valid_Obj_or_Raster_file:
+                            validRasterFile = True
                             if (rasterFilePath != "needless") and (rasterFilePath != "download failed"):  # terrain shading mask NEEDS to be created
-                                terrainShadingMaskUnscaledUnrotated, origin_0_0_0, elevationM = createTerrainShadingMask(objFilePath, rasterFilePath, rasterReprojectedFilePath, rasterTranslatedFilePath, locationLatitudeD, locationLongitudeD, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyle, context_, unitConversionFactor)
-                            scale, terrainShadingMaskScaled_radius, contextRadius, contextCentroid, validContextCentroid, printMsg = scaleTerrainShadingMask(context_, terrainShadingMaskUnscaledUnrotated, origin_0_0_0, locationLatitudeD)
-                            originPt = contextCentroid
-                            if validContextCentroid:
-                                terrainShadingMaskScaledRotated, compassCrvs, titleDescriptionLabelMeshes = compassCrvs_title_scalingRotating(origin_0_0_0, contextCentroid, scale, northVec, terrainShadingMaskUnscaledUnrotated, locationName, locationLatitudeD, locationLongitudeD, heightM, elevationM, minVisibilityRadiusM, maxVisibilityRadiusM, unitConversionFactor, rasterFilePath)
-                                if bakeIt_: bakingGrouping(locationName, locationLatitudeD, locationLongitudeD, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyleLabel, contextCentroid, terrainShadingMaskScaledRotated, compassCrvs, titleDescriptionLabelMeshes)
-                                printOutput(northRad, locationLatitudeD, locationLongitudeD, locationName, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyle, workingSubFolderPath, downloadTSVLink)
-                                terrainShadingMask = terrainShadingMaskScaledRotated; title = titleDescriptionLabelMeshes; maskRadius = terrainShadingMaskScaled_radius; elevation = elevationM
+                                terrainShadingMaskUnscaledUnrotated, origin_0_0_0, elevationM, validRasterFile, printMsg = createTerrainShadingMask(cacheFilePath, rasterFilePath, locationName, locationLatitudeD, locationLongitudeD, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyle, maskStyleLabel, horizonMethod, nearFieldRadiusM, _APIkey, context_, unitConversionFactor)
+                            if validRasterFile:
+                                scale, terrainShadingMaskScaled_radius, contextRadius, contextCentroid, validContextCentroid, printMsg = scaleTerrainShadingMask(context_, terrainShadingMaskUnscaledUnrotated, origin_0_0_0, locationLatitudeD)
+                                originPt = contextCentroid
+                                if validContextCentroid:
+                                    terrainShadingMaskScaledRotated, compassCrvs, titleDescriptionLabelMeshes = compassCrvs_title_scalingRotating(origin_0_0_0, contextCentroid, scale, northVec, terrainShadingMaskUnscaledUnrotated, locationName, locationLatitudeD, locationLongitudeD, heightM, elevationM, minVisibilityRadiusM, maxVisibilityRadiusM, unitConversionFactor, rasterFilePath)
+                                    if bakeIt_: bakingGrouping(locationName, locationLatitudeD, locationLongitudeD, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyleLabel, contextCentroid, terrainShadingMaskScaledRotated, compassCrvs, titleDescriptionLabelMeshes)
+                                    printOutput(northRad, locationLatitudeD, locationLongitudeD, locationName, heightM, minVisibilityRadiusM, maxVisibilityRadiusM, maskStyle, workingSubFolderPath, downloadTSVLink)
+                                    terrainShadingMask = terrainShadingMaskScaledRotated; title = titleDescriptionLabelMeshes; maskRadius = terrainShadingMaskScaled_radius; elevation = elevationM
+                                else:
+                                    print printMsg
+                                    ghenv.Component.AddRuntimeMessage(level, printMsg)
                             else:
                                 print printMsg
                                 ghenv.Component.AddRuntimeMessage(level, printMsg)
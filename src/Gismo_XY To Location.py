@@ -34,7 +34,7 @@ Provided by Gismo 0.0.3
 
 ghenv.Component.Name = "Gismo_XY To Location"
 ghenv.Component.NickName = "XYtoLocation"
-ghenv.Component.Message = "VER 0.0.3\nJAN_29_2019"
+ghenv.Component.Message = "VER 0.0.3\nOCT_17_2026"
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.application
 ghenv.Component.Category = "Gismo"
 ghenv.Component.SubCategory = "1 | Gismo"
@@ -73,26 +73,12 @@ def main(requiredPoint, anchorLocation, anchorOrigin):
     requiredPoint_meters = Rhino.Geometry.Point3d(requiredPoint.X*unitConversionFactor, requiredPoint.Y*unitConversionFactor, requiredPoint.Z*unitConversionFactor)
     
     
-    # inputCRS
-    EPSGcode = 4326  # WGS 84
-    inputCRS_dummy = gismo_gis.CRS_from_EPSGcode(EPSGcode)
-    # outputCRS
-    outputCRS_dummy = gismo_gis.UTM_CRS_from_latitude(anchor_locationLatitudeD, anchor_locationLongitudeD)
+    anchor_originProjected_meters = gismo_gis.projectedLocationCoordinates(anchor_locationLatitudeD, anchor_locationLongitudeD)  # in meters
     
-    anchor_originProjected_meters = gismo_gis.convertBetweenTwoCRS(inputCRS_dummy, outputCRS_dummy, anchor_locationLongitudeD, anchor_locationLatitudeD)  # in meters
-    
-    
-    # inputCRS
     # based on assumption that both anchorLocation_ input and required_location belong to the same UTM zone
-    inputCRS = gismo_gis.UTM_CRS_from_latitude(anchor_locationLatitudeD, anchor_locationLongitudeD, anchor_locationLatitudeD, anchor_locationLongitudeD)
-    
-    # outputCRS
-    EPSGcode = 4326
-    outputCRS = gismo_gis.CRS_from_EPSGcode(EPSGcode)
-    
-    
-    latitudeLongitudePt = gismo_gis.convertBetweenTwoCRS(inputCRS, outputCRS, (anchor_originProjected_meters.X - anchorOrigin_meters.X) + requiredPoint_meters.X, (anchor_originProjected_meters.Y - anchorOrigin_meters.Y) + requiredPoint_meters.Y)
-    required_location = gismo_preparation.constructLocation(locationName, latitudeLongitudePt.Y, latitudeLongitudePt.X, timeZone, elevation)
+    UTM_projection = gismo_gis.UTM_projection(anchor_locationLatitudeD, anchor_locationLongitudeD)
+    latitudes, longitudes = UTM_projection.inverse([(anchor_originProjected_meters.X - anchorOrigin_meters.X) + requiredPoint_meters.X], [(anchor_originProjected_meters.Y - anchorOrigin_meters.Y) + requiredPoint_meters.Y])
+    required_location = gismo_preparation.constructLocation(locationName, latitudes[0], longitudes[0], timeZone, elevation)
     
     
     validInputData = True
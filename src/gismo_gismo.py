@@ -33,7 +33,7 @@ Provided by Gismo 0.0.3
 
 ghenv.Component.Name = "Gismo_Gismo"
 ghenv.Component.NickName = "Gismo"
-ghenv.Component.Message = "VER 0.0.3\nFEB_20_2025"
+ghenv.Component.Message = "VER 0.0.3\nOCT_17_2026"
 ghenv.Component.IconDisplayMode = ghenv.Component.IconDisplayMode.icon
 ghenv.Component.Category = "Gismo"
 ghenv.Component.SubCategory = "0 | Gismo"
@@ -42,6 +42,7 @@ except: pass
 
 from System.Runtime.InteropServices import Marshal
 import ghpythonlib.components as ghc
+import ghpythonlib.parallel
 import rhinoscriptsyntax as rs
 import Rhino.Geometry as rg
 import scriptcontext as sc
@@ -49,7 +50,17 @@ import Grasshopper
 import datetime
 import System
 import shutil
+import struct
+import array
+import json
+import heapq
+import bisect
+import hashlib
+import codecs
+import tempfile
+import threading
 import urllib
+import Queue
 import Rhino
 import time
 import math
@@ -57,6 +68,7 @@ import sys
 import clr
 import csv
 import os
+import re
 
 
 tol = Rhino.RhinoDoc.ActiveDoc.ModelAbsoluteTolerance
@@ -1464,6 +1476,87 @@ class IO():
                     csvwriter.writerow(localizedFloat_and_encoding_L)
             
             return CSV_filefullWithExt
+    
+    
+    # binary terrain cache file (.gtc)
+    terrainCacheSignature = "GISMOGTC"
+    terrainCacheVersion = 1
+    
+    def exportTerrainCache(self, cacheFilePath, header, mesh):
+        """export a mesh and its header to a binary terrain cache file.
+        input:
+            header - a dictionary (georeference, origin, elevation...), saved as json
+        File layout (little-endian):
+            8 bytes signature, uint32 format version, uint32 header length, header, padding to a multiple of 4 bytes,
+            uint32 number of vertices, uint32 number of faces, float32 vertices (x,y,z), int32 faces (a,b,c,d, with d == c for triangles)"""
+        
+        headerString = json.dumps(header).encode("utf-8")
+        headerString += " " * (-(len(self.terrainCacheSignature) + 8 + len(headerString)) % 4)  # so that the vertices and faces blocks start at a multiple of 4 bytes
+        
+        vertices = array.array("f", list(mesh.Vertices.ToFloatArray()))
+        faces = array.array("i", list(mesh.Faces.ToIntArray(False)))
+        if (sys.byteorder != "little"):
+            vertices.byteswap(); faces.byteswap()
+        
+        with open(cacheFilePath, "wb") as cacheFile:
+            cacheFile.write(self.terrainCacheSignature)
+            cacheFile.write(struct.pack("<II", self.terrainCacheVersion, len(headerString)))
+            cacheFile.write(headerString)
+            cacheFile.write(struct.pack("<II", mesh.Vertices.Count, mesh.Faces.Count))
+            cacheFile.write(vertices.tostring())
+            cacheFile.write(faces.tostring())
+        
+        return cacheFilePath
+    
+    
+    def readTerrainCache(self, cacheFilePath):
+        """read a binary terrain cache file exported by "exportTerrainCache" method.
+        The file is memory-mapped. Its vertices and faces blocks have the same memory layout as .NET arrays of Point3f and MeshFace structures, so they are read from the mapped view straight into such arrays, and added to the mesh at once.
+        output:
+            header dictionary and the mesh.
+            None, None if the file is not a terrain cache file, or it has been exported with a newer format version"""
+        
+        with open(cacheFilePath, "rb") as cacheFile:
+            try:
+                if (cacheFile.read(len(self.terrainCacheSignature)) != self.terrainCacheSignature):
+                    return None, None
+                version, headerLength = struct.unpack("<II", cacheFile.read(8))
+                if (version > self.terrainCacheVersion):
+                    return None, None
+                header = json.loads(cacheFile.read(headerLength).decode("utf-8"))
+                numOfVertices, numOfFaces = struct.unpack("<II", cacheFile.read(8))
+            except (struct.error, ValueError):
+                # the file is corrupted
+                return None, None
+            start = cacheFile.tell()
+        
+        if (os.path.getsize(cacheFilePath) < start + numOfVertices*12 + numOfFaces*16):
+            # the file is corrupted
+            return None, None
+        
+        clr.AddReference("System.Core")
+        import System.IO.MemoryMappedFiles
+        
+        # the file is little-endian, the same as .NET on all platforms Rhino runs on
+        vertices = System.Array.CreateInstance(Rhino.Geometry.Point3f, numOfVertices)
+        faces = System.Array.CreateInstance(Rhino.Geometry.MeshFace, numOfFaces)
+        mappedFile = System.IO.MemoryMappedFiles.MemoryMappedFile.CreateFromFile(cacheFilePath, System.IO.FileMode.Open, None, 0, System.IO.MemoryMappedFiles.MemoryMappedFileAccess.Read)
+        try:
+            accessor = mappedFile.CreateViewAccessor(0, 0, System.IO.MemoryMappedFiles.MemoryMappedFileAccess.Read)
+            try:
+                accessor.ReadArray[Rhino.Geometry.Point3f](start, vertices, 0, numOfVertices)
+                accessor.ReadArray[Rhino.Geometry.MeshFace](start + numOfVertices*12, faces, 0, numOfFaces)
+            finally:
+                accessor.Dispose()
+        finally:
+            mappedFile.Dispose()
+        
+        mesh = Rhino.Geometry.Mesh()
+        mesh.Vertices.AddVertices(vertices)
+        mesh.Faces.AddFaces(faces)
+        mesh.Normals.ComputeNormals()
+        
+        return header, mesh
 
 
 class CreateGeometry():
@@ -1670,6 +1763,48 @@ class CreateGeometry():
         return mesh
     
     
+    def meshFromGrid(self, xCoordinates, yCoordinates, zCoordinates, meshColors=None):
+        """
+        create a mesh from a regular grid: "xCoordinates" per column, "yCoordinates" per row and "zCoordinates" as a flat row-major list (first row first).
+        Vertices and faces are added in bulk, in the same order as "meshFromPoints" creates them
+        """
+        numOfColumns = len(xCoordinates)
+        numOfRows = len(yCoordinates)
+        
+        pts = [Rhino.Geometry.Point3d(x, y, zCoordinates[rowStart+i])  for rowStart, y in zip(xrange(0, numOfRows*numOfColumns, numOfColumns), yCoordinates)  for i, x in enumerate(xCoordinates)]
+        
+        mesh = Rhino.Geometry.Mesh()
+        mesh.Vertices.AddVertices(pts)
+        if (meshColors != None) and (len(meshColors) > 0):
+            for color in meshColors:
+                mesh.VertexColors.Add(color)
+        faces = [Rhino.Geometry.MeshFace(k-1+(i-1)*numOfColumns, k-1+i*numOfColumns, k-1+i*numOfColumns+1, k-1+(i-1)*numOfColumns+1)  for i in xrange(1,numOfRows)  for k in xrange(1,numOfColumns)]
+        mesh.Faces.AddFaces(faces)
+        
+        del pts
+        del faces
+        return mesh
+    
+    
+    def simplifiedMeshFromGrid(self, xCoordinates, yCoordinates, zCoordinates, vertexGridPts, faces):
+        """
+        create a mesh from a subset of regular grid points: "vertexGridPts" are (row, column) tuples, and "faces" are tuples of 3 or 4 indices of "vertexGridPts" (for example from "Terrain.simplifyGrid").
+        The grid is defined the same way as in "meshFromGrid"
+        """
+        numOfColumns = len(xCoordinates)
+        
+        pts = [Rhino.Geometry.Point3d(xCoordinates[i], yCoordinates[k], zCoordinates[k*numOfColumns+i])  for k, i in vertexGridPts]
+        meshFaces = [Rhino.Geometry.MeshFace(face[0], face[1], face[2])  if (len(face) == 3)  else Rhino.Geometry.MeshFace(face[0], face[1], face[2], face[3])  for face in faces]
+        
+        mesh = Rhino.Geometry.Mesh()
+        mesh.Vertices.AddVertices(pts)
+        mesh.Faces.AddFaces(meshFaces)
+        
+        del pts
+        del meshFaces
+        return mesh
+    
+    
     def colorMeshVertices(self, mesh, colors):
         """
         color the vertices of a mesh in-place!
@@ -2301,19 +2436,28 @@ class EnvironmentalAnalysis():
         return seasonIndex
     
     
-    def calculateSkyExposureFactor(self, testPt, contextMeshes, latitude, radius, precision, treesTransmissionIndices=[0,[0,0]], leaflessStartHOY=None, leaflessEndHOY=None):
+    def skyDomeRays(self, precision, maxCachedPrecisions=4):
         """
-        calculate sky exposure factor
-        """
-        # lifting up the testPt due to MeshRay intersection
-        tol = Rhino.RhinoDoc.ActiveDoc.ModelAbsoluteTolerance
-        testPtLifted = Rhino.Geometry.Point3d(testPt.X, testPt.Y, testPt.Z+tol)
-        gismo_geometry = CreateGeometry()
+        unit ray directions and weights of the sky dome, used for the sky exposure factor calculation.
+        Sky dome is a hemisphere divided into (precision*5) x int(precision*5/3.5) quad faces. Rays are shot towards the centroids of the faces.
+        Each ray weight is the area of its face divided by the area of the whole sky dome (the sum of all weights is 1). Directions and weights do not depend on the sky dome radius and center.
+        The last "maxCachedPrecisions" results are kept in sc.sticky["gismo_skyDomeRays"].
+        output:
+            directions - list of unit (x,y,z) tuples, per sky dome face
+            weights - list of floats, per sky dome face"""
+        
+        if not sc.sticky.has_key("gismo_skyDomeRays"):
+            sc.sticky["gismo_skyDomeRays"] = []  # list of (precision, directions, weights) tuples. The most recently used is the last one
+        cachedSkyDomeRays = sc.sticky["gismo_skyDomeRays"]
+        
+        for index,(cachedPrecision, directions, weights) in enumerate(cachedSkyDomeRays):
+            if cachedPrecision == precision:
+                cachedSkyDomeRays.append(cachedSkyDomeRays.pop(index))
+                return directions, weights
         
         precisionU = precision*5
         precisionV = int(precisionU/3.5)
         
-        skyDomeHalfSphere = Rhino.Geometry.Sphere(Rhino.Geometry.Plane(Rhino.Geometry.Point3d(testPtLifted),Rhino.Geometry.Vector3d(0,0,1)), radius)
         splittedSkyDomeDomainUmin, splittedSkyDomeDomainUmax = [0, 2*math.pi]  # sphere diameter
         splittedSkyDomeDomainVmin, splittedSkyDomeDomainVmax = [0, 0.5*math.pi]  # sphere vertical arc
         splittedSkyDomeDomainVmax = 0.995*splittedSkyDomeDomainVmax
@@ -2321,185 +2465,2410 @@ class EnvironmentalAnalysis():
         stepU = (splittedSkyDomeDomainUmax - splittedSkyDomeDomainUmin)/precisionU
         stepV = (splittedSkyDomeDomainVmax - splittedSkyDomeDomainVmin)/precisionV
         
+        # sky dome points on a unit sphere (longitude u, latitude v). The first column is repeated at the end, to close the sky dome
         skyDomePts = []
-        for i in xrange(0,precisionU):
+        for i in xrange(0,precisionU+1):
+            u = splittedSkyDomeDomainUmin + stepU*(i % precisionU)
             for k in xrange(0,precisionV):
-                u = splittedSkyDomeDomainUmin + stepU*i
                 v = splittedSkyDomeDomainVmin + stepV*k
-                skyDomePt = skyDomeHalfSphere.PointAt(u,v)
-                skyDomePts.append(skyDomePt)
-        skyDomeMeshPts = skyDomePts + skyDomePts[:precisionV]  # increases precisionU for 1
-        skyDomeMesh = gismo_geometry.meshFromPoints(precisionU+1, precisionV, skyDomeMeshPts)
-        meshFacesCentroids = [skyDomeMesh.Faces.GetFaceCenter(i) for i in xrange(skyDomeMesh.Faces.Count)]
-        meshFaces = skyDomeMesh.Faces
-        meshVertices = skyDomeMesh.Vertices
-        
-        meshFaceAreas = gismo_geometry.calculateMeshFaceAreas(skyDomeMesh)
-        skyDomeMeshArea = sum(meshFaceAreas)
-        skyDomeMeshArea2 = Rhino.Geometry.AreaMassProperties.Compute(skyDomeMesh).Area
-        #print "skyDomeMeshArea: ", skyDomeMeshArea
-        #print "skyDomeMeshArea2: ", skyDomeMeshArea2
-        
-        del skyDomeMeshPts
-        del meshVertices
-        del meshFaces
-        del skyDomeMesh
+                skyDomePts.append((math.cos(v)*math.cos(u), math.cos(v)*math.sin(u), math.sin(v)))
+        
+        def distance(pt1, pt2):
+            return math.sqrt((pt1[0]-pt2[0])**2 + (pt1[1]-pt2[1])**2 + (pt1[2]-pt2[2])**2)
+        
+        def triangleArea(A,B,C):
+            # Heron's formula
+            a = distance(A,B)
+            b = distance(B,C)
+            c = distance(A,C)
+            s = (a+b+c)/2  # triangle semiperimeter
+            return math.sqrt(max(s * (s - a) * (s - b) * (s - c), 0))
+        
+        # quad faces, in the same order as "CreateGeometry.meshFromPoints" creates them
+        directions = []
+        areas = []
+        for i in xrange(1,precisionU+1):
+            for k in xrange(1,precisionV):
+                A = skyDomePts[k-1+(i-1)*precisionV]
+                B = skyDomePts[k-1+i*precisionV]
+                C = skyDomePts[k-1+i*precisionV+1]
+                D = skyDomePts[k-1+(i-1)*precisionV+1]
+                
+                centroid = [(A[j]+B[j]+C[j]+D[j])/4 for j in xrange(3)]
+                centroidLength = math.sqrt(centroid[0]**2 + centroid[1]**2 + centroid[2]**2)
+                directions.append((centroid[0]/centroidLength, centroid[1]/centroidLength, centroid[2]/centroidLength))
+                
+                # split the quad along its shorter diagonal
+                if distance(A,C) > distance(B,D):
+                    areas.append(triangleArea(D,A,B) + triangleArea(D,B,C))
+                else:
+                    areas.append(triangleArea(A,B,C) + triangleArea(A,C,D))
+        
+        skyDomeArea = sum(areas)
+        weights = [area/skyDomeArea for area in areas]
+        
+        cachedSkyDomeRays.append((precision, directions, weights))
+        if len(cachedSkyDomeRays) > maxCachedPrecisions:
+            del cachedSkyDomeRays[0]
+        
+        return directions, weights
+    
+    
+    def calculateSkyExposureFactor(self, testPt, contextMeshes, latitude, radius, precision, treesTransmissionIndices=[0,[0,0]], leaflessStartHOY=None, leaflessEndHOY=None):
+        """
+        calculate sky exposure factor
+        """
+        skyExposureFactor = self.calculateSkyExposureFactors([testPt], contextMeshes, latitude, radius, precision, treesTransmissionIndices, leaflessStartHOY, leaflessEndHOY)[0]
+        
+        return skyExposureFactor
+    
+    
+    def calculateSkyExposureFactors(self, testPts, contextMeshes, latitude, radius, precision, treesTransmissionIndices=[0,[0,0]], leaflessStartHOY=None, leaflessEndHOY=None, parallel=True):
+        """
+        calculate sky exposure factor for each of the testPts.
+        Sky dome rays (directions and weights) are created only once, and shared by all testPts. Each of the contextMeshes is only tested with the rays which did not hit any of the previous ones.
+        If "parallel" is True, testPts are split among multiple threads.
+        "radius" input is not used, as rays are infinite. It is kept for compatibility with previous versions
+        """
+        # lifting up the testPts due to ray intersection
+        tol = Rhino.RhinoDoc.ActiveDoc.ModelAbsoluteTolerance
+        gismo_rayCasting = RayCasting()
+        
+        directions, weights = self.skyDomeRays(precision)
+        rayVectors = [Rhino.Geometry.Vector3d(*direction) for direction in directions]
+        
         leaflessStartHOYdummy = 0; leaflessEndHOYdummy = 1
-        skyExposureFactor = 0  # 0 equals to 100% shading, 1 equals to 0% shading
-        for i,centroid in enumerate(meshFacesCentroids):
-            raysIntensityWithoutTransmissionIndex = meshFaceAreas[i]/skyDomeMeshArea
-            vector = Rhino.Geometry.Vector3d(centroid)-Rhino.Geometry.Vector3d(testPtLifted)
-            ray = Rhino.Geometry.Ray3d(testPtLifted, vector)
+        # season of each ray does not depend on testPt
+        seasonIndicesDummy = [self.noLeavesPeriod("perHoy", latitude, i, leaflessStartHOYdummy, leaflessEndHOYdummy) for i in xrange(len(directions))]
+        
+        def skyExposureFactorPerPt(testPt):
+            testPtLifted = Rhino.Geometry.Point3d(testPt.X, testPt.Y, testPt.Z+tol)
+            
+            # index of the first mesh from contextMeshes hitted by each ray. Each mesh is only tested with rays which did not hit any of the previous meshes
+            hittedMeshIndices = [None]*len(directions)
             for meshIndex,mesh in enumerate(contextMeshes):
-                intersectParam = Rhino.Geometry.Intersect.Intersection.MeshRay(mesh,ray)
-                # ray hitted something
-                if intersectParam >= 0:
-                    seasonIndexDummy = self.noLeavesPeriod("perHoy", latitude, i, leaflessStartHOYdummy, leaflessEndHOYdummy)
-                    if meshIndex == 0:  # context mesh hitted
-                        treesTransmissionIndex = 0
-                    elif meshIndex == 1:  # coniferousTrees mesh hitted
-                        treesTransmissionIndex = treesTransmissionIndices[0]
-                    elif meshIndex == 2:  # deciduousTrees mesh hitted
-                        treesTransmissionIndex = treesTransmissionIndices[1][seasonIndexDummy]
-                    skyExposureFactor += raysIntensityWithoutTransmissionIndex*treesTransmissionIndex
-                    break
-            # no hitting, the ray only hits the sky dome
-            else:
-                treesTransmissionIndex = 1
-                skyExposureFactor += raysIntensityWithoutTransmissionIndex * treesTransmissionIndex
+                notHittedRayIndices = [i for i in xrange(len(directions)) if (hittedMeshIndices[i] == None)]
+                hits = gismo_rayCasting.meshRays(mesh, [testPtLifted], [rayVectors[i] for i in notHittedRayIndices])
+                for rayIndex,(intersectParam, faceIndex) in zip(notHittedRayIndices, hits):
+                    if intersectParam >= 0:
+                        hittedMeshIndices[rayIndex] = meshIndex
+            
+            skyExposureFactor = 0  # 0 equals to 100% shading, 1 equals to 0% shading
+            for i in xrange(len(directions)):
+                raysIntensityWithoutTransmissionIndex = weights[i]
+                for meshIndex in xrange(len(contextMeshes)):
+                    # ray hitted something
+                    if hittedMeshIndices[i] == meshIndex:
+                        seasonIndexDummy = seasonIndicesDummy[i]
+                        if meshIndex == 0:  # context mesh hitted
+                            treesTransmissionIndex = 0
+                        elif meshIndex == 1:  # coniferousTrees mesh hitted
+                            treesTransmissionIndex = treesTransmissionIndices[0]
+                        elif meshIndex == 2:  # deciduousTrees mesh hitted
+                            treesTransmissionIndex = treesTransmissionIndices[1][seasonIndexDummy]
+                        skyExposureFactor += raysIntensityWithoutTransmissionIndex*treesTransmissionIndex
+                        break
+                # no hitting, the ray only hits the sky dome
+                else:
+                    treesTransmissionIndex = 1
+                    skyExposureFactor += raysIntensityWithoutTransmissionIndex * treesTransmissionIndex
+            
+            return skyExposureFactor
+        
+        if parallel and (len(testPts) > 1):
+            skyExposureFactors = list(ghpythonlib.parallel.run(skyExposureFactorPerPt, list(testPts), False))
+        else:
+            skyExposureFactors = [skyExposureFactorPerPt(testPt) for testPt in testPts]
         
-        del meshFacesCentroids
+        return skyExposureFactors
+    
+    
+    def highestHittingRayIndex(self, rayHits, numOfRays, numOfRefinementRays=8):
+        """
+        find the index of the highest ray in a single sky dome column (azimuth) which hits the context, without shooting all of the column rays.
+        Seen from a single point, rays of a column hit the context up to a certain elevation, and miss it above it. The transition is found by bisection.
+        A short sweep of rays above the found transition follows, to catch the context hit above a gap (for example a roof overhang). If a hit is found, bisection continues from it.
+        input:
+            rayHits - function which takes the ray index (0 to numOfRays-1, from the lowest to the highest ray) and returns True if that ray hits the context
+            numOfRays - number of rays in the column
+            numOfRefinementRays - number of rays above the transition which are shot individually
+        output:
+            index of the highest ray which hits the context. Or -1 if none of the rays hits it"""
         
-        return skyExposureFactor
+        if not rayHits(0):
+            hitIndex = -1
+        else:
+            hitIndex = 0
+        
+        while True:
+            # bisection: "hitIndex" ray hits, and all rays above "missIndex" (including it) are assumed to miss
+            if (hitIndex >= 0):
+                missIndex = numOfRays
+                while (missIndex - hitIndex > 1):
+                    midIndex = (hitIndex + missIndex) // 2
+                    if rayHits(midIndex):
+                        hitIndex = midIndex
+                    else:
+                        missIndex = midIndex
+            
+            # refinement sweep above the transition
+            for k in xrange(hitIndex+2, min(hitIndex+2+numOfRefinementRays, numOfRays)):
+                if rayHits(k):
+                    hitIndex = k
+                    break
+            else:
+                return hitIndex
 
 
-class GIS():
+class Terrain():
     """
-    methods for manipulation of GIS data
+    methods for analysis of terrain elevation grids (DEM).
+    An elevation grid is a list of rows (from top to bottom), each row being a list of elevations (from left to right).
+    These methods use python lists and floats only (no Rhino geometry), so they can be tested outside of Rhino
     """
-    def calculate_CRS_UTMzone(self, locationLatitudeD, locationLongitudeD):
-        """
-        calculate CRS UTMzone code based on location's latitude-longitude
+    def elevationAt(self, elevationLL, startX, startY, cellsizeX, cellsizeY, x, y):
         """
-        # by http://stackoverflow.com/a/9188972/3137724 (link given by Even Rouault)
-        CRS_UTMzone = (math.floor((locationLongitudeD + 180)/6) % 60) + 1
-        if locationLatitudeD >= 0:
-            # for northern hemisphere
-            northOrsouth = "north"
-            CRS_EPSG_code = 32600 + CRS_UTMzone
-        elif locationLatitudeD < 0:
-            # for southern hemisphere
-            northOrsouth = "south"
-            CRS_EPSG_code = 32700 + CRS_UTMzone
+        bilinear interpolation of the elevation grid at x,y coordinates.
+        input:
+            elevationLL - elevation grid
+            startX, startY - coordinates of the upper left grid point (row 0, column 0)
+            cellsizeX, cellsizeY - positive distances between grid points in X and Y direction
+            x, y - coordinates of the point
+        output:
+            interpolated elevation, or None if x,y is outside of the grid"""
         
-        return CRS_EPSG_code, int(CRS_UTMzone), northOrsouth
+        numOfRows = len(elevationLL)
+        numOfColumns = len(elevationLL[0])
+        
+        fi = (x - startX) / cellsizeX
+        fk = (startY - y) / cellsizeY
+        if (fi < 0) or (fk < 0) or (fi > numOfColumns-1) or (fk > numOfRows-1):
+            return None
+        
+        i0 = min(int(fi), numOfColumns-2)
+        k0 = min(int(fk), numOfRows-2)
+        ti = fi - i0
+        tk = fk - k0
+        row0 = elevationLL[k0]
+        row1 = elevationLL[k0+1]
+        elevation = (row0[i0]*(1-ti) + row0[i0+1]*ti)*(1-tk) + (row1[i0]*(1-ti) + row1[i0+1]*ti)*tk
+        
+        return elevation
     
     
-    def UTM_CRS_from_latitude(self, locationLatitudeD, locationLongitudeD, originLatitudeD = 0, originLongitudeD = 0):
-        """
-        create UTM CRS from latitude, longitude and anchor latitude, anchor longitude
+    def horizonScan(self, elevationLL, startX, startY, cellsizeX, cellsizeY, observerPt, azimuthsR, minRadius=0, maxRadius=None):
         """
-        CRS = MapWinGIS.GeoProjectionClass()
-        CRS_EPSG_code, CRS_UTMzone, northOrsouth = self.calculate_CRS_UTMzone(locationLatitudeD, locationLongitudeD)
-        proj4_string = "+proj=utm +zone=%s +%s +datum=WGS84 +ellps=WGS84 +lat_0=%s +lon_0=%s" % (CRS_UTMzone, northOrsouth, originLatitudeD, originLongitudeD)#, resamplingMethod)
-        CRS.ImportFromProj4(proj4_string)
+        calculate the horizon profile seen from the observerPt, by walking each azimuth outward across the elevation grid once, and keeping the maximal elevation angle.
+        The terrain is treated as the mesh made from grid points: along a straight line, the elevation angle of a planar mesh face is the largest at the face edges.
+        That is why the elevation is only evaluated where the azimuth crosses the grid lines (one evaluation per crossed cell), and at the minRadius and maxRadius, where the mesh faces cut by them are clipped.
+        input:
+            elevationLL - elevation grid. Any correction for Earth's curvature and refraction has to be applied to it beforehand
+            startX, startY - coordinates of the upper left grid point (row 0, column 0)
+            cellsizeX, cellsizeY - positive distances between grid points in X and Y direction
+            observerPt - (x,y,z) tuple of the viewpoint. It needs to be inside of the grid
+            azimuthsR - list of azimuth angles in radians, measured counter-clockwise from the +X axis
+            minRadius - horizontal distance from the observerPt, closer than which the terrain will not be taken into account
+            maxRadius - horizontal distance from the observerPt, farther than which the terrain will not be taken into account. None for the whole grid
+        output:
+            horizonAnglesR - the maximal elevation angle (in radians) of the terrain, for each azimuth from azimuthsR"""
+        
+        numOfRows = len(elevationLL)
+        numOfColumns = len(elevationLL[0])
+        observerX, observerY, observerZ = observerPt
+        maxDistance = float("inf") if (maxRadius == None) else maxRadius
+        
+        # the highest grid point is used to stop walking an azimuth early: once it can not rise above the current horizon
+        maxHeightAboveObserver = max([max(row) for row in elevationLL]) - observerZ
+        
+        startDistance = max(minRadius, 1e-9)
+        parallelTol = 1e-12
+        
+        def meshElevationAt(x, y):
+            # elevation of the mesh triangle at x,y. None if x,y is outside of the grid
+            fi = (x - startX) / cellsizeX
+            fk = (startY - y) / cellsizeY
+            if (fi < 0) or (fk < 0) or (fi > numOfColumns-1) or (fk > numOfRows-1):
+                return None
+            i0 = min(int(fi), numOfColumns-2)
+            k0 = min(int(fk), numOfRows-2)
+            ti = fi - i0
+            tk = fk - k0
+            elevation00 = elevationLL[k0][i0]
+            elevation11 = elevationLL[k0+1][i0+1]
+            if (ti >= tk):
+                # triangle above the (i,k)-(i+1,k+1) diagonal
+                elevation10 = elevationLL[k0][i0+1]
+                return elevation00 + (elevation10 - elevation00)*ti + (elevation11 - elevation10)*tk
+            else:
+                elevation01 = elevationLL[k0+1][i0]
+                return elevation00 + (elevation01 - elevation00)*tk + (elevation11 - elevation01)*ti
+        
+        horizonAnglesR = []
+        for azimuthR in azimuthsR:
+            dirX = math.cos(azimuthR)
+            dirY = math.sin(azimuthR)
+            maxTangent = float("-inf")
+            
+            # mesh faces cut by the minRadius and maxRadius are clipped at them: the elevation angles at the clipping points are candidates too
+            for clipDistance in (minRadius, maxRadius):
+                if (clipDistance != None) and (clipDistance > 0) and (minRadius <= clipDistance <= maxDistance):
+                    elevation = meshElevationAt(observerX + dirX*clipDistance, observerY + dirY*clipDistance)
+                    if (elevation != None):
+                        maxTangent = max(maxTangent, (elevation - observerZ) / clipDistance)
+            
+            # a) crossings with the grid columns (vertical grid lines): linear interpolation between two rows
+            if (abs(dirX) > parallelTol):
+                firstColumn = (observerX + dirX*startDistance - startX) / cellsizeX
+                if (dirX > 0):
+                    columnIndices = xrange(max(int(math.ceil(firstColumn)), 0), numOfColumns)
+                else:
+                    columnIndices = xrange(min(int(math.floor(firstColumn)), numOfColumns-1), -1, -1)
+                for i in columnIndices:
+                    distance = (startX + i*cellsizeX - observerX) / dirX
+                    fk = (startY - observerY - dirY*distance) / cellsizeY
+                    if (fk < 0) or (fk > numOfRows-1) or (distance > maxDistance):
+                        # azimuth left the grid
+                        break
+                    k0 = min(int(fk), numOfRows-2)
+                    tk = fk - k0
+                    elevation = elevationLL[k0][i]*(1-tk) + elevationLL[k0+1][i]*tk
+                    tangent = (elevation - observerZ) / distance
+                    if (tangent > maxTangent):
+                        maxTangent = tangent
+                    elif (maxTangent >= 0) and (maxHeightAboveObserver <= maxTangent*distance):
+                        # no farther grid point can rise above the current horizon
+                        break
+            
+            # b) crossings with the grid rows (horizontal grid lines): linear interpolation between two columns
+            if (abs(dirY) > parallelTol):
+                firstRow = (startY - observerY - dirY*startDistance) / cellsizeY
+                if (dirY < 0):
+                    rowIndices = xrange(max(int(math.ceil(firstRow)), 0), numOfRows)
+                else:
+                    rowIndices = xrange(min(int(math.floor(firstRow)), numOfRows-1), -1, -1)
+                for k in rowIndices:
+                    distance = (startY - k*cellsizeY - observerY) / dirY
+                    fi = (observerX + dirX*distance - startX) / cellsizeX
+                    if (fi < 0) or (fi > numOfColumns-1) or (distance > maxDistance):
+                        # azimuth left the grid
+                        break
+                    i0 = min(int(fi), numOfColumns-2)
+                    ti = fi - i0
+                    row = elevationLL[k]
+                    elevation = row[i0]*(1-ti) + row[i0+1]*ti
+                    tangent = (elevation - observerZ) / distance
+                    if (tangent > maxTangent):
+                        maxTangent = tangent
+                    elif (maxTangent >= 0) and (maxHeightAboveObserver <= maxTangent*distance):
+                        # no farther grid point can rise above the current horizon
+                        break
+            
+            # c) crossings with the cell diagonals (each quad mesh face is split into two triangles along its (i,k)-(i+1,k+1) diagonal): column index - row index is an integer on them
+            diagonalSlope = dirX/cellsizeX + dirY/cellsizeY
+            if (abs(diagonalSlope) > parallelTol):
+                diagonalAtObserver = (observerX - startX)/cellsizeX - (startY - observerY)/cellsizeY
+                firstDiagonal = diagonalAtObserver + diagonalSlope*startDistance
+                if (diagonalSlope > 0):
+                    diagonalIndices = xrange(int(math.ceil(firstDiagonal)), numOfColumns)
+                else:
+                    diagonalIndices = xrange(int(math.floor(firstDiagonal)), -numOfRows, -1)
+                for m in diagonalIndices:
+                    distance = (m - diagonalAtObserver) / diagonalSlope
+                    fi = (observerX + dirX*distance - startX) / cellsizeX
+                    fk = fi - m
+                    if (fi < 0) or (fk < 0) or (fi > numOfColumns-1) or (fk > numOfRows-1) or (distance > maxDistance):
+                        # azimuth left the grid
+                        break
+                    i0 = min(int(fi), numOfColumns-2, numOfRows-2+m)
+                    ti = fi - i0
+                    elevation = elevationLL[i0-m][i0]*(1-ti) + elevationLL[i0-m+1][i0+1]*ti
+                    tangent = (elevation - observerZ) / distance
+                    if (tangent > maxTangent):
+                        maxTangent = tangent
+                    elif (maxTangent >= 0) and (maxHeightAboveObserver <= maxTangent*distance):
+                        # no farther grid point can rise above the current horizon
+                        break
+            
+            horizonAnglesR.append(math.atan(maxTangent))  # math.atan(-inf) = -pi/2, when no grid line has been crossed
         
-        return CRS
+        return horizonAnglesR
     
     
-    def CRS_from_EPSGcode(self, EPSGcode):
+    def resolutionPyramid(self, elevationLL, startX, startY, cellsizeX, cellsizeY, numOfLevels):
         """
-        create CRS from EPSG code
+        coarser copies of the elevation grid: each level has two times larger cell size than the previous one. The terrain mesh of each coarser level is never lower than the one of the previous level (and so of the inputted grid), at any x,y point.
+        A grid point of a coarser level gets the maximal elevation of all grid points of the previous level, under the coarser mesh faces around it (3x3 previous level cells in each direction: 6x6 grid points).
+        Grid points of a coarser level are placed half a previous level cell outside of its corner grid points, so that each level covers the whole inputted grid.
+        output:
+            levels - list of (elevationLL, startX, startY, cellsizeX, cellsizeY) tuples, starting with the inputted grid. It has less than numOfLevels items if the grid becomes smaller than 4x4 grid points"""
+        
+        levels = [(elevationLL, startX, startY, cellsizeX, cellsizeY)]
+        while (len(levels) < numOfLevels) and (len(elevationLL) >= 4) and (len(elevationLL[0]) >= 4):
+            # coarser grid point "a" is at the previous level grid point 2*a-0.5. Its mesh faces cover the previous level grid points from 2*a-3 to 2*a+2
+            numOfCoarserRows = int(math.ceil((len(elevationLL)-0.5)/2)) + 1
+            numOfCoarserColumns = int(math.ceil((len(elevationLL[0])-0.5)/2)) + 1
+            rowMaxLL = [[max(row[max(2*a-3, 0):2*a+3])  for a in xrange(numOfCoarserColumns)]  for row in elevationLL]
+            coarserElevationLL = [[max(column)  for column in zip(*rowMaxLL[max(2*b-3, 0):2*b+3])]  for b in xrange(numOfCoarserRows)]
+            del rowMaxLL
+            elevationLL = coarserElevationLL
+            startX -= cellsizeX/2
+            startY += cellsizeY/2
+            cellsizeX *= 2
+            cellsizeY *= 2
+            levels.append((elevationLL, startX, startY, cellsizeX, cellsizeY))
+        
+        return levels
+    
+    
+    def multiResolutionHorizonScan(self, levels, observerPt, azimuthsR, minRadius=0):
         """
-        CRS = MapWinGIS.GeoProjectionClass()
-        CRS.ImportFromEPSG(EPSGcode)
+        horizon scan over a number of elevation grids of increasing cell size: each grid is only walked in its own ring of distances from the observerPt.
+        A coarser grid from "resolutionPyramid" method is only used to find the azimuths on which its ring can rise above the horizon of the previous rings. Only these azimuths are walked across the finer grid it has been made from, which gives their horizon angles.
+        When the cell size doubles each time the distance doubles, most azimuths of the distant rings are skipped after walking a small number of coarser grid points.
+        input:
+            levels - list of (elevationLL, startX, startY, cellsizeX, cellsizeY, maxRadius, finerGrid) tuples, ordered from the finest to the coarsest grid.
+                     Each grid is used from the maxRadius of the previous grid to its own maxRadius (None for the whole grid). All grids need to contain the observerPt.
+                     finerGrid is None if the horizon angles are taken from the grid itself. Otherwise it is the (elevationLL, startX, startY, cellsizeX, cellsizeY) tuple of the finer grid, whose terrain mesh is never higher than the one of this grid
+        output:
+            horizonAnglesR - the maximal elevation angle (in radians) of the terrain, for each azimuth from azimuthsR"""
+        
+        horizonAnglesR = [-math.pi/2] * len(azimuthsR)
+        ringStart = minRadius
+        for elevationLL, startX, startY, cellsizeX, cellsizeY, maxRadius, finerGrid in levels:
+            if (maxRadius != None) and (maxRadius <= ringStart):
+                continue
+            if (finerGrid == None):
+                levelHorizonAnglesR = self.horizonScan(elevationLL, startX, startY, cellsizeX, cellsizeY, observerPt, azimuthsR, ringStart, maxRadius)
+            else:
+                # the ring is widened by a cell diagonal on both sides, so that the coarser mesh faces above all finer grid points of the ring are walked
+                cellDiagonal = math.hypot(cellsizeX, cellsizeY)
+                boundAnglesR = self.horizonScan(elevationLL, startX, startY, cellsizeX, cellsizeY, observerPt, azimuthsR, max(ringStart-cellDiagonal, 0), (None if (maxRadius == None) else maxRadius+cellDiagonal))
+                risingIndices = [index  for index in xrange(len(azimuthsR))  if (boundAnglesR[index] > horizonAnglesR[index])]
+                levelHorizonAnglesR = [-math.pi/2] * len(azimuthsR)
+                if (len(risingIndices) > 0):
+                    finerElevationLL, finerStartX, finerStartY, finerCellsizeX, finerCellsizeY = finerGrid
+                    risingAnglesR = self.horizonScan(finerElevationLL, finerStartX, finerStartY, finerCellsizeX, finerCellsizeY, observerPt, [azimuthsR[index]  for index in risingIndices], ringStart, maxRadius)
+                    for index, angleR in zip(risingIndices, risingAnglesR):
+                        levelHorizonAnglesR[index] = angleR
+            horizonAnglesR = [max(angle1R, angle2R)  for angle1R, angle2R in zip(horizonAnglesR, levelHorizonAnglesR)]
+            if (maxRadius == None):
+                break
+            ringStart = maxRadius
         
-        return CRS
+        return horizonAnglesR
     
     
-    def convertBetweenTwoCRS(self, inputCRS, outputCRS, firstCoordinate, secondCoordinate):
-        """
-        convert coordinates from one CRS to another
+    def viewshed(self, elevationLL, startX, startY, cellsizeX, cellsizeY, observerPt):
         """
-        successStartTransform = inputCRS.StartTransform(outputCRS)
+        calculate the minimal elevation at which each grid point is visible from the observerPt (XDraw viewshed algorithm).
+        Grid points are processed in rings (squares) around the observer, from the closest ring to the farthest one. The line of sight to a grid point crosses the previous ring between two of its grid points. The horizon (maximal elevation angle tangent) in front of the grid point is linearly interpolated from the horizons of those two grid points.
+        Each grid point is visited only once.
+        input:
+            elevationLL - elevation grid
+            startX, startY - coordinates of the upper left grid point (row 0, column 0)
+            cellsizeX, cellsizeY - positive distances between grid points in X and Y direction
+            observerPt - (x,y,z) tuple of the viewpoint (eye). It is moved to the closest grid point, keeping its z coordinate
+        output:
+            minVisibleElevationLL - grid of minimal visible elevations. A point above a grid location is visible from the observerPt, if its elevation is equal or higher than the one interpolated from this grid.
+                                    Grid points with no terrain in front of them (around the observer) are set to the lowest elevation of the elevationLL"""
+        
+        numOfRows = len(elevationLL)
+        numOfColumns = len(elevationLL[0])
+        observerX, observerY, observerZ = observerPt
+        
+        oi = min(max(int(round((observerX - startX) / cellsizeX)), 0), numOfColumns-1)  # observer column
+        ok = min(max(int(round((startY - observerY) / cellsizeY)), 0), numOfRows-1)  # observer row
+        
+        lowestElevation = min([min(row) for row in elevationLL])
+        
+        # horizonLL: maximal elevation angle tangent from the observer up to each grid point (including it)
+        horizonLL = [[float("-inf")]*numOfColumns for k in xrange(numOfRows)]
+        minVisibleElevationLL = [[lowestElevation]*numOfColumns for k in xrange(numOfRows)]
+        
+        def interpolatedHorizon(k0, i0, k1, i1, t):
+            if (t == 0):
+                return horizonLL[k0][i0]
+            horizon0 = horizonLL[k0][i0]
+            horizon1 = horizonLL[k1][i1]
+            if (horizon0 == float("-inf")) or (horizon1 == float("-inf")):
+                return float("-inf")
+            return horizon0*(1-t) + horizon1*t
+        
+        maxRing = max(oi, numOfColumns-1-oi, ok, numOfRows-1-ok)
+        for ring in xrange(1, maxRing+1):
+            # grid points of the ring: upper and lower rows, then left and right columns without the corners
+            ringPoints = []
+            for k in (ok-ring, ok+ring):
+                if (0 <= k < numOfRows):
+                    ringPoints.extend([(k, i) for i in xrange(max(oi-ring, 0), min(oi+ring, numOfColumns-1)+1)])
+            for i in (oi-ring, oi+ring):
+                if (0 <= i < numOfColumns):
+                    ringPoints.extend([(k, i) for k in xrange(max(ok-ring+1, 0), min(ok+ring-1, numOfRows-1)+1)])
+            
+            for k,i in ringPoints:
+                di = i - oi
+                dk = k - ok
+                if (abs(di) >= abs(dk)):
+                    # the line of sight crosses the previous ring's column
+                    previousI = i - (1 if (di > 0) else -1)
+                    fk = ok + dk * float(abs(di)-1) / abs(di)
+                    k0 = int(math.floor(fk))
+                    t = fk - k0
+                    horizonInFront = interpolatedHorizon(k0, previousI, min(k0+1, numOfRows-1), previousI, t)
+                else:
+                    # the line of sight crosses the previous ring's row
+                    previousK = k - (1 if (dk > 0) else -1)
+                    fi = oi + di * float(abs(dk)-1) / abs(dk)
+                    i0 = int(math.floor(fi))
+                    t = fi - i0
+                    horizonInFront = interpolatedHorizon(previousK, i0, previousK, min(i0+1, numOfColumns-1), t)
+                
+                distance = math.sqrt((di*cellsizeX)**2 + (dk*cellsizeY)**2)
+                tangent = (elevationLL[k][i] - observerZ) / distance
+                horizonLL[k][i] = max(horizonInFront, tangent)
+                if (horizonInFront != float("-inf")):
+                    minVisibleElevationLL[k][i] = max(observerZ + horizonInFront*distance, lowestElevation)
         
-        secondCoordinate_ref = clr.StrongBox[System.Double](secondCoordinate)
-        firstCoordinate_ref = clr.StrongBox[System.Double](firstCoordinate)
-        successTransform = MapWinGIS.GeoProjectionClass.Transform(inputCRS, firstCoordinate_ref, secondCoordinate_ref)
+        return minVisibleElevationLL
+    
+    
+    def paddedGrid(self, valuesLL, radius):
+        """
+        extend the grid by "radius" rows and columns on each side, by repeating its edge values"""
         
-        inputCRS.StopTransform()
+        paddedLL = []
+        for row in valuesLL:
+            paddedLL.append([row[0]]*radius + list(row) + [row[-1]]*radius)
+        paddedLL = [list(paddedLL[0]) for k in xrange(radius)] + paddedLL + [list(paddedLL[-1]) for k in xrange(radius)]
         
-        originPtProjected = Rhino.Geometry.Point3d(firstCoordinate_ref.Value, secondCoordinate_ref.Value, 0)
+        return paddedLL
+    
+    
+    def focalSums(self, valuesLL, radius=1, edgeHandling=0):
+        """
+        sum and number of values in a (2*radius+1) x (2*radius+1) window around each grid point (including it). Window of radius 1 is 3x3, radius 2 is 5x5 etc.
+        Calculated from the summed area table of the grid, so the time does not depend on the radius.
+        input:
+            valuesLL - grid of numbers (list of rows)
+            radius - window radius, in number of grid points
+            edgeHandling - 0: windows are cut at the grid edges (only existing grid points are taken into account)
+                           1: grid edge values are repeated outside of the grid, so that each window has (2*radius+1)**2 values
+        output:
+            sumsLL - grid of window sums
+            countsLL - grid of numbers of values in windows"""
+        
+        if (edgeHandling == 1):
+            sumsLL, countsLL = self.focalSums(self.paddedGrid(valuesLL, radius), radius, 0)
+            sumsLL = [row[radius:len(row)-radius] for row in sumsLL[radius:len(sumsLL)-radius]]
+            countsLL = [row[radius:len(row)-radius] for row in countsLL[radius:len(countsLL)-radius]]
+            return sumsLL, countsLL
+        
+        numOfRows = len(valuesLL)
+        numOfColumns = len(valuesLL[0])
+        
+        # summed area table: integralLL[k][i] is the sum of all values above and left of grid point k,i (excluding its row and column)
+        integralLL = [[0]*(numOfColumns+1)]
+        for k in xrange(numOfRows):
+            row = valuesLL[k]
+            previousIntegralRow = integralLL[k]
+            integralRow = [0]
+            rowSum = 0
+            for i in xrange(numOfColumns):
+                rowSum += row[i]
+                integralRow.append(previousIntegralRow[i+1] + rowSum)
+            integralLL.append(integralRow)
+        
+        sumsLL = []
+        countsLL = []
+        for k in xrange(numOfRows):
+            k0 = max(k-radius, 0)
+            k1 = min(k+radius, numOfRows-1) + 1
+            integralRow0 = integralLL[k0]
+            integralRow1 = integralLL[k1]
+            sumsRow = []
+            countsRow = []
+            for i in xrange(numOfColumns):
+                i0 = max(i-radius, 0)
+                i1 = min(i+radius, numOfColumns-1) + 1
+                sumsRow.append(integralRow1[i1] - integralRow0[i1] - integralRow1[i0] + integralRow0[i0])
+                countsRow.append((k1-k0)*(i1-i0))
+            sumsLL.append(sumsRow)
+            countsLL.append(countsRow)
+        
+        return sumsLL, countsLL
+    
+    
+    def focalMinMax(self, valuesLL, radius=1, edgeHandling=0):
+        """
+        minimal and maximal value in a (2*radius+1) x (2*radius+1) window around each grid point (including it).
+        Each window is split into rows and columns: a sliding window (monotonic queue) is moved along each grid row, and then along each column of the results. The time does not depend on the radius.
+        Edge values do not change the minimum and maximum when repeated, so edgeHandling is the same for both values of it
+        output:
+            minLL, maxLL - grids of window minimums and maximums"""
+        
+        def slidingMinMax(values, radius):
+            # minimums and maximums of [j-radius, j+radius] windows of a list
+            numOfValues = len(values)
+            minimums = []
+            maximums = []
+            minQueue = []; minStart = 0  # indices of values, increasing by value
+            maxQueue = []; maxStart = 0  # indices of values, decreasing by value
+            for j in xrange(numOfValues + radius):
+                if (j < numOfValues):
+                    value = values[j]
+                    while (len(minQueue) > minStart) and (values[minQueue[-1]] >= value):
+                        minQueue.pop()
+                    minQueue.append(j)
+                    while (len(maxQueue) > maxStart) and (values[maxQueue[-1]] <= value):
+                        maxQueue.pop()
+                    maxQueue.append(j)
+                center = j - radius
+                if (center >= 0):
+                    while minQueue[minStart] < center-radius:
+                        minStart += 1
+                    while maxQueue[maxStart] < center-radius:
+                        maxStart += 1
+                    minimums.append(values[minQueue[minStart]])
+                    maximums.append(values[maxQueue[maxStart]])
+            return minimums, maximums
+        
+        numOfRows = len(valuesLL)
+        numOfColumns = len(valuesLL[0])
+        
+        rowMinLL = []
+        rowMaxLL = []
+        for row in valuesLL:
+            minimums, maximums = slidingMinMax(row, radius)
+            rowMinLL.append(minimums)
+            rowMaxLL.append(maximums)
+        
+        minLL = [[None]*numOfColumns for k in xrange(numOfRows)]
+        maxLL = [[None]*numOfColumns for k in xrange(numOfRows)]
+        for i in xrange(numOfColumns):
+            minimums, dummy = slidingMinMax([rowMinLL[k][i] for k in xrange(numOfRows)], radius)
+            dummy, maximums = slidingMinMax([rowMaxLL[k][i] for k in xrange(numOfRows)], radius)
+            for k in xrange(numOfRows):
+                minLL[k][i] = minimums[k]
+                maxLL[k][i] = maximums[k]
+        
+        return minLL, maxLL
+    
+    
+    def ruggednessIndices(self, elevationLL, normalsLL, radius=1, edgeHandling=0):
+        """
+        calculate terrain ruggedness indices in a (2*radius+1) x (2*radius+1) window around each grid point. Window sums, minimums and maximums are calculated once for the whole grid, after which each grid point is visited only once.
+        based on: http://download.osgeo.org/qgis/doc/reference-docs/Terrain_Ruggedness_Index.pdf
+        http://gis.stackexchange.com/a/6059/65002
+        https://github.com/wschwanghart/topotoolbox/blob/master/@GRIDobj/roughness.m
+        input:
+            elevationLL - elevation grid
+            normalsLL - grid of unit surface normals: (x,y,z) tuples
+            radius, edgeHandling - check "focalSums" method
+        output:
+            TRI_LL - Terrain Ruggedness Index (Riley): square root of the sum of squared elevation differences between the grid point and the rest of the window
+            SRF_LL - Surface Roughness Factor (Hobson): length of the sum of window normals, divided by their number
+            TPI_LL - Topographic Position Index: grid point elevation minus the mean elevation of the rest of the window. 0 if the window contains only the grid point
+            ERR_LL - Elevation-Relief Ratio (Pike and Wilson): (mean - minimum) / (maximum - minimum) of the window elevations"""
+        
+        numOfRows = len(elevationLL)
+        numOfColumns = len(elevationLL[0])
+        
+        elevationSumsLL, countsLL = self.focalSums(elevationLL, radius, edgeHandling)
+        squaredElevationSumsLL, dummy = self.focalSums([[elevation**2 for elevation in row] for row in elevationLL], radius, edgeHandling)
+        normalXsumsLL, dummy = self.focalSums([[normal[0] for normal in row] for row in normalsLL], radius, edgeHandling)
+        normalYsumsLL, dummy = self.focalSums([[normal[1] for normal in row] for row in normalsLL], radius, edgeHandling)
+        normalZsumsLL, dummy = self.focalSums([[normal[2] for normal in row] for row in normalsLL], radius, edgeHandling)
+        minLL, maxLL = self.focalMinMax(elevationLL, radius, edgeHandling)
+        
+        TRI_LL = []; SRF_LL = []; TPI_LL = []; ERR_LL = []
+        for k in xrange(numOfRows):
+            TRI_row = []; SRF_row = []; TPI_row = []; ERR_row = []
+            for i in xrange(numOfColumns):
+                elevation = elevationLL[k][i]
+                elevationSum = elevationSumsLL[k][i]
+                count = countsLL[k][i]
+                
+                # sum of (elevation - windowElevation)**2 expanded. The grid point itself adds 0 to it
+                squaredDifferencesSum = squaredElevationSumsLL[k][i] - 2*elevation*elevationSum + count*elevation**2
+                TRI_row.append(math.sqrt(max(squaredDifferencesSum, 0)))
+                
+                SRF_row.append(math.sqrt(normalXsumsLL[k][i]**2 + normalYsumsLL[k][i]**2 + normalZsumsLL[k][i]**2) / count)
+                
+                if (count > 1):
+                    TPI_row.append(elevation - (elevationSum - elevation)/(count - 1))
+                else:
+                    TPI_row.append(0)  # the window contains only the grid point: radius 0, or a single point grid with edgeHandling 0
+                
+                relief = maxLL[k][i] - minLL[k][i]
+                if (relief > 0):
+                    ERR_row.append((elevationSum/count - minLL[k][i]) / relief)
+                else:
+                    ERR_row.append(0.5)  # flat window: mean elevation is in the middle of (zero) relief
+            TRI_LL.append(TRI_row); SRF_LL.append(SRF_row); TPI_LL.append(TPI_row); ERR_LL.append(ERR_row)
         
-        return originPtProjected
+        return TRI_LL, SRF_LL, TPI_LL, ERR_LL
     
     
-    def projectedLocationCoordinates(self, locationLatitudeD, locationLongitudeD):
+    def multiScaleTPI(self, elevationLL, radii, edgeHandling=0):
         """
-        convert latitude,longitude coordinates to x,y projected coordinates
+        multi-scale Topographic Position Index, as maximal deviation from mean elevation (DEVmax) over a range of window radii.
+        For each radius, deviation is the grid point elevation minus the mean window elevation, divided by the standard deviation of the window elevations. Deviations of different radii can be compared to each other.
+        based on: "Scale-optimized surface roughness for topographic analysis", Lindsay, Cockburn, Russell, Geomorphology, 2015.
+        input:
+            elevationLL - elevation grid
+            radii - list of window radii (number of grid points)
+            edgeHandling - check "focalSums" method
+        output:
+            DEVmaxLL - grid of deviations with the largest absolute value
+            radiusLL - grid of window radii at which those deviations occur"""
+        
+        numOfRows = len(elevationLL)
+        numOfColumns = len(elevationLL[0])
+        squaredElevationLL = [[elevation**2 for elevation in row] for row in elevationLL]
+        
+        DEVmaxLL = [[0]*numOfColumns for k in xrange(numOfRows)]
+        radiusLL = [[radii[0]]*numOfColumns for k in xrange(numOfRows)]
+        for radius in radii:
+            elevationSumsLL, countsLL = self.focalSums(elevationLL, radius, edgeHandling)
+            squaredElevationSumsLL, dummy = self.focalSums(squaredElevationLL, radius, edgeHandling)
+            for k in xrange(numOfRows):
+                for i in xrange(numOfColumns):
+                    count = countsLL[k][i]
+                    mean = elevationSumsLL[k][i]/count
+                    variance = squaredElevationSumsLL[k][i]/count - mean**2
+                    if (variance <= 0):
+                        continue
+                    deviation = (elevationLL[k][i] - mean) / math.sqrt(variance)
+                    if abs(deviation) > abs(DEVmaxLL[k][i]):
+                        DEVmaxLL[k][i] = deviation
+                        radiusLL[k][i] = radius
+        
+        return DEVmaxLL, radiusLL
+    
+    
+    def fillGridGaps(self, valuesLL):
         """
-        outputCRS_EPSG_code, CRS_UTMzone, northOrsouth = self.calculate_CRS_UTMzone(locationLatitudeD, locationLongitudeD)
+        replace None values of the grid (grid points outside of the terrain) with the closest value from the same row, or with the closest row if the whole row is None.
+        The terrain edge values are repeated outside of the terrain this way, so they do not create false slopes at the terrain edge"""
+        
+        filledLL = []
+        for row in valuesLL:
+            numOfColumns = len(row)
+            # index of the closest value on the left and on the right side of each grid point
+            leftIndices = [None]*numOfColumns
+            rightIndices = [None]*numOfColumns
+            lastIndex = None
+            for i in xrange(numOfColumns):
+                if (row[i] != None):
+                    lastIndex = i
+                leftIndices[i] = lastIndex
+            lastIndex = None
+            for i in xrange(numOfColumns-1, -1, -1):
+                if (row[i] != None):
+                    lastIndex = i
+                rightIndices[i] = lastIndex
+            
+            filledRow = []
+            for i in xrange(numOfColumns):
+                leftIndex = leftIndices[i]
+                rightIndex = rightIndices[i]
+                if (leftIndex == None):
+                    closestIndex = rightIndex
+                elif (rightIndex == None) or (i - leftIndex <= rightIndex - i):
+                    closestIndex = leftIndex
+                else:
+                    closestIndex = rightIndex
+                filledRow.append(row[closestIndex] if (closestIndex != None) else None)
+            filledLL.append(filledRow)
         
-        # set the CRS to WGS 84
-        inputCRS = MapWinGIS.GeoProjectionClass()
-        inputCRS_EPSG_code = 4326  # WGS 84
-        inputCRS.ImportFromEPSG(inputCRS_EPSG_code)
+        # rows without any value
+        validRowIndices = [k for k,row in enumerate(filledLL) if (row[0] != None)]
+        if (len(validRowIndices) == 0):
+            return filledLL
+        for k in xrange(len(filledLL)):
+            if (filledLL[k][0] == None):
+                closestRowIndex = min(validRowIndices, key=lambda validRowIndex: abs(validRowIndex-k))
+                filledLL[k] = list(filledLL[closestRowIndex])
         
-        # set the output CRS
-        outputCRS = MapWinGIS.GeoProjectionClass()
-        outputCRS.ImportFromEPSG(outputCRS_EPSG_code)
+        return filledLL
+    
+    
+    def surfaceDerivatives(self, elevationLL, cellsizeX, cellsizeY, method=0):
+        """
+        first and second partial derivatives of the elevation grid, from the 3x3 window around each grid point:
+            a b c
+            d e f
+            g h i
+        The whole grid is calculated in one pass. Grid edge values are repeated outside of the grid.
+        based on: "Quantitative analysis of land surface topography", Zevenbergen, Thorne, Earth Surface Processes and Landforms, 1987.
+        "Hill shading and the reflectance map", Horn, Proceedings of the IEEE, 1981.
+        input:
+            elevationLL - elevation grid
+            cellsizeX, cellsizeY - positive distances between grid points in X and Y direction
+            method - 0: Horn (first derivatives from all 8 neighbors, weighted), 1: Zevenbergen-Thorne (first derivatives from 4 closest neighbors)
+                     second derivatives are always calculated with Zevenbergen-Thorne method
+        output:
+            pLL, qLL - grids of dz/dx, dz/dy
+            rLL, sLL, tLL - grids of d2z/dx2, d2z/dxdy, d2z/dy2"""
+        
+        numOfRows = len(elevationLL)
+        numOfColumns = len(elevationLL[0])
+        paddedLL = self.paddedGrid(elevationLL, 1)
+        
+        pLL = []; qLL = []; rLL = []; sLL = []; tLL = []
+        for k in xrange(numOfRows):
+            rowAbove = paddedLL[k]  # "+y" direction
+            row = paddedLL[k+1]
+            rowBelow = paddedLL[k+2]
+            p_row = []; q_row = []; r_row = []; s_row = []; t_row = []
+            for i in xrange(numOfColumns):
+                a = rowAbove[i]; b = rowAbove[i+1]; c = rowAbove[i+2]
+                d = row[i];      e = row[i+1];      f = row[i+2]
+                g = rowBelow[i]; h = rowBelow[i+1]; i_ = rowBelow[i+2]
+                if (method == 0):
+                    p_row.append(((c + 2*f + i_) - (a + 2*d + g)) / (8*cellsizeX))
+                    q_row.append(((a + 2*b + c) - (g + 2*h + i_)) / (8*cellsizeY))
+                else:
+                    p_row.append((f - d) / (2*cellsizeX))
+                    q_row.append((b - h) / (2*cellsizeY))
+                r_row.append((d - 2*e + f) / (cellsizeX**2))
+                s_row.append((c - a + g - i_) / (4*cellsizeX*cellsizeY))
+                t_row.append((b - 2*e + h) / (cellsizeY**2))
+            pLL.append(p_row); qLL.append(q_row); rLL.append(r_row); sLL.append(s_row); tLL.append(t_row)
         
-        successStartTransform = inputCRS.StartTransform(outputCRS)
+        return pLL, qLL, rLL, sLL, tLL
+    
+    
+    def surfaceParameters(self, p, q, r, s, t):
+        """
+        land surface parameters from the partial derivatives of the elevation (check "surfaceDerivatives" method).
+        Curvatures are positive for concave (valley) and negative for convex (ridge) surfaces. Mean curvature is the average of plan and profile curvature.
+        based on: "Digital Terrain Analysis in Soil Science and Geology", Florinsky, 2012.
+        output:
+            slopeR - slope angle, in radians
+            aspectR - slope direction (downhill), clockwise from +Y axis, in radians. 0 for flat surface
+            planCurvature - curvature of the normal section tangential to the contour line (horizontal curvature), in 1/document units
+            profileCurvature - curvature of the normal section in slope direction (vertical curvature), in 1/document units
+            meanCurvature - in 1/document units"""
         
-        locationLatitudeD_ref = clr.StrongBox[System.Double](locationLatitudeD)
-        locationLongitudeD_ref = clr.StrongBox[System.Double](locationLongitudeD)
-        successTransform = MapWinGIS.GeoProjectionClass.Transform(inputCRS, locationLongitudeD_ref, locationLatitudeD_ref)
+        gradientSquared = p**2 + q**2
+        slopeR = math.atan(math.sqrt(gradientSquared))
         
-        inputCRS.StopTransform()
+        meanCurvature = ((1 + q**2)*r - 2*p*q*s + (1 + p**2)*t) / (2 * (1 + gradientSquared)**1.5)
         
-        originPtProjected = Rhino.Geometry.Point3d(locationLongitudeD_ref.Value, locationLatitudeD_ref.Value, 0)
+        if (gradientSquared == 0):
+            # flat surface: slope direction and plan/profile sections are not defined
+            return slopeR, 0, meanCurvature, meanCurvature, meanCurvature
         
-        return originPtProjected
+        aspectR = math.atan2(-p, -q)
+        if (aspectR < 0):
+            aspectR += 2*math.pi
+        planCurvature = (q**2*r - 2*p*q*s + p**2*t) / (gradientSquared * math.sqrt(1 + gradientSquared))
+        profileCurvature = (p**2*r + 2*p*q*s + q**2*t) / (gradientSquared * (1 + gradientSquared)**1.5)
+        
+        return slopeR, aspectR, planCurvature, profileCurvature, meanCurvature
     
     
-    def projectedLocationCoordinates2(locationLatitudeD, locationLongitudeD, unitConversionFactor):
+    # 8 neighbors of a grid point (row offset, column offset): counter clockwise, starting from +X axis. Row offset of -1 is the row above (+Y direction)
+    neighborOffsets = [(0,1), (-1,1), (-1,0), (-1,-1), (0,-1), (1,-1), (1,0), (1,1)]
+    
+    def fillDepressions(self, elevationLL, epsilon=0):
         """
-        convert latitude,longitude coordinates to x,y projected coordinates2
-        this method should be replaced with upper "projectedLocationCoordinates" but only for 4.9.4? > versions of MapWinGIS,
-        due to lack of MapWinGIS.GeoProjectionClass.Transform method in those MapWinGIS methods
+        fill the depressions (pits) of the elevation grid, so that water can flow from each grid point to the grid edge.
+        Grid points are flooded inwards from the grid edge in the order of their elevation (priority queue), so each grid point is visited only once.
+        based on: "Priority-flood: An optimal depression-filling and watershed-labeling algorithm for digital elevation models", Barnes, Lehman, Mulla, Computers & Geosciences, 2014.
+        input:
+            elevationLL - elevation grid. None values are grid points outside of the terrain: the terrain edge next to them is treated as the grid edge
+            epsilon - filled grid points (and flats) are raised by this value above the neighbor they drain to, so that each grid point has a lower neighbor. 0 creates flat filled depressions
+        output:
+            filledLL - filled elevation grid"""
+        
+        numOfRows = len(elevationLL)
+        numOfColumns = len(elevationLL[0])
+        filledLL = [list(row) for row in elevationLL]
+        closedLL = [[(elevation == None) for elevation in row] for row in elevationLL]
+        
+        # grid edge points are the starting points of flooding
+        openHeap = []
+        for k in xrange(numOfRows):
+            for i in xrange(numOfColumns):
+                if closedLL[k][i]:
+                    continue
+                for dk, di in self.neighborOffsets:
+                    neighborK = k + dk
+                    neighborI = i + di
+                    if (neighborK < 0) or (neighborI < 0) or (neighborK >= numOfRows) or (neighborI >= numOfColumns) or (elevationLL[neighborK][neighborI] == None):
+                        openHeap.append((filledLL[k][i], k, i))
+                        closedLL[k][i] = True
+                        break
+        heapq.heapify(openHeap)
+        
+        while openHeap:
+            elevation, k, i = heapq.heappop(openHeap)
+            for dk, di in self.neighborOffsets:
+                neighborK = k + dk
+                neighborI = i + di
+                if (neighborK < 0) or (neighborI < 0) or (neighborK >= numOfRows) or (neighborI >= numOfColumns) or closedLL[neighborK][neighborI]:
+                    continue
+                closedLL[neighborK][neighborI] = True
+                filledLL[neighborK][neighborI] = max(filledLL[neighborK][neighborI], elevation + epsilon)
+                heapq.heappush(openHeap, (filledLL[neighborK][neighborI], neighborK, neighborI))
+        
+        return filledLL
+    
+    
+    def flowReceivers(self, filledLL, cellsizeX, cellsizeY, method=0):
         """
-        outputCRS_EPSG_code, CRS_UTMzone, northOrsouth = self.calculate_CRS_UTMzone(locationLatitudeD, locationLongitudeD)
+        flow direction of each grid point, as the list of its downslope neighbors (receivers) and the fraction of the flow each of them receives.
+        based on: "Extraction of topographic information from digital elevation data", O'Callaghan, Mark, Computer Vision, Graphics, and Image Processing, 1984.
+        "A new method for the determination of flow directions and upslope areas in grid digital elevation models", Tarboton, Water Resources Research, 1997.
+        input:
+            filledLL - elevation grid, with filled depressions (check "fillDepressions" method)
+            cellsizeX, cellsizeY - positive distances between grid points in X and Y direction
+            method - 0: D8 (all the flow goes to the neighbor in the direction of the steepest descent)
+                     1: D-infinity (the steepest descent direction is found on 8 triangular facets around the grid point, and the flow is split between the two neighbors of the facet, proportionally to the angle)
+        output:
+            receiversLL - grid of lists of (row, column, fraction) tuples. Empty list for grid points without a lower neighbor (outlets)"""
+        
+        numOfRows = len(filledLL)
+        numOfColumns = len(filledLL[0])
+        cellsizeXY = math.sqrt(cellsizeX**2 + cellsizeY**2)
+        neighborDistances = [(cellsizeXY if (dk != 0) and (di != 0) else (cellsizeX if (dk == 0) else cellsizeY))  for dk, di in self.neighborOffsets]
+        
+        receiversLL = []
+        for k in xrange(numOfRows):
+            receiversRow = []
+            for i in xrange(numOfColumns):
+                elevation = filledLL[k][i]
+                if (elevation == None):
+                    receiversRow.append([])
+                    continue
+                
+                # elevations of the neighbors. None for neighbors outside of the grid or terrain
+                neighborElevations = []
+                for dk, di in self.neighborOffsets:
+                    neighborK = k + dk
+                    neighborI = i + di
+                    if (neighborK < 0) or (neighborI < 0) or (neighborK >= numOfRows) or (neighborI >= numOfColumns):
+                        neighborElevations.append(None)
+                    else:
+                        neighborElevations.append(filledLL[neighborK][neighborI])
+                
+                receivers = []
+                if (method == 1):
+                    maxSlope = 0
+                    for facetIndex in xrange(8):
+                        # each facet is a triangle of the grid point, one of its cardinal (e1) and one of its diagonal (e2) neighbors
+                        if (facetIndex % 2 == 0):
+                            cardinalIndex = facetIndex; diagonalIndex = facetIndex + 1
+                        else:
+                            cardinalIndex = (facetIndex + 1) % 8; diagonalIndex = facetIndex
+                        e1 = neighborElevations[cardinalIndex]
+                        e2 = neighborElevations[diagonalIndex]
+                        if (e1 == None) or (e2 == None):
+                            continue
+                        d1 = neighborDistances[cardinalIndex]
+                        d2 = cellsizeY if (d1 == cellsizeX) else cellsizeX
+                        s1 = (elevation - e1) / d1
+                        s2 = (e1 - e2) / d2
+                        angleR = math.atan2(s2, s1)
+                        maxAngleR = math.atan2(d2, d1)
+                        if (angleR <= 0):
+                            angleR = 0
+                            slope = s1
+                        elif (angleR >= maxAngleR):
+                            angleR = maxAngleR
+                            slope = (elevation - e2) / cellsizeXY
+                        else:
+                            slope = math.sqrt(s1**2 + s2**2)
+                        if (slope > maxSlope):
+                            maxSlope = slope
+                            diagonalFraction = angleR / maxAngleR
+                            receivers = []
+                            if (diagonalFraction < 1):
+                                receivers.append((k + self.neighborOffsets[cardinalIndex][0], i + self.neighborOffsets[cardinalIndex][1], 1 - diagonalFraction))
+                            if (diagonalFraction > 0):
+                                receivers.append((k + self.neighborOffsets[diagonalIndex][0], i + self.neighborOffsets[diagonalIndex][1], diagonalFraction))
+                
+                if (len(receivers) == 0):
+                    # D8, also used for D-infinity grid points at the terrain edge, which do not have complete facets
+                    maxSlope = 0
+                    for neighborIndex, neighborElevation in enumerate(neighborElevations):
+                        if (neighborElevation == None):
+                            continue
+                        slope = (elevation - neighborElevation) / neighborDistances[neighborIndex]
+                        if (slope > maxSlope):
+                            maxSlope = slope
+                            receivers = [(k + self.neighborOffsets[neighborIndex][0], i + self.neighborOffsets[neighborIndex][1], 1)]
+                
+                receiversRow.append(receivers)
+            receiversLL.append(receiversRow)
         
-        # create a dummy point with locationLatitudeD, locationLongitudeD coordinates
-        dummyShape = MapWinGIS.ShapeClass()
-        dummyShape.ShapeType = MapWinGIS.ShpfileType.SHP_POINT
-        dummyShape.AddPoint(locationLongitudeD, locationLatitudeD)
+        return receiversLL
+    
+    
+    def flowAccumulation(self, filledLL, receiversLL):
+        """
+        number of grid points draining through each grid point (including it).
+        Grid points are visited once, from the highest to the lowest, each passing its accumulated flow to its receivers.
+        input:
+            filledLL - elevation grid, with filled depressions
+            receiversLL - check "flowReceivers" method
+        output:
+            accumulationLL - grid of numbers of upslope grid points. Multiply it by cell area to get the upslope (catchment) area. None for grid points outside of the terrain"""
         
-        # insert a dummy point to the dummyShapefile
-        dummyShapefile = MapWinGIS.ShapefileClass()
-        openShapefileSuccess2 = MapWinGIS.ShapefileClass.CreateNew(dummyShapefile, "", MapWinGIS.ShpfileType.SHP_POINT)
-        shapeIndex2 = clr.StrongBox[System.Int32]()
-        success = dummyShapefile.EditInsertShape(dummyShape, shapeIndex2)
+        accumulationLL = [[(1 if (elevation != None) else None) for elevation in row] for row in filledLL]
         
-        # a single field needs to be defined due to inserting of "dummyShape"
-        fieldName = "5"  # dummy name
-        fieldType = MapWinGIS.FieldType.INTEGER_FIELD
-        fieldPrecision = 1
-        fieldWidth = 1
-        success2 = dummyShapefile.EditAddField(fieldName, fieldType, fieldPrecision, fieldWidth)
+        gridPts = [(elevation, k, i)  for k,row in enumerate(filledLL)  for i,elevation in enumerate(row)  if (elevation != None)]
+        gridPts.sort(reverse=True)
+        for elevation, k, i in gridPts:
+            accumulation = accumulationLL[k][i]
+            for receiverK, receiverI, fraction in receiversLL[k][i]:
+                accumulationLL[receiverK][receiverI] += accumulation * fraction
         
-        # set the CRS of dummyShapefile to WGS 84
-        inputCRS = MapWinGIS.GeoProjectionClass()
-        inputCRS_EPSG_code = 4326  # WGS 84
-        inputCRS.ImportFromEPSG(inputCRS_EPSG_code)
-        dummyShapefile.GeoProjection = inputCRS
+        return accumulationLL
+    
+    
+    def catchments(self, filledLL, receiversLL):
+        """
+        catchment (drainage basin) of each grid point: the index of the outlet it drains to.
+        Grid points are visited once, from the lowest to the highest, each taking the catchment of its main receiver (the one which receives the largest fraction of the flow).
+        input:
+            filledLL - elevation grid, with filled depressions
+            receiversLL - check "flowReceivers" method
+        output:
+            catchmentLL - grid of catchment indices (0, 1, 2...). None for grid points outside of the terrain
+            numOfCatchments - number of catchments"""
+        
+        catchmentLL = [[None]*len(row) for row in filledLL]
+        numOfCatchments = 0
+        
+        gridPts = [(elevation, k, i)  for k,row in enumerate(filledLL)  for i,elevation in enumerate(row)  if (elevation != None)]
+        gridPts.sort()
+        for elevation, k, i in gridPts:
+            receivers = receiversLL[k][i]
+            if (len(receivers) == 0):
+                catchmentLL[k][i] = numOfCatchments
+                numOfCatchments += 1
+            else:
+                receiverK, receiverI, fraction = max(receivers, key=lambda receiver: receiver[2])
+                catchmentLL[k][i] = catchmentLL[receiverK][receiverI]
         
-        shapeFileFolderPath = "C:\\gismo\\shapefile_example2"
-        if not os.path.exists(shapeFileFolderPath):
-            os.makedirs(shapeFileFolderPath)
-        shapefileFilePath = shapeFileFolderPath + "\\dummyShapefile_%s.shp" % str(time.time())
-        success = MapWinGIS.ShapefileClass.SaveAs(dummyShapefile, shapefileFilePath, None)
-        dummyShapefile.Close()
+        return catchmentLL, numOfCatchments
+    
+    
+    def flowPath(self, receiversLL, k, i):
+        """
+        grid points (row, column) which the water passes, flowing from k,i grid point to its outlet. It follows the main receiver of each grid point.
+        Receivers are always lower than the grid point, so the path can not loop"""
+        
+        pathGridPts = [(k, i)]
+        receivers = receiversLL[k][i]
+        while (len(receivers) > 0):
+            k, i, fraction = max(receivers, key=lambda receiver: receiver[2])
+            pathGridPts.append((k, i))
+            receivers = receiversLL[k][i]
+        
+        return pathGridPts
+    
+    
+    def simplifyGrid(self, elevationLL, xCoordinates, yCoordinates, tolerance, coreRadius=0, centerX=0, centerY=0):
+        """
+        adaptive level of detail triangulation of an elevation grid (quadtree).
+        Square blocks of grid points are split into four, until the triangle fan from the block's center point to its corners is closer than the vertical "tolerance" to every grid point inside the block.
+        Neighboring blocks can differ in size by any factor (no 2:1 balancing). The mesh has no cracks anyway: the fan of each block also goes through the corners of smaller neighboring blocks which lie on its edges (T-vertices).
+        If coreRadius > 0, blocks closer than coreRadius to centerX,centerY keep the full resolution, and the tolerance increases linearly with the distance beyond the coreRadius.
+        Returns the grid points (row, column) used as vertices, and the faces as tuples of 3 or 4 vertex indices (counterclockwise when seen from above, the same as "CreateGeometry.meshFromPoints" faces)
+        """
+        numOfRows = len(elevationLL)
+        numOfColumns = len(elevationLL[0])
+        
+        def blockTolerance(k0, i0, size):
+            if (coreRadius <= 0):
+                return tolerance
+            # distance from centerX,centerY to the closest point of the block
+            dx = max(xCoordinates[i0] - centerX, 0, centerX - xCoordinates[min(i0+size, numOfColumns-1)])
+            dy = max(centerY - yCoordinates[k0], 0, yCoordinates[min(k0+size, numOfRows-1)] - centerY)
+            distance = math.sqrt(dx*dx + dy*dy)
+            if (distance <= coreRadius):
+                return 0
+            return tolerance * distance / coreRadius
+        
+        def fanFits(k0, i0, size, blockTol):
+            # maximal vertical deviation of the block's grid points from the four triangles: center-top, center-left, center-bottom, center-right
+            half = size // 2
+            kc = k0 + half; ic = i0 + half
+            zC = elevationLL[kc][ic]
+            zTL = elevationLL[k0][i0]; zTR = elevationLL[k0][i0+size]
+            zBL = elevationLL[k0+size][i0]; zBR = elevationLL[k0+size][i0+size]
+            for k in xrange(k0, k0+size+1):
+                row = elevationLL[k]
+                v = float(k - kc) / half
+                for i in xrange(i0, i0+size+1):
+                    u = float(i - ic) / half
+                    if (abs(v) >= abs(u)):
+                        t = abs(v); w = u
+                        z1, z2 = (zTL, zTR) if (v < 0) else (zBL, zBR)
+                    else:
+                        t = abs(u); w = v
+                        z1, z2 = (zTL, zBL) if (u < 0) else (zTR, zBR)
+                    zFan = zC + (z2 - z1) / 2 * w + ((z1 + z2) / 2 - zC) * t
+                    if (abs(row[i] - zFan) > blockTol):
+                        return False
+            return True
+        
+        # root blocks: the largest power of 2 which fits into the grid. Blocks on the right and bottom edges of the grid overhang it, and are split until their parts fit
+        rootSize = 1
+        while (rootSize*2 <= min(numOfRows, numOfColumns) - 1):
+            rootSize *= 2
+        blocks = [(k0, i0, rootSize)  for k0 in xrange(0, numOfRows-1, rootSize)  for i0 in xrange(0, numOfColumns-1, rootSize)]
+        
+        leaves = []
+        while (len(blocks) > 0):
+            k0, i0, size = blocks.pop()
+            insideGrid = (k0+size <= numOfRows-1) and (i0+size <= numOfColumns-1)
+            if insideGrid and ((size == 1) or fanFits(k0, i0, size, blockTolerance(k0, i0, size))):
+                leaves.append((k0, i0, size))
+            else:
+                half = size // 2
+                for kChild, iChild in ((k0, i0), (k0, i0+half), (k0+half, i0), (k0+half, i0+half)):
+                    if (kChild < numOfRows-1) and (iChild < numOfColumns-1):
+                        blocks.append((kChild, iChild, half))
+        
+        # the corners of all blocks are vertices. Block edges which border smaller blocks also contain their corners
+        vertexIndices = {}
+        for k0, i0, size in leaves:
+            for gridPt in ((k0, i0), (k0+size, i0), (k0+size, i0+size), (k0, i0+size)):
+                if gridPt not in vertexIndices:
+                    vertexIndices[gridPt] = len(vertexIndices)
+        
+        faces = []
+        for k0, i0, size in leaves:
+            if (size == 1):
+                faces.append((vertexIndices[(k0, i0)], vertexIndices[(k0+1, i0)], vertexIndices[(k0+1, i0+1)], vertexIndices[(k0, i0+1)]))
+                continue
+            # block boundary counterclockwise from the upper left corner: down the left edge, right along the bottom edge, up the right edge, left along the top edge
+            boundaryGridPts = [(k, i0)  for k in xrange(k0, k0+size)] + [(k0+size, i)  for i in xrange(i0, i0+size)] + [(k, i0+size)  for k in xrange(k0+size, k0, -1)] + [(k0, i)  for i in xrange(i0+size, i0, -1)]
+            boundaryIndices = [vertexIndices[gridPt]  for gridPt in boundaryGridPts  if gridPt in vertexIndices]
+            centerGridPt = (k0 + size//2, i0 + size//2)
+            vertexIndices[centerGridPt] = len(vertexIndices)
+            centerIndex = vertexIndices[centerGridPt]
+            for j in xrange(len(boundaryIndices)):
+                faces.append((centerIndex, boundaryIndices[j], boundaryIndices[(j+1) % len(boundaryIndices)]))
+        
+        vertexGridPts = [None] * len(vertexIndices)
+        for gridPt, index in vertexIndices.items():
+            vertexGridPts[index] = gridPt
+        
+        return vertexGridPts, faces
+    
+    
+    # marching squares segments per cell case. Case bits are the grid points at or above the contour level: 8 upper left, 4 upper right, 2 lower right, 1 lower left.
+    # Cell edges: 0 top, 1 right, 2 bottom, 3 left. Segments are directed so that the higher terrain is on their left side.
+    # Saddle cases (5 and 10) have two variants: with the cell center below and at or above the contour level
+    contourSegments = {1: ((2,3),), 2: ((1,2),), 3: ((1,3),), 4: ((0,1),), 6: ((0,2),), 7: ((0,3),), 8: ((3,0),), 9: ((2,0),), 11: ((1,0),), 12: ((3,1),), 13: ((2,1),), 14: ((3,2),),
+                       5: (((0,1), (2,3)), ((0,3), (2,1))),
+                       10: (((3,0), (1,2)), ((1,0), (3,2)))}
+    
+    def contourLines(self, elevationLL, xCoordinates, yCoordinates, levels, tolerance=0):
+        """
+        elevation contours of the grid, for all contour levels in one pass over the grid cells (marching squares).
+        Each cell is only visited for the levels between its lowest and highest grid point. Contour segments of neighboring cells share the point on their common cell edge, so they are joined into polylines through a dictionary keyed by the cell edges.
+        input:
+            elevationLL - elevation grid. None values are grid points outside of the terrain: cells touching them get no contours
+            xCoordinates, yCoordinates - coordinates of the grid columns and rows
+            levels - contour elevations
+            tolerance - if larger than 0, polylines are simplified (Douglas-Peucker) so that they do not deviate horizontally from the contour by more than this value
+        output:
+            polylinesLL - list of polylines per level. Each polyline is a list of (x,y,z) tuples, with the higher terrain on its left side. Closed polylines end with their first point"""
+        
+        numOfRows = len(elevationLL)
+        numOfColumns = len(elevationLL[0])
+        sortedLevels = sorted(levels)
+        contourSegments = self.contourSegments
+        
+        # per level: edge from which a segment starts: edge at which it ends. Edge keys are (row*numOfColumns + column)*2 for horizontal and +1 for vertical edges, starting at their upper/left grid point
+        nextEdgesL = [{} for level in sortedLevels]
+        for k in xrange(numOfRows-1):
+            row0 = elevationLL[k]
+            row1 = elevationLL[k+1]
+            for i in xrange(numOfColumns-1):
+                zTL = row0[i]; zTR = row0[i+1]; zBR = row1[i+1]; zBL = row1[i]
+                if (zTL == None) or (zTR == None) or (zBR == None) or (zBL == None):
+                    continue
+                zMin = min(zTL, zTR, zBR, zBL)
+                zMax = max(zTL, zTR, zBR, zBL)
+                firstLevelIndex = bisect.bisect_right(sortedLevels, zMin)
+                lastLevelIndex = bisect.bisect_right(sortedLevels, zMax)
+                if (firstLevelIndex == lastLevelIndex):
+                    continue
+                
+                topEdge = (k*numOfColumns + i)*2
+                cellEdges = (topEdge, topEdge + 3, topEdge + numOfColumns*2, topEdge + 1)
+                for levelIndex in xrange(firstLevelIndex, lastLevelIndex):
+                    level = sortedLevels[levelIndex]
+                    case = (zTL >= level)*8 + (zTR >= level)*4 + (zBR >= level)*2 + (zBL >= level)
+                    segments = contourSegments[case]
+                    if (case == 5) or (case == 10):
+                        segments = segments[(zTL + zTR + zBR + zBL)/4 >= level]
+                    nextEdges = nextEdgesL[levelIndex]
+                    for startEdge, endEdge in segments:
+                        nextEdges[cellEdges[startEdge]] = cellEdges[endEdge]
+        
+        def edgePoint(edge, level):
+            # contour point on the edge, linearly interpolated between its grid points
+            gridPtIndex = edge // 2
+            k0 = gridPtIndex // numOfColumns; i0 = gridPtIndex % numOfColumns
+            k1, i1 = (k0+1, i0) if (edge % 2) else (k0, i0+1)
+            z0 = elevationLL[k0][i0]
+            t = (level - z0) / (elevationLL[k1][i1] - z0)
+            return (xCoordinates[i0] + t*(xCoordinates[i1] - xCoordinates[i0]), yCoordinates[k0] + t*(yCoordinates[k1] - yCoordinates[k0]), level)
+        
+        polylinesLL = []
+        for level, nextEdges in zip(sortedLevels, nextEdgesL):
+            level = float(level)
+            polylines = []
+            # open polylines start at the edges where no segment ends (grid edge, or cells next to None values). The rest are closed
+            endEdges = set(nextEdges.itervalues())
+            startEdges = [edge  for edge in nextEdges  if edge not in endEdges]
+            del endEdges
+            for startEdge in startEdges:
+                edges = [startEdge]
+                while edges[-1] in nextEdges:
+                    edges.append(nextEdges.pop(edges[-1]))
+                polylines.append([edgePoint(edge, level)  for edge in edges])
+            while (len(nextEdges) > 0):
+                startEdge, edge = nextEdges.popitem()
+                edges = [startEdge, edge]
+                while (edge != startEdge):
+                    edge = nextEdges.pop(edge)
+                    edges.append(edge)
+                polylines.append([edgePoint(edge, level)  for edge in edges])
+            
+            if (tolerance > 0):
+                polylines = [self.simplifyPolyline(polyline, tolerance)  for polyline in polylines]
+            polylinesLL.append(polylines)
+        
+        # the same order as inputted levels
+        levelIndices = dict((level, levelIndex)  for levelIndex, level in enumerate(sortedLevels))
+        polylinesLL = [polylinesLL[levelIndices[level]]  for level in levels]
+        
+        return polylinesLL
+    
+    
+    def simplifyPolyline(self, pts, tolerance):
+        """
+        Douglas-Peucker simplification of a polyline in XY plane: only the points farther than "tolerance" from the simplified polyline are kept.
+        The first and the last point are always kept, so closed polylines stay closed"""
+        
+        numOfPts = len(pts)
+        if (numOfPts < 3):
+            return pts
+        
+        keep = [False] * numOfPts
+        keep[0] = keep[-1] = True
+        toleranceSquared = tolerance * tolerance
+        stack = [(0, numOfPts-1)]
+        while (len(stack) > 0):
+            start, end = stack.pop()
+            if (end - start < 2):
+                continue
+            x0, y0 = pts[start][0], pts[start][1]
+            dx = pts[end][0] - x0; dy = pts[end][1] - y0
+            lengthSquared = dx*dx + dy*dy
+            maxDistanceSquared = -1; maxIndex = start
+            for j in xrange(start+1, end):
+                px = pts[j][0] - x0; py = pts[j][1] - y0
+                if (lengthSquared == 0):
+                    # closed polyline: distance from its first point
+                    distanceSquared = px*px + py*py
+                else:
+                    cross = px*dy - py*dx
+                    distanceSquared = cross*cross / lengthSquared
+                if (distanceSquared > maxDistanceSquared):
+                    maxDistanceSquared = distanceSquared; maxIndex = j
+            if (maxDistanceSquared > toleranceSquared) or (lengthSquared == 0):
+                keep[maxIndex] = True
+                stack.append((start, maxIndex))
+                stack.append((maxIndex, end))
+        
+        return [pt  for pt, kept in zip(pts, keep)  if kept]
+
+
+class RayCasting():
+    """
+    shooting a list of rays to a Rhino mesh with Rhino's native "Intersection.MeshRay" ("meshRays" method).
+    "rayTriangleIntersection" and "firstHitsReference" methods are the pure python reference: they use python lists, tuples and floats only (no Rhino geometry), so ray casting results can be checked outside of Rhino.
+    """
+    def meshTriangles(self, mesh):
+        """
+        extract triangles from a Rhino mesh. Quad mesh faces are split into two triangles (A,B,C and A,C,D)
+        output:
+            triangleCoordinates - flat list of triangle vertex coordinates: 9 floats per triangle (ax,ay,az, bx,by,bz, cx,cy,cz)
+            triangleFaceIndices - index of the mesh face, per triangle"""
+        
+        vertices = mesh.Vertices
+        faces = mesh.Faces
+        triangleCoordinates = []
+        triangleFaceIndices = []
+        for faceIndex in xrange(faces.Count):
+            face = faces[faceIndex]
+            A = vertices[face.A]; B = vertices[face.B]; C = vertices[face.C]
+            triangleCoordinates.extend((A.X, A.Y, A.Z, B.X, B.Y, B.Z, C.X, C.Y, C.Z))
+            triangleFaceIndices.append(faceIndex)
+            if face.IsQuad:
+                D = vertices[face.D]
+                triangleCoordinates.extend((A.X, A.Y, A.Z, C.X, C.Y, C.Z, D.X, D.Y, D.Z))
+                triangleFaceIndices.append(faceIndex)
+        
+        return triangleCoordinates, triangleFaceIndices
+    
+    
+    def rayTriangleIntersection(self, origin, direction, triangle):
+        """
+        intersect a ray with a triangle (Moller-Trumbore). Both sides of the triangle are hit
+        input:
+            origin, direction - (x,y,z) tuples
+            triangle - 9 floats: (ax,ay,az, bx,by,bz, cx,cy,cz)
+        output:
+            rayParameter - distance to the hit, in lengths of the direction. Or -1 if the ray does not hit the triangle"""
+        
+        ox, oy, oz = origin
+        dx, dy, dz = direction
+        ax, ay, az, bx, by, bz, cx, cy, cz = triangle
+        e1 = (bx-ax, by-ay, bz-az)
+        e2 = (cx-ax, cy-ay, cz-az)
+        p = (dy*e2[2] - dz*e2[1], dz*e2[0] - dx*e2[2], dx*e2[1] - dy*e2[0])
+        det = e1[0]*p[0] + e1[1]*p[1] + e1[2]*p[2]
+        if det == 0:
+            return -1
+        s = (ox-ax, oy-ay, oz-az)
+        u = (s[0]*p[0] + s[1]*p[1] + s[2]*p[2])/det
+        if (u < 0) or (u > 1):
+            return -1
+        q = (s[1]*e1[2] - s[2]*e1[1], s[2]*e1[0] - s[0]*e1[2], s[0]*e1[1] - s[1]*e1[0])
+        v = (dx*q[0] + dy*q[1] + dz*q[2])/det
+        if (v < 0) or (u + v > 1):
+            return -1
+        rayParameter = (e2[0]*q[0] + e2[1]*q[1] + e2[2]*q[2])/det
+        if rayParameter < 0:
+            return -1
+        
+        return rayParameter
+    
+    
+    def firstHitsReference(self, triangleCoordinates, triangleFaceIndices, origins, directions, maxParameter=None):
+        """
+        shoot rays to a list of triangles. Each ray is tested against all triangles. Slow, use it for testing only.
+        input:
+            triangleCoordinates, triangleFaceIndices - triangles. Check "meshTriangles" method
+            origins, directions - lists of ray origins and ray directions: (x,y,z) tuples. A single origin (a list with one item) can be used for all directions
+            maxParameter - ignore hits farther than maxParameter (in lengths of the direction). Use 1 to intersect line segments from origin to origin+direction
+        output:
+            hits - list of (rayParameter, faceIndex) tuples, per each ray. rayParameter is the distance to the closest hit, in lengths of the direction (the same as "Rhino.Geometry.Intersect.Intersection.MeshRay" result). (-1,-1) if the ray does not hit any triangle"""
+        
+        if maxParameter == None:
+            maxParameter = float("inf")
+        
+        hits = []
+        for rayIndex in xrange(len(directions)):
+            origin = origins[0] if (len(origins) == 1) else origins[rayIndex]
+            closestParameter = maxParameter
+            closestFaceIndex = -1
+            for t in xrange(len(triangleFaceIndices)):
+                rayParameter = self.rayTriangleIntersection(origin, directions[rayIndex], triangleCoordinates[9*t:9*t+9])
+                if (rayParameter >= 0) and (rayParameter <= closestParameter):
+                    closestParameter = rayParameter
+                    closestFaceIndex = triangleFaceIndices[t]
+            if closestFaceIndex == -1:
+                hits.append((-1, -1))
+            else:
+                hits.append((closestParameter, closestFaceIndex))
+        
+        return hits
+    
+    
+    def meshRays(self, mesh, origins, directions, maxParameter=None):
+        """
+        shoot rays to a Rhino mesh, with Rhino.Geometry.Intersect.Intersection.MeshRay.
+        input:
+            origins - list of Rhino.Geometry.Point3d. A single origin (a list with one item) can be used for all directions
+            directions - list of Rhino.Geometry.Vector3d
+            maxParameter - ignore hits farther than maxParameter (in lengths of the direction). Use 1 to intersect line segments from origin to origin+direction
+        output:
+            hits - list of (rayParameter, faceIndex) tuples, per each ray. (-1,-1) if the ray does not hit the mesh. faceIndex is -1 if the ray hits the mesh at a mesh edge"""
+        
+        hits = []
+        for rayIndex in xrange(len(directions)):
+            origin = origins[0] if (len(origins) == 1) else origins[rayIndex]
+            ray = Rhino.Geometry.Ray3d(origin, directions[rayIndex])
+            hitFaceIndices = clr.StrongBox[System.Array[System.Int32]]()
+            rayParameter = Rhino.Geometry.Intersect.Intersection.MeshRay(mesh, ray, hitFaceIndices)
+            if (rayParameter < 0) or ((maxParameter != None) and (rayParameter > maxParameter)):
+                hits.append((-1, -1))
+            elif (hitFaceIndices.Value == None) or (hitFaceIndices.Value.Length == 0):
+                hits.append((rayParameter, -1))
+            else:
+                hits.append((rayParameter, hitFaceIndices.Value[0]))
+        
+        return hits
+
+
+class TerrainBrep():
+    """
+    lazy terrain brep: the NURBS surface is fitted through the terrain grid points only when "brep" method is called for the first time.
+    Fitted breps are kept in sc.sticky per terrain, so rerunning the component with the same terrain does not fit the surface again.
+    gridStep > 1 fits the surface through every gridStep-th grid point in each direction (the last row and column are always used)
+    """
+    stickyKey = "gismo_terrainBreps"
+    maxNumOfCachedBreps = 3  # the least recently used breps are removed first
+    
+    def __init__(self, terrainKey, xCoordinates, yCoordinates, zCoordinates, gridStep=1):
+        self.key = "%s_gridStep=%s" % (terrainKey, gridStep)
+        self.xCoordinates = xCoordinates
+        self.yCoordinates = yCoordinates
+        self.zCoordinates = zCoordinates
+        self.gridStep = gridStep
+    
+    
+    def decimatedIndices(self, numOfIndices):
+        indices = range(0, numOfIndices, self.gridStep)
+        if (indices[-1] != numOfIndices-1):
+            indices.append(numOfIndices-1)
+        return indices
+    
+    
+    def brep(self):
+        """
+        terrain brep. Fitted on the first call, then taken from the cache
+        """
+        if not sc.sticky.has_key(self.stickyKey):
+            sc.sticky[self.stickyKey] = []  # (key, brep) items, the most recently used last
+        cachedBreps = sc.sticky[self.stickyKey]
+        
+        for i, (key, brep) in enumerate(cachedBreps):
+            if (key == self.key):
+                cachedBreps.append(cachedBreps.pop(i))
+                return brep.DuplicateBrep()
+        
+        numOfColumns = len(self.xCoordinates)
+        rowIndices = self.decimatedIndices(len(self.yCoordinates))
+        columnIndices = self.decimatedIndices(numOfColumns)
+        pts = [Rhino.Geometry.Point3d(self.xCoordinates[i], self.yCoordinates[k], self.zCoordinates[k*numOfColumns+i])  for k in rowIndices  for i in columnIndices]
+        
+        uDegree = min(3, len(rowIndices) - 1)
+        vDegree = min(3, len(columnIndices) - 1)
+        uClosed = False; vClosed = False
+        surface = Rhino.Geometry.NurbsSurface.CreateThroughPoints(pts, len(rowIndices), len(columnIndices), uDegree, vDegree, uClosed, vClosed)
+        brep = surface.ToBrep()
+        del pts
+        
+        cachedBreps.append((self.key, brep))
+        while (len(cachedBreps) > self.maxNumOfCachedBreps):
+            cachedBreps.pop(0)
+        
+        return brep.DuplicateBrep()
+
+
+class DEMTileCache():
+    """
+    on-disk cache of downloaded DEM (terrain raster) tiles.
+    Tiles are cells of a regular latitude-longitude grid, one grid per terrain source. Any area covered by downloaded tiles can be created locally by mosaicking and cropping them, instead of downloading it again.
+    Downloaded tiles are listed in an index file, with their file size and time of last use. When the total size of tiles exceeds the maximal cache size, the least recently used tiles are deleted
+    """
+    # tile size in degrees, per terrain source. Around 1000x1000 to 4000x4000 raster cells per tile
+    tileSizesD = {"USGS10m": 0.1, "NASADEM": 0.25, "AW3D30": 0.25, "COP30": 0.25, "GMRT": 1}
+    indexFileName = "0_dem_tiles_index.json"
+    tiffSignatures = (b"II*\x00", b"MM\x00*", b"II+\x00", b"MM\x00+")  # little and big endian TIFF and BigTIFF
+    
+    def __init__(self, cacheFolderPath, maxCacheSizeMB=2000):
+        self.cacheFolderPath = cacheFolderPath
+        self.maxCacheSizeMB = maxCacheSizeMB
+        self.indexFilePath = os.path.join(cacheFolderPath, self.indexFileName)
+    
+    
+    def readIndex(self):
+        """
+        read the index file: a dictionary of tileKey: {"fileName", "sizeMB", "lastUsed"} items.
+        Tiles whose files have been deleted, or are not valid rasters, are removed from it"""
+        
+        try:
+            with open(self.indexFilePath, "r") as indexFile:
+                index = json.load(indexFile)
+        except (IOError, ValueError):
+            # index file does not exist yet, or it is corrupted
+            index = {}
+        
+        for tileKey in list(index.keys()):
+            if not self.validTileFile(os.path.join(self.cacheFolderPath, index[tileKey]["fileName"])):
+                del index[tileKey]
+        
+        return index
+    
+    
+    def validTileFile(self, tileFilePath):
+        """
+        check if the tile file is a TIFF raster. Failed downloads can save an error page (for example "Too many requests") instead of the raster"""
+        
+        try:
+            with open(tileFilePath, "rb") as tileFile:
+                return tileFile.read(4) in self.tiffSignatures
+        except IOError:
+            # tile file does not exist
+            return False
+    
+    
+    def writeIndex(self, index):
+        
+        with open(self.indexFilePath, "w") as indexFile:
+            json.dump(index, indexFile, indent=1, sort_keys=True)
+    
+    
+    def tileKey(self, sourceLabel, tileRow, tileColumn):
+        return "%s_%s_%s" % (sourceLabel, tileRow, tileColumn)
+    
+    
+    def tilesCovering(self, sourceLabel, latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD):
+        """
+        tiles which cover the latitude-longitude bounding box.
+        output:
+            tiles - list of (tileKey, filePath, (latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD)) tuples"""
+        
+        tileSizeD = self.tileSizesD[sourceLabel]
+        
+        tiles = []
+        for tileRow in xrange(int(math.floor(latitudeBottomD/tileSizeD)), int(math.floor(latitudeTopD/tileSizeD)) + 1):
+            for tileColumn in xrange(int(math.floor(longitudeLeftD/tileSizeD)), int(math.floor(longitudeRightD/tileSizeD)) + 1):
+                tileKey = self.tileKey(sourceLabel, tileRow, tileColumn)
+                tileFilePath = os.path.join(self.cacheFolderPath, tileKey + ".tif")
+                tileBoundsD = (tileRow*tileSizeD, (tileRow+1)*tileSizeD, tileColumn*tileSizeD, (tileColumn+1)*tileSizeD)
+                tiles.append((tileKey, tileFilePath, tileBoundsD))
+        
+        return tiles
+    
+    
+    def missingTiles(self, tiles):
+        """
+        tiles (check "tilesCovering" method) which have not been downloaded"""
+        
+        index = self.readIndex()
+        return [tile for tile in tiles if (tile[0] not in index)]
+    
+    
+    def addTiles(self, tiles):
+        """
+        add newly downloaded tiles to the index. Then delete the least recently used tiles if the cache is too large. Tiles which have just been added are never deleted.
+        Downloaded files which are not valid rasters are deleted instead, so that they are downloaded again the next time.
+        output:
+            addedTiles - the tiles which have been added"""
+        
+        index = self.readIndex()
+        addedTiles = []
+        for tileKey, tileFilePath, tileBoundsD in tiles:
+            if self.validTileFile(tileFilePath):
+                index[tileKey] = {"fileName": os.path.basename(tileFilePath), "sizeMB": os.path.getsize(tileFilePath)/1048576.0, "lastUsed": time.time()}
+                addedTiles.append((tileKey, tileFilePath, tileBoundsD))
+            else:
+                try:
+                    os.remove(tileFilePath)
+                except OSError:
+                    # tile file does not exist
+                    pass
+        
+        usedTileKeys = set([tile[0] for tile in addedTiles])
+        totalSizeMB = sum([tileItem["sizeMB"] for tileItem in index.values()])
+        for tileKey in sorted(index.keys(), key=lambda tileKey: index[tileKey]["lastUsed"]):
+            if (totalSizeMB <= self.maxCacheSizeMB):
+                break
+            if (tileKey in usedTileKeys):
+                continue
+            try:
+                os.remove(os.path.join(self.cacheFolderPath, index[tileKey]["fileName"]))
+            except OSError:
+                # tile file is in use, or already deleted
+                continue
+            totalSizeMB -= index[tileKey]["sizeMB"]
+            del index[tileKey]
+        
+        self.writeIndex(index)
+        
+        return addedTiles
+    
+    
+    def useTiles(self, tiles):
+        """
+        mark the already downloaded tiles as recently used"""
+        
+        index = self.readIndex()
+        for tileKey, tileFilePath, tileBoundsD in tiles:
+            if tileKey in index:
+                index[tileKey]["lastUsed"] = time.time()
+        self.writeIndex(index)
+
+
+class RasterCache():
+    """
+    on-disk cache of reprojected (GDALWarp) and resampled (TranslateRaster) rasters.
+    Cached rasters are content addressed: their file names are the hash of the input raster's content together with the operation and its options (target CRS, resampling method, output size). So a changed input raster or different options never return an outdated cached raster.
+    Cached rasters are listed in an index file, with their file size and time of last use. When the total size of cached rasters exceeds the maximal cache size, the least recently used ones are deleted
+    """
+    indexFileName = "0_rasters_index.json"
+    fileHashesStickyKey = "gismo_rasterFileHashes"
+    
+    def __init__(self, cacheFolderPath, maxCacheSizeMB=1000):
+        self.cacheFolderPath = cacheFolderPath
+        self.maxCacheSizeMB = maxCacheSizeMB
+        self.indexFilePath = os.path.join(cacheFolderPath, self.indexFileName)
+    
+    
+    def readIndex(self):
+        """
+        read the index file: a dictionary of rasterKey: {"fileName", "sizeMB", "lastUsed"} items.
+        Rasters whose files have been deleted, or whose size has changed (an interrupted GDAL operation), are removed from it"""
+        
+        try:
+            with open(self.indexFilePath, "r") as indexFile:
+                index = json.load(indexFile)
+        except (IOError, ValueError):
+            # index file does not exist yet, or it is corrupted
+            index = {}
+        
+        for rasterKey in list(index.keys()):
+            rasterFilePath = os.path.join(self.cacheFolderPath, index[rasterKey]["fileName"])
+            if not os.path.exists(rasterFilePath) or (os.path.getsize(rasterFilePath)/1048576.0 != index[rasterKey]["sizeMB"]):
+                del index[rasterKey]
+        
+        return index
+    
+    
+    def writeIndex(self, index):
+        
+        with open(self.indexFilePath, "w") as indexFile:
+            json.dump(index, indexFile, indent=1, sort_keys=True)
+    
+    
+    def fileHash(self, filePath):
+        """
+        md5 hash of the file's content. Hashes are kept in sc.sticky per file path, and only calculated again when the file's size or time of modification changes"""
+        
+        if not sc.sticky.has_key(self.fileHashesStickyKey):
+            sc.sticky[self.fileHashesStickyKey] = {}
+        fileHashes = sc.sticky[self.fileHashesStickyKey]
+        
+        fileStamp = (os.path.getsize(filePath), os.path.getmtime(filePath))
+        if (filePath in fileHashes) and (fileHashes[filePath][0] == fileStamp):
+            return fileHashes[filePath][1]
+        
+        md5 = hashlib.md5()
+        with open(filePath, "rb") as rasterFile:
+            while True:
+                chunk = rasterFile.read(1048576)
+                if not chunk:
+                    break
+                md5.update(chunk)
+        fileHash = md5.hexdigest()
+        fileHashes[filePath] = (fileStamp, fileHash)
+        
+        return fileHash
+    
+    
+    def rasterKey(self, operation, inputRasterFilePath, bstrOptions):
+        return hashlib.md5("%s|%s|%s" % (self.fileHash(inputRasterFilePath), operation, " ".join(bstrOptions.split()))).hexdigest()
+    
+    
+    def cachedRaster(self, operation, inputRasterFilePath, bstrOptions):
+        """
+        raster created from the inputRasterFilePath by "GDALWarp" or "TranslateRaster" operation with bstrOptions. It is taken from the cache, and the operation is only run if it has not been cached yet.
+        Cached rasters are shared between components and runs, so they must not be deleted or modified.
+        output:
+            rasterFilePath - file path of the cached raster, or None if the operation failed
+            gdalErrorMsg - GDAL's error message if the operation failed, None otherwise"""
+        
+        rasterKey = self.rasterKey(operation, inputRasterFilePath, bstrOptions)
+        rasterFilePath = os.path.join(self.cacheFolderPath, rasterKey + ".tif")
+        
+        index = self.readIndex()
+        if rasterKey in index:
+            index[rasterKey]["lastUsed"] = time.time()
+            self.writeIndex(index)
+            return rasterFilePath, None
+        
+        if os.path.exists(rasterFilePath):
+            # not in the index: left by an interrupted operation
+            os.remove(rasterFilePath)
+        utils = MapWinGIS.UtilsClass()
+        if (operation == "GDALWarp"):
+            operationResult = MapWinGIS.UtilsClass.GDALWarp(utils, inputRasterFilePath, rasterFilePath, bstrOptions, None)
+        elif (operation == "TranslateRaster"):
+            operationResult = MapWinGIS.UtilsClass.TranslateRaster(utils, inputRasterFilePath, rasterFilePath, bstrOptions, None)
+        if (operationResult != True) or not os.path.exists(rasterFilePath):
+            return None, MapWinGIS.GlobalSettingsClass().GdalLastErrorMsg
+        
+        # add the new raster to the index. Then delete the least recently used rasters if the cache is too large. The new raster is never deleted
+        index[rasterKey] = {"fileName": os.path.basename(rasterFilePath), "sizeMB": os.path.getsize(rasterFilePath)/1048576.0, "lastUsed": time.time()}
+        totalSizeMB = sum([rasterItem["sizeMB"] for rasterItem in index.values()])
+        for oldRasterKey in sorted(index.keys(), key=lambda oldRasterKey: index[oldRasterKey]["lastUsed"]):
+            if (totalSizeMB <= self.maxCacheSizeMB):
+                break
+            if (oldRasterKey == rasterKey):
+                continue
+            try:
+                os.remove(os.path.join(self.cacheFolderPath, index[oldRasterKey]["fileName"]))
+            except OSError:
+                # raster file is in use, or already deleted
+                continue
+            totalSizeMB -= index[oldRasterKey]["sizeMB"]
+            del index[oldRasterKey]
+        
+        self.writeIndex(index)
+        
+        return rasterFilePath, None
+
+
+class ShapefileReader():
+    """
+    reader of shapefiles (.shp, .shx, .dbf, .prj, .cpg files) in pure python: records are parsed from the files with "struct" module, without MapWinGIS.
+    Records are read one by one (streamed) at the offsets from the .shx file, so any record can also be read directly. Shapes outside of a bounding box can be skipped before their points are parsed, and only the required .dbf fields are decoded
+    """
+    # shape types whose records contain a bounding box, parts and points
+    polyShapeTypes = (3, 5, 13, 15, 23, 25, 31)
+    multipointShapeTypes = (8, 18, 28)
+    pointShapeTypes = (1, 11, 21)
+    
+    def __init__(self, shpFilePath):
+        self.shpFilePath = shpFilePath
+        filePathWithoutExtension = os.path.splitext(shpFilePath)[0]
+        
+        self.shpFile = open(shpFilePath, "rb")
+        shpHeader = self.shpFile.read(100)
+        fileCode, = struct.unpack(">i", shpHeader[0:4])
+        if (fileCode != 9994):
+            self.shpFile.close()
+            raise ValueError("\"%s\" is not a shapefile (.shp)." % shpFilePath)
+        self.shapeType, = struct.unpack("<i", shpHeader[32:36])
+        self.bbox = struct.unpack("<4d", shpHeader[36:68])  # xMin, yMin, xMax, yMax
+        
+        # record offsets and content lengths (in bytes) from the .shx file, or from the .shp record headers if .shx file does not exist
+        shxFilePath = filePathWithoutExtension + ".shx"
+        if os.path.isfile(shxFilePath):
+            with open(shxFilePath, "rb") as shxFile:
+                shxContent = shxFile.read()
+            numOfRecords = (len(shxContent) - 100) // 8
+            offsetsLengths = struct.unpack(">%si" % (numOfRecords*2), shxContent[100:100+numOfRecords*8])
+            self.recordOffsets = [offset*2  for offset in offsetsLengths[0::2]]  # in 16-bit words in .shx file
+            self.recordLengths = [length*2  for length in offsetsLengths[1::2]]
+        else:
+            shpFileLength = struct.unpack(">i", shpHeader[24:28])[0] * 2
+            self.recordOffsets = []; self.recordLengths = []
+            offset = 100
+            while (offset + 8 <= shpFileLength):
+                self.shpFile.seek(offset)
+                recordNumber, contentLength = struct.unpack(">2i", self.shpFile.read(8))
+                self.recordOffsets.append(offset); self.recordLengths.append(contentLength*2)
+                offset += 8 + contentLength*2
+        self.numOfRecords = len(self.recordOffsets)
+        
+        # .dbf fields: (name, type, offset in the record, length, number of decimals)
+        self.fields = []
+        self.dbfFile = None
+        dbfFilePath = filePathWithoutExtension + ".dbf"
+        if os.path.isfile(dbfFilePath):
+            self.dbfFile = open(dbfFilePath, "rb")
+            dbfHeader = self.dbfFile.read(32)
+            self.dbfNumOfRecords, self.dbfHeaderLength, self.dbfRecordLength = struct.unpack("<IHH", dbfHeader[4:12])
+            fieldDescriptors = self.dbfFile.read(self.dbfHeaderLength - 32)
+            fieldOffset = 1  # the first byte of each record is the deletion flag
+            for j in xrange(0, len(fieldDescriptors) - 31, 32):
+                fieldDescriptor = fieldDescriptors[j:j+32]
+                if (fieldDescriptor[0:1] == b"\r"):
+                    break
+                fieldName = fieldDescriptor[0:11].split(b"\x00")[0].decode("latin-1")
+                fieldType = fieldDescriptor[11:12].decode("latin-1")
+                fieldLength, fieldDecimals = struct.unpack("<BB", fieldDescriptor[16:18])
+                self.fields.append((fieldName, fieldType, fieldOffset, fieldLength, fieldDecimals))
+                fieldOffset += fieldLength
+        self.fieldNames = [field[0]  for field in self.fields]
+        
+        # text encoding of .dbf values
+        self.encoding = "utf-8"
+        cpgFilePath = filePathWithoutExtension + ".cpg"
+        if os.path.isfile(cpgFilePath):
+            with open(cpgFilePath, "r") as cpgFile:
+                codePage = cpgFile.read().strip().lower()
+            if codePage.isdigit():
+                codePage = "cp" + codePage
+            try:
+                self.encoding = codecs.lookup(codePage).name
+            except LookupError:
+                pass
+        
+        # CRS of the shapefile, as WKT string. Empty if .prj file does not exist
+        self.projection = ""
+        prjFilePath = filePathWithoutExtension + ".prj"
+        if os.path.isfile(prjFilePath):
+            with open(prjFilePath, "r") as prjFile:
+                self.projection = prjFile.read().strip()
+    
+    
+    def close(self):
+        self.shpFile.close()
+        if (self.dbfFile != None):
+            self.dbfFile.close()
+    
+    
+    def fieldIndices(self, fieldNames=None):
+        """
+        indices of fieldNames in self.fields. None for fields which do not exist in the shapefile. All fields if fieldNames is None"""
+        
+        if (fieldNames == None):
+            return range(len(self.fields))
+        return [self.fieldNames.index(fieldName) if (fieldName in self.fieldNames) else None  for fieldName in fieldNames]
+    
+    
+    def decodeValue(self, valueBytes, fieldType, fieldDecimals):
+        """
+        .dbf value as python object: numbers as int or float, logical values as True/False, the rest as strings. Empty numbers and logical values are None"""
+        
+        if (fieldType == "C") or (fieldType == "M"):
+            try:
+                return valueBytes.decode(self.encoding).rstrip(" \x00")
+            except UnicodeDecodeError:
+                return valueBytes.decode("latin-1").rstrip(" \x00")
+        
+        text = valueBytes.decode("latin-1").strip(" \x00")
+        if (fieldType == "N") or (fieldType == "F"):
+            if (text == "") or text.startswith("*"):
+                return None
+            try:
+                if (fieldDecimals == 0) and ("." not in text) and ("e" not in text.lower()):
+                    return int(text)
+                return float(text)
+            except ValueError:
+                return None
+        elif (fieldType == "L"):
+            if (text[:1] in ("T", "t", "Y", "y")):
+                return True
+            elif (text[:1] in ("F", "f", "N", "n")):
+                return False
+            return None
+        return text
+    
+    
+    def recordValues(self, recordIndex, fieldIndices):
+        """
+        decoded .dbf values of the record, only for the fields with fieldIndices"""
+        
+        if (self.dbfFile == None) or (recordIndex >= self.dbfNumOfRecords) or (len(fieldIndices) == 0):
+            return [None  for fieldIndex in fieldIndices]
+        
+        self.dbfFile.seek(self.dbfHeaderLength + recordIndex*self.dbfRecordLength)
+        recordBytes = self.dbfFile.read(self.dbfRecordLength)
+        values = []
+        for fieldIndex in fieldIndices:
+            if (fieldIndex == None):
+                values.append(None)
+                continue
+            fieldName, fieldType, fieldOffset, fieldLength, fieldDecimals = self.fields[fieldIndex]
+            values.append(self.decodeValue(recordBytes[fieldOffset:fieldOffset+fieldLength], fieldType, fieldDecimals))
+        
+        return values
+    
+    
+    def recordBBox(self, recordIndex):
+        """
+        bounding box (xMin, yMin, xMax, yMax) of the record's shape, read without its points. None for null shapes"""
+        
+        self.shpFile.seek(self.recordOffsets[recordIndex] + 8)  # skip the record header
+        content = self.shpFile.read(min(36, self.recordLengths[recordIndex]))
+        shapeType, = struct.unpack("<i", content[0:4])
+        if (shapeType == 0):
+            return None
+        elif shapeType in self.pointShapeTypes:
+            x, y = struct.unpack("<2d", content[4:20])
+            return (x, y, x, y)
+        return struct.unpack("<4d", content[4:36])
+    
+    
+    def recordShape(self, recordIndex, bbox=None):
+        """
+        shape of the record.
+        output:
+            shapeType - shape type of the record (0 for null shapes). None if the shape is outside of the bbox (xMin, yMin, xMax, yMax)
+            parts - list of parts, each part is a list of (x,y,z) points. Points and multipoints have a single part. z is 0 for shape types without Z coordinates"""
+        
+        contentLength = self.recordLengths[recordIndex]
+        self.shpFile.seek(self.recordOffsets[recordIndex] + 8)  # skip the record header
+        
+        if (bbox != None):
+            # shape type and bounding box (or x,y of a point) are read first, so that shapes outside of the bbox are skipped without reading their points
+            content = self.shpFile.read(min(36, contentLength))
+            shapeType, = struct.unpack("<i", content[0:4])
+            if shapeType in self.pointShapeTypes:
+                x, y = struct.unpack("<2d", content[4:20])
+                shapeBBox = (x, y, x, y)
+            elif (shapeType != 0):
+                shapeBBox = struct.unpack("<4d", content[4:36])
+            if (shapeType != 0) and ((shapeBBox[0] > bbox[2]) or (shapeBBox[2] < bbox[0]) or (shapeBBox[1] > bbox[3]) or (shapeBBox[3] < bbox[1])):
+                return None, []
+            content += self.shpFile.read(contentLength - len(content))
+        else:
+            content = self.shpFile.read(contentLength)
+        
+        shapeType, = struct.unpack("<i", content[0:4])
+        if (shapeType == 0):
+            return shapeType, []
+        
+        if shapeType in self.pointShapeTypes:
+            x, y = struct.unpack("<2d", content[4:20])
+            z = struct.unpack("<d", content[20:28])[0] if (shapeType == 11) else 0
+            return shapeType, [[(x, y, z)]]
+        
+        if shapeType in self.multipointShapeTypes:
+            numOfParts = 1
+            numOfPoints, = struct.unpack("<i", content[36:40])
+            partStarts = [0]
+            pointsOffset = 40
+        else:
+            numOfParts, numOfPoints = struct.unpack("<2i", content[36:44])
+            partStarts = list(struct.unpack("<%si" % numOfParts, content[44:44+numOfParts*4]))
+            pointsOffset = 44 + numOfParts*4
+            if (shapeType == 31):
+                pointsOffset += numOfParts*4  # multipatch part types
+        
+        xy = struct.unpack("<%sd" % (numOfPoints*2), content[pointsOffset:pointsOffset+numOfPoints*16])
+        if shapeType in (11, 13, 15, 18, 31):
+            zOffset = pointsOffset + numOfPoints*16 + 16  # skip the z range
+            zs = struct.unpack("<%sd" % numOfPoints, content[zOffset:zOffset+numOfPoints*8])
+        else:
+            zs = [0] * numOfPoints
+        points = zip(xy[0::2], xy[1::2], zs)
+        
+        partStarts.append(numOfPoints)
+        parts = [points[partStarts[n]:partStarts[n+1]]  for n in xrange(numOfParts)]
+        
+        return shapeType, parts
+    
+    
+    def records(self, bbox=None, fieldNames=None, recordIndices=None):
+        """
+        generator of shapefile records: (recordIndex, shapeType, parts, values). Check "recordShape" method for shapeType and parts.
+        input:
+            bbox - (xMin, yMin, xMax, yMax) in shapefile's CRS. Only shapes whose bounding box intersects it are returned. Null shapes are always returned
+            fieldNames - names of the .dbf fields whose values are returned, in that order. All fields if None
+            recordIndices - indices of records to read. All records if None"""
+        
+        fieldIndices = self.fieldIndices(fieldNames)
+        if (recordIndices == None):
+            recordIndices = xrange(self.numOfRecords)
+        
+        for recordIndex in recordIndices:
+            shapeType, parts = self.recordShape(recordIndex, bbox)
+            if (shapeType == None):
+                continue
+            yield recordIndex, shapeType, parts, self.recordValues(recordIndex, fieldIndices)
+
+
+class AttributeTable():
+    """
+    .dbf values of all shapefile's records, stored by columns (fields). Each distinct value of a column is decoded only once, "yes" values are replaced with True, and equal strings of all columns are the same object.
+    A row (list of values) of each record is created once, so all parts of a multipart shape share it. Index of each key's column is kept in "keyIndices" dictionary (check GIS "keyIndices" method).
+    """
+    chunkSize = 4096  # number of .dbf records read at once
+    
+    def __init__(self, reader):
+        self.keys = list(reader.fieldNames)
+        self.keyIndices = GIS().keyIndices(self.keys)
+        self.numOfRecords = reader.numOfRecords
+        self.columns = [[None] * self.numOfRecords  for key in self.keys]
+        self.rows = [None] * self.numOfRecords
+        
+        if (reader.dbfFile == None) or (len(self.keys) == 0):
+            return
+        
+        internedStrings = {}
+        decodedValues = [{}  for key in self.keys]  # by column: raw .dbf bytes: decoded value
+        numOfDbfRecords = min(reader.dbfNumOfRecords, self.numOfRecords)
+        recordLength = reader.dbfRecordLength
+        reader.dbfFile.seek(reader.dbfHeaderLength)
+        for chunkStart in xrange(0, numOfDbfRecords, self.chunkSize):
+            numOfChunkRecords = min(self.chunkSize, numOfDbfRecords - chunkStart)
+            chunkBytes = reader.dbfFile.read(numOfChunkRecords * recordLength)
+            numOfChunkRecords = min(numOfChunkRecords, len(chunkBytes) // recordLength)
+            
+            for fieldIndex, (fieldName, fieldType, fieldOffset, fieldLength, fieldDecimals) in enumerate(reader.fields):
+                column = self.columns[fieldIndex]
+                columnDecodedValues = decodedValues[fieldIndex]
+                for k in xrange(numOfChunkRecords):
+                    valueStart = k*recordLength + fieldOffset
+                    valueBytes = chunkBytes[valueStart:valueStart+fieldLength]
+                    try:
+                        value = columnDecodedValues[valueBytes]
+                    except KeyError:
+                        value = reader.decodeValue(valueBytes, fieldType, fieldDecimals)
+                        if (value == "yes"):
+                            value = True  # for example: "building=yes"
+                        elif isinstance(value, basestring):
+                            value = internedStrings.setdefault(value, value)
+                        columnDecodedValues[valueBytes] = value
+                    column[chunkStart + k] = value
+    
+    
+    def row(self, recordIndex):
+        """
+        values of all keys for the record. The same list is returned on each call"""
+        
+        row = self.rows[recordIndex]
+        if (row == None):
+            row = [column[recordIndex]  for column in self.columns]
+            self.rows[recordIndex] = row
+        return row
+
+
+class ShapefileSpatialIndex():
+    """
+    packed R-tree of shapefile's records, for finding the records whose shapes intersect a bounding box without reading the whole shapefile.
+    Records are sorted into nodes of "nodeSize" bounding boxes by Sort-Tile-Recursive method, and each level of the tree is packed into a single array.
+    The tree is built on the first query, and saved next to the .shp file (.gsi file). It is built again when the .shp file's size or time of modification changes.
+    based on: "STR: A Simple and Efficient Algorithm for R-Tree Packing", Leutenegger, Lopez, Edgington, 1997.
+    """
+    signature = b"GISMOGSI"
+    version = 1
+    nodeSize = 16
+    
+    def __init__(self, shpFilePath):
+        self.shpFilePath = shpFilePath
+        self.indexFilePath = os.path.splitext(shpFilePath)[0] + ".gsi"
+        self.boxes = None  # xMin, yMin, xMax, yMax of all nodes, level by level (from records to the root)
+        self.recordIndices = None  # record index of each box of the lowest level
+        self.levelEnds = None  # index of the first box after each level
+        self.saveErrorMsg = None  # set if the built tree could not be saved to the .gsi file
+    
+    
+    def shpFileStamp(self):
+        return os.path.getsize(self.shpFilePath), os.path.getmtime(self.shpFilePath)
+    
+    
+    def load(self):
+        """
+        read the .gsi file. Returns False if it does not exist, or if it was built for a different .shp file"""
+        
+        if not os.path.isfile(self.indexFilePath):
+            return False
+        shpFileSize, shpFileMtime = self.shpFileStamp()
+        try:
+            with open(self.indexFilePath, "rb") as indexFile:
+                header = indexFile.read(36)
+                signature = header[0:8]
+                version, numOfLevels, numOfRecords, indexShpFileSize, indexShpFileMtime = struct.unpack("<3iqd", header[8:36])
+                if (signature != self.signature) or (version != self.version) or (indexShpFileSize != shpFileSize) or (indexShpFileMtime != shpFileMtime):
+                    return False
+                levelEnds = array.array("i"); levelEnds.fromstring(indexFile.read(numOfLevels*4))
+                recordIndices = array.array("i"); recordIndices.fromstring(indexFile.read(numOfRecords*4))
+                boxes = array.array("d"); boxes.fromstring(indexFile.read(levelEnds[-1]*4*8))
+        except (IOError, struct.error, ValueError):
+            # index file is in use, or corrupted
+            return False
+        if (len(boxes) != levelEnds[-1]*4) or (len(recordIndices) != numOfRecords):
+            return False
+        
+        self.levelEnds = list(levelEnds); self.recordIndices = recordIndices; self.boxes = boxes
+        return True
+    
+    
+    def build(self):
+        """
+        build the tree from the bounding boxes of shapefile's records, and save it to the .gsi file"""
+        
+        reader = ShapefileReader(self.shpFilePath)
+        items = []  # (xCenter, yCenter, recordIndex, bbox)
+        for recordIndex in xrange(reader.numOfRecords):
+            bbox = reader.recordBBox(recordIndex)
+            if (bbox != None):  # null shapes are never found
+                items.append(((bbox[0]+bbox[2])/2, (bbox[1]+bbox[3])/2, recordIndex, bbox))
+        reader.close()
+        
+        # Sort-Tile-Recursive: vertical slices by x, then nodes by y within each slice
+        nodeSize = self.nodeSize
+        numOfNodes = int(math.ceil(len(items) / float(nodeSize)))
+        sliceSize = nodeSize * int(math.ceil(math.sqrt(numOfNodes)))
+        items.sort()
+        sortedItems = []
+        for sliceStart in xrange(0, len(items), max(sliceSize, 1)):
+            sortedItems.extend(sorted(items[sliceStart:sliceStart+sliceSize], key=lambda item: item[1]))
+        
+        self.recordIndices = array.array("i", [item[2] for item in sortedItems])
+        self.boxes = array.array("d")
+        for item in sortedItems:
+            self.boxes.extend(item[3])
+        self.levelEnds = [len(sortedItems)]
+        del items; del sortedItems
+        
+        # upper levels: each node's box encloses the boxes of its nodeSize children
+        levelStart = 0
+        while (self.levelEnds[-1] - levelStart > 1):
+            levelEnd = self.levelEnds[-1]
+            boxes = self.boxes
+            for childStart in xrange(levelStart, levelEnd, nodeSize):
+                childEnd = min(childStart + nodeSize, levelEnd)
+                boxes.extend((min(boxes[4*j] for j in xrange(childStart, childEnd)), min(boxes[4*j+1] for j in xrange(childStart, childEnd)),
+                              max(boxes[4*j+2] for j in xrange(childStart, childEnd)), max(boxes[4*j+3] for j in xrange(childStart, childEnd))))
+            levelStart = levelEnd
+            self.levelEnds.append(len(boxes) // 4)
+        
+        shpFileSize, shpFileMtime = self.shpFileStamp()
+        try:
+            with open(self.indexFilePath, "wb") as indexFile:
+                indexFile.write(self.signature)
+                indexFile.write(struct.pack("<3iqd", self.version, len(self.levelEnds), len(self.recordIndices), shpFileSize, shpFileMtime))
+                indexFile.write(array.array("i", self.levelEnds).tostring())
+                indexFile.write(self.recordIndices.tostring())
+                indexFile.write(self.boxes.tostring())
+        except IOError:
+            # .shp folder is not writable. The tree is only used for this query
+            self.saveErrorMsg = "Spatial index file could not be saved: \"%s\".\n" % self.indexFilePath + \
+                                "The shapes around the _location were read, but the spatial index will be built again on each run of the component. Check if the shapefile's folder is writable."
+    
+    
+    def query(self, bbox):
+        """
+        indices of records (sorted) whose shape's bounding box intersects the bbox (xMin, yMin, xMax, yMax)"""
+        
+        if (self.boxes == None) and not self.load():
+            self.build()
+        
+        boxes = self.boxes
+        levelEnds = self.levelEnds
+        numOfRecords = levelEnds[0]
+        if (numOfRecords == 0):
+            return []
+        xMin, yMin, xMax, yMax = bbox
+        
+        foundRecordIndices = []
+        stack = [(levelEnds[-1] - 1, len(levelEnds) - 1)]  # (node index, level) starting from the root
+        while (len(stack) > 0):
+            nodeIndex, level = stack.pop()
+            if (boxes[4*nodeIndex] > xMax) or (boxes[4*nodeIndex+1] > yMax) or (boxes[4*nodeIndex+2] < xMin) or (boxes[4*nodeIndex+3] < yMin):
+                continue
+            if (level == 0):
+                foundRecordIndices.append(self.recordIndices[nodeIndex])
+                continue
+            # children of the node
+            levelStart = levelEnds[level-1]
+            childLevelStart = levelEnds[level-2] if (level > 1) else 0
+            childStart = childLevelStart + (nodeIndex - levelStart) * self.nodeSize
+            for childIndex in xrange(childStart, min(childStart + self.nodeSize, levelEnds[level-1])):
+                stack.append((childIndex, level-1))
+        
+        foundRecordIndices.sort()
+        return foundRecordIndices
+
+
+class TransverseMercator():
+    """
+    conversion of whole lists of coordinates between WGS84 latitude-longitude and UTM zone's easting-northing (the same ones as EPSG:326xx and EPSG:327xx), without MapWinGIS.
+    Uses Kruger series to the sixth order of the third flattening, which are accurate to less than a millimeter within a few thousand kilometers from the zone's central meridian.
+    Series coefficients are calculated once, and the constants of each UTM zone are cached.
+    based on: "Transverse Mercator with an accuracy of a few nanometers", Karney, 2011.
+    """
+    a = 6378137.0  # WGS84 equatorial radius, meters
+    f = 1 / 298.257223563  # WGS84 flattening
+    k0 = 0.9996  # UTM scale factor on the central meridian
+    falseEasting = 500000.0
+    falseNorthingSouth = 10000000.0
+    
+    # coefficients of the Kruger series
+    n = f / (2 - f)
+    e = math.sqrt(f * (2 - f))  # eccentricity
+    A = a / (1 + n) * (1 + n**2/4 + n**4/64 + n**6/256)  # radius of the rectifying sphere
+    alpha = (n/2 - 2*n**2/3 + 5*n**3/16 + 41*n**4/180 - 127*n**5/288 + 7891*n**6/37800,
+             13*n**2/48 - 3*n**3/5 + 557*n**4/1440 + 281*n**5/630 - 1983433*n**6/1935360,
+             61*n**3/240 - 103*n**4/140 + 15061*n**5/26880 + 167603*n**6/181440,
+             49561*n**4/161280 - 179*n**5/168 + 6601661*n**6/7257600,
+             34729*n**5/80640 - 3418889*n**6/1995840,
+             212378941*n**6/319334400)
+    beta = (n/2 - 2*n**2/3 + 37*n**3/96 - n**4/360 - 81*n**5/512 + 96199*n**6/604800,
+            n**2/48 + n**3/15 - 437*n**4/1440 + 46*n**5/105 - 1118711*n**6/3870720,
+            17*n**3/480 - 37*n**4/840 - 209*n**5/4480 + 5569*n**6/90720,
+            4397*n**4/161280 - 11*n**5/504 - 830251*n**6/7257600,
+            4583*n**5/161280 - 108847*n**6/3991680,
+            20648693*n**6/638668800)
+    
+    zones = {}  # cached instances, by (CRS_UTMzone, northOrsouth)
+    
+    def __init__(self, CRS_UTMzone, northOrsouth):
+        self.CRS_UTMzone = CRS_UTMzone
+        self.northOrsouth = northOrsouth
+        self.centralMeridianR = math.radians(CRS_UTMzone * 6 - 183)
+        self.falseNorthing = self.falseNorthingSouth if (northOrsouth == "south") else 0.0
+        self.k0A = self.k0 * self.A
+    
+    
+    @classmethod
+    def UTMzone(cls, CRS_UTMzone, northOrsouth):
+        """
+        Transverse Mercator of the UTM zone. Created only once for each zone"""
+        
+        key = (CRS_UTMzone, northOrsouth)
+        if key not in cls.zones:
+            cls.zones[key] = cls(CRS_UTMzone, northOrsouth)
+        return cls.zones[key]
+    
+    
+    def forward(self, latitudesD, longitudesD):
+        """
+        convert lists of latitudes, longitudes (degrees) to lists of eastings, northings (meters)"""
+        
+        e = self.e; alpha = self.alpha; k0A = self.k0A
+        centralMeridianR = self.centralMeridianR; falseEasting = self.falseEasting; falseNorthing = self.falseNorthing
+        sin = math.sin; cos = math.cos; sinh = math.sinh; cosh = math.cosh; sqrt = math.sqrt
+        
+        eastings = []
+        northings = []
+        for latitudeD, longitudeD in zip(latitudesD, longitudesD):
+            latitudeR = math.radians(latitudeD)
+            longitudeR = (math.radians(longitudeD) - centralMeridianR + math.pi) % (2*math.pi) - math.pi  # relative to the central meridian, within -180 to 180 degrees
+            
+            # conformal latitude
+            tau = math.tan(latitudeR)
+            sigma = sinh(e * math.atanh(e * sin(latitudeR)))
+            tau_ = tau * sqrt(1 + sigma*sigma) - sigma * sqrt(1 + tau*tau)
+            
+            cosLongitude = cos(longitudeR)
+            xi_ = math.atan2(tau_, cosLongitude)
+            eta_ = math.asinh(sin(longitudeR) / sqrt(tau_*tau_ + cosLongitude*cosLongitude))
+            
+            xi = xi_; eta = eta_
+            for j in xrange(6):
+                xi += alpha[j] * sin(2*(j+1)*xi_) * cosh(2*(j+1)*eta_)
+                eta += alpha[j] * cos(2*(j+1)*xi_) * sinh(2*(j+1)*eta_)
+            
+            eastings.append(k0A * eta + falseEasting)
+            northings.append(k0A * xi + falseNorthing)
+        
+        return eastings, northings
+    
+    
+    def inverse(self, eastings, northings):
+        """
+        convert lists of eastings, northings (meters) to lists of latitudes, longitudes (degrees)"""
+        
+        e = self.e; beta = self.beta; k0A = self.k0A
+        centralMeridianR = self.centralMeridianR; falseEasting = self.falseEasting; falseNorthing = self.falseNorthing
+        sin = math.sin; cos = math.cos; sinh = math.sinh; cosh = math.cosh; sqrt = math.sqrt
+        oneMinusEsq = 1 - e*e
+        
+        latitudesD = []
+        longitudesD = []
+        for easting, northing in zip(eastings, northings):
+            eta = (easting - falseEasting) / k0A
+            xi = (northing - falseNorthing) / k0A
+            
+            xi_ = xi; eta_ = eta
+            for j in xrange(6):
+                xi_ -= beta[j] * sin(2*(j+1)*xi) * cosh(2*(j+1)*eta)
+                eta_ -= beta[j] * cos(2*(j+1)*xi) * sinh(2*(j+1)*eta)
+            
+            sinhEta_ = sinh(eta_)
+            cosXi_ = cos(xi_)
+            tau_ = sin(xi_) / sqrt(sinhEta_*sinhEta_ + cosXi_*cosXi_)
+            
+            # latitude from the conformal latitude, by Newton's method
+            tau = tau_
+            for iteration in xrange(5):
+                sigma = sinh(e * math.atanh(e * tau / sqrt(1 + tau*tau)))
+                tauI_ = tau * sqrt(1 + sigma*sigma) - sigma * sqrt(1 + tau*tau)
+                deltaTau = (tau_ - tauI_) / sqrt(1 + tauI_*tauI_) * (1 + oneMinusEsq*tau*tau) / (oneMinusEsq * sqrt(1 + tau*tau))
+                tau += deltaTau
+                if abs(deltaTau) < 1e-12:
+                    break
+            
+            latitudesD.append(math.degrees(math.atan(tau)))
+            longitudeD = math.degrees(math.atan2(sinhEta_, cosXi_) + centralMeridianR)
+            longitudesD.append((longitudeD + 180) % 360 - 180)
+        
+        return latitudesD, longitudesD
+
+
+class GIS():
+    """
+    methods for manipulation of GIS data
+    """
+    def calculate_CRS_UTMzone(self, locationLatitudeD, locationLongitudeD):
+        """
+        calculate CRS UTMzone code based on location's latitude-longitude
+        """
+        # by http://stackoverflow.com/a/9188972/3137724 (link given by Even Rouault)
+        CRS_UTMzone = (math.floor((locationLongitudeD + 180)/6) % 60) + 1
+        if locationLatitudeD >= 0:
+            # for northern hemisphere
+            northOrsouth = "north"
+            CRS_EPSG_code = 32600 + CRS_UTMzone
+        elif locationLatitudeD < 0:
+            # for southern hemisphere
+            northOrsouth = "south"
+            CRS_EPSG_code = 32700 + CRS_UTMzone
+        
+        return CRS_EPSG_code, int(CRS_UTMzone), northOrsouth
+    
+    
+    def mosaicCropRasters(self, rasterFilePaths, outputRasterFilePath, latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD):
+        """
+        mosaic rasters in Geographic CRS (EPSG:4326) and crop the mosaic to the latitude-longitude bounding box. The cropped raster is saved as a GeoTIFF file.
+        Returns "True" if the raster is successfully created and "False" if it fails, together with GDAL's error message (None if the raster is created)
+        """
+        utils = MapWinGIS.UtilsClass()
+        
+        if (len(rasterFilePaths) == 1):
+            mosaicFilePath = rasterFilePaths[0]
+        else:
+            # virtual raster (.vrt) mosaic: it only references the rasters, they are not copied
+            mosaicFilePath = os.path.splitext(outputRasterFilePath)[0] + "_mosaic.vrt"
+            bstrOptions = " ".join(['"%s"' % rasterFilePath  for rasterFilePath in rasterFilePaths])
+            buildVrtResult = MapWinGIS.UtilsClass.GDALBuildVrt(utils, mosaicFilePath, bstrOptions, None)
+            if (buildVrtResult != True):
+                return False, MapWinGIS.GlobalSettingsClass().GdalLastErrorMsg
+        
+        bstrOptions = "-of GTiff -te %s %s %s %s" % (longitudeLeftD, latitudeBottomD, longitudeRightD, latitudeTopD)
+        cropResult = MapWinGIS.UtilsClass.GDALWarp(utils, mosaicFilePath, outputRasterFilePath, bstrOptions, None)
+        cropErrorMsg = None if (cropResult == True) else MapWinGIS.GlobalSettingsClass().GdalLastErrorMsg
+        
+        if (len(rasterFilePaths) > 1):
+            os.remove(mosaicFilePath)
+        
+        return cropResult, cropErrorMsg
+    
+    
+    def readGridValues(self, grid, rasterFilePath, nanValue=0):
+        """
+        read all cell values of an opened MapWinGIS grid into a flat row-major list (top row first). NaN cells are replaced with "nanValue".
+        The raster is translated once to a raw float32 (.bil) file which is read as a single block, instead of calling grid.Value(i,k) for each cell
+        """
+        header = grid.Header
+        numOfRows = header.NumberRows
+        numOfColumns = header.NumberCols
+        numOfCells = numOfRows * numOfColumns
+        
+        bilFilePath = os.path.splitext(rasterFilePath)[0] + "_values.bil"
+        utils = MapWinGIS.UtilsClass()
+        bstrOptions = "-of EHdr -ot Float32"  # band interleaved by line, in the byte order of the machine
+        translateResult = MapWinGIS.UtilsClass.TranslateRaster(utils, rasterFilePath, bilFilePath, bstrOptions, None)
+        
+        values = array.array("f")
+        if (translateResult == True) and os.path.isfile(bilFilePath):
+            with open(bilFilePath, "rb") as bilFile:
+                values.fromstring(bilFile.read(numOfCells * values.itemsize))
+        if (len(values) != numOfCells):
+            # translation failed. Read the grid cell by cell
+            values = [grid.Value(i,k)  for k in xrange(numOfRows)  for i in xrange(numOfColumns)]
+        
+        # delete the .bil file and its header, projection and statistics files
+        for extension in [".bil", ".hdr", ".prj", ".stx", ".bil.aux.xml"]:
+            sideFilePath = os.path.splitext(bilFilePath)[0] + extension
+            if os.path.isfile(sideFilePath):
+                os.remove(sideFilePath)
+        
+        values = [nanValue if (value != value) else value  for value in values]  # NaN is the only value which is not equal to itself
+        
+        return values
+    
+    
+    def UTM_CRS_from_latitude(self, locationLatitudeD, locationLongitudeD, originLatitudeD = 0, originLongitudeD = 0):
+        """
+        create UTM CRS from latitude, longitude and anchor latitude, anchor longitude
+        """
+        CRS = MapWinGIS.GeoProjectionClass()
+        CRS_EPSG_code, CRS_UTMzone, northOrsouth = self.calculate_CRS_UTMzone(locationLatitudeD, locationLongitudeD)
+        proj4_string = "+proj=utm +zone=%s +%s +datum=WGS84 +ellps=WGS84 +lat_0=%s +lon_0=%s" % (CRS_UTMzone, northOrsouth, originLatitudeD, originLongitudeD)#, resamplingMethod)
+        CRS.ImportFromProj4(proj4_string)
+        
+        return CRS
+    
+    
+    def CRS_from_EPSGcode(self, EPSGcode):
+        """
+        create CRS from EPSG code
+        """
+        CRS = MapWinGIS.GeoProjectionClass()
+        CRS.ImportFromEPSG(EPSGcode)
+        
+        return CRS
+    
+    
+    def convertBetweenTwoCRS(self, inputCRS, outputCRS, firstCoordinate, secondCoordinate):
+        """
+        convert coordinates from one CRS to another
+        """
+        successStartTransform = inputCRS.StartTransform(outputCRS)
+        
+        secondCoordinate_ref = clr.StrongBox[System.Double](secondCoordinate)
+        firstCoordinate_ref = clr.StrongBox[System.Double](firstCoordinate)
+        successTransform = MapWinGIS.GeoProjectionClass.Transform(inputCRS, firstCoordinate_ref, secondCoordinate_ref)
+        
+        inputCRS.StopTransform()
+        
+        originPtProjected = Rhino.Geometry.Point3d(firstCoordinate_ref.Value, secondCoordinate_ref.Value, 0)
+        
+        return originPtProjected
+    
+    
+    def UTM_projection(self, locationLatitudeD, locationLongitudeD):
+        """
+        Transverse Mercator projection of the location's UTM zone (the same zone as of 'calculate_CRS_UTMzone' and 'UTM_CRS_from_latitude')
+        """
+        CRS_EPSG_code, CRS_UTMzone, northOrsouth = self.calculate_CRS_UTMzone(locationLatitudeD, locationLongitudeD)
+        
+        return TransverseMercator.UTMzone(CRS_UTMzone, northOrsouth)
+    
+    
+    def projectedLocationCoordinates(self, locationLatitudeD, locationLongitudeD):
+        """
+        convert latitude,longitude coordinates to x,y projected coordinates (UTM, in meters)
+        """
+        eastings, northings = self.UTM_projection(locationLatitudeD, locationLongitudeD).forward([locationLatitudeD], [locationLongitudeD])
+        
+        originPtProjected = Rhino.Geometry.Point3d(eastings[0], northings[0], 0)
+        
+        return originPtProjected
+    
+    
+    def projectedLocationCoordinates2(locationLatitudeD, locationLongitudeD, unitConversionFactor):
+        """
+        convert latitude,longitude coordinates to x,y projected coordinates2
+        this method should be replaced with upper "projectedLocationCoordinates" but only for 4.9.4? > versions of MapWinGIS,
+        due to lack of MapWinGIS.GeoProjectionClass.Transform method in those MapWinGIS methods
+        """
+        outputCRS_EPSG_code, CRS_UTMzone, northOrsouth = self.calculate_CRS_UTMzone(locationLatitudeD, locationLongitudeD)
+        
+        # create a dummy point with locationLatitudeD, locationLongitudeD coordinates
+        dummyShape = MapWinGIS.ShapeClass()
+        dummyShape.ShapeType = MapWinGIS.ShpfileType.SHP_POINT
+        dummyShape.AddPoint(locationLongitudeD, locationLatitudeD)
+        
+        # insert a dummy point to the dummyShapefile
+        dummyShapefile = MapWinGIS.ShapefileClass()
+        openShapefileSuccess2 = MapWinGIS.ShapefileClass.CreateNew(dummyShapefile, "", MapWinGIS.ShpfileType.SHP_POINT)
+        shapeIndex2 = clr.StrongBox[System.Int32]()
+        success = dummyShapefile.EditInsertShape(dummyShape, shapeIndex2)
+        
+        # a single field needs to be defined due to inserting of "dummyShape"
+        fieldName = "5"  # dummy name
+        fieldType = MapWinGIS.FieldType.INTEGER_FIELD
+        fieldPrecision = 1
+        fieldWidth = 1
+        success2 = dummyShapefile.EditAddField(fieldName, fieldType, fieldPrecision, fieldWidth)
+        
+        # set the CRS of dummyShapefile to WGS 84
+        inputCRS = MapWinGIS.GeoProjectionClass()
+        inputCRS_EPSG_code = 4326  # WGS 84
+        inputCRS.ImportFromEPSG(inputCRS_EPSG_code)
+        dummyShapefile.GeoProjection = inputCRS
+        
+        shapeFileFolderPath = "C:\\gismo\\shapefile_example2"
+        if not os.path.exists(shapeFileFolderPath):
+            os.makedirs(shapeFileFolderPath)
+        shapefileFilePath = shapeFileFolderPath + "\\dummyShapefile_%s.shp" % str(time.time())
+        success = MapWinGIS.ShapefileClass.SaveAs(dummyShapefile, shapefileFilePath, None)
+        dummyShapefile.Close()
         
         # dummyShapefile2 = dummyShapefile
         dummyShapefile2 = MapWinGIS.ShapefileClass()
@@ -2510,9 +4879,6 @@ class GIS():
         outputCRS2.ImportFromEPSG(outputCRS_EPSG_code)
         numOfsuccessfullyReprojectedShapes = clr.StrongBox[System.Int32]()
         reprojectedShapefile = MapWinGIS.ShapefileClass.Reproject(dummyShapefile2, outputCRS2, numOfsuccessfullyReprojectedShapes)
-        if reprojectedShapefile == None:
-            reprojectErrorMsg2 = dummyShapefile2.ErrorMsg(dummyShapefile2.LastErrorCode)
-            print "reprojectErrorMsg2: ", reprojectErrorMsg2
         dummyShapefile2.Close()
         
         # delete the dummyShapefile_timetime().shp files and whole its folder
@@ -2536,6 +4902,15 @@ class GIS():
         """calculate latitude and longitude coordinates of the 'pt_req' in Rhino scene.
         output: 'pt_req' converted to latitude, longitude degrees"""
         
+        latitudes, longitudes = self.XYtoLocations([pt_req], anchorLocation, anchorOriginPt)
+        
+        return latitudes[0], longitudes[0]
+    
+    
+    def XYtoLocations(self, pts_req, anchorLocation, anchorOriginPt=rg.Point3d(0,0,0)):
+        """calculate latitude and longitude coordinates of all 'pts_req' in Rhino scene, at once.
+        output: lists of 'pts_req' converted to latitude, longitude degrees"""
+        
         
         # extract latitude, longitude from input 'anchorLocation'
         gismo_prep = Preparation()
@@ -2544,35 +4919,20 @@ class GIS():
         
         unitConversionFactor, unitSystemLabel = gismo_prep.checkUnits()
         anchorOriginPt_meters = rg.Point3d(anchorOriginPt.X*unitConversionFactor, anchorOriginPt.Y*unitConversionFactor, anchorOriginPt.Z*unitConversionFactor)
-        pt_req_meters = rg.Point3d(pt_req.X*unitConversionFactor, pt_req.Y*unitConversionFactor, pt_req.Z*unitConversionFactor)
-        
-        
-        
-        # inputCRS
-        EPSGcode = 4326  # WGS 84
-        inputCRS_dummy = self.CRS_from_EPSGcode(EPSGcode)
-        # outputCRS
-        outputCRS_dummy = self.UTM_CRS_from_latitude(anchor_locationLatitudeD, anchor_locationLongitudeD)
-        
-        anchor_originProjected_meters = self.convertBetweenTwoCRS(inputCRS_dummy, outputCRS_dummy, anchor_locationLongitudeD, anchor_locationLatitudeD)  # in meters
-        
         
         
+        # based on assumption that both anchorLocation_ input and required points belong to the same UTM zone
+        UTM_projection = self.UTM_projection(anchor_locationLatitudeD, anchor_locationLongitudeD)
+        anchor_originProjected_meters = self.projectedLocationCoordinates(anchor_locationLatitudeD, anchor_locationLongitudeD)  # in meters
         
-        # inputCRS
-        # based on assumption that both anchorLocation_ input and required_location belong to the same UTM zone
-        inputCRS = self.UTM_CRS_from_latitude(anchor_locationLatitudeD, anchor_locationLongitudeD, anchor_locationLatitudeD, anchor_locationLongitudeD)
+        moveX = anchor_originProjected_meters.X - anchorOriginPt_meters.X
+        moveY = anchor_originProjected_meters.Y - anchorOriginPt_meters.Y
+        eastings = [moveX + pt_req.X*unitConversionFactor  for pt_req in pts_req]
+        northings = [moveY + pt_req.Y*unitConversionFactor  for pt_req in pts_req]
         
-        # outputCRS
-        EPSGcode = 4326
-        outputCRS = self.CRS_from_EPSGcode(EPSGcode)
+        latitudes, longitudes = UTM_projection.inverse(eastings, northings)
         
-        
-        latitudeLongitudePt = self.convertBetweenTwoCRS(inputCRS, outputCRS, (anchor_originProjected_meters.X - anchorOriginPt_meters.X) + pt_req_meters.X, (anchor_originProjected_meters.Y - anchorOriginPt_meters.Y) + pt_req_meters.Y)
-        latitude = latitudeLongitudePt.Y
-        longitude = latitudeLongitudePt.X
-        
-        return latitude, longitude
+        return latitudes, longitudes
     
     
     def destinationLatLon(self, latitude1D, longitude1D, radiusM):
@@ -2716,20 +5076,6 @@ class GIS():
                        "2) In the same folder where the .shp file is, check if there are .shx,.dbf,.prj files with the same file name. These two files are essential, in order to open the .shx file.\n" +\
                        "3) If both upper two checks are fine: post a question about this issue on Gismo forum (grasshopper3d.com/group/gismo) with .shp and its files attached, and a screenshot of the message coming from 'readMe!' output."
             
-            print "shapefile.ErrorMsg: ", shapefile.ErrorMsg
-            
-            utils = MapWinGIS.UtilsClass()
-            convertErrorNo = MapWinGIS.GlobalSettingsClass().GdalLastErrorNo
-            convertErrorMsg = MapWinGIS.GlobalSettingsClass().GdalLastErrorMsg
-            convertErrorType = MapWinGIS.GlobalSettingsClass().GdalLastErrorType
-            reprojectErrorMsg = MapWinGIS.GlobalSettingsClass().GdalReprojectionErrorMsg
-            print "convertErrorNo: ", convertErrorNo
-            print "convertErrorMsg: ", convertErrorMsg
-            print "convertErrorType: ", convertErrorType
-            print "reprojectErrorMsg: ", reprojectErrorMsg
-            print "utils.ErrorMsg: ", utils.ErrorMsg
-            print "utils.LastErrorCode: ", utils.LastErrorCode
-            
             return None, printMsg
         
         elif openShapefileSuccess:
@@ -2772,121 +5118,147 @@ class GIS():
             return locationStr, printMsg
     
     
-    def readSHPfile(self, shpFilePath, locationLatitudeD, locationLongitudeD, northRad=0, originPt=rg.Point3d(0,0,0), unitConversionFactor=1, osm_id_Only=[], osm_way_id_Only=[], osm_id_Remove=[], osm_way_id_Remove=[]):
-        """ read shapefile """
+    def shapefileReprojectionMethod(self, shapefileCRS, outputCRS):
+        """
+        how the points read from a shapefile are reprojected to the outputCRS (location's UTM zone):
+            "none" - shapefile is already in the outputCRS
+            "transverseMercator" - shapefile is in WGS84 latitude-longitude. Points are reprojected in bulk with TransverseMercator
+            "mapWinGIS" - shapefile is in some other CRS. Points are transformed by MapWinGIS GeoProjection
+            None - shapefile's CRS is unknown (there is no .prj file)
+        """
+        if shapefileCRS.IsEmpty:
+            return None
+        elif shapefileCRS.IsSame(outputCRS):
+            return "none"
+        elif shapefileCRS.IsGeographic and shapefileCRS.IsSameGeogCS(self.CRS_from_EPSGcode(4326)):
+            return "transverseMercator"
+        else:
+            return "mapWinGIS"
+    
+    
+    def reprojectedPoints(self, points, reprojectionMethod, shapefileCRS, UTMprojection):
+        """
+        reproject (x,y,z) points of a shape's part to the location's UTM zone (meters). Check "shapefileReprojectionMethod" method.
+        For "mapWinGIS" reprojectionMethod, shapefileCRS.StartTransform needs to be called beforehand
+        """
+        if (reprojectionMethod == "none"):
+            return points
+        elif (reprojectionMethod == "transverseMercator"):
+            eastings, northings = UTMprojection.forward([pt[1] for pt in points], [pt[0] for pt in points])  # x is longitude, y is latitude
+            return zip(eastings, northings, [pt[2] for pt in points])
+        else:
+            reprojected = []
+            for x, y, z in points:
+                x_ref = clr.StrongBox[System.Double](x)
+                y_ref = clr.StrongBox[System.Double](y)
+                MapWinGIS.GeoProjectionClass.Transform(shapefileCRS, x_ref, y_ref)
+                reprojected.append((x_ref.Value, y_ref.Value, z))
+            return reprojected
+    
+    
+    def shapefileTransform(self, moveVector, northRad, originPt, unitConversionFactor):
+        """
+        single transformation matrix from reprojected shapefile coordinates (meters) to Rhino scene: scale to Rhino document units, move by moveVector (in Rhino document units), and rotate due to north angle
+        """
+        transformMatrixScale = Rhino.Geometry.Transform.Scale(Rhino.Geometry.Point3d(0,0,0), 1.0/unitConversionFactor)
+        transformMatrixMove = Rhino.Geometry.Transform.Translation(moveVector)
+        #transformMatrixRotate = Rhino.Geometry.Transform.Rotation(-northRad, Rhino.Geometry.Vector3d(0,0,1), originPt)  # counter-clockwise
+        transformMatrixRotate = Rhino.Geometry.Transform.Rotation(northRad, Rhino.Geometry.Vector3d(0,0,1), originPt)  # clockwise
+        
+        return transformMatrixRotate * transformMatrixMove * transformMatrixScale  # the right-most one is applied first
+    
+    
+    def transformedPolyline(self, coordinates, transformMatrix):
+        """
+        polyline from (X,Y,Z) coordinates of a shape's part. All of its points are transformed with a single transformMatrix call
+        """
+        polyline = Rhino.Geometry.Polyline(len(coordinates))
+        for X, Y, Z in coordinates:
+            polyline.Add(X, Y, Z)
+        polyline.Transform(transformMatrix)
+        
+        return polyline
+    
+    
+    def shapefileRecordsAroundLocation(self, shapefile, shpFilePath, locationLatitudeD, locationLongitudeD, radiusM):
+        """
+        indices of shapefile's records which intersect the square of radiusM around the location. Found with shapefile's spatial index (.gsi file).
+        None if shapefile's projection is unknown. Also returns the message if the spatial index could not be saved (None otherwise)
+        """
+        if shapefile.GeoProjection.IsEmpty:
+            return None, None
+        
+        latTop, lonTop, latBottom, lonBottom, latLeft, lonLeft, latRight, lonRight = self.destinationLatLon(locationLatitudeD, locationLongitudeD, radiusM)
+        
+        # corners of the square in shapefile's CRS
+        WGS84_CRS = self.CRS_from_EPSGcode(4326)
+        cornerPts = [self.convertBetweenTwoCRS(WGS84_CRS, shapefile.GeoProjection, lon, lat)  for lon, lat in [(lonLeft, latBottom), (lonRight, latBottom), (lonRight, latTop), (lonLeft, latTop)]]
+        bbox = (min(pt.X for pt in cornerPts), min(pt.Y for pt in cornerPts), max(pt.X for pt in cornerPts), max(pt.Y for pt in cornerPts))
+        
+        spatialIndex = ShapefileSpatialIndex(shpFilePath)
+        recordIndices = spatialIndex.query(bbox)
+        
+        return recordIndices, spatialIndex.saveErrorMsg
+    
+    
+    def readSHPfile(self, shpFilePath, locationLatitudeD, locationLongitudeD, northRad=0, originPt=rg.Point3d(0,0,0), unitConversionFactor=1, osm_id_Only=[], osm_way_id_Only=[], osm_id_Remove=[], osm_way_id_Remove=[], radiusM=None):
+        """ read shapefile. If radiusM is supplied, only the shapes around the location are read.
+        Shapes and attribute values are read directly from the .shp and .dbf files with ShapefileReader, and their points are then reprojected to the location's UTM zone. MapWinGIS is only used for shapefile's CRS """
         
         # shapefile is always reprojected to UTM in Gismo
         outputCRS = self.UTM_CRS_from_latitude(locationLatitudeD, locationLongitudeD)
+        UTMprojection = self.UTM_projection(locationLatitudeD, locationLongitudeD)
         
+        shapefileShapeType = proj4_str = shortenedName_keys = values = shapes = moveVector = None
         
-        # fix invalid shapes, overlapping shape issues, shape vertices direction ...
-        utils = MapWinGIS.UtilsClass()
         shapefile = MapWinGIS.ShapefileClass()
         openShapefileSuccess = MapWinGIS.ShapefileClass.Open(shapefile, shpFilePath, None)
+        try:
+            reader = ShapefileReader(shpFilePath)
+        except (IOError, ValueError, struct.error):
+            reader = None
         
-        
-        if (not openShapefileSuccess) or (not shapefile):
+        if (not openShapefileSuccess) or (not shapefile) or (reader == None):
             # maybe the 'shpFilePath' is incorrect, or shapefile type is not supported (SHP_MULTIPATCH)
-            shapefileShapeType = proj4_str = shortenedName_keys = values = shapes = None
-            
+            if openShapefileSuccess:
+                shapefile.Close()
             validShapes = False
             printMsg = "Shapefile reading failed. Check: \n" +\
                        "1) If '_shpFile' file path is correct. If it is: \n" +\
                        "2) In the same folder where the .shp file is, check if there are .shx,.dbf,.prj files with the same file name. These two files are essential, in order to open the .shx file.\n" +\
                        "3) If both upper two checks are fine: post a question about this issue on Gismo forum (grasshopper3d.com/group/gismo) with .shp and its files attached, and a screenshot of the message coming from 'readMe!' output."
-            
-            print "shapefile.ErrorMsg: ", shapefile.ErrorMsg
-            
-            utils = MapWinGIS.UtilsClass()
-            convertErrorNo = MapWinGIS.GlobalSettingsClass().GdalLastErrorNo
-            convertErrorMsg = MapWinGIS.GlobalSettingsClass().GdalLastErrorMsg
-            convertErrorType = MapWinGIS.GlobalSettingsClass().GdalLastErrorType
-            reprojectErrorMsg = MapWinGIS.GlobalSettingsClass().GdalReprojectionErrorMsg
-            print "convertErrorNo: ", convertErrorNo
-            print "convertErrorMsg: ", convertErrorMsg
-            print "convertErrorType: ", convertErrorType
-            print "reprojectErrorMsg: ", reprojectErrorMsg
-            print "utils.ErrorMsg: ", utils.ErrorMsg
-            print "utils.LastErrorCode: ", utils.LastErrorCode
-            
             return shortenedName_keys, values, shapes, shapefileShapeType, proj4_str, moveVector, validShapes, printMsg
         
-        elif openShapefileSuccess:
-            
-            # direct reprojection
-            numOfsuccessfullyReprojectedShapes_sb = clr.StrongBox[System.Int32]()  # instance of clr.StrongBox
-            shapefileFixedSuccess, fixedShapefile = MapWinGIS.ShapefileClass.FixUpShapes(shapefile)  # fails on MapWinGIS 4.9.4.2. Does not fail on Map Window Lite 32x
-            
-            """
-            print "shapefileFixedSuccess: ", shapefileFixedSuccess
-            print "fixedShapefile: ", fixedShapefile
-            """
-            
-            if shapefileFixedSuccess:
-                # shape file has been fixed
-                #reprojectedShapefile = MapWinGIS.ShapefileClass.Reproject(shapefile, outputCRS, numOfsuccessfullyReprojectedShapes_sb)
-                reprojectedShapefile = MapWinGIS.ShapefileClass.Reproject(fixedShapefile, outputCRS, numOfsuccessfullyReprojectedShapes_sb)
-            else:
-                # shapefile has NOT been fixed. Use the initial shapefile
-                reprojectedShapefile = MapWinGIS.ShapefileClass.Reproject(shapefile, outputCRS, numOfsuccessfullyReprojectedShapes_sb)
-            
-            numOfsuccessfullyReprojectedShapes = numOfsuccessfullyReprojectedShapes_sb.Value
-            
-            """
-            print "numOfsuccessfullyReprojectedShapes: ", numOfsuccessfullyReprojectedShapes
-            print "type(numOfsuccessfullyReprojectedShapes): ", type(numOfsuccessfullyReprojectedShapes)
-            print "reprojectedShapefile: ", reprojectedShapefile
-            """
-            
-            """
-            # testing fixing of shapes
-            print "reprojectedShapefile: ", reprojectedShapefile
-            # testing MapWinGIS.ShapefileClass.FixUpShapes
-            shpFilePath_saved = shpFilePath[:-4] + "_saved_" + str(int(time.time())) + ".shp"
-            print "shpFilePath_saved: ", shpFilePath_saved
-            success = MapWinGIS.ShapefileClass.SaveAs(reprojectedShapefile, shpFilePath_saved, None)
-            print "success: ", success
-            """
-        
-        
-        if (numOfsuccessfullyReprojectedShapes == 0) or (reprojectedShapefile == None):
-            # reprojection failed
-            print "REPROJECTION FAILED"
-            convertErrorNo = MapWinGIS.GlobalSettingsClass().GdalLastErrorNo
-            convertErrorMsg = MapWinGIS.GlobalSettingsClass().GdalLastErrorMsg
-            convertErrorType = MapWinGIS.GlobalSettingsClass().GdalLastErrorType
-            reprojectErrorMsg = MapWinGIS.GlobalSettingsClass().GdalReprojectionErrorMsg
-            print "numOfsuccessfullyReprojectedShapes: ", numOfsuccessfullyReprojectedShapes
-            print "convertErrorNo: ", convertErrorNo
-            print "convertErrorMsg: ", convertErrorMsg
-            print "convertErrorType: ", convertErrorType
-            print "reprojectErrorMsg: ", reprojectErrorMsg
-            print "utils.ErrorMsg: ", utils.ErrorMsg
-            print "utils.LastErrorCode: ", utils.LastErrorCode
-            
-            reprojectionError = fixedShapefile.ErrorMsg(fixedShapefile.LastErrorCode)
-            
-            shapefileShapeType = proj4_str = shortenedName_keys = values = shapes = None
+        shapefileCRS = shapefile.GeoProjection
+        reprojectionMethod = self.shapefileReprojectionMethod(shapefileCRS, outputCRS)
+        if (reprojectionMethod == None):
+            reader.close()
+            shapefile.Close()
             validShapes = False
-            printMsg = "The following error emerged while processing the data:\n" + \
-                       " \n" + \
-                       "\"%s\"\n" % reprojectionError + \
-                       "numOfsuccessfullyReprojectedShapes: %s\n" % numOfsuccessfullyReprojectedShapes + \
-                       " \n" + \
-                       "Open new topic about it on: www.grasshopper3d.com/group/gismo/forum, and attached .shp and all its files (.shx, .dbf, .prj)."
+            printMsg = "The CRS of the shapefile is unknown, so it can not be reprojected to your _location.\n" + \
+                       "Check if there is a .prj file with the same file name in the same folder where the .shp file is."
             return shortenedName_keys, values, shapes, shapefileShapeType, proj4_str, moveVector, validShapes, printMsg
         
+        recordIndices = None  # indices of the read shapes in the .shp file. None: all shapes are read
+        spatialIndexMsg = None
+        if (radiusM != None):
+            recordIndices, spatialIndexMsg = self.shapefileRecordsAroundLocation(shapefile, shpFilePath, locationLatitudeD, locationLongitudeD, radiusM)
+            if (recordIndices != None) and (len(recordIndices) == 0):
+                reader.close()
+                shapefile.Close()
+                validShapes = False
+                printMsg = "There are no shapes within the radius_ (%s meters) around the _location.\n" % radiusM + \
+                           "Increase the radius_ input, or check if the _location is inside of the shapefile's area."
+                return shortenedName_keys, values, shapes, shapefileShapeType, proj4_str, moveVector, validShapes, printMsg
+        
         
         originPtProjected_meters = self.projectedLocationCoordinates(locationLatitudeD, locationLongitudeD)  # in meters!
         originPtProjected = Rhino.Geometry.Point3d(originPtProjected_meters.X/unitConversionFactor, originPtProjected_meters.Y/unitConversionFactor, originPtProjected_meters.Z/unitConversionFactor)  # in Rhino units
         moveVector = originPt - originPtProjected  # later
         
-        # rotation due to north angle position
-        #transformMatrixRotate = Rhino.Geometry.Transform.Rotation(-northRad, Rhino.Geometry.Vector3d(0,0,1), originPt)  # counter-clockwise
-        transformMatrixRotate = Rhino.Geometry.Transform.Rotation(northRad, Rhino.Geometry.Vector3d(0,0,1), originPt)  # clockwise
-        
+        # scaling, moving and rotation due to north angle position
+        transformMatrix = self.shapefileTransform(moveVector, northRad, originPt, unitConversionFactor)
         
-        # open reprojectedShapefile
         
         # ShapeType of a whole shapefile (.shp) and also of each 'shape' in the shapefile (.shp)
         shapeShapeType_dict = {}
@@ -2905,156 +5277,116 @@ class GIS():
         shapeShapeType_dict[28] = 'SHP_MULTIPOINTM'
         shapeShapeType_dict[31] = 'SHP_MULTIPATCH'
         
-        # loop through shortenedName_keys (these are shapefile fields (":" is replaced with "_" and maximal size is 10 characters))
-        shortenedName_keys = []
-        for i in xrange(reprojectedShapefile.NumFields):
-            field = reprojectedShapefile.Field(i)
-            shortenedName_keys.append(field.Name)
+        # shortenedName_keys are shapefile fields (":" is replaced with "_" and maximal size is 10 characters)
+        attributeTable = AttributeTable(reader)
+        shortenedName_keys = attributeTable.keys
         
         
         values = Grasshopper.DataTree[object]()
         shapes = Grasshopper.DataTree[object]()
         
-        for i in xrange(reprojectedShapefile.NumShapes):
-            shape_com = reprojectedShapefile.Shape[i]
-            shape = Marshal.CreateWrapperOfType(shape_com, MapWinGIS.ShapeClass)
-            if not shape.IsValid:
-                fixedShape = MapWinGIS.ShapeClass.FixUp(shape)
-                if (fixedShape != None):
-                    shape = fixedShape
-                
-            
+        if (reprojectionMethod == "mapWinGIS"):
+            shapefileCRS.StartTransform(outputCRS)
+        
+        for i, shapeType, parts, dummyValues in reader.records(fieldNames=[], recordIndices=recordIndices):  # values are read from attributeTable
+            # data tree path is the shape's index in the .shp file, even if only the shapes around the location are read
             
-            if (shape.ShapeType == 0):  # NULL_SHAPE
+            if (shapeType == 0):  # NULL_SHAPE
                 # ShapeType: NULL_SHAPE
                 
                 # values
-                subValuesL = []
-                for g in xrange(reprojectedShapefile.NumFields):
-                    value = reprojectedShapefile.CellValue(g,i)
-                    subValuesL.append(value)
-                values.AddRange(subValuesL, Grasshopper.Kernel.Data.GH_Path(i))
+                values.AddRange(attributeTable.row(i), Grasshopper.Kernel.Data.GH_Path(i))
                 
                 # pts
                 ptsPerShape = [None]
                 shapes.AddRange(ptsPerShape, Grasshopper.Kernel.Data.GH_Path(i))
             
-            if (shape.ShapeType == 1):  # SHP_POINT
+            elif (shapeType == 1):  # SHP_POINT
                 # ShapeType: POINT
                 
                 # values
-                subValuesL = []
-                for g in xrange(reprojectedShapefile.NumFields):
-                    value = reprojectedShapefile.CellValue(g,i)
-                    if value == "yes": value = True  # for example: "building=yes"
-                    subValuesL.append(value)
+                subValuesL = attributeTable.row(i)
                 
                 # pts
-                ptsPerShape = []
-                for k in xrange(shape.numPoints):
-                    pt = shape.Point[k]
-                    point3dProjected = Rhino.Geometry.Point3d(pt.x/unitConversionFactor, pt.y/unitConversionFactor, pt.z/unitConversionFactor)
-                    point3dMoved = point3dProjected + moveVector
-                    succ = point3dMoved.Transform(transformMatrixRotate)
-                    ptsPerShape.append(point3dMoved)
+                ptsPerShape = list(self.transformedPolyline(self.reprojectedPoints(parts[0], reprojectionMethod, shapefileCRS, UTMprojection), transformMatrix))
                 
-                subValuesL_filtered, ptsPerShape_filtered = self.filterShapes(shortenedName_keys, subValuesL, ptsPerShape, osm_id_Only, osm_way_id_Only, osm_id_Remove, osm_way_id_Remove)
+                subValuesL_filtered, ptsPerShape_filtered = self.filterShapes(shortenedName_keys, subValuesL, ptsPerShape, osm_id_Only, osm_way_id_Only, osm_id_Remove, osm_way_id_Remove, attributeTable.keyIndices)
                 
                 values.AddRange(subValuesL_filtered, Grasshopper.Kernel.Data.GH_Path(i))
                 shapes.AddRange(ptsPerShape_filtered, Grasshopper.Kernel.Data.GH_Path(i))
                 del ptsPerShape
             
-            elif (shape.ShapeType == 3) or (shape.ShapeType == 13) or (shape.ShapeType == 5) or (shape.ShapeType == 15):
+            elif (shapeType == 3) or (shapeType == 13) or (shapeType == 5) or (shapeType == 15):
                 # ShapeType: POLYLINE, POLYLINEZ, POLYGON, POLYGONZ
                 
-                for n in xrange(shape.NumParts):
-                    # values
-                    subValuesL = []
-                    for g in xrange(reprojectedShapefile.NumFields):
-                        value = reprojectedShapefile.CellValue(g,i)
-                        if value == "yes": value = True  # for example: "building=yes"
-                        subValuesL.append(value)
-                    
-                    
-                    # points
-                    ptsPerPart = []
-                    subShape = shape.PartAsShape(n)
-                    for k in xrange(subShape.numPoints):
-                        pt = subShape.Point[k]
-                        
-                        X = pt.x/unitConversionFactor
-                        Y = pt.y/unitConversionFactor
-                        Z = pt.z/unitConversionFactor
-                        
-                        """
-                        elif (shape.ShapeType != 13):  # POLYLINEZ
-                            ## FIX ##
-                            #if (k == 0):
-                            if (k == subShape.numPoints-1):
-                                #Z = subShape.Point[subShape.numPoints-1].z
-                                Z = subShape.Point[0].z
-                            else:
-                                Z = pt.z/unitConversionFactor
-                            ## FIX ##
-                        """
-                        
-                        point3dProjected = Rhino.Geometry.Point3d(X, Y, Z)  # in Rhino document units
-                        point3dMoved = point3dProjected + moveVector
-                        succ = point3dMoved.Transform(transformMatrixRotate)
-                        ptsPerPart.append(point3dMoved)
-                    polyline = Rhino.Geometry.Polyline(ptsPerPart)
-                    
-                    subValuesL_filtered, shapesL_filtered = self.filterShapes(shortenedName_keys, subValuesL, [polyline], osm_id_Only, osm_way_id_Only, osm_id_Remove, osm_way_id_Remove)
-                    
+                # values (the same row for all parts)
+                subValuesL = attributeTable.row(i)
+                
+                # points, in Rhino document units
+                polylines = [self.transformedPolyline(self.reprojectedPoints(part, reprojectionMethod, shapefileCRS, UTMprojection), transformMatrix)  for part in parts]
+                
+                # all parts of the shape are either kept or removed
+                subValuesL_filtered, shapesL_filtered = self.filterShapes(shortenedName_keys, subValuesL, polylines, osm_id_Only, osm_way_id_Only, osm_id_Remove, osm_way_id_Remove, attributeTable.keyIndices)
+                
+                for n in xrange(len(parts)):
                     values.AddRange(subValuesL_filtered, Grasshopper.Kernel.Data.GH_Path(i,n))
-                    shapes.AddRange(shapesL_filtered, Grasshopper.Kernel.Data.GH_Path(i,n))
-                    del subValuesL
-                    del ptsPerPart
-                    del polyline
-                    del subValuesL_filtered
-                    del shapesL_filtered
-                subShape = None
-            
-            elif (shape.ShapeType == 31):  # MULTI_PATCH
-                # ShapeType: MULTI_PATCH
-                shapefileShapeType = proj4_str = shortenedName_keys = values = shapes = None
-                validShapes = False
-                printMsg = "Gismo at the moment does not support MULTI_PATCH shapefile shapes."
-                return shortenedName_keys, values, shapes, shapefileShapeType, proj4_str, moveVector, validShapes, printMsg
+                    shapes.AddRange(shapesL_filtered[n:n+1], Grasshopper.Kernel.Data.GH_Path(i,n))
+                del polylines
+                del subValuesL_filtered
+                del shapesL_filtered
             
             else:
-                shapeShapeType = shapeShapeType_dict[shape.ShapeType]
-                
+                if (reprojectionMethod == "mapWinGIS"):
+                    shapefileCRS.StopTransform()
+                reader.close()
+                shapefile.Close()
                 shapefileShapeType = proj4_str = shortenedName_keys = values = shapes = None
                 validShapes = False
-                printMsg = "Gismo at the moment does not support {} shapefile type shapes.\nAsk a question on the forum (https://www.grasshopper3d.com/group/gismo/forum) if this type can be added to Gismo.".format(shapeShapeType)
+                if (shapeType == 31):  # MULTI_PATCH
+                    printMsg = "Gismo at the moment does not support MULTI_PATCH shapefile shapes."
+                else:
+                    shapeShapeType = shapeShapeType_dict.get(shapeType, shapeType)
+                    printMsg = "Gismo at the moment does not support {} shapefile type shapes.\nAsk a question on the forum (https://www.grasshopper3d.com/group/gismo/forum) if this type can be added to Gismo.".format(shapeShapeType)
                 return shortenedName_keys, values, shapes, shapefileShapeType, proj4_str, moveVector, validShapes, printMsg
         
+        if (reprojectionMethod == "mapWinGIS"):
+            shapefileCRS.StopTransform()
+        reader.close()
+        
         
-        shapefileShapeType = shapeShapeType_dict[shapefile.ShapefileType]
+        shapefileShapeType = shapeShapeType_dict.get(reader.shapeType, reader.shapeType)
         proj4_str = shapefile.Projection
         
         shapefile.Close()
-        reprojectedShapefile.Close()
         
         
         validShapes = True
-        printMsg = "ok"
+        printMsg = "ok" if (spatialIndexMsg == None) else spatialIndexMsg  # shapes are valid even if the spatial index was not saved
         
         return shortenedName_keys, values, shapes, shapefileShapeType, proj4_str, moveVector, validShapes, printMsg
     
     
-    def filterShapes(self, shortenedName_keys, subValuesL, shapesL, osm_id_Only, osm_way_id_Only, osm_id_Remove, osm_way_id_Remove):
+    def keyIndices(self, keys):
+        """
+        dictionary of key: index of the key, for constant time lookup of the keys' values
+        """
+        return dict((key, keyIndex)  for keyIndex, key in enumerate(keys))
+    
+    
+    def filterShapes(self, shortenedName_keys, subValuesL, shapesL, osm_id_Only, osm_way_id_Only, osm_id_Remove, osm_way_id_Remove, keyIndices=None):
         """
-        filter values and shapes for the four inputs from "OSM ids" component
+        filter values and shapes for the four inputs from "OSM ids" component.
+        keyIndices (from "keyIndices" method) can be supplied when this method is called for many shapes with the same shortenedName_keys
         """
+        if (keyIndices == None):
+            keyIndices = self.keyIndices(shortenedName_keys)
+        
         value__osm_id = "^#-@"  # dummy value, in case for some unknown reason there is no "osm_id" key
         value__osm_way_id = "^#-@"  # dummy value, in case there is no "osm_way_id" key (shapeType = 1,2)
-        for shortenedName_keysIndex, key in enumerate(shortenedName_keys):
-            if key == "osm_id":
-                value__osm_id = subValuesL[shortenedName_keysIndex]  # it will always be a string, not float, because shapefile keeps its values as strings
-            if key == "osm_way_id":
-                value__osm_way_id = subValuesL[shortenedName_keysIndex]  # it will always be a string, not float, because shapefile keeps its values as strings
+        if ("osm_id" in keyIndices):
+            value__osm_id = subValuesL[keyIndices["osm_id"]]  # it will always be a string, not float, because shapefile keeps its values as strings
+        if ("osm_way_id" in keyIndices):
+            value__osm_way_id = subValuesL[keyIndices["osm_way_id"]]  # it will always be a string, not float, because shapefile keeps its values as strings
         
         
         # removing shapes
@@ -3077,38 +5409,43 @@ class GIS():
                 return [], []
     
     
-    def tagEqual_to_requiredTag(self, branchIndex, keys, values_shiftedPaths_LL, requiredKeyL, requiredValuesLL, OSMobjectNameL):
+    def tagEqual_to_requiredTag(self, branchIndex, keys, values_shiftedPaths_LL, requiredKeyL, requiredValuesLL, OSMobjectNameL, keyIndices=None):
         """
-        determine if shapes's tags (key=value pairs) correspond to particular requiredTag (key=value pair)
+        determine if shapes's tags (key=value pairs) correspond to particular requiredTag (key=value pair).
+        keyIndices (from "keyIndices" method) can be supplied when this method is called for many shapes with the same keys
         """
+        if (keyIndices == None):
+            keyIndices = self.keyIndices(keys)
+        
+        # only the keys which are required, in the order of "keys"
+        foundKeyIndices = sorted((keyIndices[requiredKey], requiredKeyIndex)  for requiredKeyIndex,requiredKey in enumerate(requiredKeyL)  if (requiredKey in keyIndices))
+        
         value = ""  # dummy values in case requiredKey or requiredValues does not exist
         foundShapesSwitch = False  # initial value
-        for keyIndex,key in enumerate(keys):
-            for requiredKeyIndex,requiredKey in enumerate(requiredKeyL):
-                if (key == requiredKey):
-                    # requiredKey is found, check if requiredValue can be found
+        for keyIndex, requiredKeyIndex in foundKeyIndices:
+            # requiredKey is found, check if requiredValue can be found
+            
+            # first check if a value is a multi-value or not (example: "commercial;residential")
+            values_unsplitted = values_shiftedPaths_LL[branchIndex][keyIndex]
+            if (type(values_unsplitted) == System.Boolean):  # "OSM shapes" component replaces all "building"="yes"/"no" values with "building"=True/False. This is why it is not possible to split(";") the Boolean value, as it is a string
+                values_stripped = [values_unsplitted]
+            elif (type(values_unsplitted) != System.Boolean):
+                values_splitted = values_unsplitted.split(";")  # in case a value is not a single item but a multiple-value (wiki.openstreetmap.org/wiki/Multiple_values). If it is a single value, then .strip(";") will not be performed
+                values_stripped = [value2.strip()  for value2 in values_splitted]
+            
+            for value in values_stripped:
+                if (value in requiredValuesLL[requiredKeyIndex]) and (value != ""):
+                    foundShapesSwitch = True
+                    OSMobjectName = OSMobjectNameL[requiredKeyIndex]  # "requiredKeyL" and "OSMobjectNameL" lists have the same number of items
                     
-                    # first check if a value is a multi-value or not (example: "commercial;residential")
-                    values_unsplitted = values_shiftedPaths_LL[branchIndex][keyIndex]
-                    if (type(values_unsplitted) == System.Boolean):  # "OSM shapes" component replaces all "building"="yes"/"no" values with "building"=True/False. This is why it is not possible to split(";") the Boolean value, as it is a string
-                        values_stripped = [values_unsplitted]
-                    elif (type(values_unsplitted) != System.Boolean):
-                        values_splitted = values_unsplitted.split(";")  # in case a value is not a single item but a multiple-value (wiki.openstreetmap.org/wiki/Multiple_values). If it is a single value, then .strip(";") will not be performed
-                        values_stripped = [value2.strip()  for value2 in values_splitted]
+                    del values_shiftedPaths_LL
+                    return foundShapesSwitch, value, [OSMobjectName]
+                elif (requiredValuesLL[requiredKeyIndex] == ["^"]) and (value != ""):
+                    foundShapesSwitch = True
+                    OSMobjectName = OSMobjectNameL[requiredKeyIndex]  # "requiredKeyL" and "OSMobjectNameL" lists have the same number of items
                     
-                    for value in values_stripped:
-                        if (value in requiredValuesLL[requiredKeyIndex]) and (value != ""):
-                            foundShapesSwitch = True
-                            OSMobjectName = OSMobjectNameL[requiredKeyIndex]  # "requiredKeyL" and "OSMobjectNameL" lists have the same number of items
-                            
-                            del values_shiftedPaths_LL
-                            return foundShapesSwitch, value, [OSMobjectName]
-                        elif (key == requiredKey) and (requiredValuesLL[requiredKeyIndex] == ["^"]) and (value != ""):
-                            foundShapesSwitch = True
-                            OSMobjectName = OSMobjectNameL[requiredKeyIndex]  # "requiredKeyL" and "OSMobjectNameL" lists have the same number of items
-                            
-                            del values_shiftedPaths_LL
-                            return foundShapesSwitch, value, [OSMobjectName]
+                    del values_shiftedPaths_LL
+                    return foundShapesSwitch, value, [OSMobjectName]
         
         del values_shiftedPaths_LL
         return foundShapesSwitch, value, []
@@ -3138,6 +5475,712 @@ class GIS():
         return validShapefiles, printMsg
 
 
+class OverpassDownloader():
+    """
+    download of OSM data (.osm file) for a latitude-longitude bounding box from Overpass API.
+    The bounding box is split into tiles, which are downloaded with at most "maxNumOfParallelDownloads" downloads at once. A tile which fails to download (for example: "Too many requests" or "Gateway timeout" response) is downloaded again, after a pause which doubles after each attempt.
+    Tiles are merged into a single .osm file in which each node, way and relation appears only once (elements which cross the edges of tiles are downloaded with each of them).
+    Downloaded tiles are kept until all of them are merged, so a download which failed continues from the missing tiles the next time.
+    With "tagFilters", only the elements with those tags (and the nodes and ways they consist of) are downloaded, instead of the whole map of the tile.
+    """
+    interpreterLink = "http://overpass-api.de/api/interpreter"
+    tileSizeD = 0.05  # around 5x5 km at the equator
+    maxNumOfParallelDownloads = 2  # overpass-api.de runs two queries per IP address at once
+    maxNumOfAttempts = 4
+    firstPauseS = 5  # pause before the second attempt, in seconds
+    elementTypes = ("node", "way", "relation")  # in the order required by .osm files
+    elementIdRegex = re.compile(r'\sid="(-?\d+)"')
+    shapeTypeElementTypes = {0: ("way", "relation"), 1: ("way",), 2: ("node",), 3: ("relation",)}  # elements of which polygons, polylines, points and multilinestrings shapes are made
+    regexSpecialCharacterRegex = re.compile(r'([\\.^$|?*+()\[\]{}])')
+    
+    def __init__(self, tilesFolderPath, tagFilters=None, shapeType=None, geometryInline=False):
+        """
+        input:
+            tagFilters - list of (key, values) pairs. An element is downloaded if it has at least one of the keys with one of its values. values = ["^"] stands for any value. Empty list or None downloads the whole map
+            shapeType - 0 (polygons), 1 (polylines), 2 (points), 3 (multilinestrings). Only the elements of this shapeType are filtered by tags. If None, all of them are
+            geometryInline - coordinates of ways are written in their <nd> elements ("out geom"), instead of downloading their nodes. The .osm file can then not be converted by OGR, which requires the nodes"""
+        
+        self.tilesFolderPath = tilesFolderPath
+        self.tagFilters = tagFilters if tagFilters else []
+        self.shapeType = shapeType
+        self.geometryInline = geometryInline
+    
+    
+    def tiles(self, latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD):
+        """
+        bounding box split into equal tiles not larger than tileSizeD.
+        output:
+            tiles - list of (tileFilePath, (latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD)) tuples"""
+        
+        numOfRows = max(1, int(math.ceil(round((latitudeTopD - latitudeBottomD) / self.tileSizeD, 9))))
+        numOfColumns = max(1, int(math.ceil(round((longitudeRightD - longitudeLeftD) / self.tileSizeD, 9))))
+        tileHeightD = (latitudeTopD - latitudeBottomD) / numOfRows
+        tileWidthD = (longitudeRightD - longitudeLeftD) / numOfColumns
+        
+        tiles = []
+        for tileRow in xrange(numOfRows):
+            for tileColumn in xrange(numOfColumns):
+                tileFilePath = os.path.join(self.tilesFolderPath, "tile_%s_%s.osm" % (tileRow, tileColumn))
+                tileBoundsD = (latitudeBottomD + tileRow*tileHeightD, latitudeBottomD + (tileRow+1)*tileHeightD, longitudeLeftD + tileColumn*tileWidthD, longitudeLeftD + (tileColumn+1)*tileWidthD)
+                tiles.append((tileFilePath, tileBoundsD))
+        
+        return tiles
+    
+    
+    def tileQuery(self, tileBoundsD):
+        """
+        Overpass QL query of the tile. The same data as the one of the "api/map?bbox=" call: nodes in the tile, ways and relations which use them, and all nodes and ways of those ways and relations"""
+        
+        latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD = tileBoundsD
+        bbox = "%s,%s,%s,%s" % (latitudeBottomD, longitudeLeftD, latitudeTopD, longitudeRightD)
+        
+        if (len(self.tagFilters) == 0):
+            return "[out:xml][timeout:180];(node(%s);<;>;);out meta;" % bbox
+        
+        tagStatements = "".join(["%s%s(%s);" % (elementType, tagFilterQuery, bbox)  for tagFilterQuery in self.tagFilterQueries()  for elementType in self.shapeTypeElementTypes.get(self.shapeType, self.elementTypes)])
+        if self.geometryInline:
+            return "[out:xml][timeout:180];(%s);out meta geom;" % tagStatements
+        else:
+            return "[out:xml][timeout:180];(%s);(._;>;);out meta;" % tagStatements
+    
+    
+    def qlString(self, text):
+        """
+        text as a quoted Overpass QL string"""
+        
+        return '"%s"' % text.replace("\\", "\\\\").replace('"', '\\"')
+    
+    
+    def tagFilterQueries(self):
+        """
+        Overpass QL tag filter of each (key, values) pair of tagFilters: ["key"] for any value, ["key"~"^(value1|value2)$"] for specific values"""
+        
+        tagFilterQueries = []
+        for key, values in self.tagFilters:
+            if (len(values) == 0) or ("^" in values):
+                tagFilterQueries.append("[%s]" % self.qlString(key))
+            else:
+                valuesRegex = "^(%s)$" % "|".join([self.regexSpecialCharacterRegex.sub(r"\\\1", value)  for value in values])
+                tagFilterQueries.append("[%s~%s]" % (self.qlString(key), self.qlString(valuesRegex)))
+        
+        return tagFilterQueries
+    
+    
+    def filterName(self):
+        """
+        short name which differs for each tagFilters and shapeType, so that the .osm files downloaded with different filters are not mistaken for each other. Empty string for the whole map"""
+        
+        if (len(self.tagFilters) == 0):
+            return ""
+        
+        return hashlib.md5(self.tileQuery((0, 0, 0, 0)).encode("utf-8")).hexdigest()[:8]
+    
+    
+    def validTileFile(self, tileFilePath):
+        """
+        check if the tile has been completely downloaded: it ends with "</osm>", and Overpass did not report a runtime error (timeout, out of memory) at its end"""
+        
+        try:
+            with open(tileFilePath, "rb") as tileFile:
+                tileFile.seek(0, 2)
+                tileFile.seek(max(0, tileFile.tell() - 4096))
+                tail = tileFile.read()
+        except IOError:
+            return False
+        
+        return ("</osm>" in tail) and ("runtime error" not in tail)
+    
+    
+    def postQuery(self, query, downloadedFilePath):
+        """
+        send the Overpass QL query as a POST request (a GET request with the query in its link can be too long for the server), and write the response to the downloadedFilePath.
+        Returns True if the response is downloaded, together with the error message (None if it is downloaded)"""
+        
+        postData = urllib.urlencode({"data": query.encode("utf-8")})
+        try:
+            client = System.Net.WebClient()
+            client.Encoding = System.Text.Encoding.UTF8
+            client.Headers.Add(System.Net.HttpRequestHeader.ContentType, "application/x-www-form-urlencoded")
+            response = client.UploadString(self.interpreterLink, "POST", postData)
+            with open(downloadedFilePath, "wb") as downloadedFile:
+                downloadedFile.write(response.encode("utf-8"))
+        except Exception as e:
+            try:
+                # System.Net.WebClient failed, try urllib
+                response = urllib.urlopen(self.interpreterLink, postData)
+                with open(downloadedFilePath, "wb") as downloadedFile:
+                    shutil.copyfileobj(response, downloadedFile)
+                response.close()
+            except Exception as e2:
+                errorMsg = "%s (%s)" % (e, e2)
+                return False, errorMsg
+        
+        return True, None
+    
+    
+    def downloadTile(self, tileFilePath, tileBoundsD):
+        """
+        download a single tile, if it has not been downloaded already. Returns True if the tile is downloaded.
+        Otherwise returns False and the error of the last attempt"""
+        
+        if self.validTileFile(tileFilePath):
+            return True, None
+        
+        tileQuery = self.tileQuery(tileBoundsD)
+        partFilePath = tileFilePath + ".part"  # an incomplete tile is never left with the tileFilePath
+        lastErrorMsg = None
+        for attempt in xrange(self.maxNumOfAttempts):
+            if (attempt > 0):
+                time.sleep(self.firstPauseS * 2**(attempt-1))
+            
+            tileFileDownloaded, lastErrorMsg = self.postQuery(tileQuery, partFilePath)
+            if tileFileDownloaded and self.validTileFile(partFilePath):
+                if os.path.isfile(tileFilePath):
+                    os.remove(tileFilePath)
+                os.rename(partFilePath, tileFilePath)
+                return True, None
+            elif tileFileDownloaded:
+                lastErrorMsg = "Overpass API response is not a complete .osm file (the query timed out, or the server is overloaded)"
+        
+        if os.path.isfile(partFilePath):
+            os.remove(partFilePath)
+        return False, lastErrorMsg
+    
+    
+    def downloadTiles(self, tiles):
+        """
+        download the tiles, with at most maxNumOfParallelDownloads at once. Returns the tiles which failed to download, each with its last error: (tileFilePath, tileBoundsD, errorMsg)"""
+        
+        tilesQueue = Queue.Queue()
+        for tile in tiles:
+            tilesQueue.put(tile)
+        
+        failedTiles = []
+        def downloadTilesFromQueue():
+            while True:
+                try:
+                    tileFilePath, tileBoundsD = tilesQueue.get_nowait()
+                except Queue.Empty:
+                    return
+                tileFileDownloaded, errorMsg = self.downloadTile(tileFilePath, tileBoundsD)
+                if not tileFileDownloaded:
+                    failedTiles.append((tileFilePath, tileBoundsD, errorMsg))
+        
+        threads = [threading.Thread(target=downloadTilesFromQueue)  for i in xrange(min(self.maxNumOfParallelDownloads, len(tiles)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        return failedTiles
+    
+    
+    def osmElements(self, osmFile):
+        """
+        generator of (elementType, elementId, elementLines) of the nodes, ways and relations of an opened .osm file, read line by line.
+        Overpass writes the opening and closing tag of each element, and each of its child tags, in separate lines"""
+        
+        elementLines = None
+        for line in osmFile:
+            if (elementLines != None):
+                # inside of a way or relation, or a node with tags
+                elementLines.append(line)
+                if (line.strip() == closingTag):
+                    yield elementType, elementId, elementLines
+                    elementLines = None
+                continue
+            
+            strippedLine = line.strip()
+            for elementType in self.elementTypes:
+                if strippedLine.startswith("<" + elementType + " "):
+                    elementId = self.elementIdRegex.search(line).group(1)
+                    if strippedLine.endswith("/>"):
+                        yield elementType, elementId, [line]
+                    else:
+                        elementLines = [line]
+                        closingTag = "</%s>" % elementType
+                    break
+    
+    
+    def mergeTiles(self, tileFilePaths, osmFilePath, boundsD):
+        """
+        merge the tiles into a single .osm file, with each node, way and relation written only once. All nodes are written first, then ways, then relations.
+        Returns True if the .osm file has been written. Otherwise (for example: not enough disk space) no .osm file is left"""
+        
+        latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD = boundsD
+        
+        # each element type is first written to its own file
+        elementIds = dict((elementType, set())  for elementType in self.elementTypes)
+        elementsFilePaths = dict((elementType, osmFilePath + "." + elementType + ".part")  for elementType in self.elementTypes)
+        partFilePath = osmFilePath + ".part"  # an incomplete .osm file is never left with the osmFilePath
+        try:
+            elementsFiles = {}
+            try:
+                for elementType in self.elementTypes:
+                    elementsFiles[elementType] = open(elementsFilePaths[elementType], "wb")
+                for tileFilePath in tileFilePaths:
+                    with open(tileFilePath, "rb") as tileFile:
+                        for elementType, elementId, elementLines in self.osmElements(tileFile):
+                            if (elementId in elementIds[elementType]):
+                                continue  # already written from one of the previous tiles
+                            elementIds[elementType].add(elementId)
+                            elementsFiles[elementType].writelines(elementLines)
+            finally:
+                for elementsFile in elementsFiles.values():
+                    elementsFile.close()
+            del elementIds
+            
+            with open(partFilePath, "wb") as osmFile:
+                osmFile.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+                osmFile.write('<osm version="0.6" generator="Gismo">\n')
+                osmFile.write('  <bounds minlat="%s" minlon="%s" maxlat="%s" maxlon="%s"/>\n' % (latitudeBottomD, longitudeLeftD, latitudeTopD, longitudeRightD))
+                for elementType in self.elementTypes:
+                    with open(elementsFilePaths[elementType], "rb") as elementsFile:
+                        shutil.copyfileobj(elementsFile, osmFile)
+                    os.remove(elementsFilePaths[elementType])
+                osmFile.write("</osm>\n")
+            
+            if os.path.isfile(osmFilePath):
+                os.remove(osmFilePath)
+            os.rename(partFilePath, osmFilePath)
+        except (IOError, OSError):
+            for filePath in [partFilePath] + elementsFilePaths.values():
+                if os.path.isfile(filePath):
+                    os.remove(filePath)
+            return False
+        
+        return True
+    
+    
+    def downloadOsmFile(self, latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD, osmFilePath):
+        """
+        download OSM data for the bounding box into a single .osm file. Returns True if all of its tiles have been downloaded and merged.
+        Otherwise returns False and the error message"""
+        
+        if not os.path.isdir(self.tilesFolderPath):
+            os.makedirs(self.tilesFolderPath)
+        
+        tiles = self.tiles(latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD)
+        failedTiles = self.downloadTiles(tiles)
+        if (len(failedTiles) > 0):
+            errorMsg = "%s out of %s OSM tiles failed to download. Last error: %s" % (len(failedTiles), len(tiles), failedTiles[-1][2])
+            return False, errorMsg
+        
+        osmFileMerged = self.mergeTiles([tileFilePath  for tileFilePath, tileBoundsD in tiles], osmFilePath, (latitudeBottomD, latitudeTopD, longitudeLeftD, longitudeRightD))
+        if not osmFileMerged:
+            errorMsg = "OSM tiles could not be merged into the .osm file (check if there is enough free disk space)"
+            return False, errorMsg
+        
+        # tiles are not needed anymore, the .osm file is kept instead
+        shutil.rmtree(self.tilesFolderPath, ignore_errors=True)
+        
+        return True, None
+
+
+class OsmParser():
+    """
+    streaming parser of OSM data (.osm XML file, or Overpass API json file), which creates the shapes of a single shapeType directly from nodes, ways and relations, in one pass through the file.
+    Coordinates of nodes are kept in two arrays, and found by node's id (id: index dictionary). Each way is kept as an array of indices of its nodes. Rings of multipolygon relations are assembled from their member ways.
+    Keys are kept with their full names (they are not shortened to 10 characters and ":" is not replaced, as in .dbf files).
+    Shapes are created in the same way as with GDAL's OSM driver (with osmconf.ini of previous Gismo versions):
+    0 (polygons) - closed ways with one of "closedWaysArePolygonsKeys" keys (or "area=yes"), and multipolygon and boundary relations
+    1 (polylines) - ways which are not polygons
+    2 (points) - nodes
+    3 (multilinestrings) - multilinestring and route relations
+    Nodes and ways need to have at least one key which is not in "uninterestingKeys".
+    Nodes need to be written before the ways and relations which use them, as in the files of OSM API and Overpass API.
+    "resources/osm/osm_parser_sample.osm" is a small .osm file with each of these cases, and the shapes expected from it. For example, its polygons are created with:
+        osmParser = OsmParser(0)
+        osmParser.parse(osmFilePath)
+    """
+    closedWaysArePolygonsKeys = frozenset(["aeroway", "amenity", "boundary", "building", "building:levels", "building:part", "craft", "geological", "historic", "landuse", "leisure", "military", "natural", "office", "place", "shop", "sport", "tourism"])
+    uninterestingKeys = frozenset(["created_by", "converted_by", "source", "time", "ele", "attribution", "note", "todo", "fixme", "FIXME"])
+    multipolygonRelationTypes = ("multipolygon", "boundary")
+    multilinestringRelationTypes = ("multilinestring", "route")
+    attributeRegex = re.compile(r"""([\w:]+)=(?:"([^"]*)"|'([^']*)')""")
+    idCoordinateAttributeRegex = re.compile(r"""\s(id|ref|lat|lon)=["']([^"']*)["']""")  # values of these attributes never need to be unescaped
+    characterReferenceRegex = re.compile(r"&(#x[0-9a-fA-F]+|#[0-9]+|amp|lt|gt|quot|apos);")
+    characterEntities = {"amp": u"&", "lt": u"<", "gt": u">", "quot": u'"', "apos": u"'"}
+    
+    def __init__(self, shapeType, requiredKeys=None):
+        """
+        input:
+            shapeType - 0 (polygons), 1 (polylines), 2 (points), 3 (multilinestrings)
+            requiredKeys - keys whose values are read. If empty or None, all keys of the shapes are read"""
+        
+        self.shapeType = shapeType
+        self.requiredKeys = list(requiredKeys) if requiredKeys else []
+        
+        self.latitudesD = array.array("d")
+        self.longitudesD = array.array("d")
+        self.nodeIndices = {}  # node id (or (latitude, longitude) of an inline coordinate without id): index of its coordinates
+        self.wayNodeIndices = {}  # way id: array of indices of its node coordinates. Only for shapeTypes made of relations
+        
+        self.shapeIds = []  # osm_id (and osm_way_id for polygons) of each shape
+        self.shapeTags = []  # tags of each shape
+        self.shapeParts = []  # list of arrays of node coordinate indices of each shape
+        
+        # results of "parse" method
+        self.keys = []
+        self.shapes = []  # (values, parts) of each shape
+    
+    
+    def parse(self, osmFilePath):
+        """
+        read the OSM file, and create "keys", "shapes", "latitudesD" and "longitudesD".
+        shapes are (values, parts) of each shape: values are ordered as keys (missing values are "", and "yes" values are True), each part is a list of indices of "latitudesD" and "longitudesD" coordinates.
+        Rings of polygons are closed: outer rings are clockwise, inner ones counterclockwise"""
+        
+        # lines are read as bytes. Only the ones with keys and values are decoded (from utf-8)
+        with open(osmFilePath, "rb") as osmFile:
+            firstLine = osmFile.readline()
+            if firstLine.lstrip().startswith("{"):
+                elements = self.jsonElements(osmFile)
+            else:
+                elements = self.xmlElements(osmFile)
+            
+            for elementType, elementId, latitude, longitude, tags, nds, members in elements:
+                if (elementType == "node"):
+                    self.addNode(elementId, latitude, longitude, tags)
+                elif (elementType == "way"):
+                    self.addWay(elementId, tags, nds)
+                elif (elementType == "relation"):
+                    self.addRelation(elementId, tags, members)
+        
+        self.createKeysValues()
+    
+    
+    def xmlElements(self, osmFile):
+        """
+        (elementType, elementId, latitude, longitude, tags, nds, members) of each node, way and relation of .osm file.
+        nds are (ref, latitude, longitude) of way's nodes, members are (type, ref, role, nds) of relation's members. Latitudes and longitudes exist only in files downloaded with Overpass "out geom"
+        Each XML tag needs to be written in a separate line, as in the files of OSM API, Overpass API, JOSM, osmium and osmosis"""
+        
+        element = None
+        memberNds = None  # nds of a member with inline geometry
+        for line in osmFile:
+            line = line.strip()
+            if line.startswith("<node ") or line.startswith("<way ") or line.startswith("<relation "):
+                attributes = dict(self.idCoordinateAttributeRegex.findall(line))
+                elementType = line[1:line.index(" ")]
+                element = (elementType, attributes.get("id"), attributes.get("lat"), attributes.get("lon"), {}, [], [])
+                if line.endswith("/>"):
+                    yield element
+                    element = None
+            
+            elif (element == None):
+                # header, bounds, or the end of the file
+                continue
+            
+            elif line.startswith("<nd "):
+                attributes = dict(self.idCoordinateAttributeRegex.findall(line))
+                nd = (attributes.get("ref"), attributes.get("lat"), attributes.get("lon"))
+                if (memberNds != None):
+                    memberNds.append(nd)
+                else:
+                    element[5].append(nd)
+            
+            elif line.startswith("<tag "):
+                attributes = self.attributes(line.decode("utf-8"))
+                element[4][attributes.get("k", u"")] = attributes.get("v", u"")
+            
+            elif line.startswith("<member "):
+                attributes = self.attributes(line.decode("utf-8"))
+                member = (attributes.get("type"), attributes.get("ref"), attributes.get("role", u""), [])
+                element[6].append(member)
+                if (attributes.get("lat") != None):
+                    member[3].append((None, attributes["lat"], attributes["lon"]))  # node member with inline coordinates
+                if not line.endswith("/>"):
+                    memberNds = member[3]
+            
+            elif line.startswith("</member"):
+                memberNds = None
+            
+            elif (line == "</node>") or (line == "</way>") or (line == "</relation>"):
+                yield element
+                element = None
+    
+    
+    def jsonElements(self, osmFile):
+        """
+        the same as "xmlElements", for Overpass API json file ("[out:json]"). Each element is decoded on its own.
+        Overpass API writes each element of "elements" list starting with a "{" line, and ending with a "}" or "}," line"""
+        
+        elementLines = None
+        for line in osmFile:
+            if (elementLines == None):
+                if (line.rstrip() == "{"):
+                    elementLines = [line]
+                continue
+            
+            elementLines.append(line)
+            if (line.rstrip() == "}") or (line.rstrip() == "},"):
+                element = json.loads("".join(elementLines).rstrip().rstrip(","))
+                elementLines = None
+                
+                nds = []
+                if ("nodes" in element):
+                    geometry = element.get("geometry") or [None] * len(element["nodes"])
+                    for ref, coordinate in zip(element["nodes"], geometry):
+                        if (coordinate != None):
+                            nds.append((str(ref), coordinate["lat"], coordinate["lon"]))
+                        else:
+                            nds.append((str(ref), None, None))
+                
+                members = []
+                for member in element.get("members", []):
+                    memberNds = [(None, coordinate["lat"], coordinate["lon"])  for coordinate in member.get("geometry", [])  if (coordinate != None)]
+                    if ("lat" in member):
+                        memberNds.append((None, member["lat"], member["lon"]))
+                    members.append((member["type"], str(member["ref"]), member.get("role", u""), memberNds))
+                
+                yield element["type"], str(element["id"]), element.get("lat"), element.get("lon"), element.get("tags", {}), nds, members
+    
+    
+    def attributes(self, line):
+        """
+        attributes of an XML tag as dictionary, with unescaped values"""
+        
+        attributes = {}
+        for name, doubleQuotedValue, singleQuotedValue in self.attributeRegex.findall(line):
+            value = doubleQuotedValue or singleQuotedValue
+            if ("&" in value):
+                value = self.characterReferenceRegex.sub(self.characterReference, value)
+            attributes[name] = value
+        return attributes
+    
+    
+    def characterReference(self, match):
+        name = match.group(1)
+        try:
+            if name.startswith("#x"):
+                return unichr(int(name[2:], 16))
+            elif name.startswith("#"):
+                return unichr(int(name[1:]))
+        except ValueError:
+            # character out of range of unichr
+            return match.group(0)
+        return self.characterEntities[name]
+    
+    
+    def nodeIndex(self, nodeKey, latitude, longitude):
+        """
+        index of node's coordinates. New coordinates are added if they are known (latitude and longitude are not None), and the node has not been added already. None if node's coordinates are not known"""
+        
+        nodeIndex = self.nodeIndices.get(nodeKey)
+        if (nodeIndex == None) and (latitude != None):
+            nodeIndex = len(self.latitudesD)
+            self.latitudesD.append(float(latitude))
+            self.longitudesD.append(float(longitude))
+            self.nodeIndices[nodeKey] = nodeIndex
+        return nodeIndex
+    
+    
+    def ndsNodeIndices(self, nds):
+        """
+        array of node coordinate indices of the nds. Nodes whose coordinates are not known are left out"""
+        
+        nodeIndices = array.array("i")
+        for ref, latitude, longitude in nds:
+            if (ref == None):
+                nodeKey = (latitude, longitude)  # inline coordinate of a relation member. Equal coordinates of different members are the same node
+            else:
+                nodeKey = ref
+            nodeIndex = self.nodeIndex(nodeKey, latitude, longitude)
+            if (nodeIndex != None):
+                nodeIndices.append(nodeIndex)
+        return nodeIndices
+    
+    
+    def interesting(self, tags):
+        """
+        check if tags contain at least one key which is not in "uninterestingKeys" """
+        
+        for key in tags:
+            if key not in self.uninterestingKeys:
+                return True
+        return False
+    
+    
+    def addShape(self, shapeIds, tags, parts):
+        self.shapeIds.append(shapeIds)
+        self.shapeTags.append(tags)
+        self.shapeParts.append(parts)
+    
+    
+    def addNode(self, nodeId, latitude, longitude, tags):
+        if (self.shapeType == 2):
+            # points: only the coordinates of point shapes are needed
+            if (latitude != None) and self.interesting(tags):
+                self.addShape((nodeId,), tags, [[self.nodeIndex(nodeId, latitude, longitude)]])
+        else:
+            self.nodeIndex(nodeId, latitude, longitude)
+    
+    
+    def addWay(self, wayId, tags, nds):
+        if (self.shapeType == 2):
+            return
+        
+        nodeIndices = self.ndsNodeIndices(nds)
+        if (self.shapeType == 0) or (self.shapeType == 3):
+            # the way can be a member of a relation
+            self.wayNodeIndices[wayId] = nodeIndices
+        
+        if (len(nodeIndices) < 2) or not self.interesting(tags):
+            return
+        
+        closedWay = (len(nodeIndices) >= 4) and (nodeIndices[0] == nodeIndices[-1])
+        if closedWay and (tags.get("area") != "no") and ((tags.get("area") == "yes") or not self.closedWaysArePolygonsKeys.isdisjoint(tags)):
+            if (self.shapeType == 0):
+                self.addShape(("", wayId), tags, [self.orientedRing(nodeIndices, True)])
+        elif (self.shapeType == 1):
+            self.addShape((wayId,), tags, [nodeIndices])
+    
+    
+    def addRelation(self, relationId, tags, members):
+        relationType = tags.get("type")
+        if (self.shapeType == 0) and (relationType in self.multipolygonRelationTypes):
+            outerWays = []
+            innerWays = []
+            for memberType, ref, role, memberNds in members:
+                if (memberType == "way"):
+                    nodeIndices = self.memberNodeIndices(ref, memberNds)
+                    if (role == "inner"):
+                        innerWays.append(nodeIndices)
+                    else:
+                        outerWays.append(nodeIndices)  # "outer" or no role
+            
+            outerRings = [self.orientedRing(ring, True)  for ring in self.rings(outerWays)]
+            if (len(outerRings) > 0):
+                innerRings = [self.orientedRing(ring, False)  for ring in self.rings(innerWays)]
+                relationTags = dict((key, value)  for key, value in tags.items()  if (key != "type"))
+                self.addShape((relationId, ""), relationTags, outerRings + innerRings)
+        
+        elif (self.shapeType == 3) and (relationType in self.multilinestringRelationTypes):
+            parts = []
+            for memberType, ref, role, memberNds in members:
+                if (memberType == "way"):
+                    nodeIndices = self.memberNodeIndices(ref, memberNds)
+                    if (len(nodeIndices) >= 2):
+                        parts.append(nodeIndices)
+            if (len(parts) > 0):
+                relationTags = dict((key, value)  for key, value in tags.items()  if (key != "type"))
+                self.addShape((relationId,), relationTags, parts)
+    
+    
+    def memberNodeIndices(self, ref, memberNds):
+        """
+        node coordinate indices of a relation's member way: from its inline geometry, or from the way with the ref id"""
+        
+        if (len(memberNds) > 0):
+            return self.ndsNodeIndices(memberNds)
+        return self.wayNodeIndices.get(ref, array.array("i"))
+    
+    
+    def rings(self, ways):
+        """
+        closed rings assembled from the ways (arrays of node coordinate indices), by joining the ways with the same end nodes (in any direction).
+        Ways which can not be closed into a ring are left out"""
+        
+        rings = []
+        openWays = []
+        for way in ways:
+            if (len(way) >= 4) and (way[0] == way[-1]):
+                rings.append(list(way))
+            elif (len(way) >= 2):
+                openWays.append(list(way))
+        
+        while (len(openWays) > 0):
+            ring = openWays.pop()
+            while (ring[0] != ring[-1]):
+                for wayIndex, way in enumerate(openWays):
+                    if (way[0] == ring[-1]):
+                        ring.extend(way[1:])
+                        break
+                    elif (way[-1] == ring[-1]):
+                        ring.extend(reversed(way[:-1]))
+                        break
+                else:
+                    # the ring can not be closed
+                    ring = None
+                    break
+                del openWays[wayIndex]
+            
+            if (ring != None) and (len(ring) >= 4):
+                rings.append(ring)
+        
+        return rings
+    
+    
+    def orientedRing(self, ring, clockwise):
+        """
+        ring (list of node coordinate indices) in clockwise or counterclockwise direction. The direction is the same in latitude-longitude and in projected coordinates"""
+        
+        latitudesD = self.latitudesD; longitudesD = self.longitudesD
+        doubleSignedArea = 0
+        for k in xrange(len(ring)-1):
+            doubleSignedArea += longitudesD[ring[k]] * latitudesD[ring[k+1]] - longitudesD[ring[k+1]] * latitudesD[ring[k]]
+        
+        if (doubleSignedArea < 0) == clockwise:
+            return list(ring)
+        return list(reversed(ring))
+    
+    
+    def createKeysValues(self):
+        """
+        keys, and values of each shape. Only the coordinates which are used by the shapes are kept"""
+        
+        if (len(self.requiredKeys) != 0):
+            tagKeys = self.requiredKeys
+        else:
+            tagKeySet = set()
+            for tags in self.shapeTags:
+                tagKeySet.update(tags)
+            tagKeys = sorted(tagKeySet)  # sort the keys alphabetically
+        
+        if (self.shapeType == 0):
+            self.keys = ["osm_id", "osm_way_id"] + tagKeys
+        else:
+            self.keys = ["osm_id"] + tagKeys
+        
+        # coordinates of the shapes' nodes, in the order of the shapes
+        latitudesD = array.array("d")
+        longitudesD = array.array("d")
+        newNodeIndices = {}
+        internedValues = {}
+        self.shapes = []
+        for shapeIds, tags, parts in zip(self.shapeIds, self.shapeTags, self.shapeParts):
+            values = list(shapeIds)
+            for key in tagKeys:
+                value = tags.get(key, "")
+                if (value == "yes"):
+                    value = True  # for example: "building=yes"
+                else:
+                    value = internedValues.setdefault(value, value)
+                values.append(value)
+            
+            newParts = []
+            for part in parts:
+                newPart = []
+                for nodeIndex in part:
+                    newNodeIndex = newNodeIndices.get(nodeIndex)
+                    if (newNodeIndex == None):
+                        newNodeIndex = len(latitudesD)
+                        latitudesD.append(self.latitudesD[nodeIndex])
+                        longitudesD.append(self.longitudesD[nodeIndex])
+                        newNodeIndices[nodeIndex] = newNodeIndex
+                    newPart.append(newNodeIndex)
+                newParts.append(newPart)
+            
+            self.shapes.append((values, newParts))
+        
+        self.latitudesD = latitudesD
+        self.longitudesD = longitudesD
+        self.nodeIndices = {}
+        self.wayNodeIndices = {}
+        self.shapeIds = []; self.shapeTags = []; self.shapeParts = []
+
+
 class OSM():
     """
     methods for manipulation of OSM and GIS data
@@ -3235,8 +6278,19 @@ sc.sticky["gismo_Transfrom"] = Transform
 sc.sticky["gismo_Preparation"] = Preparation
 sc.sticky["gismo_CreateGeometry"] = CreateGeometry
 sc.sticky["gismo_EnvironmentalAnalysis"] = EnvironmentalAnalysis
+sc.sticky["gismo_Terrain"] = Terrain
+sc.sticky["gismo_RayCasting"] = RayCasting
+sc.sticky["gismo_TerrainBrep"] = TerrainBrep
+sc.sticky["gismo_DEMTileCache"] = DEMTileCache
+sc.sticky["gismo_RasterCache"] = RasterCache
+sc.sticky["gismo_ShapefileReader"] = ShapefileReader
+sc.sticky["gismo_AttributeTable"] = AttributeTable
+sc.sticky["gismo_ShapefileSpatialIndex"] = ShapefileSpatialIndex
+sc.sticky["gismo_TransverseMercator"] = TransverseMercator
 sc.sticky["gismo_IO"] = IO
 sc.sticky["gismo_GIS"] = GIS
+sc.sticky["gismo_OverpassDownloader"] = OverpassDownloader
+sc.sticky["gismo_OsmParser"] = OsmParser
 sc.sticky["gismo_OSM"] = OSM
 sc.sticky["gismo_mapwingisFolder"] = mapFolder_
 
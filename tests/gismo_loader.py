@@ -0,0 +1,58 @@
+# Gismo: a plugin for GIS Environmental Analysis (GPL) started by Djordje Spasic
+# 
+# This file is part of Gismo.
+# 
+# Gismo is free software; you can redistribute it and/or modify 
+# it under the terms of the GNU General Public License as published 
+# by the Free Software Foundation; either version 3 of the License, 
+# or (at your option) any later version. 
+# 
+# Gismo is distributed in the hope that it will be useful, 
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the 
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with Gismo; If not, see <http://www.gnu.org/licenses/>.
+# 
+# @license GPL-3.0+ <http://spdx.org/licenses/GPL-3.0+>
+
+"""
+Load a single class from src/gismo_gismo.py, without Rhino and Grasshopper.
+Only the source of the class is executed, so the class can be tested if its methods do not use Rhino, Grasshopper or .NET.
+"""
+
+import io
+import os
+import re
+import math
+
+
+gismoGismoFilePath = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src", "gismo_gismo.py")
+resourcesFolderPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "resources")
+
+
+def loadClass(className, extraGlobals=None):
+    """
+    execute the source of the "className" class from gismo_gismo.py and return the class.
+    input:
+        className - name of the class
+        extraGlobals - dictionary of modules and names the class uses, other than math
+    output:
+        the class"""
+    
+    with io.open(gismoGismoFilePath, encoding="utf-8") as gismoGismoFile:
+        source = gismoGismoFile.read().replace("\r\n", "\n")
+    start = source.index("\nclass %s(" % className)
+    end = re.compile(r"\n(class |def |sc\.sticky)").search(source, start + 1).start()
+    
+    classGlobals = {"math": math}
+    try:
+        classGlobals["xrange"] = xrange
+    except NameError:
+        classGlobals["xrange"] = range  # Python 3
+    if extraGlobals:
+        classGlobals.update(extraGlobals)
+    exec(source[start:end], classGlobals)
+    
+    return classGlobals[className]
@@ -0,0 +1,105 @@
+# Gismo: a plugin for GIS Environmental Analysis (GPL) started by Djordje Spasic
+# 
+# This file is part of Gismo.
+# 
+# Gismo is free software; you can redistribute it and/or modify 
+# it under the terms of the GNU General Public License as published 
+# by the Free Software Foundation; either version 3 of the License, 
+# or (at your option) any later version. 
+# 
+# Gismo is distributed in the hope that it will be useful, 
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the 
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with Gismo; If not, see <http://www.gnu.org/licenses/>.
+# 
+# @license GPL-3.0+ <http://spdx.org/licenses/GPL-3.0+>
+
+
+"""
+Compare Terrain.horizonScan with horizon angles found by ray casting against the terrain mesh triangles (RayCasting.firstHitsReference).
+"""
+
+import math
+import random
+import unittest
+
+from gismo_loader import loadClass
+
+
+Terrain = loadClass("Terrain")
+RayCasting = loadClass("RayCasting")
+
+
+def hillyElevationGrid(numOfGridPoints, seed):
+    # sum of gaussian hills and valleys
+    randomGenerator = random.Random(seed)
+    hills = [(randomGenerator.uniform(0, numOfGridPoints), randomGenerator.uniform(0, numOfGridPoints), randomGenerator.uniform(-10, 25), randomGenerator.uniform(1, 4))  for h in range(10)]
+    return [[sum(height*math.exp(-((i-hillX)**2 + (k-hillY)**2)/(2*spread**2))  for hillX, hillY, height, spread in hills)  for i in range(numOfGridPoints)]  for k in range(numOfGridPoints)]
+
+
+def gridTriangles(elevationLL, startX, startY, cellsizeX, cellsizeY):
+    # each cell is split into two triangles along its (i,k)-(i+1,k+1) diagonal, the same as in Terrain.horizonScan
+    def gridPoint(k, i):
+        return (startX + i*cellsizeX, startY - k*cellsizeY, elevationLL[k][i])
+    triangleCoordinates = []
+    for k in range(len(elevationLL)-1):
+        for i in range(len(elevationLL[0])-1):
+            triangleCoordinates.extend(gridPoint(k, i) + gridPoint(k, i+1) + gridPoint(k+1, i+1))
+            triangleCoordinates.extend(gridPoint(k, i) + gridPoint(k+1, i+1) + gridPoint(k+1, i))
+    return triangleCoordinates, list(range(len(triangleCoordinates)//9))
+
+
+def rayCastingHorizonAngle(rayCasting, triangleCoordinates, triangleFaceIndices, observerPt, azimuthR, minRadius, maxRadius):
+    # the largest elevation angle at which a ray (starting at minRadius from the observer, ending at maxRadius) still hits the terrain. Found by bisection
+    dirX, dirY = math.cos(azimuthR), math.sin(azimuthR)
+    clipX, clipY = observerPt[0] + dirX*minRadius, observerPt[1] + dirY*minRadius
+    rayParameter, faceIndex = rayCasting.firstHitsReference(triangleCoordinates, triangleFaceIndices, [(clipX, clipY, 1e4)], [(0, 0, -1)])[0]
+    clipElevation = (1e4 - rayParameter) if (faceIndex != -1) else None
+    
+    def terrainHit(angleR):
+        tangent = math.tan(angleR)
+        rayStartZ = observerPt[2] + tangent*minRadius
+        if (minRadius > 0) and (clipElevation != None) and (clipElevation >= rayStartZ):
+            # the ray starts below the terrain
+            return True
+        rayParameter, faceIndex = rayCasting.firstHitsReference(triangleCoordinates, triangleFaceIndices, [(clipX, clipY, rayStartZ)], [(dirX, dirY, tangent)], maxParameter=maxRadius-minRadius)[0]
+        return (faceIndex != -1)
+    
+    lowerAngleR, upperAngleR = -math.pi/2 + 1e-6, math.pi/2 - 1e-6
+    if not terrainHit(lowerAngleR):
+        return -math.pi/2
+    for iteration in range(40):
+        angleR = (lowerAngleR + upperAngleR) / 2
+        if terrainHit(angleR):
+            lowerAngleR = angleR
+        else:
+            upperAngleR = angleR
+    return lowerAngleR
+
+
+class HorizonScanTest(unittest.TestCase):
+    
+    def test_agrees_with_ray_casting(self):
+        terrain = Terrain()
+        rayCasting = RayCasting()
+        numOfGridPoints = 15
+        cellsize = 1.5
+        startX, startY = 0.0, (numOfGridPoints-1)*cellsize
+        azimuthsR = [2*math.pi*j/24 + 0.05  for j in range(24)]
+        for seed in range(3):
+            elevationLL = hillyElevationGrid(numOfGridPoints, seed)
+            triangleCoordinates, triangleFaceIndices = gridTriangles(elevationLL, startX, startY, cellsize, cellsize)
+            observerPt = (9.7, 10.3, terrain.elevationAt(elevationLL, startX, startY, cellsize, cellsize, 9.7, 10.3) + 1.0)
+            # minRadius and maxRadius cut the mesh faces, away from the grid lines
+            for minRadius, maxRadius in ((0, None), (2.3, None), (4.1, None), (2.3, 7.9)):
+                horizonAnglesR = terrain.horizonScan(elevationLL, startX, startY, cellsize, cellsize, observerPt, azimuthsR, minRadius, maxRadius)
+                for azimuthR, horizonAngleR in zip(azimuthsR, horizonAnglesR):
+                    referenceAngleR = rayCastingHorizonAngle(rayCasting, triangleCoordinates, triangleFaceIndices, observerPt, azimuthR, minRadius, (1e9 if (maxRadius == None) else maxRadius))
+                    self.assertAlmostEqual(math.degrees(horizonAngleR), math.degrees(referenceAngleR), places=6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+# Gismo: a plugin for GIS Environmental Analysis (GPL) started by Djordje Spasic
+# 
+# This file is part of Gismo.
+# 
+# Gismo is free software; you can redistribute it and/or modify 
+# it under the terms of the GNU General Public License as published 
+# by the Free Software Foundation; either version 3 of the License, 
+# or (at your option) any later version. 
+# 
+# Gismo is distributed in the hope that it will be useful, 
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the 
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with Gismo; If not, see <http://www.gnu.org/licenses/>.
+# 
+# @license GPL-3.0+ <http://spdx.org/licenses/GPL-3.0+>
+
+"""
+Parse resources/osm/osm_parser_sample.osm with OsmParser, and compare its shapes with the ones expected in the file's comment.
+OsmParser reads the file as IronPython 2.7 str, so these tests run with Python 2 only.
+"""
+
+import array
+import codecs
+import json
+import os
+import re
+import sys
+import unittest
+
+from gismo_loader import loadClass, resourcesFolderPath
+
+
+OsmParser = loadClass("OsmParser", {"array": array, "codecs": codecs, "json": json, "os": os, "re": re})
+osmFilePath = os.path.join(resourcesFolderPath, "osm", "osm_parser_sample.osm")
+
+
+def parsedShapes(shapeType, requiredKeys=None):
+    # keys, and (values, coordinates of parts) of each shape
+    osmParser = OsmParser(shapeType, requiredKeys)
+    osmParser.parse(osmFilePath)
+    shapes = [(values, [[(osmParser.latitudesD[k], osmParser.longitudesD[k])  for k in part]  for part in parts])  for values, parts in osmParser.shapes]
+    return osmParser.keys, shapes
+
+
+def signedArea(ring):
+    # shoelace formula with longitude as x and latitude as y: negative for clockwise rings
+    return sum(ring[k][1]*ring[k+1][0] - ring[k+1][1]*ring[k][0]  for k in range(len(ring)-1)) / 2.0
+
+
+@unittest.skipIf(sys.version_info[0] > 2, "OsmParser reads the file as IronPython 2.7 str")
+class OsmParserTest(unittest.TestCase):
+    
+    def test_polygons(self):
+        keys, shapes = parsedShapes(0)
+        self.assertEqual(keys, ["osm_id", "osm_way_id", "building", "building:levels", "landuse"])
+        self.assertEqual(len(shapes), 2)
+        
+        # closed way with "building" key
+        values, parts = shapes[0]
+        self.assertEqual(values, ["", "13", True, "3", ""])
+        self.assertEqual(len(parts), 1)
+        
+        # multipolygon relation: outer ring assembled from two ways, and one inner ring
+        values, parts = shapes[1]
+        self.assertEqual(values, ["20", "", "", "", "grass"])
+        self.assertEqual(len(parts), 2)
+        outerRing, innerRing = parts
+        self.assertEqual(sorted(set(outerRing)), [(0.0, 0.0), (0.0, 1.0), (1.0, 0.0), (1.0, 1.0)])
+        self.assertEqual(sorted(set(innerRing)), [(0.2, 0.2), (0.2, 0.4), (0.4, 0.4)])
+        
+        # rings are closed: outer ones clockwise, inner ones counterclockwise
+        for values, parts in shapes:
+            for ring in parts:
+                self.assertEqual(ring[0], ring[-1])
+            self.assertLess(signedArea(parts[0]), 0)
+            for ring in parts[1:]:
+                self.assertGreater(signedArea(ring), 0)
+    
+    
+    def test_polylines(self):
+        keys, shapes = parsedShapes(1)
+        self.assertEqual(keys, ["osm_id", "highway", "name:en"])  # full key names
+        self.assertEqual(shapes, [(["14", "residential", "Long key street"], [[(0.0, 0.0), (1.0, 1.0)]])])
+    
+    
+    def test_points(self):
+        keys, shapes = parsedShapes(2)
+        self.assertEqual(keys, ["osm_id", "amenity", "name"])  # node 9 has only an uninteresting key
+        self.assertEqual(shapes, [(["8", "bench", u"A & B \u010d"], [[(0.5, 0.5)]])])  # unescaped character references
+    
+    
+    def test_multilinestrings(self):
+        keys, shapes = parsedShapes(3)
+        self.assertEqual(keys, ["osm_id", "route"])
+        self.assertEqual(shapes, [(["22", "bus"], [[(0.0, 0.0), (1.0, 1.0)]])])
+    
+    
+    def test_required_keys(self):
+        keys, shapes = parsedShapes(0, ["landuse"])
+        self.assertEqual(keys, ["osm_id", "osm_way_id", "landuse"])
+        self.assertEqual([values for values, parts in shapes], [["", "13", ""], ["20", "", "grass"]])  # only the values of required keys are read, shapes are not filtered
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+# Gismo: a plugin for GIS Environmental Analysis (GPL) started by Djordje Spasic
+# 
+# This file is part of Gismo.
+# 
+# Gismo is free software; you can redistribute it and/or modify 
+# it under the terms of the GNU General Public License as published 
+# by the Free Software Foundation; either version 3 of the License, 
+# or (at your option) any later version. 
+# 
+# Gismo is distributed in the hope that it will be useful, 
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the 
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with Gismo; If not, see <http://www.gnu.org/licenses/>.
+# 
+# @license GPL-3.0+ <http://spdx.org/licenses/GPL-3.0+>
+
+"""
+Compare TransverseMercator forward and inverse conversions with published UTM coordinates, and with the ones calculated by PROJ.
+"""
+
+import unittest
+
+from gismo_loader import loadClass
+
+
+TransverseMercator = loadClass("TransverseMercator")
+
+
+# latitude, longitude (degrees), UTM zone, hemisphere, easting, northing (meters)
+# example of GeographicLib's GeoConvert documentation (rounded to centimeters)
+publishedCoordinates = [
+    (33.3, 44.4, 38, "north", 444140.54, 3684706.36)]
+
+# calculated with PROJ ("+proj=utm +zone=.. +ellps=WGS84", "+south" for the southern hemisphere): both hemispheres, near the poles, the equator and the edges of the zones
+projCoordinates = [
+    (-79.99, 87.04331613386256, 45, "south", 500840.54570876, 1119530.0235459972),
+    (73.93691351702975, 56.838043063297704, 39, "north", 680043.1233290075, 8213823.217360551),
+    (45.578974067179246, -122.54248355110624, 10, "north", 535694.284630351, 5047372.140286619),
+    (22.00502284589169, -138.37407738428263, 8, "north", 151591.32097765506, 2437229.780988194),
+    (-1e-09, -72.43599677260761, 18, "south", 785405.2808799788, 9999999.999889359),
+    (17.451250603931037, 71.29159447642067, 43, "north", 105994.97075416014, 1933303.4458217993),
+    (-79.99, -13.374086626626308, 28, "south", 531546.7280399337, 1119089.5095358603),
+    (60.172228075106666, -163.24622974024462, 3, "north", 597304.6747122408, 6671884.161264154)]
+
+
+class TransverseMercatorTest(unittest.TestCase):
+    
+    def assertForward(self, coordinates, tolerance):
+        for latitudeD, longitudeD, CRS_UTMzone, northOrsouth, easting, northing in coordinates:
+            eastings, northings = TransverseMercator.UTMzone(CRS_UTMzone, northOrsouth).forward([latitudeD], [longitudeD])
+            self.assertAlmostEqual(eastings[0], easting, delta=tolerance)
+            self.assertAlmostEqual(northings[0], northing, delta=tolerance)
+    
+    
+    def assertInverse(self, coordinates, tolerance):
+        for latitudeD, longitudeD, CRS_UTMzone, northOrsouth, easting, northing in coordinates:
+            latitudesD, longitudesD = TransverseMercator.UTMzone(CRS_UTMzone, northOrsouth).inverse([easting], [northing])
+            self.assertAlmostEqual(latitudesD[0], latitudeD, delta=tolerance)
+            self.assertAlmostEqual(longitudesD[0], longitudeD, delta=tolerance)
+    
+    
+    def test_forward_published(self):
+        self.assertForward(publishedCoordinates, 0.005)
+    
+    
+    def test_inverse_published(self):
+        self.assertInverse(publishedCoordinates, 1e-7)  # 0.005 meters are around 5e-8 degrees
+    
+    
+    def test_forward_proj(self):
+        self.assertForward(projCoordinates, 0.001)
+    
+    
+    def test_inverse_proj(self):
+        self.assertInverse(projCoordinates, 1e-9)
+    
+    
+    def test_central_meridian_on_equator(self):
+        for CRS_UTMzone, northOrsouth, falseNorthing in [(1, "north", 0.0), (31, "north", 0.0), (60, "south", 10000000.0)]:
+            eastings, northings = TransverseMercator.UTMzone(CRS_UTMzone, northOrsouth).forward([0.0], [CRS_UTMzone*6 - 183])
+            self.assertAlmostEqual(eastings[0], 500000.0, places=6)
+            self.assertAlmostEqual(northings[0], falseNorthing, places=6)
+    
+    
+    def test_utm_zone_is_cached(self):
+        self.assertIs(TransverseMercator.UTMzone(33, "north"), TransverseMercator.UTMzone(33, "north"))
+        self.assertIsNot(TransverseMercator.UTMzone(33, "north"), TransverseMercator.UTMzone(33, "south"))
+
+
+if __name__ == "__main__":
+    unittest.main()
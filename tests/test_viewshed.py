@@ -0,0 +1,99 @@
+# Gismo: a plugin for GIS Environmental Analysis (GPL) started by Djordje Spasic
+# 
+# This file is part of Gismo.
+# 
+# Gismo is free software; you can redistribute it and/or modify 
+# it under the terms of the GNU General Public License as published 
+# by the Free Software Foundation; either version 3 of the License, 
+# or (at your option) any later version. 
+# 
+# Gismo is distributed in the hope that it will be useful, 
+# but WITHOUT ANY WARRANTY; without even the implied warranty of 
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the 
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with Gismo; If not, see <http://www.gnu.org/licenses/>.
+# 
+# @license GPL-3.0+ <http://spdx.org/licenses/GPL-3.0+>
+
+"""
+Compare Terrain.viewshed (XDraw) with a brute-force line of sight over the bilinear terrain.
+"""
+
+import math
+import random
+import unittest
+
+from gismo_loader import loadClass
+
+
+Terrain = loadClass("Terrain")
+
+
+def hillyElevationGrid(numOfGridPoints, seed):
+    # sum of gaussian hills and valleys
+    randomGenerator = random.Random(seed)
+    hills = [(randomGenerator.uniform(0, numOfGridPoints), randomGenerator.uniform(0, numOfGridPoints), randomGenerator.uniform(-30, 60), randomGenerator.uniform(2, 8))  for h in range(12)]
+    return [[sum(height*math.exp(-((i-hillX)**2 + (k-hillY)**2)/(2*spread**2))  for hillX, hillY, height, spread in hills)  for i in range(numOfGridPoints)]  for k in range(numOfGridPoints)]
+
+
+def lineOfSight(terrain, elevationLL, startX, startY, cellsizeX, cellsizeY, observerPt, targetPt, numOfSamples=400):
+    # the target is visible if no sample along the line is below the terrain
+    for j in range(1, numOfSamples):
+        s = j / float(numOfSamples)
+        x, y, z = [observerPt[c] + (targetPt[c] - observerPt[c])*s  for c in range(3)]
+        elevation = terrain.elevationAt(elevationLL, startX, startY, cellsizeX, cellsizeY, x, y)
+        if (elevation != None) and (elevation > z):
+            return False
+    return True
+
+
+class ViewshedTest(unittest.TestCase):
+    
+    def test_agrees_with_brute_force_line_of_sight(self):
+        terrain = Terrain()
+        numOfGridPoints = 41
+        startX, startY, cellsizeX, cellsizeY = 0.0, float(numOfGridPoints-1), 1.0, 1.0
+        numOfPoints = numOfAgreements = 0
+        for seed in range(5):
+            elevationLL = hillyElevationGrid(numOfGridPoints, seed)
+            randomGenerator = random.Random(seed + 100)
+            oi, ok = randomGenerator.randrange(numOfGridPoints), randomGenerator.randrange(numOfGridPoints)
+            observerPt = (startX + oi*cellsizeX, startY - ok*cellsizeY, elevationLL[ok][oi] + 1.6)  # eye height above a grid point
+            minVisibleElevationLL = terrain.viewshed(elevationLL, startX, startY, cellsizeX, cellsizeY, observerPt)
+            for k in range(numOfGridPoints):
+                for i in range(numOfGridPoints):
+                    if (k, i) == (ok, oi):
+                        continue
+                    targetPt = (startX + i*cellsizeX, startY - k*cellsizeY, elevationLL[k][i] + 0.01)  # lifted the same as in Terrain Analysis component
+                    visible = lineOfSight(terrain, elevationLL, startX, startY, cellsizeX, cellsizeY, observerPt, targetPt)
+                    visibleViewshed = (targetPt[2] >= minVisibleElevationLL[k][i])
+                    numOfPoints += 1
+                    numOfAgreements += (visible == visibleViewshed)
+        
+        # XDraw interpolates the horizon between grid points of the previous ring, so a few points right at the visibility boundary differ (99.1% agree)
+        self.assertGreaterEqual(numOfAgreements / float(numOfPoints), 0.985)
+    
+    
+    def test_flat_terrain_is_visible(self):
+        terrain = Terrain()
+        elevationLL = [[5.0]*9 for k in range(9)]
+        minVisibleElevationLL = terrain.viewshed(elevationLL, 0.0, 8.0, 1.0, 1.0, (4.0, 4.0, 6.6))
+        for row in minVisibleElevationLL:
+            for minVisibleElevation in row:
+                self.assertLessEqual(minVisibleElevation, 5.0)
+    
+    
+    def test_wall_hides_the_terrain_behind_it(self):
+        terrain = Terrain()
+        elevationLL = [[0.0]*11 for k in range(11)]
+        for k in range(11):
+            elevationLL[k][7] = 20.0  # wall along the column 7
+        minVisibleElevationLL = terrain.viewshed(elevationLL, 0.0, 10.0, 1.0, 1.0, (5.0, 5.0, 1.6))
+        self.assertGreater(minVisibleElevationLL[5][9], 0.01)  # behind the wall
+        self.assertLessEqual(minVisibleElevationLL[5][3], 0.0)  # on the other side
+
+
+if __name__ == "__main__":
+    unittest.main()